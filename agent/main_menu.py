@@ -1,16 +1,10 @@
-from agent.menus.exit_task_menu import ExitTaskMenu
-from agent.menus.conquer_city_menu import ConquerCityMenu
-from agent.menus.daily_menu import DailyMenu
+from agent.menus import MENU_REGISTRY, create_menu
 from common.utils import print_box, print_menu_item, Colors
 
 
 class MainMenu:
     def __init__(self):
-        self.menu_items = [
-            ExitTaskMenu(),
-            ConquerCityMenu(),
-            DailyMenu()
-        ]
+        self.menu_items = [create_menu(name) for name in MENU_REGISTRY]
 
     def display(self):
         menu_text = []
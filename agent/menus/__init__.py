@@ -0,0 +1,18 @@
+import importlib
+
+# 菜单注册表：菜单名 -> "模块路径:类名"，按注册顺序显示在主菜单中
+MENU_REGISTRY = {
+    'exit': 'agent.menus.exit_task_menu:ExitTaskMenu',
+    'conquer_city': 'agent.menus.conquer_city_menu:ConquerCityMenu',
+    'daily': 'agent.menus.daily_menu:DailyMenu',
+    'profiler': 'agent.menus.profiler_menu:ProfilerMenu',
+}
+
+
+def create_menu(menu_name):
+    """按菜单名创建菜单项实例"""
+    if menu_name not in MENU_REGISTRY:
+        raise KeyError(f"未注册的菜单: {menu_name}")
+    module_path, class_name = MENU_REGISTRY[menu_name].split(':')
+    module = importlib.import_module(module_path)
+    return getattr(module, class_name)()
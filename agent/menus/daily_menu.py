@@ -1,11 +1,9 @@
 from agent.menus.menu_item_base import MenuItemBase
-from agent.tasks.daily_task import DailyTask
 
 
 class DailyMenu(MenuItemBase):
     def __init__(self):
-        super().__init__('日常任务', '每日常规任务', 'task')
-        self.task = DailyTask()
+        super().__init__('日常任务', '每日常规任务', 'task', task_name='daily')
 
     def display_submenu(self):
         """显示子菜单的方法，子类应该重写这个方法"""
@@ -1,10 +1,20 @@
 class MenuItemBase:
     """菜单项基类，所有菜单项（子菜单或任务）都应该继承这个类"""
     
-    def __init__(self, name, description, item_type):
+    def __init__(self, name, description, item_type, task_name=None):
         self.name = name
         self.description = description
         self.item_type = item_type  # "menu" 或 "task"
+        self.task_name = task_name  # 对应 agent.tasks.TASK_REGISTRY 中的任务名
+        self._task = None
+    
+    @property
+    def task(self):
+        """菜单对应的任务，第一次访问时才导入并创建"""
+        if self._task is None and self.task_name:
+            from agent.tasks import create_task
+            self._task = create_task(self.task_name)
+        return self._task
     
     def execute(self):
         """执行菜单项的方法，子类应该重写这个方法"""
@@ -19,4 +29,4 @@ class MenuItemBase:
 
     def execute_task(self):
         """执行任务的方法，子类应该重写这个方法"""
-        raise NotImplementedError("子类必须实现execute_task方法")
\ No newline at end of file
+        raise NotImplementedError("子类必须实现execute_task方法")
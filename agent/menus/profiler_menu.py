@@ -0,0 +1,60 @@
+from agent.menus.menu_item_base import MenuItemBase
+from common.utils import print_box, print_menu_item, Colors
+
+
+class ProfilerMenu(MenuItemBase):
+    """性能分析：选择分析方式后执行一个任务，结果写入 PROFILER_SETTINGS['output_dir']"""
+
+    MODES = [
+        (None, "关闭性能分析"),
+        ('sampling', "采样分析（开销低）"),
+        ('cprofile', "cProfile确定性分析"),
+    ]
+
+    def __init__(self):
+        super().__init__("性能分析", "开启性能分析后执行任务", "menu")
+
+    def display_submenu(self):
+        """选择分析方式和要分析的任务"""
+        from agent.tasks import TASK_REGISTRY, create_task
+        from common.profiler import get_profiler
+
+        profiler = get_profiler()
+        menu_text = [f"当前状态: {profiler.mode or '关闭'}", ""]
+        for i, (_, name) in enumerate(self.MODES, start=1):
+            menu_text.append(print_menu_item(i, name))
+        print_box(menu_text, title="性能分析", width=60)
+
+        mode = self._choose(len(self.MODES))
+        if mode is None:
+            return
+        mode = self.MODES[mode][0]
+        if mode is None:
+            profiler.configure(None)
+            print(f"{Colors.GREEN}性能分析已关闭{Colors.ENDC}")
+            return
+
+        task_names = [name for name in TASK_REGISTRY if name != 'exit']
+        print_box([print_menu_item(i, name) for i, name in enumerate(task_names, start=1)],
+                  title="选择要分析的任务", width=60)
+        index = self._choose(len(task_names))
+        if index is None:
+            return
+        task_name = task_names[index]
+        profiler.configure(mode, tasks=[task_name], steps=profiler.steps)
+        create_task(task_name).execute()
+        print(f"{Colors.GREEN}本次写出的分析文件: {len(profiler.written)}个，"
+              f"目录 {profiler.output_dir}{Colors.ENDC}")
+
+    @staticmethod
+    def _choose(count):
+        choice = input(f"\n{Colors.GREEN}>>> {Colors.ENDC}")
+        try:
+            choice = int(choice)
+        except ValueError:
+            print(f"\n{Colors.RED}无效的输入，请输入一个数字。{Colors.ENDC}")
+            return None
+        if not 1 <= choice <= count:
+            print(f"\n{Colors.RED}无效的选择，请重新输入。{Colors.ENDC}")
+            return None
+        return choice - 1
@@ -0,0 +1,24 @@
+import importlib
+
+# 任务注册表：任务名 -> "模块路径:类名"，任务模块在第一次使用时才导入
+TASK_REGISTRY = {
+    'exit': 'agent.tasks.exit_task:ExitTask',
+    'conquer_city': 'agent.tasks.conquer_city_task:ConquerCityTask',
+    'daily': 'agent.tasks.daily_task:DailyTask',
+}
+
+
+def load_task_class(task_name):
+    """按任务名导入任务类"""
+    if task_name not in TASK_REGISTRY:
+        raise KeyError(f"未注册的任务: {task_name}")
+    module_path, class_name = TASK_REGISTRY[task_name].split(':')
+    module = importlib.import_module(module_path)
+    return getattr(module, class_name)
+
+
+def create_task(task_name):
+    """按任务名创建任务实例"""
+    task = load_task_class(task_name)()
+    task.task_name = task_name
+    return task
@@ -1,11 +1,8 @@
 from agent.tasks.task_base import TaskBase
-from common.gui_util import get_game_windows, capture_window
-from common.image_finder import ImageFinder
+from common.gui_util import get_game_windows, capture_window_array
 from common.coordinate_converter import CoordinateConverter
-from common.image_recognition import ImageRecognition
+from common.region_watcher import RegionWatcher
 import time
-import numpy as np
-import cv2
 
 
 class ConquerCityTask(TaskBase):
@@ -20,128 +17,129 @@ class ConquerCityTask(TaskBase):
             
             for game_window in game_windows:
                 hwnd, title = game_window
-                print(f"正在处理窗口：{title}")
-                
-                # 创建坐标转换器
-                coord_converter = CoordinateConverter(hwnd)
-                
-                # 使用封装方法查找并点击军事事务图标
-                coord_converter.find_and_click_icon(
-                    icon_path="./img/template/military_affairs.png",
-                    description="军事事务图标",
-                    confidence_threshold=0.8,
-                    delay=1.0
-                )
+                self.run_profiled(hwnd, title)
 
-                # 使用封装方法查找并点击攻城图标
-                coord_converter.find_and_click_icon(
-                    icon_path="./img/template/conquer_city.png",
-                    description="攻城图标",
-                    confidence_threshold=0.8,
-                    delay=1.0
-                )
+        except Exception as e:
+            print(f"执行任务时出错: {e}")
+            import traceback
+            traceback.print_exc()
 
-                
-                # 八珍汤
-                imageRecognition = ImageRecognition(0.6)
-                scene_image = capture_window(hwnd)
-                results = imageRecognition.find_target_in_scene(scene_image, "./img/template/bazhentang.png")
-                
-                # 将PIL Image转换为OpenCV格式用于绘制
-                if scene_image is not None:
-                    # 转换PIL Image为OpenCV格式
-                    scene_cv = cv2.cvtColor(np.array(scene_image), cv2.COLOR_RGB2BGR)
-                    # 在图上绘制所有结果
-                    print(f"检测到 {len(results)} 个八珍汤")
-                    result_image = imageRecognition.draw_matches(scene_cv, results)
-                    cv2.imwrite(f"./img/screen/test_result.png", result_image)
-                    
-                    # 如果检测到八珍汤，点击中心点下方height/4的位置
-                    if results:
-                        best_match = results[0]  # 取置信度最高的结果
-                        center_x, center_y = best_match['center']
-                        height = best_match['height']
-                        
-                        # 计算目标点击位置：中心点下移height/4
-                        target_x = center_x
-                        target_y = center_y + height // 4 + 5
-                        
-                        print(f"八珍汤中心点: ({center_x}, {center_y})")
-                        print(f"目标点击位置: ({target_x}, {target_y})")
-                        
-                        # 使用坐标转换器进行点击（图像坐标）
-                        coord_converter.click_at_image_coords(target_x, target_y)
+    def run_for_window(self, hwnd, title, coord_converter=None):
+        print(f"正在处理窗口：{title}")
+        
+        # 创建坐标转换器
+        if coord_converter is None:
+            coord_converter = CoordinateConverter(hwnd)
+        
+        # 使用封装方法查找并点击军事事务图标
+        coord_converter.find_and_click_icon(
+            icon_path="./img/template/military_affairs.png",
+            description="军事事务图标",
+            confidence_threshold=0.8,
+            delay=1.0
+        )
 
-                # 搜索对手
-                coord_converter.find_and_click_icon(
-                    icon_path="./img/template/search_opponent.png",
-                    description="搜索对手",
-                    confidence_threshold=0.8,
-                    delay=1.0
-                )
-                
-                # 确定
-                coord_converter.find_and_click_icon(
-                    icon_path="./img/template/confirm.png",
-                    description="确定",
-                    confidence_threshold=0.8,
-                    delay=1.5
-                )
+        # 使用封装方法查找并点击攻城图标
+        coord_converter.find_and_click_icon(
+            icon_path="./img/template/conquer_city.png",
+            description="攻城图标",
+            confidence_threshold=0.8,
+            delay=1.0
+        )
 
-                # 进攻
-                coord_converter.find_and_click_icon(
-                    icon_path="./img/template/attack.png",
-                    description="进攻",
-                    confidence_threshold=0.8,
-                    delay=1.5
-                )
+        
+        # 八珍汤
+        image_finder = coord_converter.get_image_finder(0.6)
+        imageRecognition = image_finder.recognizer
+        scene_cv = capture_window_array(hwnd, image_finder.buffer_pool)
+        results = imageRecognition.find_target_in_scene(scene_cv, "./img/template/bazhentang.png")
+        
+        if scene_cv is not None:
+            # 画面和结果交给飞行记录器，未检测到时才写出（后台线程），截图缓冲区用完后归还
+            print(f"检测到 {len(results)} 个八珍汤")
+            image_finder.record_lookup(scene_cv, "./img/template/bazhentang.png", results)
+            image_finder.buffer_pool.release(scene_cv)
+            if not results:
+                image_finder.dump_recording("bazhentang_not_found")
+            
+            # 如果检测到八珍汤，点击中心点下方height/4的位置
+            if results:
+                best_match = results[0]  # 取置信度最高的结果
+                center_x, center_y = best_match['center']
+                height = best_match['height']
                 
-                while True:
-                    time.sleep(10)
-                    # 游戏窗口左边最中间鼠标左键不放手
-                    window_center_x, window_center_y = coord_converter.get_window_center()
-                    
-                    # 计算左边位置：窗口中心x坐标减去窗口宽度的一半，再加一点偏移避免在边界
-                    coord_converter._update_window_info()
-                    left_margin = 50  # 距离左边界50像素的位置
-                    left_x = coord_converter.client_screen_pos[0] + left_margin
-                    center_y = window_center_y
-                    
-                    print(f"准备在窗口左边中间位置按住鼠标: ({left_x}, {center_y})")
-                    
-                    # 移动鼠标到目标位置
-                    import win32api
-                    import win32con
-                    win32api.SetCursorPos((left_x, center_y))
-                                     # 按下鼠标左键20秒
-                    win32api.mouse_event(win32con.MOUSEEVENTF_LEFTDOWN, 0, 0, 0, 0)
-                    print("鼠标左键已按下，将保持20秒...")
-                    
-                    # 保持按下20秒
-                    time.sleep(10)
-                    
-                    # 松开鼠标左键
-                    win32api.mouse_event(win32con.MOUSEEVENTF_LEFTUP, 0, 0, 0, 0)
-                    print("鼠标左键已松开")
-                    
-                    # 检查是否出现“下一场”按钮
-                    while True:
-                        image_finder = ImageFinder(0.8)
-                        results = image_finder.find_icon_in_game("./img/template/next_opponent.png")
-                        if results:
-                            print("下一场按钮已出现，等待5秒后点击")
-                            time.sleep(10)
-                            break
-                    # 点击下一场
-                    coord_converter.find_and_click_icon(
-                        icon_path="./img/template/next_opponent.png",
-                        description="下一场",
-                        confidence_threshold=0.8,
-                        delay=1.0
-                    )
+                # 计算目标点击位置：中心点下移height/4
+                target_x = center_x
+                target_y = center_y + height // 4 + 5
                 
+                print(f"八珍汤中心点: ({center_x}, {center_y})")
+                print(f"目标点击位置: ({target_x}, {target_y})")
                 
-        except Exception as e:
-            print(f"执行任务时出错: {e}")
-            import traceback
-            traceback.print_exc()
+                # 使用坐标转换器进行点击（图像坐标）
+                coord_converter.click_at_image_coords(target_x, target_y)
+
+        # 搜索对手
+        coord_converter.find_and_click_icon(
+            icon_path="./img/template/search_opponent.png",
+            description="搜索对手",
+            confidence_threshold=0.8,
+            delay=1.0
+        )
+        
+        # 确定
+        coord_converter.find_and_click_icon(
+            icon_path="./img/template/confirm.png",
+            description="确定",
+            confidence_threshold=0.8,
+            delay=1.5
+        )
+
+        # 进攻
+        coord_converter.find_and_click_icon(
+            icon_path="./img/template/attack.png",
+            description="进攻",
+            confidence_threshold=0.8,
+            delay=1.5
+        )
+        
+        # 只截取按钮所在区域高频检查“下一场”按钮
+        image_finder = coord_converter.get_image_finder(0.8)
+        next_watcher = RegionWatcher(hwnd, "./img/template/next_opponent.png", threshold=0.8,
+                                     pool=image_finder.buffer_pool)
+
+        while True:
+            time.sleep(10)
+            # 游戏窗口左边最中间鼠标左键不放手
+            window_center_x, window_center_y = coord_converter.get_window_center()
+            
+            # 计算左边位置：窗口中心x坐标减去窗口宽度的一半，再加一点偏移避免在边界
+            coord_converter._update_window_info()
+            left_margin = 50  # 距离左边界50像素的位置
+            left_x = coord_converter.client_screen_pos[0] + left_margin
+            center_y = window_center_y
+            
+            print(f"准备在窗口左边中间位置按住鼠标: ({left_x}, {center_y})")
+            
+            # 移动鼠标到目标位置并按下鼠标左键
+            coord_converter.mouse_down(left_x, center_y)
+            print("鼠标左键已按下，将保持20秒...")
+            
+            # 保持按下20秒
+            time.sleep(10)
+            
+            # 松开鼠标左键
+            coord_converter.mouse_up()
+            print("鼠标左键已松开")
+            
+            # 等待“下一场”按钮出现：区域轮询，长时间未匹配到时穿插完整识别
+            if not next_watcher.wait_or_find(image_finder):
+                continue
+            print("下一场按钮已出现，等待5秒后点击")
+            time.sleep(10)
+            # 点击下一场
+            coord_converter.find_and_click_icon(
+                icon_path="./img/template/next_opponent.png",
+                description="下一场",
+                confidence_threshold=0.8,
+                delay=1.0
+            )
@@ -4,6 +4,7 @@ from agent.tasks.task_base import TaskBase
 from common.gui_util import get_game_windows
 from common.coordinate_converter import CoordinateConverter
 from common.image_finder import ImageFinder
+from common.region_watcher import RegionWatcher
 
 
 def sign_in(coord_converter: CoordinateConverter):
@@ -135,42 +136,30 @@ def competition_among_warlords(coord_converter: CoordinateConverter, image_finde
         delay=1.5
     )
 
+    # 只截取按钮所在区域高频检查“下一场”按钮
+    next_watcher = RegionWatcher(coord_converter.hwnd, "./img/template/qunxiong-xiayichang.png",
+                                 threshold=0.8, pool=image_finder.buffer_pool)
+
     while True:
         time.sleep(10)
-        # 游戏窗口左边最中间鼠标左键不放手
-        window_center_x, window_center_y = coord_converter.get_window_center()
-
-        # 计算左边位置：窗口中心x坐标减去窗口宽度的一半，再加一点偏移避免在边界
+        # 游戏窗口左边最中间按住不放手
         coord_converter._update_window_info()
         left_margin = 50  # 距离左边界50像素的位置
-        left_x = coord_converter.client_screen_pos[0] + left_margin
-        center_y = window_center_y
+        image_x = int(left_margin * coord_converter.dpi_scale)
+        image_y = int(coord_converter.client_height * coord_converter.dpi_scale) // 2
 
-        print(f"准备在窗口左边中间位置按住鼠标: ({left_x}, {center_y})")
+        print(f"准备在窗口左边中间位置长按: 图像坐标({image_x}, {image_y})")
 
-        # 移动鼠标到目标位置
-        import win32api
-        import win32con
-        win32api.SetCursorPos((left_x, center_y))
-        # 按下鼠标左键20秒
-        win32api.mouse_event(win32con.MOUSEEVENTF_LEFTDOWN, 0, 0, 0, 0)
-        print("鼠标左键已按下，将保持20秒...")
+        # 长按10秒，不阻塞：按住期间同时检查“下一场”按钮
+        hold = coord_converter.long_press_at_image_coords(image_x, image_y, 10.0)
 
-        # 保持按下20秒
+        # 等待“下一场”按钮出现：区域轮询，长时间未匹配到时穿插完整识别
+        found = next_watcher.wait_or_find(image_finder)
+        hold.wait()
+        if not found:
+            continue
+        print("下一场按钮已出现，等待5秒后点击")
         time.sleep(10)
-
-        # 松开鼠标左键
-        win32api.mouse_event(win32con.MOUSEEVENTF_LEFTUP, 0, 0, 0, 0)
-        print("鼠标左键已松开")
-
-        # 检查是否出现“下一场”按钮
-        while True:
-            image_finder = ImageFinder(0.8)
-            results = image_finder.find_icon_in_game("./img/template/qunxiong-xiayichang.png")
-            if results:
-                print("下一场按钮已出现，等待5秒后点击")
-                time.sleep(10)
-                break
         # 点击下一场
         coord_converter.find_and_click_icon(
             icon_path="./img/template/qunxiong-xiayichang.png",
@@ -205,11 +194,13 @@ def songxin(coord_converter: CoordinateConverter):
         delay=1.0
     )
 
+    # 切换到好友标签页，重复点击无副作用，画面未变化时立即重试
     coord_converter.find_and_click_icon(
         icon_path="./img/template/friend.png",
         description="好友",
         confidence_threshold=0.8,
-        delay=1.0
+        delay=1.0,
+        verify=True
     )
 
     coord_converter.find_and_click_icon(
@@ -291,11 +282,9 @@ def yangqi(coord_converter: CoordinateConverter):
     )
 
     # 随意点击鼠标
-    import win32api
-    import win32con
-    win32api.mouse_event(win32con.MOUSEEVENTF_LEFTDOWN, 0, 0, 0, 0)
+    coord_converter.mouse_down()
     time.sleep(0.5)
-    win32api.mouse_event(win32con.MOUSEEVENTF_LEFTUP, 0, 0, 0, 0)
+    coord_converter.mouse_up()
 
     coord_converter.find_and_click_icon(
         icon_path="./img/template/fanhui.png",
@@ -409,12 +398,10 @@ def yangqi(coord_converter: CoordinateConverter):
             delay=1.0
         )
         
-            # 随意点击鼠标
-        import win32api
-        import win32con
-        win32api.mouse_event(win32con.MOUSEEVENTF_LEFTDOWN, 0, 0, 0, 0)
+        # 随意点击鼠标
+        coord_converter.mouse_down()
         time.sleep(0.5)
-        win32api.mouse_event(win32con.MOUSEEVENTF_LEFTUP, 0, 0, 0, 0)
+        coord_converter.mouse_up()
     
 
 
@@ -430,22 +417,24 @@ class DailyTask(TaskBase):
 
             for game_window in game_windows:
                 hwnd, title = game_window
-                print(f"正在处理窗口：{title}")
-
-                # 创建坐标转换器
-                coord_converter = CoordinateConverter(hwnd)
+                self.run_profiled(hwnd, title)
 
-                image_finder = ImageFinder(0.8)
+        except Exception as e:
+            print(e)
 
-                sign_in(coord_converter)
+    def run_for_window(self, hwnd, title, coord_converter=None):
+        print(f"正在处理窗口：{title}")
 
-                competition_among_warlords(coord_converter, image_finder)
+        # 创建坐标转换器
+        if coord_converter is None:
+            coord_converter = CoordinateConverter(hwnd)
 
-                songxin(coord_converter)
+        image_finder = coord_converter.get_image_finder(0.8)
 
-                yangqi(coord_converter)
+        sign_in(coord_converter)
 
+        competition_among_warlords(coord_converter, image_finder)
 
+        songxin(coord_converter)
 
-        except Exception as e:
-            print(e)
+        yangqi(coord_converter)
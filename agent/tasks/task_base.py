@@ -5,11 +5,37 @@ class TaskBase:
         self.name = name
         self.type = "base"
         self.description = description
+        # agent.tasks.TASK_REGISTRY中的任务名，由create_task设置
+        self.task_name = None
     
     def execute(self):
         """执行任务的方法，子类应该重写这个方法"""
         raise NotImplementedError("子类必须实现execute方法")
     
+    def run_for_window(self, hwnd, title, coord_converter=None):
+        """
+        在单个游戏窗口上执行任务，出错时抛出异常，由调用方决定是否重试
+        
+        Args:
+            hwnd: 窗口句柄
+            title: 窗口标题
+            coord_converter: 复用的坐标转换器，为None时新建
+        """
+        raise NotImplementedError("子类必须实现run_for_window方法")
+    
+    def run_profiled(self, hwnd, title, coord_converter=None):
+        """
+        执行run_for_window，性能分析开启时（common.profiler）分析这次执行
+        
+        Args:
+            hwnd: 窗口句柄
+            title: 窗口标题
+            coord_converter: 复用的坐标转换器，为None时新建
+        """
+        from common.profiler import get_profiler
+        with get_profiler().task(self.task_name or self.name, title):
+            return self.run_for_window(hwnd, title, coord_converter)
+    
     def pre_execute(self):
         """任务执行前的准备工作"""
         print(f"准备执行任务: {self.name}")
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+ADB截图基准测试
+用模拟adb server（common.backends.fake_adb_server）为每个模拟窗口提供一个设备，
+测量ADB截图的单帧耗时，以及多个窗口逐个截图与多线程并行截图的总帧率，并检查窗口与设备按画面正确对应、
+画面与窗口截图一致
+
+用法:
+    python -m benchmarks.adb_capture_benchmark [--windows 4] [--seconds 2] [--screencap-delay-ms 0]
+"""
+
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import cv2
+import numpy as np
+
+from common.backends.adb_backend import AdbBackend, AdbClient
+from common.backends.fake_adb_server import FakeAdbServer
+from common.backends.fake_backend import FakeBackend
+from common.buffer_pool import BufferPool
+from common.utils import Colors
+
+SCENE_PATH = "./img/screen/test_result.png"
+
+
+def run(backend: AdbBackend, hwnds: List[int], seconds: float, parallel: bool) -> Dict[str, float]:
+    """持续截图seconds秒，返回所有窗口合计帧率"""
+    pool = BufferPool()
+
+    def capture(hwnd):
+        pool.release(backend.capture_window_array(hwnd, pool))
+
+    frames = 0
+    executor = ThreadPoolExecutor(max_workers=len(hwnds)) if parallel else None
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        if executor is not None:
+            list(executor.map(capture, hwnds))
+        else:
+            for hwnd in hwnds:
+                capture(hwnd)
+        frames += len(hwnds)
+    elapsed = time.perf_counter() - start
+    if executor is not None:
+        executor.shutdown()
+    return {'fps': frames / elapsed}
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="ADB截图基准测试")
+    parser.add_argument("--windows", type=int, default=4, help="模拟器窗口数")
+    parser.add_argument("--seconds", type=float, default=2.0, help="每种方式的测试时长")
+    parser.add_argument("--screencap-delay-ms", type=float, default=0.0,
+                        help="模拟设备端每次screencap的耗时（毫秒）")
+    args = parser.parse_args(argv)
+
+    scene = cv2.imread(SCENE_PATH)
+    if scene is None:
+        print(f"{Colors.RED}无法加载画面: {SCENE_PATH}{Colors.ENDC}")
+        return 1
+    # 设备分辨率为画面的一半，窗口客户区为画面原始尺寸；每个模拟器画面不同，窗口与设备按画面自动对应
+    frames = []
+    for index in range(args.windows):
+        frame = scene.copy()
+        # 每个模拟器停在不同界面：在不同位置打开一个面板
+        left = 80 + index * frame.shape[1] // (args.windows + 1)
+        cv2.rectangle(frame, (left, 120), (left + frame.shape[1] // 4, frame.shape[0] - 120), (40, 40, 40), -1)
+        frames.append(frame)
+
+    inner = FakeBackend()
+    devices = {}
+    for index, frame in enumerate(frames):
+        inner.add_window(f"雷电模拟器-{index + 1}", [frame])
+        device_size = (frame.shape[1] // 2, frame.shape[0] // 2)
+        devices[f"emulator-{5554 + 2 * index}"] = [cv2.resize(frame, device_size, interpolation=cv2.INTER_AREA)]
+
+    with FakeAdbServer(devices, screencap_delay=args.screencap_delay_ms / 1000) as server:
+        backend = AdbBackend(inner, AdbClient(*server.address))
+        mapping = backend.map_devices()
+        hwnds = list(inner.windows)
+        print(f"{Colors.BOLD}窗口与设备对应:{Colors.ENDC}")
+        for hwnd in hwnds:
+            print(f"  {inner.get_window_text(hwnd)} -> {mapping.get(hwnd)}")
+
+        frame = backend.capture_window_array(hwnds[0])
+        difference = float(np.abs(frame.astype(np.int16) - frames[0].astype(np.int16)).mean())
+        print(f"ADB画面 {frame.shape[1]}x{frame.shape[0]}，与窗口画面的平均像素差 {difference:.2f}")
+
+        sequential = run(backend, hwnds, args.seconds, parallel=False)
+        parallel = run(backend, hwnds, args.seconds, parallel=True)
+        stats = backend.stats()
+
+    print(f"\n{'方式':<10}{'总帧率(fps)':>14}")
+    print(f"{'逐个':<10}{sequential['fps']:>14.1f}")
+    print(f"{'并行':<10}{parallel['fps']:>14.1f}")
+    print(f"ADB截图 {stats['adb_captures']} 次，失败 {stats['adb_failures']} 次，平均 {stats['adb_mean_ms']:.2f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
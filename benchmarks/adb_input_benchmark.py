@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+ADB输入基准测试
+在模拟adb server上对比三种发送点击的方式：每次点击新建连接执行 shell 命令、
+复用会话池中的常驻shell、batch()合并为一次写入；并测量长按调用的返回耗时和wait()等到设备回执的耗时
+
+用法:
+    python -m benchmarks.adb_input_benchmark [--devices 4] [--taps 200] [--batch 10]
+"""
+
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import numpy as np
+
+from common.backends.adb_backend import AdbClient
+from common.backends.adb_input import AdbInput, AdbShellPool
+from common.backends.fake_adb_server import FakeAdbServer
+from common.utils import Colors
+
+PRESS_SECONDS = 0.3
+
+
+def wait_logged(server: FakeAdbServer, count: int, timeout: float = 10.0):
+    """等待模拟服务记录到count条shell命令"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if sum(1 for command in server.commands if command[2] == 'shell') >= count:
+            return
+        time.sleep(0.005)
+    raise TimeoutError("模拟adb server没有收到全部命令")
+
+
+def run(mode: str, serials: List[str], taps: int, batch: int) -> Dict[str, float]:
+    """每个设备一个线程各点击taps次，返回总点击速率和写入次数"""
+    frame = np.zeros((720, 1280, 3), dtype=np.uint8)
+    with FakeAdbServer({serial: [frame] for serial in serials}) as server:
+        client = AdbClient(*server.address)
+        pool = AdbShellPool(client)
+
+        def device(serial):
+            channel = AdbInput(pool, serial)
+            for index in range(0, taps, batch if mode == 'batch' else 1):
+                if mode == 'connection':
+                    client.shell(serial, f"input tap {index} {index}")
+                elif mode == 'session':
+                    channel.tap(index, index)
+                else:
+                    with channel.batch():
+                        for offset in range(min(batch, taps - index)):
+                            channel.tap(index + offset, index + offset)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(serials)) as executor:
+            list(executor.map(device, serials))
+        wait_logged(server, taps * len(serials))
+        elapsed = time.perf_counter() - start
+
+        # 长按调用只把命令写入会话，不等待按住结束；wait()等到设备执行完长按输出回执
+        channel = AdbInput(pool, serials[0])
+        press_start = time.perf_counter()
+        hold = channel.long_press(100, 100, PRESS_SECONDS)
+        press_ms = (time.perf_counter() - press_start) * 1000
+        acknowledged = hold.wait()
+        hold_ms = (time.perf_counter() - press_start) * 1000 if acknowledged else float('nan')
+        pool.close()
+
+        writes = pool.writes - 1 if mode != 'connection' else taps * len(serials)
+        return {
+            'taps_per_second': taps * len(serials) / elapsed,
+            'writes': writes,
+            'connections': server.shell_sessions if mode != 'connection' else taps * len(serials),
+            'long_press_call_ms': press_ms,
+            'long_press_wait_ms': hold_ms,
+        }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="ADB输入基准测试")
+    parser.add_argument("--devices", type=int, default=4, help="设备数")
+    parser.add_argument("--taps", type=int, default=200, help="每个设备的点击次数")
+    parser.add_argument("--batch", type=int, default=10, help="batch模式每次合并的点击数")
+    args = parser.parse_args(argv)
+
+    serials = [f"emulator-{5554 + 2 * index}" for index in range(args.devices)]
+    print(f"{Colors.BOLD}{args.devices}个设备，每个设备点击{args.taps}次{Colors.ENDC}")
+    print(f"{'方式':<12}{'点击/秒':>10}{'连接数':>10}{'写入次数':>10}{'长按调用(ms)':>14}"
+          f"{f'长按{PRESS_SECONDS}秒完成(ms)':>20}")
+    for mode in ('connection', 'session', 'batch'):
+        stats = run(mode, serials, args.taps, args.batch)
+        print(f"{mode:<12}{stats['taps_per_second']:>10.0f}{stats['connections']:>10}{stats['writes']:>10}"
+              f"{stats['long_press_call_ms']:>14.2f}{stats['long_press_wait_ms']:>20.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
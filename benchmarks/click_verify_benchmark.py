@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+点击验证基准测试
+1. 区域差异：在图标大小的灰度区域上计算归一化差异的耗时（微秒）
+2. 验证往返：点击前快照+点击后截取区域比较一次，对比完整截图识别一次（用识别确认点击结果的代价）
+3. 点击未生效：模拟窗口第一次点击后画面不变、第二次点击后才变化，
+   find_and_click_icon 通过区域比较发现未变化并立即重试
+
+用法:
+    python -m benchmarks.click_verify_benchmark [--template PATH] [--repeat 200]
+"""
+
+import argparse
+import contextlib
+import io
+import statistics
+import sys
+import time
+from typing import List
+
+import cv2
+import numpy as np
+
+from benchmarks.corpus import make_background
+from common.utils import Colors
+
+TEMPLATE_PATH = "./img/template/legion.png"
+
+
+def build_scene(template_path: str, size=(1280, 720), seed: int = 0):
+    """
+    生成包含图标的画面和点击生效后的画面（图标变暗，模拟按下/切换）
+
+    Returns:
+        (点击前画面, 点击后画面)
+    """
+    template = cv2.imread(template_path)
+    if template is None:
+        raise FileNotFoundError(f"无法加载模板: {template_path}")
+    scene = make_background(np.random.default_rng(seed), size)
+    h, w = template.shape[:2]
+    left, top = size[0] // 3, size[1] // 3
+    scene[top:top + h, left:left + w] = template
+    pressed = scene.copy()
+    pressed[top:top + h, left:left + w] = (template * 0.6).astype(np.uint8)
+    return scene, pressed
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="点击验证基准测试")
+    parser.add_argument("--template", default=TEMPLATE_PATH, help="点击的模板")
+    parser.add_argument("--repeat", type=int, default=200, help="区域差异和验证往返的重复次数")
+    args = parser.parse_args(argv)
+
+    from common.backends import set_backend
+    from common.backends.fake_backend import FakeBackend
+    from common.click_verifier import ClickVerifier, region_diff
+    from common.coordinate_converter import CoordinateConverter
+    from common.governor import RecognitionGovernor, set_governor
+    from common.image_finder import ImageFinder
+
+    scene, pressed = build_scene(args.template)
+    # 不限速，只测验证和识别本身
+    set_governor(RecognitionGovernor())
+
+    # 1. 区域差异
+    backend = FakeBackend()
+    set_backend(backend)
+    hwnd = backend.add_window("雷电模拟器-bench", [scene])
+    with contextlib.redirect_stdout(io.StringIO()):
+        finder = ImageFinder(hwnd=hwnd)
+        finder.recorder = None
+        center = finder.find_icon_in_game(args.template)
+    if center is None:
+        print(f"{Colors.RED}画面中未找到图标{Colors.ENDC}")
+        return 1
+    verifier = ClickVerifier(hwnd, backend=backend)
+    regions = verifier.regions_for(args.template, finder.last_result)
+    left, top, right, bottom = regions[0]
+    before = cv2.cvtColor(scene[top:bottom, left:right], cv2.COLOR_BGR2GRAY)
+    after = cv2.cvtColor(pressed[top:bottom, left:right], cv2.COLOR_BGR2GRAY)
+    durations = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        score = region_diff(before, after)
+        durations.append((time.perf_counter() - start) * 1e6)
+    print(f"{Colors.BOLD}区域 {right - left}x{bottom - top}：{Colors.ENDC}"
+          f"差异计算中位 {statistics.median(durations):.1f} µs，"
+          f"未变化 {region_diff(before, before):.4f}，点击后 {score:.4f}（阈值 {verifier.threshold}）")
+
+    # 2. 验证往返 vs 完整识别
+    verify_ms = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        verifier.compare(verifier.snapshot(regions))
+        verify_ms.append((time.perf_counter() - start) * 1000)
+    detect_ms = []
+    # 画面不变，关闭识别结果缓存，测实际识别的耗时
+    finder.recognizer.memo = None
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(max(args.repeat // 20, 3)):
+            start = time.perf_counter()
+            finder.find_icon_in_game(args.template)
+            detect_ms.append((time.perf_counter() - start) * 1000)
+    verify_median, detect_median = statistics.median(verify_ms), statistics.median(detect_ms)
+    print(f"快照+比较一次中位 {verify_median:.2f} ms，完整截图识别一次中位 {detect_median:.2f} ms"
+          f"（{detect_median / verify_median:.0f}倍）")
+
+    # 3. 第一次点击未生效，立即重试
+    backend = FakeBackend()
+    set_backend(backend)
+    # 画面函数：点击两次之后才显示点击生效的画面
+    hwnd = backend.add_window("雷电模拟器-bench", lambda _: pressed if len(backend.clicks()) >= 2 else scene)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        converter = CoordinateConverter(hwnd)
+        converter.get_image_finder().recorder = None
+        start = time.perf_counter()
+        success = converter.find_and_click_icon(args.template, "军团", delay=0, verify=True)
+        elapsed = (time.perf_counter() - start) * 1000
+    color = Colors.GREEN if success and converter.click_retries == 1 else Colors.RED
+    print(f"{color}第一次点击未生效：成功={success}，点击{len(backend.clicks())}次，"
+          f"立即重试{converter.click_retries}次，步骤耗时 {elapsed:.0f} ms"
+          f"（其中等待画面变化 {converter.verifier.timeout * 1000:.0f} ms）{Colors.ENDC}")
+    stats = converter.verifier.stats()
+    print(f"验证{stats['checks']}次，比较{stats['compares']}次，平均每次比较 {stats['compare_us']:.1f} µs")
+    return 0 if color == Colors.GREEN else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+识别基准语料
+用固定随机种子生成合成场景：在带有界面元素纹理的背景上按随机位置、缩放和亮度粘贴模板，
+记录每个模板的真实位置，并为每个场景附带不在场景中的模板作为负样本
+"""
+
+import os
+import statistics
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from common.template_manifest import DEFAULT_TEMPLATE_DIR
+
+Box = Tuple[int, int, int, int]
+
+
+class CorpusScene:
+    """一个合成场景及其真值"""
+
+    def __init__(self, image: np.ndarray, truth: Dict[str, Box], absent: List[str]):
+        """
+        Args:
+            image: BGR场景
+            truth: 模板路径 -> 真实位置 (left, top, right, bottom)
+            absent: 不在场景中的模板路径
+        """
+        self.image = image
+        self.truth = truth
+        self.absent = absent
+
+
+def make_background(rng: np.random.Generator, size: Tuple[int, int]) -> np.ndarray:
+    """生成带有面板、线条和文字的背景，特征点数量接近真实游戏画面"""
+    width, height = size
+    low_res = rng.integers(30, 120, size=(height // 40 + 1, width // 40 + 1, 3), dtype=np.uint8)
+    background = cv2.resize(low_res, (width, height), interpolation=cv2.INTER_CUBIC)
+    background = cv2.GaussianBlur(background, (0, 0), 6)
+    for _ in range(25):
+        x, y = int(rng.integers(0, width - 40)), int(rng.integers(0, height - 40))
+        w, h = int(rng.integers(40, 260)), int(rng.integers(20, 120))
+        color = tuple(int(c) for c in rng.integers(20, 200, size=3))
+        cv2.rectangle(background, (x, y), (x + w, y + h), color, -1 if rng.random() < 0.5 else 2)
+    for _ in range(15):
+        x, y = int(rng.integers(0, width - 100)), int(rng.integers(20, height))
+        color = tuple(int(c) for c in rng.integers(120, 255, size=3))
+        cv2.putText(background, f"Lv.{int(rng.integers(1, 99))} {int(rng.integers(100, 99999))}",
+                    (x, y), cv2.FONT_HERSHEY_SIMPLEX, float(rng.uniform(0.4, 1.0)), color, 1)
+    return background
+
+
+def build_corpus(template_paths: Optional[List[str]] = None, scenes: int = 12, per_scene: int = 3,
+                 negatives: int = 2, size: Tuple[int, int] = (1280, 720), seed: int = 0,
+                 scale_range: Tuple[float, float] = (0.9, 1.1)) -> List[CorpusScene]:
+    """
+    生成基准语料
+
+    Args:
+        template_paths: 模板路径列表，默认使用模板目录下的全部模板
+        scenes: 场景数量
+        per_scene: 每个场景粘贴的模板数量
+        negatives: 每个场景附带的负样本数量
+        size: 场景尺寸 (宽, 高)
+        seed: 随机种子
+        scale_range: 模板缩放范围
+
+    Returns:
+        场景列表
+    """
+    if template_paths is None:
+        import glob
+        template_paths = sorted(glob.glob(os.path.join(DEFAULT_TEMPLATE_DIR, "*.png")))
+    templates = {path: cv2.imread(path) for path in template_paths}
+    templates = {path: image for path, image in templates.items() if image is not None}
+    paths = sorted(templates)
+    rng = np.random.default_rng(seed)
+    width, height = size
+
+    corpus = []
+    for _ in range(scenes):
+        image = make_background(rng, size)
+        truth: Dict[str, Box] = {}
+        occupied: List[Box] = []
+        for path in rng.permutation(paths):
+            if len(truth) >= per_scene:
+                break
+            scale = float(rng.uniform(*scale_range))
+            template = templates[path]
+            scaled = cv2.resize(template, None, fx=scale, fy=scale,
+                                interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR)
+            h, w = scaled.shape[:2]
+            if w >= width or h >= height:
+                continue
+            # 最多尝试若干次，找一个不与已粘贴模板重叠的位置
+            for _ in range(20):
+                left, top = int(rng.integers(0, width - w)), int(rng.integers(0, height - h))
+                box = (left, top, left + w, top + h)
+                if all(box[2] <= o[0] or box[0] >= o[2] or box[3] <= o[1] or box[1] >= o[3] for o in occupied):
+                    break
+            else:
+                continue
+            brightness = float(rng.uniform(-12, 12))
+            image[top:top + h, left:left + w] = cv2.convertScaleAbs(scaled, alpha=1.0, beta=brightness)
+            truth[str(path)] = box
+            occupied.append(box)
+
+        remaining = [path for path in paths if path not in truth]
+        absent = [str(path) for path in rng.choice(remaining, size=min(negatives, len(remaining)), replace=False)]
+        corpus.append(CorpusScene(image, truth, absent))
+    return corpus
+
+
+def evaluate(lookup: Callable[[np.ndarray, str], List[Dict]], corpus: List[CorpusScene],
+             tolerance: float = 0.25) -> Dict[str, float]:
+    """
+    在语料上评估识别函数
+
+    Args:
+        lookup: 识别函数 (场景, 模板路径) -> 识别结果列表（按置信度排序）
+        corpus: 基准语料
+        tolerance: 中心点误差不超过真值框较短边的该比例时视为正确
+
+    Returns:
+        准确率、正确结果的中心点误差（像素）和耗时统计
+    """
+    correct = wrong = missed = false_positives = negatives = 0
+    durations = []
+    errors = []
+    for scene in corpus:
+        queries = [(path, box) for path, box in scene.truth.items()] + [(path, None) for path in scene.absent]
+        for path, box in queries:
+            start = time.perf_counter()
+            results = lookup(scene.image, path)
+            durations.append((time.perf_counter() - start) * 1000)
+
+            if box is None:
+                negatives += 1
+                false_positives += 1 if results else 0
+                continue
+            if not results:
+                missed += 1
+                continue
+            cx, cy = results[0]['center']
+            tx, ty = (box[0] + box[2]) / 2, (box[1] + box[3]) / 2
+            limit = tolerance * min(box[2] - box[0], box[3] - box[1])
+            if abs(cx - tx) <= limit and abs(cy - ty) <= limit:
+                correct += 1
+                errors.append(float(np.hypot(cx - tx, cy - ty)))
+            else:
+                wrong += 1
+
+    positives = correct + wrong + missed
+    durations.sort()
+    errors.sort()
+    return {
+        'positives': positives,
+        'correct': correct,
+        'wrong': wrong,
+        'missed': missed,
+        'negatives': negatives,
+        'false_positives': false_positives,
+        'accuracy': correct / positives if positives else 0.0,
+        'error_px_median': statistics.median(errors) if errors else 0.0,
+        'error_px_p95': errors[max(int(len(errors) * 0.95) - 1, 0)] if errors else 0.0,
+        'median_ms': statistics.median(durations) if durations else 0.0,
+        'p95_ms': durations[int(len(durations) * 0.95) - 1] if durations else 0.0,
+        'total_s': sum(durations) / 1000,
+    }
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+识别语料基准测试
+在合成语料（benchmarks.corpus）上对比不同识别配置的准确率、误报和耗时
+
+用法:
+    python -m benchmarks.corpus_benchmark [--scenes 12] [--configs sift,compact,sift-tiled,compact-tiled] [--json PATH]
+"""
+
+import argparse
+import json
+import sys
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from common.compact_descriptors import get_default_codec
+from common.image_recognition import ImageRecognition
+from common.utils import Colors
+from benchmarks.corpus import build_corpus, evaluate
+
+
+def make_lookup(recognizer: ImageRecognition, methods: Optional[List[str]]) -> Callable:
+    return lambda scene, template: recognizer.find_target_in_scene(scene, template, methods)
+
+
+def build_configs() -> Dict[str, Callable]:
+    """可选的识别配置：名称 -> 创建识别函数的工厂"""
+    sift = ['feature_match_SIFT']
+    return {
+        'sift': lambda: make_lookup(ImageRecognition(0.8), sift),
+        'compact': lambda: make_lookup(ImageRecognition(0.8, descriptor_codec=get_default_codec()), sift),
+        # 分块缓存让同一场景的多次查询共用场景特征，耗时主要反映匹配阶段
+        'sift-tiled': lambda: make_lookup(ImageRecognition(0.8, tile_size=320), sift),
+        'compact-tiled': lambda: make_lookup(
+            ImageRecognition(0.8, tile_size=320, descriptor_codec=get_default_codec()), sift),
+        # 匹配方法由模板清单决定
+        'manifest': lambda: make_lookup(ImageRecognition(0.8), None),
+        # 清单推荐的方法与NCC、SIFT并行竞速
+        'race': lambda: make_lookup(ImageRecognition(0.8, race=True), None),
+        'race-tiled': lambda: make_lookup(ImageRecognition(0.8, tile_size=320, race=True), None),
+        # 由粗到细：缩小的画面上定位，原分辨率局部窗口细化
+        'coarse': lambda: make_lookup(ImageRecognition(0.8, coarse_scale=0.5), sift),
+        'coarse-tiled': lambda: make_lookup(ImageRecognition(0.8, tile_size=320, coarse_scale=0.5), sift),
+    }
+
+
+def descriptor_store_report(corpus_paths: List[str]):
+    """对比模板描述子库的完整和紧凑存储大小"""
+    import cv2
+    codec = get_default_codec()
+    if codec is None:
+        return None
+    sift = cv2.SIFT_create()
+    full = compact = 0
+    for path in corpus_paths:
+        gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        _, descriptors = sift.detectAndCompute(gray, None)
+        if descriptors is not None:
+            full += descriptors.nbytes
+            compact += codec.encode(descriptors).nbytes
+    return {'full_bytes': full, 'compact_bytes': compact, 'dims': codec.dims}
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="识别语料基准测试")
+    parser.add_argument("--scenes", type=int, default=12, help="合成场景数量")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--configs", default="sift,compact,sift-tiled,compact-tiled", help="逗号分隔的识别配置")
+    parser.add_argument("--json", default=None, help="将结果写入JSON文件")
+    args = parser.parse_args(argv)
+
+    configs = build_configs()
+    names = [name.strip() for name in args.configs.split(",") if name.strip()]
+    unknown = [name for name in names if name not in configs]
+    if unknown:
+        print(f"{Colors.RED}未知的识别配置: {', '.join(unknown)}（可选: {', '.join(configs)}）{Colors.ENDC}")
+        return 1
+    if any(name.startswith('compact') for name in names) and get_default_codec() is None:
+        print(f"{Colors.RED}缺少描述子编码器，请先运行 python -m tools.template_compiler{Colors.ENDC}")
+        return 1
+
+    corpus = build_corpus(scenes=args.scenes, seed=args.seed)
+    queries = sum(len(scene.truth) + len(scene.absent) for scene in corpus)
+    print(f"{Colors.BOLD}合成语料: {len(corpus)}个场景，{queries}次查询{Colors.ENDC}")
+
+    report = {}
+    for name in names:
+        report[name] = evaluate(configs[name](), corpus)
+
+    # 耗时相对第一个配置的倍数，误差为正确结果的中心点误差
+    baseline = report[names[0]]['median_ms']
+    print(f"\n{'配置':<14}{'准确率':>8}{'错位':>6}{'漏检':>6}{'误报':>6}{'中位数(ms)':>12}{'P95(ms)':>10}"
+          f"{'相对耗时':>10}{'误差中位(px)':>14}{'误差P95(px)':>13}")
+    for name, stats in report.items():
+        print(f"{name:<14}{stats['accuracy']:>9.1%}{stats['wrong']:>6}{stats['missed']:>6}"
+              f"{stats['false_positives']:>6}{stats['median_ms']:>12.1f}{stats['p95_ms']:>10.1f}"
+              f"{stats['median_ms'] / baseline if baseline else 0.0:>10.2f}"
+              f"{stats['error_px_median']:>14.2f}{stats['error_px_p95']:>13.2f}")
+
+    if any(name.startswith('compact') for name in names):
+        paths = sorted({path for scene in corpus for path in list(scene.truth) + scene.absent})
+        store = descriptor_store_report(paths)
+        if store:
+            report['descriptor_store'] = store
+            print(f"\n模板描述子库: 完整 {store['full_bytes'] / 1024:.0f}KB，"
+                  f"紧凑({store['dims']}维uint8) {store['compact_bytes'] / 1024:.0f}KB")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2, default=lambda v: v.item() if isinstance(v, np.generic) else v)
+        print(f"\n结果已写入: {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+多窗口屏幕截图基准测试
+在模拟后端上平铺多个模拟器窗口，对比逐窗口截图与每周期一次屏幕截图再切片（DesktopCapture）
+的每窗口帧率；--overlap 让最后一个窗口与前一个窗口重叠，观察退回逐窗口截图的情况
+
+用法:
+    python -m benchmarks.desktop_capture_benchmark [--windows 4,8] [--seconds 2] [--capture-delay-ms 0] [--overlap]
+"""
+
+import argparse
+import math
+import sys
+import time
+from typing import Dict, List
+
+import cv2
+
+from common.backends.fake_backend import FakeBackend
+from common.buffer_pool import BufferPool
+from common.desktop_capture import DesktopCapture
+from common.utils import Colors
+
+SCENE_PATH = "./img/screen/test_result.png"
+WINDOW_SIZE = (480, 300)
+
+
+def make_backend(count: int, frame, overlap: bool, capture_delay: float) -> FakeBackend:
+    """按网格平铺count个模拟窗口"""
+    backend = FakeBackend()
+    backend.capture_delay = capture_delay
+    columns = math.ceil(math.sqrt(count))
+    width, height = WINDOW_SIZE
+    for index in range(count):
+        row, column = divmod(index, columns)
+        pos = (column * width, row * height)
+        if overlap and index == count - 1 and index > 0:
+            previous = backend.windows[list(backend.windows)[-1]].screen_pos
+            pos = (previous[0] + width // 2, previous[1])
+        backend.add_window(f"雷电模拟器-{index + 1}", [frame], screen_pos=pos)
+    return backend
+
+
+def run(backend: FakeBackend, mode: str, seconds: float) -> Dict[str, float]:
+    """持续截图seconds秒，返回每窗口帧率"""
+    pool = BufferPool()
+    hwnds = list(backend.windows)
+    capture = DesktopCapture(backend=backend, pool=pool)
+    ticks = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        if mode == 'desktop':
+            capture.grab(hwnds)
+        else:
+            for hwnd in hwnds:
+                pool.release(backend.capture_window_array(hwnd, pool))
+        ticks += 1
+    elapsed = time.perf_counter() - start
+    capture.close()
+    return {'fps_per_window': ticks / elapsed, **capture.stats()}
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="多窗口屏幕截图基准测试")
+    parser.add_argument("--windows", default="4,8", help="逗号分隔的窗口数量")
+    parser.add_argument("--seconds", type=float, default=2.0, help="每种方式的测试时长")
+    parser.add_argument("--capture-delay-ms", type=float, default=0.0,
+                        help="模拟每次截图调用的固定开销（毫秒）")
+    parser.add_argument("--overlap", action="store_true", help="让最后一个窗口与前一个重叠")
+    args = parser.parse_args(argv)
+
+    scene = cv2.imread(SCENE_PATH)
+    if scene is None:
+        print(f"{Colors.RED}无法加载画面: {SCENE_PATH}{Colors.ENDC}")
+        return 1
+    frame = cv2.resize(scene, WINDOW_SIZE, interpolation=cv2.INTER_AREA)
+
+    print(f"{Colors.BOLD}窗口 {WINDOW_SIZE[0]}x{WINDOW_SIZE[1]}，"
+          f"每次截图调用开销 {args.capture_delay_ms:.1f}ms{Colors.ENDC}")
+    print(f"{'窗口数':<8}{'逐窗口(fps)':>14}{'屏幕切片(fps)':>16}{'加速':>8}{'切片/退回':>12}")
+    for count in [int(n) for n in args.windows.split(",") if n.strip()]:
+        backend = make_backend(count, frame, args.overlap, args.capture_delay_ms / 1000)
+        per_window = run(backend, 'window', args.seconds)
+        desktop = run(backend, 'desktop', args.seconds)
+        ratio = desktop['fps_per_window'] / per_window['fps_per_window']
+        split = f"{desktop['sliced'] // max(desktop['ticks'], 1)}/{desktop['fallbacks'] // max(desktop['ticks'], 1)}"
+        print(f"{count:<8}{per_window['fps_per_window']:>14.1f}{desktop['fps_per_window']:>16.1f}"
+              f"{ratio:>7.1f}x{split:>12}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
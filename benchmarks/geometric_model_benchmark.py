@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+几何模型基准测试
+场景特征只提取一次，对每个模板的SIFT匹配点分别用单应矩阵、平移+缩放（RANSAC）和中位数闭式解拟合，
+统计拟合耗时、通过框一致性检查的比例，以及与单应矩阵结果的中心点偏差
+
+用法:
+    python -m benchmarks.geometric_model_benchmark [--repeat 20]
+"""
+
+import argparse
+import glob
+import os
+import statistics
+import sys
+import time
+from typing import List
+
+import cv2
+import numpy as np
+
+from common.image_recognition import (
+    MODEL_HOMOGRAPHY, MODEL_MEDIAN, MODEL_SIMILARITY, ImageRecognition,
+)
+from common.template_manifest import DEFAULT_TEMPLATE_DIR
+from common.utils import Colors
+
+SCENE_PATH = "./img/screen/test_result.png"
+MODELS = [MODEL_HOMOGRAPHY, MODEL_SIMILARITY, MODEL_MEDIAN]
+
+
+def collect_matches(scene_gray: np.ndarray, template_paths: List[str]) -> List[tuple]:
+    """提取每个模板的Lowe比率筛选后的匹配点"""
+    sift = cv2.SIFT_create()
+    scene_kp, scene_des = sift.detectAndCompute(scene_gray, None)
+    matcher = cv2.FlannBasedMatcher(dict(algorithm=1, trees=5), dict(checks=50))
+    collected = []
+    for path in template_paths:
+        template = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if template is None:
+            continue
+        kp, des = sift.detectAndCompute(template, None)
+        if des is None or len(kp) < 2:
+            continue
+        good = [pair[0] for pair in matcher.knnMatch(des, scene_des, k=2)
+                if len(pair) == 2 and pair[0].distance < 0.7 * pair[1].distance]
+        if len(good) < 4:
+            continue
+        src = np.float32([kp[m.queryIdx].pt for m in good]).reshape(-1, 1, 2)
+        dst = np.float32([scene_kp[m.trainIdx].pt for m in good]).reshape(-1, 1, 2)
+        collected.append((os.path.basename(path), src, dst, template.shape[1], template.shape[0]))
+    return collected
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="特征匹配几何模型基准测试")
+    parser.add_argument("--repeat", type=int, default=20, help="每个模板重复拟合次数")
+    args = parser.parse_args(argv)
+
+    scene = cv2.imread(SCENE_PATH, cv2.IMREAD_GRAYSCALE)
+    if scene is None:
+        print(f"{Colors.RED}无法加载画面: {SCENE_PATH}{Colors.ENDC}")
+        return 1
+    matches = collect_matches(scene, sorted(glob.glob(os.path.join(DEFAULT_TEMPLATE_DIR, "*.png"))))
+    print(f"{Colors.BOLD}{len(matches)}个模板有至少4个匹配点，每个重复拟合{args.repeat}次{Colors.ENDC}")
+
+    centers = {}
+    print(f"{'模型':<14}{'拟合中位数(us)':>16}{'通过检查':>10}{'单应矩阵退回':>14}{'中心偏差(px)':>14}")
+    for model in MODELS:
+        recognizer = ImageRecognition(geometric_model=model)
+        durations = []
+        passed = 0
+        fallbacks = 0
+        deviations = []
+        for name, src, dst, w, h in matches:
+            estimate = None
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                estimate = recognizer.estimate_box(src, dst, w, h)
+                durations.append((time.perf_counter() - start) * 1e6)
+            if estimate is None:
+                continue
+            passed += 1
+            corners, _, used = estimate
+            center = corners.reshape(-1, 2).mean(axis=0)
+            if used != model:
+                fallbacks += 1
+            if model == MODEL_HOMOGRAPHY:
+                centers[name] = center
+            elif name in centers:
+                deviations.append(float(np.linalg.norm(center - centers[name])))
+
+        deviation = f"{statistics.median(deviations):.1f}" if deviations else "-"
+        print(f"{model:<14}{statistics.median(durations):>16.1f}{passed:>10}{fallbacks:>14}{deviation:>14}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
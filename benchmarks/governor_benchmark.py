@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+识别调节器基准测试
+在模拟后端上创建N个窗口，每个窗口一个交互线程按日常任务签到的步骤执行 find_and_click_icon，
+另有一个后台线程用 wait_for_icon 轮询一个不会出现的模板；对比调节器关闭和开启时
+实际的截图/识别速率、CPU利用率、交互步骤耗时，以及各优先级被限流等待的时间
+
+用法:
+    python -m benchmarks.governor_benchmark [--windows 4] [--rounds 1] [--recognitions 12] [--captures 40]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+from benchmarks.scaling_benchmark import STEPS, build_backend, percentile
+from common.utils import Colors
+
+# 后台线程轮询的模板，合成画面中不包含它
+BACKGROUND_TEMPLATE = "./img/template/next_opponent.png"
+
+
+def run(windows: int, rounds: int, scenes: int, recognitions: Optional[float],
+        captures: Optional[float], burst: float) -> Dict:
+    """执行一轮测量，recognitions和captures为None时关闭调节"""
+    from common.backends import set_backend
+    from common.coordinate_converter import CoordinateConverter
+    from common.governor import RecognitionGovernor, set_governor
+    from common.image_finder import ImageFinder
+
+    backend = build_backend(windows, None, scenes)
+    set_backend(backend)
+    governor = RecognitionGovernor(recognitions, captures, burst)
+    set_governor(governor)
+    hwnds = list(backend.windows)
+    latencies: List[float] = []
+    stop = threading.Event()
+    errors = []
+
+    def interactive(hwnd):
+        try:
+            converter = CoordinateConverter(hwnd)
+            for _ in range(rounds):
+                for template, description in STEPS:
+                    start = time.perf_counter()
+                    converter.find_and_click_icon(template, description, delay=0)
+                    latencies.append((time.perf_counter() - start) * 1000)
+        except Exception as e:
+            errors.append(repr(e))
+
+    def background(hwnd):
+        try:
+            finder = ImageFinder(hwnd)
+            while not stop.is_set():
+                finder.wait_for_icon(BACKGROUND_TEMPLATE, timeout=0.5, interval=0.05)
+        except Exception as e:
+            errors.append(repr(e))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        watchers = [threading.Thread(target=background, args=(hwnd,), daemon=True) for hwnd in hwnds]
+        workers = [threading.Thread(target=interactive, args=(hwnd,)) for hwnd in hwnds]
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        for thread in watchers + workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        stop.set()
+        for thread in watchers:
+            thread.join()
+
+    stats = governor.stats()
+    return {
+        'seconds': wall,
+        'cpu_percent': cpu / wall / (os.cpu_count() or 1) * 100,
+        'step_ms_median': statistics.median(latencies) if latencies else 0.0,
+        'step_ms_p95': percentile(latencies, 0.95) if latencies else 0.0,
+        'recognition_rate': stats['recognition']['rate'],
+        'capture_rate': stats['capture']['rate'],
+        'throttled': {
+            name: sum(stats[kind]['by_priority'].get(name, {}).get('throttled_seconds', 0.0) for kind in stats)
+            for name in ('interactive', 'background')
+        },
+        'errors': errors,
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="识别调节器基准测试（模拟后端）")
+    parser.add_argument("--windows", type=int, default=4, help="窗口数")
+    parser.add_argument("--rounds", type=int, default=1, help="每个窗口执行步骤序列的轮数")
+    parser.add_argument("--scenes", type=int, default=4, help="每个窗口的合成画面数")
+    parser.add_argument("--recognitions", type=float, default=12, help="开启时每秒识别次数上限")
+    parser.add_argument("--captures", type=float, default=40, help="开启时每秒截图次数上限")
+    parser.add_argument("--burst", type=float, default=3, help="令牌桶容量")
+    args = parser.parse_args(argv)
+
+    print(f"{Colors.BOLD}{args.windows}个窗口，每个窗口一个交互线程（{len(STEPS) * args.rounds}步）"
+          f"和一个后台轮询线程，CPU核心数 {os.cpu_count()}{Colors.ENDC}")
+    print(f"{'调节器':<8}{'识别/秒':>9}{'截图/秒':>9}{'CPU%':>8}{'中位(ms)':>11}{'P95(ms)':>11}"
+          f"{'交互限流(s)':>13}{'后台限流(s)':>13}")
+    for label, recognitions, captures in (('关闭', None, None), ('开启', args.recognitions, args.captures)):
+        stats = run(args.windows, args.rounds, args.scenes, recognitions, captures, args.burst)
+        print(f"{label:<8}{stats['recognition_rate']:>9.1f}{stats['capture_rate']:>9.1f}"
+              f"{stats['cpu_percent']:>8.1f}{stats['step_ms_median']:>11.1f}{stats['step_ms_p95']:>11.1f}"
+              f"{stats['throttled']['interactive']:>13.2f}{stats['throttled']['background']:>13.2f}")
+        for error in stats['errors']:
+            print(f"{Colors.RED}  出错: {error}{Colors.ENDC}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
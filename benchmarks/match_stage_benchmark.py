@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+特征匹配后处理微基准测试
+场景和模板特征只提取一次，分阶段对比原有实现（DMatch对象、Python循环和排序）
+与数组实现（flann_Index.knnSearch、batchDistance交叉检查、缓存的坐标数组）的耗时
+
+用法:
+    python -m benchmarks.match_stage_benchmark [--repeat 10]
+"""
+
+import argparse
+import glob
+import os
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+
+import cv2
+import numpy as np
+
+from common.image_recognition import (
+    FLANN_INDEX_PARAMS, FLANN_SEARCH_PARAMS, RATIO_TEST, cross_check_matches, ratio_test_matches,
+)
+from common.template_manifest import DEFAULT_TEMPLATE_DIR
+from common.utils import Colors
+
+SCENE_PATH = "./img/screen/test_result.png"
+
+
+# ---- 原有实现（改写前 feature_match 中的代码） ----
+
+def legacy_ratio_test(des1, des2):
+    flann = cv2.FlannBasedMatcher(FLANN_INDEX_PARAMS, FLANN_SEARCH_PARAMS)
+    matches = flann.knnMatch(des1, des2, k=2)
+    good_matches = []
+    for match_pair in matches:
+        if len(match_pair) == 2:
+            m, n = match_pair
+            if m.distance < RATIO_TEST * n.distance:
+                good_matches.append(m)
+    return good_matches
+
+
+def legacy_cross_check(des1, des2):
+    bf = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True)
+    matches = bf.match(des1, des2)
+    return sorted(matches, key=lambda x: x.distance)
+
+
+def legacy_points(kp1, kp2, good_matches):
+    src_pts = np.float32([kp1[m.queryIdx].pt for m in good_matches]).reshape(-1, 1, 2)
+    dst_pts = np.float32([kp2[m.trainIdx].pt for m in good_matches]).reshape(-1, 1, 2)
+    return src_pts, dst_pts
+
+
+def legacy_box(dst, mask):
+    center_x = np.mean(dst[:, 0, 0])
+    center_y = np.mean(dst[:, 0, 1])
+    x_coords = dst[:, 0, 0]
+    y_coords = dst[:, 0, 1]
+    min_x, max_x = np.min(x_coords), np.max(x_coords)
+    min_y, max_y = np.min(y_coords), np.max(y_coords)
+    confidence = np.sum(mask) / len(mask)
+    return center_x, center_y, min_x, min_y, max_x, max_y, confidence, int(np.sum(mask))
+
+
+# ---- 数组实现（与 feature_match 当前代码一致） ----
+
+def array_points(template_points, scene_points, query_idx, train_idx):
+    # 坐标数组随模板和场景特征缓存，每次匹配只做索引
+    src_pts = template_points[query_idx].reshape(-1, 1, 2)
+    dst_pts = scene_points[train_idx].reshape(-1, 1, 2)
+    return src_pts, dst_pts
+
+
+def array_box(dst, mask):
+    quad = dst.reshape(-1, 2)
+    center_x, center_y = quad.mean(axis=0)
+    min_x, min_y = quad.min(axis=0)
+    max_x, max_y = quad.max(axis=0)
+    inliers = int(np.count_nonzero(mask))
+    return center_x, center_y, min_x, min_y, max_x, max_y, inliers / len(mask), inliers
+
+
+def timed(func: Callable, repeat: int) -> float:
+    """重复执行，返回单次耗时中位数（微秒）"""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(durations)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="特征匹配后处理微基准测试")
+    parser.add_argument("--repeat", type=int, default=10, help="每个阶段重复次数")
+    args = parser.parse_args(argv)
+
+    scene = cv2.imread(SCENE_PATH, cv2.IMREAD_GRAYSCALE)
+    if scene is None:
+        print(f"{Colors.RED}无法加载画面: {SCENE_PATH}{Colors.ENDC}")
+        return 1
+    templates = [cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+                 for path in sorted(glob.glob(os.path.join(DEFAULT_TEMPLATE_DIR, "*.png")))]
+
+    stages: Dict[str, List[tuple]] = {}
+    for method, detector in (('SIFT', cv2.SIFT_create()), ('ORB', cv2.ORB_create())):
+        scene_kp, scene_des = detector.detectAndCompute(scene, None)
+        scene_points = cv2.KeyPoint_convert(scene_kp)
+        scene_index = cv2.flann_Index(scene_des, FLANN_INDEX_PARAMS) if method == 'SIFT' else None
+        print(f"{method} 场景特征点: {len(scene_kp)}，"
+              f"坐标转换一次 {timed(lambda: cv2.KeyPoint_convert(scene_kp), args.repeat):.1f}us")
+        for template in templates:
+            kp, des = detector.detectAndCompute(template, None)
+            if des is None or len(kp) < 2:
+                continue
+
+            if method == 'SIFT':
+                legacy_match = lambda: legacy_ratio_test(des, scene_des)
+                array_match = lambda: ratio_test_matches(des, scene_des)
+            else:
+                legacy_match = lambda: legacy_cross_check(des, scene_des)
+                array_match = lambda: cross_check_matches(des, scene_des)
+            stages.setdefault(f"{method} 匹配筛选", []).append(
+                (timed(legacy_match, args.repeat), timed(array_match, args.repeat)))
+            if method == 'SIFT':
+                # 画面未变化（分块缓存命中）或同一画面匹配多个模板时，场景索引只建立一次
+                stages.setdefault("SIFT 匹配筛选(复用索引)", []).append((
+                    timed(legacy_match, args.repeat),
+                    timed(lambda: ratio_test_matches(des, scene_des, index=scene_index), args.repeat),
+                ))
+            template_points = cv2.KeyPoint_convert(kp)
+
+            good = legacy_match()
+            query_idx = np.int32([m.queryIdx for m in good])
+            train_idx = np.int32([m.trainIdx for m in good])
+            if len(good) < 4:
+                continue
+            stages.setdefault(f"{method} 坐标提取", []).append((
+                timed(lambda: legacy_points(kp, scene_kp, good), args.repeat),
+                timed(lambda: array_points(template_points, scene_points, query_idx, train_idx), args.repeat),
+            ))
+
+            src, dst = array_points(template_points, scene_points, query_idx, train_idx)
+            _, mask = cv2.findHomography(src, dst, cv2.RANSAC, 5.0)
+            if mask is None:
+                continue
+            corners = np.float32(np.random.default_rng(0).random((4, 1, 2)) * 100)
+            stages.setdefault(f"{method} 框与内点统计", []).append((
+                timed(lambda: legacy_box(corners, mask), args.repeat),
+                timed(lambda: array_box(corners, mask), args.repeat),
+            ))
+
+    print(f"\n{Colors.BOLD}各阶段每个模板的耗时（中位数，{len(templates)}个模板）{Colors.ENDC}")
+    print(f"{'阶段':<20}{'原有(us)':>12}{'数组(us)':>12}{'加速':>8}")
+    for stage, samples in stages.items():
+        legacy = statistics.median(sample[0] for sample in samples)
+        array = statistics.median(sample[1] for sample in samples)
+        padding = 20 - sum(2 if ord(ch) > 127 else 1 for ch in stage)
+        print(f"{stage}{' ' * max(padding, 1)}{legacy:>12.1f}{array:>12.1f}{legacy / array:>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
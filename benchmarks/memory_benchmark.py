@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+识别内存基准测试
+在模拟后端上对多个窗口循环执行“截图 + 识别”，用tracemalloc统计每次识别的峰值分配字节数，
+对比原有路径（PIL截图、每次新建BGR和灰度图）与缓冲池路径（截图和灰度图复用池中缓冲区）
+
+用法:
+    python -m benchmarks.memory_benchmark [--windows 4] [--rounds 5] [--json PATH]
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import tracemalloc
+from typing import Dict, List
+
+from common.backends import set_backend
+from common.backends.fake_backend import FakeBackend
+from common.buffer_pool import BufferPool
+from common.image_recognition import ImageRecognition
+from common.utils import Colors
+
+SCENE_PATH = "./img/screen/test_result.png"
+TEMPLATES = [
+    "./img/template/attack.png",
+    "./img/template/jiangli.png",
+]
+
+
+def measure(backend, recognizer: ImageRecognition, pool, rounds: int) -> List[int]:
+    """
+    逐次测量每次识别的峰值分配
+
+    Args:
+        backend: 模拟后端
+        recognizer: 图像识别器（已关闭识别结果记忆）
+        pool: 缓冲池，为None时走原有的PIL截图路径
+        rounds: 每个窗口、每个模板的识别轮数
+
+    Returns:
+        每次识别的峰值分配字节数
+    """
+    peaks = []
+    hwnds = [hwnd for hwnd, _ in backend.enum_windows()]
+    for _ in range(rounds):
+        for hwnd in hwnds:
+            for template in TEMPLATES:
+                tracemalloc.reset_peak()
+                baseline = tracemalloc.get_traced_memory()[0]
+                if pool is None:
+                    scene = backend.capture_window(hwnd)
+                    recognizer.find_target_in_scene(scene, template)
+                    del scene
+                else:
+                    scene = backend.capture_window_array(hwnd, pool)
+                    recognizer.find_target_in_scene(scene, template)
+                    pool.release(scene)
+                peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    return peaks
+
+
+def summarize(peaks: List[int]) -> Dict:
+    # 第一轮包含缓冲池和模板缓存的预热，稳态只看后半段
+    steady = peaks[len(peaks) // 2:]
+    return {
+        "lookups": len(peaks),
+        "first_kb": peaks[0] / 1024,
+        "median_kb": statistics.median(peaks) / 1024,
+        "steady_median_kb": statistics.median(steady) / 1024,
+        "max_kb": max(peaks) / 1024,
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="识别内存基准测试（模拟后端）")
+    parser.add_argument("--windows", type=int, default=4, help="模拟窗口数量")
+    parser.add_argument("--rounds", type=int, default=5, help="每个窗口、每个模板的识别轮数")
+    parser.add_argument("--json", default=None, help="将结果写入JSON文件")
+    args = parser.parse_args(argv)
+
+    backend = FakeBackend()
+    for index in range(args.windows):
+        backend.add_window(f"雷电模拟器-{index + 1}", [SCENE_PATH], screen_pos=(index * 40, index * 30))
+    set_backend(backend)
+
+    pool = BufferPool()
+    legacy = ImageRecognition(0.8)
+    pooled = ImageRecognition(0.8, buffer_pool=pool)
+    # 预热检测器和模板缓存，避免一次性的初始化分配计入任何一方
+    for recognizer in (legacy, pooled):
+        recognizer.find_target_in_scene(SCENE_PATH, TEMPLATES[0])
+
+    tracemalloc.start()
+    try:
+        legacy_peaks = measure(backend, legacy, None, args.rounds)
+        pooled_peaks = measure(backend, pooled, pool, args.rounds)
+    finally:
+        tracemalloc.stop()
+
+    results = {"legacy": summarize(legacy_peaks), "pooled": summarize(pooled_peaks)}
+    names = {"legacy": "原有路径", "pooled": "缓冲池"}
+
+    print(f"{Colors.BOLD}每次识别的峰值分配（{args.windows}个窗口，{args.rounds}轮，"
+          f"{len(TEMPLATES)}个模板）{Colors.ENDC}")
+    print(f"{'路径':<10}{'首次(KB)':>12}{'中位数(KB)':>14}{'稳态中位数(KB)':>18}{'最大(KB)':>12}")
+    for key, summary in results.items():
+        name = names[key]
+        print(f"{name}{' ' * max(10 - len(name) * 2, 1)}{summary['first_kb']:>12.1f}"
+              f"{summary['median_kb']:>14.1f}{summary['steady_median_kb']:>18.1f}{summary['max_kb']:>12.1f}")
+
+    legacy_kb = results["legacy"]["steady_median_kb"]
+    pooled_kb = results["pooled"]["steady_median_kb"]
+    if legacy_kb:
+        print(f"\n{Colors.GREEN}稳态峰值分配减少 {100 * (1 - pooled_kb / legacy_kb):.1f}%{Colors.ENDC}")
+    results["pool"] = pool.stats()
+    print(f"缓冲池: {results['pool']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已写入: {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+识别服务基准测试
+启动N个Agent进程（每个对应一组模拟器，画面各不相同），分别在本进程识别和通过本地识别服务识别，
+对比所有进程的峰值内存（RSS）之和、模板特征缓存命中率和总耗时；全部在本机完成
+
+用法:
+    python -m benchmarks.recognition_server_benchmark [--processes 4] [--scenes 4] [--rounds 2] [--json PATH]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import secrets
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+from common.recognition_server import AUTHKEY_ENV, RecognitionClient
+from common.utils import Colors
+
+ADDRESS = ('127.0.0.1', 47652)
+
+
+def max_rss_kb() -> int:
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def agent_process(mode: str, index: int, scenes: int, rounds: int, results) -> None:
+    """模拟一个Agent进程：在自己的画面上反复查找模板"""
+    import contextlib
+    import io
+
+    from benchmarks.corpus import build_corpus
+    from common.buffer_pool import get_buffer_pool
+    from common.image_finder import create_recognizer
+    from common.recognition_server import RemoteRecognition
+
+    corpus = build_corpus(scenes=scenes, seed=100 + index)
+    if mode == 'server':
+        client = RecognitionClient(ADDRESS)
+        recognizer = RemoteRecognition(client, 0.8, session=f"agent-{index}")
+    else:
+        client = None
+        recognizer = create_recognizer(0.8, get_buffer_pool())
+
+    lookups = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(rounds):
+            for scene in corpus:
+                for template in list(scene.truth) + scene.absent:
+                    recognizer.find_target_in_scene(scene.image, template)
+                    lookups += 1
+
+    report = {'lookups': lookups, 'max_rss_kb': max_rss_kb()}
+    if client is None:
+        report['template_features'] = recognizer.template_feature_stats()
+    else:
+        client.close()
+    results.put(report)
+
+
+def run(mode: str, processes: int, scenes: int, rounds: int) -> Dict:
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    server = None
+    if mode == 'server':
+        # 识别服务作为独立进程启动，与实际部署相同
+        server = subprocess.Popen([sys.executable, "-m", "tools.recognition_server",
+                                   "--address", f"{ADDRESS[0]}:{ADDRESS[1]}"], stdout=subprocess.DEVNULL)
+        wait_for_server(server)
+
+    start = time.perf_counter()
+    agents = [ctx.Process(target=agent_process, args=(mode, index, scenes, rounds, results))
+              for index in range(processes)]
+    for agent in agents:
+        agent.start()
+    reports = [results.get() for _ in agents]
+    for agent in agents:
+        agent.join()
+    elapsed = time.perf_counter() - start
+
+    summary = {
+        'processes': processes,
+        'lookups': sum(report['lookups'] for report in reports),
+        'seconds': round(elapsed, 2),
+        'agent_rss_mb': round(sum(report['max_rss_kb'] for report in reports) / 1024, 1),
+    }
+    if server is not None:
+        client = RecognitionClient(ADDRESS)
+        stats = client.stats()
+        client.shutdown()
+        client.close()
+        server.wait(10)
+        summary['server_rss_mb'] = round(stats['max_rss_kb'] / 1024, 1)
+        features = stats['template_features']
+        summary['memo_hit_rate'] = stats['memo']['hit_rate']
+    else:
+        summary['server_rss_mb'] = 0.0
+        features = {name: sum(report['template_features'][name] for report in reports)
+                    for name in ('hits', 'misses', 'entries')}
+    total = features['hits'] + features['misses']
+    summary['template_feature_entries'] = features['entries']
+    summary['template_feature_hit_rate'] = round(features['hits'] / total, 4) if total else 0.0
+    summary['total_rss_mb'] = round(summary['agent_rss_mb'] + summary['server_rss_mb'], 1)
+    return summary
+
+
+def wait_for_server(server: subprocess.Popen, timeout: float = 60):
+    """等待识别服务开始监听"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("识别服务启动失败")
+        try:
+            RecognitionClient(ADDRESS).close()
+            return
+        except (OSError, EOFError):
+            time.sleep(0.2)
+    raise TimeoutError("等待识别服务超时")
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="识别服务基准测试")
+    parser.add_argument("--processes", type=int, default=4, help="Agent进程数")
+    parser.add_argument("--scenes", type=int, default=4, help="每个进程的画面数")
+    parser.add_argument("--rounds", type=int, default=2, help="每个进程重复查找的轮数")
+    parser.add_argument("--json", default=None, help="将结果写入JSON文件")
+    args = parser.parse_args(argv)
+
+    # 服务监听TCP地址，本次运行使用一次性密钥，服务和Agent进程从环境变量继承
+    os.environ[AUTHKEY_ENV] = secrets.token_hex(16)
+    report = {}
+    for mode in ('local', 'server'):
+        print(f"{Colors.BOLD}运行 {mode} 模式...{Colors.ENDC}")
+        report[mode] = run(mode, args.processes, args.scenes, args.rounds)
+
+    print(f"\n{'模式':<8}{'总RSS(MB)':>12}{'Agent(MB)':>12}{'服务(MB)':>10}{'特征条目':>10}{'特征命中率':>12}{'耗时(s)':>10}")
+    for mode, stats in report.items():
+        print(f"{mode:<8}{stats['total_rss_mb']:>12.1f}{stats['agent_rss_mb']:>12.1f}{stats['server_rss_mb']:>10.1f}"
+              f"{stats['template_feature_entries']:>10}{stats['template_feature_hit_rate']:>13.1%}{stats['seconds']:>10.1f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已写入: {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
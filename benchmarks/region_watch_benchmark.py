@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+区域监视基准测试
+在模拟后端上轮询“下一场”按钮，对比每次轮询截取整个窗口再识别（原有轮询方式）、
+截取整个窗口只做NCC，以及只截取配置区域或上次出现位置附近做NCC（RegionWatcher）的
+单次CPU耗时和每CPU秒轮询次数
+
+用法:
+    python -m benchmarks.region_watch_benchmark [--polls 50]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from typing import Callable, List
+
+import cv2
+
+from common.backends.fake_backend import FakeBackend
+from common.buffer_pool import BufferPool
+from common.image_recognition import ImageRecognition
+from common.region_watcher import RegionWatcher
+from common.utils import Colors
+
+SCENE_PATH = "./img/screen/test_result.png"
+TEMPLATE_PATH = "./img/template/next_opponent.png"
+
+
+def timed_polls(poll: Callable[[], object], polls: int) -> List[float]:
+    """执行若干次轮询，返回每次的CPU耗时（毫秒）"""
+    durations = []
+    for _ in range(polls):
+        start = time.process_time()
+        poll()
+        durations.append((time.process_time() - start) * 1000)
+    return durations
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="区域监视基准测试")
+    parser.add_argument("--polls", type=int, default=50, help="每种方式的轮询次数")
+    args = parser.parse_args(argv)
+
+    scene = cv2.imread(SCENE_PATH)
+    template = cv2.imread(TEMPLATE_PATH)
+    if scene is None or template is None:
+        print(f"{Colors.RED}无法加载画面或模板{Colors.ENDC}")
+        return 1
+    # 按钮出现在右下区域
+    height, width = scene.shape[:2]
+    h, w = template.shape[:2]
+    top, left = int(height * 0.8), int(width * 0.85)
+    scene[top:top + h, left:left + w] = template
+
+    backend = FakeBackend()
+    hwnd = backend.add_window("雷电模拟器-bench", [scene])
+    pool = BufferPool()
+    recognizer = ImageRecognition(0.8, buffer_pool=pool)
+    gray_template = cv2.cvtColor(template, cv2.COLOR_BGR2GRAY)
+
+    def full_recognize():
+        frame = backend.capture_window_array(hwnd, pool)
+        try:
+            return recognizer.find_target_in_scene(frame, TEMPLATE_PATH)
+        finally:
+            pool.release(frame)
+
+    def full_ncc():
+        frame = backend.capture_window_array(hwnd, pool)
+        try:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            return cv2.minMaxLoc(cv2.matchTemplate(gray, gray_template, cv2.TM_CCOEFF_NORMED))[1]
+        finally:
+            pool.release(frame)
+
+    watcher = RegionWatcher(hwnd, TEMPLATE_PATH, pool=pool, backend=backend)
+    found = watcher.poll()
+    if not found:
+        print(f"{Colors.RED}区域监视未找到按钮，请检查WATCHER_SETTINGS['regions']{Colors.ENDC}")
+        return 1
+    region_area = (watcher.region[2] - watcher.region[0]) * (watcher.region[3] - watcher.region[1])
+    print(f"{Colors.BOLD}画面 {width}x{height}，配置区域占 {region_area / (width * height):.0%}，"
+          f"按钮位置 {found['top_left']}{Colors.ENDC}")
+
+    ways = [
+        ("整窗截图+识别", full_recognize),
+        ("整窗截图+NCC", full_ncc),
+        # 指定区域时不使用上次出现的位置，每次都截取完整的配置区域
+        ("配置区域+NCC", RegionWatcher(hwnd, TEMPLATE_PATH, region=watcher.region, pool=pool, backend=backend).poll),
+        ("上次位置+NCC", watcher.poll),
+    ]
+    print(f"\n{'方式':<16}{'中位数(ms)':>12}{'每CPU秒轮询':>14}")
+    for name, poll in ways:
+        durations = timed_polls(poll, args.polls)
+        median = statistics.median(durations)
+        rate = len(durations) / max(sum(durations) / 1000, 1e-9)
+        padding = 16 - sum(2 if ord(ch) > 127 else 1 for ch in name)
+        print(f"{name}{' ' * max(padding, 1)}{median:>12.2f}{rate:>14.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
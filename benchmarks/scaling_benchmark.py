@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+多窗口扩展基准测试
+在模拟后端上创建N个窗口（画面来自会话录制或合成语料），每个窗口一个线程，
+通过真实的 CoordinateConverter.find_and_click_icon -> ImageFinder 路径执行与日常任务签到相同的步骤序列，
+报告随N增长的每窗口步骤耗时、总步骤速率、CPU利用率和峰值内存（RSS）；
+每个N在独立的子进程中运行，RSS互不影响，结果可写入JSON用于版本间对比
+
+用法:
+    python -m benchmarks.scaling_benchmark [--windows 1,2,4,8,16] [--rounds 1] [--session PATH] [--json PATH]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+from common.utils import Colors
+
+# 与 agent.tasks.daily_task.sign_in 相同的步骤：(模板, 描述)
+STEPS = [
+    ("./img/template/cebianlan_zhankai.png", "侧边栏"),
+    ("./img/template/legion.png", "进入军团"),
+    ("./img/template/legion_sign_in.png", "军团签到"),
+    ("./img/template/liangcaojuanxian.png", "粮草捐献"),
+    ("./img/template/liangcao.png", "粮草"),
+    ("./img/template/juntuanqiyun.png", "军团祈运"),
+    ("./img/template/qiyun.png", "祈运"),
+    ("./img/template/close.png", "关闭"),
+    ("./img/template/cebianlan_shouqi.png", "侧边栏"),
+]
+
+
+def build_backend(windows: int, session: Optional[str], scenes: int):
+    """创建N个模拟窗口：有会话录制时依次使用录制中各窗口的画面，否则每个窗口一组不同的合成画面"""
+    from common.backends.fake_backend import FakeBackend
+
+    backend = FakeBackend()
+    if session:
+        from common.session_recording import SessionReader
+        reader = SessionReader(session)
+        sources = [reader.frame_source(hwnd) for hwnd in reader.windows() if reader.frame_indices(hwnd)]
+        if not sources:
+            raise ValueError(f"会话录制中没有画面: {session}")
+        for index in range(windows):
+            backend.add_window(f"雷电模拟器-{index + 1}", sources[index % len(sources)])
+        return backend
+
+    from benchmarks.corpus import build_corpus
+    templates = sorted({path for path, _ in STEPS})
+    for index in range(windows):
+        corpus = build_corpus(templates, scenes=scenes, per_scene=3, negatives=0, seed=index)
+        backend.add_window(f"雷电模拟器-{index + 1}", [scene.image for scene in corpus])
+    return backend
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def run_windows(windows: int, rounds: int, session: Optional[str], scenes: int) -> Dict:
+    """在当前进程中用N个窗口线程执行步骤序列"""
+    import contextlib
+    import io
+    import resource
+
+    from common.backends import set_backend
+    from common.coordinate_converter import CoordinateConverter
+
+    backend = build_backend(windows, session, scenes)
+    set_backend(backend)
+    hwnds = list(backend.windows)
+    latencies: Dict[int, List[float]] = {hwnd: [] for hwnd in hwnds}
+    found = []
+    errors = []
+
+    def window_worker(hwnd):
+        try:
+            converter = CoordinateConverter(hwnd)
+            for _ in range(rounds):
+                for template, description in STEPS:
+                    start = time.perf_counter()
+                    found.append(converter.find_and_click_icon(template, description, delay=0))
+                    latencies[hwnd].append((time.perf_counter() - start) * 1000)
+        except Exception as e:
+            errors.append(repr(e))
+
+    # 任务代码的日志很多，测量期间丢弃
+    with contextlib.redirect_stdout(io.StringIO()):
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        threads = [threading.Thread(target=window_worker, args=(hwnd,)) for hwnd in hwnds]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    steps = len(all_latencies)
+    cores = os.cpu_count() or 1
+    return {
+        'windows': windows,
+        'steps': steps,
+        'found_rate': round(sum(found) / len(found), 4) if found else 0.0,
+        'seconds': round(wall, 2),
+        'steps_per_second': round(steps / wall, 2) if wall else 0.0,
+        'step_ms_median': round(statistics.median(all_latencies), 1) if steps else 0.0,
+        'step_ms_p95': round(percentile(all_latencies, 0.95), 1) if steps else 0.0,
+        # 每个窗口的步骤耗时中位数，观察窗口之间是否公平
+        'window_ms_median': [round(statistics.median(values), 1) for values in latencies.values() if values],
+        'cpu_percent': round(cpu / wall / cores * 100, 1) if wall else 0.0,
+        'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'errors': errors,
+    }
+
+
+def _child(windows: int, rounds: int, session: Optional[str], scenes: int, results):
+    results.put(run_windows(windows, rounds, session, scenes))
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="多窗口扩展基准测试（模拟后端）")
+    parser.add_argument("--windows", default="1,2,4,8,16", help="逗号分隔的窗口数量")
+    parser.add_argument("--rounds", type=int, default=1, help="每个窗口执行步骤序列的轮数")
+    parser.add_argument("--scenes", type=int, default=4, help="没有会话录制时每个窗口的合成画面数")
+    parser.add_argument("--session", default=None, help="会话录制目录，用录制的画面代替合成画面")
+    parser.add_argument("--json", default=None, help="将结果写入JSON文件")
+    args = parser.parse_args(argv)
+
+    ctx = multiprocessing.get_context('spawn')
+    results = []
+    print(f"{Colors.BOLD}每个窗口 {len(STEPS) * args.rounds} 步，CPU核心数 {os.cpu_count()}{Colors.ENDC}")
+    print(f"{'窗口数':<8}{'步骤/秒':>10}{'中位(ms)':>12}{'P95(ms)':>12}{'CPU%':>8}{'RSS(MB)':>10}{'找到率':>10}")
+    for count in [int(n) for n in args.windows.split(",") if n.strip()]:
+        queue = ctx.Queue()
+        child = ctx.Process(target=_child, args=(count, args.rounds, args.session, args.scenes, queue))
+        child.start()
+        stats = queue.get()
+        child.join()
+        results.append(stats)
+        print(f"{count:<8}{stats['steps_per_second']:>10.2f}{stats['step_ms_median']:>12.1f}"
+              f"{stats['step_ms_p95']:>12.1f}{stats['cpu_percent']:>8.1f}{stats['max_rss_mb']:>10.1f}"
+              f"{stats['found_rate']:>10.1%}")
+        for error in stats['errors']:
+            print(f"{Colors.RED}  窗口出错: {error}{Colors.ENDC}")
+
+    if args.json:
+        report = {
+            'host': {
+                'platform': platform.platform(),
+                'python': platform.python_version(),
+                'cpu_count': os.cpu_count(),
+            },
+            'config': {'rounds': args.rounds, 'scenes': args.scenes, 'session': args.session,
+                       'steps': [description for _, description in STEPS]},
+            'results': results,
+        }
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已写入: {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
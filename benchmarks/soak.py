@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+长时间运行（soak）泄漏检测
+在模拟后端上反复执行任务迭代：每次迭代在一个窗口上新建坐标转换器（连同图像查找器和识别器），
+按日常任务签到的步骤执行 find_and_click_icon 并轮询一次区域监视器，定期关闭一个窗口并打开新窗口
+（与守护进程一样释放已关闭窗口的截图会话）；
+预热后定期采样 tracemalloc 内存、RSS、各类型对象数、线程数和模拟后端的截图会话/GDI对象计数，
+按最小二乘拟合每次迭代的增长斜率，超过阈值时列出增长最多的分配位置和对象类型并以非0退出
+
+用法:
+    python -m benchmarks.soak [--iterations 2000] [--windows 2] [--sample-every 20] [--json PATH]
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from benchmarks.scaling_benchmark import STEPS
+from common.flight_recorder import get_flight_recorder
+from common.governor import get_governor
+from common.utils import Colors
+
+WATCH_TEMPLATE = "./img/template/next_opponent.png"
+
+# 指标 -> (命令行参数名, 默认阈值（每次迭代的增长量）, 说明)
+THRESHOLDS = {
+    'traced_bytes': ('max_traced_slope', 2048.0, "tracemalloc字节"),
+    'rss_bytes': ('max_rss_slope', 64 * 1024.0, "RSS字节"),
+    'objects': ('max_object_slope', 5.0, "Python对象"),
+    'threads': ('max_handle_slope', 0.01, "线程"),
+    'capture_sessions': ('max_handle_slope', 0.01, "截图会话"),
+    'gdi_objects': ('max_handle_slope', 0.01, "GDI对象"),
+    'cached_frames': ('max_handle_slope', 0.01, "已加载画面"),
+}
+
+
+def current_rss() -> int:
+    """当前常驻内存（字节），没有/proc时退回峰值RSS"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def type_counts() -> Counter:
+    return Counter(type(obj).__name__ for obj in gc.get_objects())
+
+
+def slope(points: List[Tuple[int, float]]) -> float:
+    """最小二乘斜率：每次迭代的增长量"""
+    if len(points) < 2:
+        return 0.0
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    var = sum((x - mean_x) ** 2 for x, _ in points)
+    if var == 0:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / var
+
+
+class SoakRun:
+    """一次soak运行：持有模拟后端和窗口，逐次执行迭代"""
+
+    def __init__(self, windows: int, scenes: int, steps: int, churn_every: int, keep_sessions: bool):
+        from benchmarks.scaling_benchmark import build_backend
+        from common.backends import set_backend
+
+        self.backend = build_backend(windows, None, scenes)
+        self.backend.keep_capture_sessions = keep_sessions
+        set_backend(self.backend)
+        # 关闭窗口后新开的窗口沿用其画面
+        self.frames = {hwnd: window.frames for hwnd, window in self.backend.windows.items()}
+        self.steps = STEPS[:steps] if steps else STEPS
+        self.churn_every = churn_every
+        self.opened = windows
+        # 步骤失败时飞行记录器写出的画面放到临时目录
+        self.recorder = get_flight_recorder()
+        self.recorder_dir = None
+        if self.recorder is not None:
+            self.recorder_dir = self.recorder.output_dir = tempfile.mkdtemp(prefix="soak_flight_")
+
+    def close(self):
+        if self.recorder_dir:
+            self.recorder.flush()
+            shutil.rmtree(self.recorder_dir, ignore_errors=True)
+
+    def churn(self):
+        """关闭最早的窗口并打开一个新窗口，释放已关闭窗口的截图会话"""
+        hwnd = next(iter(self.backend.windows))
+        frames = self.frames.pop(hwnd)
+        self.backend.remove_window(hwnd)
+        self.backend.release_capture_sessions(hwnd)
+        get_governor().forget(hwnd)
+        if self.recorder is not None:
+            self.recorder.forget(hwnd)
+        self.opened += 1
+        new_hwnd = self.backend.add_window(f"雷电模拟器-{self.opened}", frames)
+        self.frames[new_hwnd] = frames
+
+    def iteration(self, index: int):
+        from common.coordinate_converter import CoordinateConverter
+        from common.region_watcher import RegionWatcher
+
+        if self.churn_every and index and index % self.churn_every == 0:
+            self.churn()
+        hwnds = list(self.backend.windows)
+        hwnd = hwnds[index % len(hwnds)]
+        converter = CoordinateConverter(hwnd)
+        for template, description in self.steps:
+            converter.find_and_click_icon(template, description, delay=0)
+        RegionWatcher(hwnd, WATCH_TEMPLATE).poll()
+        # 模拟后端的鼠标事件记录是测试用的，不计入泄漏
+        self.backend.events.clear()
+
+    def sample(self, index: int) -> Tuple[Dict, Counter]:
+        """采样一次，返回指标和各类型对象数"""
+        # 等待飞行记录器写完排队的失败画面，排队中的画面不计入增长
+        if self.recorder is not None:
+            self.recorder.flush()
+        gc.collect()
+        counters = self.backend.resource_counters()
+        counts = type_counts()
+        return {
+            'iteration': index,
+            'traced_bytes': tracemalloc.get_traced_memory()[0],
+            'rss_bytes': current_rss(),
+            'objects': sum(counts.values()),
+            'threads': threading.active_count(),
+            'capture_sessions': counters['capture_sessions'],
+            'gdi_objects': counters['gdi_objects'],
+            'cached_frames': counters['cached_frames'],
+        }, counts
+
+
+def report_growth(baseline_snapshot, final_snapshot, first: Counter, last: Counter, top: int):
+    """打印增长最多的分配位置和对象类型"""
+    print(f"\n{Colors.BOLD}增长最多的分配位置:{Colors.ENDC}")
+    filters = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    ]
+    stats = final_snapshot.filter_traces(filters).compare_to(baseline_snapshot.filter_traces(filters), 'traceback')
+    for stat in [s for s in stats if s.size_diff > 0][:top]:
+        print(f"  {stat.size_diff / 1024:+.1f} KB ({stat.count_diff:+d} 块)")
+        for line in stat.traceback.format(limit=4, most_recent_first=True):
+            print(f"      {line}")
+
+    growth = last - first
+    print(f"\n{Colors.BOLD}增长最多的对象类型:{Colors.ENDC}")
+    for name, count in growth.most_common(top):
+        print(f"  {name:<32}{count:>+8d}")
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="长时间运行泄漏检测（模拟后端）")
+    parser.add_argument("--iterations", type=int, default=2000, help="任务迭代次数")
+    parser.add_argument("--windows", type=int, default=2, help="同时存在的窗口数")
+    parser.add_argument("--scenes", type=int, default=4, help="每个窗口的合成画面数")
+    parser.add_argument("--steps", type=int, default=0, help="每次迭代执行的步骤数，0为签到的全部步骤")
+    parser.add_argument("--warmup", type=int, default=50, help="预热迭代次数，缓存和缓冲池在此期间填满")
+    parser.add_argument("--sample-every", type=int, default=20, help="每隔多少次迭代采样一次")
+    parser.add_argument("--churn-every", type=int, default=25, help="每隔多少次迭代关闭并重新打开一个窗口，0为不关闭")
+    parser.add_argument("--no-keep-sessions", action="store_true", help="每次截图后释放截图会话（手动运行的模式）")
+    parser.add_argument("--frames", type=int, default=8, help="tracemalloc记录的调用栈深度")
+    parser.add_argument("--top", type=int, default=10, help="失败时列出的增长位置数")
+    for metric, (dest, default, label) in THRESHOLDS.items():
+        flag = "--" + dest.replace("_", "-")
+        if not any(flag in action.option_strings for action in parser._actions):
+            parser.add_argument(flag, dest=dest, type=float, default=default,
+                                help=f"每次迭代允许的最大增长（{label}）")
+    parser.add_argument("--json", default=None, help="将采样结果写入JSON文件")
+    args = parser.parse_args(argv)
+
+    run = SoakRun(args.windows, args.scenes, args.steps, args.churn_every, not args.no_keep_sessions)
+    tracemalloc.start(args.frames)
+    samples: List[Dict] = []
+    # 只保留第一次和最近一次采样的对象类型计数，采样本身的内存不随迭代次数增长太多
+    first_counts = last_counts = None
+    baseline_snapshot = None
+    started = time.perf_counter()
+    print(f"{Colors.BOLD}{args.iterations}次迭代，{args.windows}个窗口，每次迭代{len(run.steps)}步，"
+          f"预热{args.warmup}次{Colors.ENDC}")
+    print(f"{'迭代':>8}{'traced(MB)':>12}{'RSS(MB)':>10}{'对象数':>10}{'线程':>6}{'会话':>6}{'GDI':>6}{'耗时(s)':>10}")
+
+    for index in range(args.iterations):
+        # 任务代码的日志很多，运行期间丢弃
+        with contextlib.redirect_stdout(io.StringIO()):
+            run.iteration(index)
+        done = index + 1
+        if done < args.warmup or (done - args.warmup) % args.sample_every and done != args.iterations:
+            continue
+        sample, last_counts = run.sample(done)
+        samples.append(sample)
+        if baseline_snapshot is None:
+            first_counts = last_counts
+            baseline_snapshot = tracemalloc.take_snapshot()
+        print(f"{done:>8}{sample['traced_bytes'] / 1048576:>12.2f}{sample['rss_bytes'] / 1048576:>10.1f}"
+              f"{sample['objects']:>10}{sample['threads']:>6}{sample['capture_sessions']:>6}"
+              f"{sample['gdi_objects']:>6}{time.perf_counter() - started:>10.1f}")
+
+    final_snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    run.close()
+
+    failures = []
+    slopes = {}
+    print(f"\n{Colors.BOLD}每次迭代的增长斜率:{Colors.ENDC}")
+    for metric, (dest, _, label) in THRESHOLDS.items():
+        value = slope([(sample['iteration'], sample[metric]) for sample in samples])
+        limit = getattr(args, dest)
+        slopes[metric] = value
+        failed = len(samples) >= 3 and value > limit
+        color = Colors.RED if failed else Colors.GREEN
+        print(f"  {color}{label:<16}{value:>+14.3f}  (阈值 {limit:g}){Colors.ENDC}")
+        if failed:
+            failures.append(metric)
+
+    if len(samples) < 3:
+        print(f"{Colors.YELLOW}采样不足3次，无法判断增长趋势，请增加迭代次数或减小 --sample-every{Colors.ENDC}")
+    if failures:
+        report_growth(baseline_snapshot, final_snapshot, first_counts, last_counts, args.top)
+
+    if args.json:
+        report = {
+            'config': {key: value for key, value in vars(args).items() if key != 'json'},
+            'slopes': slopes,
+            'failures': failures,
+            'samples': samples,
+        }
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已写入: {args.json}")
+
+    if failures:
+        print(f"\n{Colors.RED}检测到持续增长: {', '.join(failures)}{Colors.ENDC}")
+        return 1
+    print(f"\n{Colors.GREEN}未检测到持续增长{Colors.ENDC}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+启动耗时基准测试
+在模拟后端上多次冷启动子进程，统计从导入入口到菜单就绪、首次创建任务、首次识别的耗时，
+并附带 -X importtime 的导入耗时排行
+
+用法:
+    python -m benchmarks.startup_benchmark [--runs 5] [--top 15] [--json PATH]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+from common.utils import Colors
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 这些模块不应在菜单就绪前被导入
+HEAVY_MODULES = ["cv2", "numpy", "PIL", "win32gui", "win32api", "win32ui"]
+
+# 子进程中执行的测量脚本，结果以一行JSON输出到stdout
+CHILD_SCRIPT = r"""
+import json, sys, time
+heavy = %(heavy)r
+t0 = time.perf_counter()
+import main
+from agent.main_menu import MainMenu
+t1 = time.perf_counter()
+menu = MainMenu()
+t2 = time.perf_counter()
+heavy_at_menu = [name for name in heavy if name in sys.modules]
+daily = [item for item in menu.menu_items if item.task_name == 'daily'][0]
+task = daily.task
+t3 = time.perf_counter()
+from common.image_finder import ImageFinder
+finder = ImageFinder(0.8)
+t4 = time.perf_counter()
+finder.find_icon_in_game('./img/template/attack.png')
+t5 = time.perf_counter()
+print('__RESULT__' + json.dumps({
+    'import_main': t1 - t0,
+    'menu_ready': t2 - t0,
+    'first_task': t3 - t0,
+    'first_finder': t4 - t0,
+    'first_lookup': t5 - t0,
+    'heavy_at_menu': heavy_at_menu,
+}))
+"""
+
+STAGES = ["import_main", "menu_ready", "first_task", "first_finder", "first_lookup"]
+STAGE_NAMES = {
+    "import_main": "导入入口",
+    "menu_ready": "主菜单就绪",
+    "first_task": "首次创建任务",
+    "first_finder": "首次创建查找器",
+    "first_lookup": "首次识别完成",
+}
+
+
+def run_once() -> Dict:
+    """
+    冷启动一个子进程执行测量脚本
+
+    Returns:
+        包含各阶段耗时和导入耗时记录的字典
+    """
+    env = dict(os.environ, JLTX_BACKEND="fake", PYTHONDONTWRITEBYTECODE="1")
+    script = CHILD_SCRIPT % {"heavy": HEAVY_MODULES}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, encoding="utf-8",
+    )
+    result_lines = [line for line in proc.stdout.splitlines() if line.startswith("__RESULT__")]
+    if proc.returncode != 0 or not result_lines:
+        raise RuntimeError(f"子进程执行失败:\n{proc.stderr[-2000:]}")
+
+    result = json.loads(result_lines[0][len("__RESULT__"):])
+    result["imports"] = parse_importtime(proc.stderr)
+    return result
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """
+    解析 -X importtime 输出
+
+    Args:
+        stderr: 子进程标准错误输出
+
+    Returns:
+        [{'module', 'depth', 'self_us', 'cumulative_us'}, ...]
+    """
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, module = line[len("import time:"):].split("|", 2)
+            # 模块名前每两个空格代表一层嵌套导入
+            module = module[1:].rstrip()
+            records.append({
+                "module": module.strip(),
+                "depth": (len(module) - len(module.lstrip())) // 2,
+                "self_us": int(self_us),
+                "cumulative_us": int(cumulative_us),
+            })
+        except ValueError:
+            continue
+    return records
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="启动耗时基准测试（模拟后端）")
+    parser.add_argument("--runs", type=int, default=5, help="冷启动次数")
+    parser.add_argument("--top", type=int, default=15, help="导入耗时排行显示条数")
+    parser.add_argument("--json", default=None, help="将结果写入JSON文件")
+    args = parser.parse_args(argv)
+
+    runs = [run_once() for _ in range(args.runs)]
+
+    print(f"{Colors.BOLD}启动耗时（{args.runs}次冷启动，模拟后端）{Colors.ENDC}")
+    print(f"{'阶段':<16}{'中位数(ms)':>12}{'最小(ms)':>12}{'最大(ms)':>12}")
+    summary = {}
+    for stage in STAGES:
+        values = [run[stage] * 1000 for run in runs]
+        summary[stage] = {
+            "median_ms": statistics.median(values),
+            "min_ms": min(values),
+            "max_ms": max(values),
+        }
+        name = STAGE_NAMES[stage]
+        padding = 16 - (len(name) * 2)
+        print(f"{name}{' ' * max(padding, 1)}{summary[stage]['median_ms']:>12.1f}"
+              f"{summary[stage]['min_ms']:>12.1f}{summary[stage]['max_ms']:>12.1f}")
+
+    heavy = runs[0]["heavy_at_menu"]
+    if heavy:
+        print(f"\n{Colors.RED}主菜单就绪时已导入重量级模块: {', '.join(heavy)}{Colors.ENDC}")
+    else:
+        print(f"\n{Colors.GREEN}主菜单就绪时未导入任何重量级模块{Colors.ENDC}")
+
+    # 只统计顶层包，避免子模块重复计入
+    imports = runs[0]["imports"]
+    top_level = [record for record in imports if record["depth"] == 0]
+    top_level.sort(key=lambda record: record["cumulative_us"], reverse=True)
+    print(f"\n{Colors.BOLD}导入耗时排行（顶层模块，累计）{Colors.ENDC}")
+    print(f"{'模块':<40}{'累计(ms)':>12}{'自身(ms)':>12}")
+    for record in top_level[:args.top]:
+        print(f"{record['module']:<42}{record['cumulative_us'] / 1000:>12.1f}{record['self_us'] / 1000:>12.1f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"runs": args.runs, "stages": summary, "heavy_at_menu": heavy,
+                       "imports": top_level[:args.top]}, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已写入: {args.json}")
+
+    return 1 if heavy else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
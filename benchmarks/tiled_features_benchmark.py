@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+分块场景特征基准测试
+模拟战斗循环中的连续画面（静止、局部变化、整体变化），对比整幅画面提取SIFT特征
+与分块缓存（只重新提取变化小块）的每帧耗时，并检查两种方式的识别位置是否一致
+
+用法:
+    python -m benchmarks.tiled_features_benchmark [--frames 10] [--tile-size 320] [--workers 4]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+import cv2
+import numpy as np
+
+from common.image_recognition import ImageRecognition
+from common.tiled_features import TiledFeatureExtractor
+from common.utils import Colors
+
+SCENE_PATH = "./img/screen/test_result.png"
+TEMPLATE_PATH = "./img/template/attack.png"
+
+
+def make_frames(scene: np.ndarray, pattern: str, count: int) -> List[np.ndarray]:
+    """
+    生成连续画面
+
+    Args:
+        scene: 基础画面
+        pattern: 'static' 静止，'local' 只有一个角落的小区域变化，'full' 整幅画面都有噪声
+        count: 帧数
+    """
+    rng = np.random.default_rng(0)
+    frames = []
+    for i in range(count):
+        frame = scene.copy()
+        if pattern == 'local':
+            # 左上角的倒计时/血条一类小区域每帧变化
+            x = 40 + (i * 7) % 120
+            cv2.rectangle(frame, (x, 40), (x + 80, 90), (0, 0, 255), -1)
+            cv2.putText(frame, str(i), (60, 160), cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 3)
+        elif pattern == 'full':
+            noise = rng.integers(0, 3, size=frame.shape, dtype=np.uint8)
+            frame = cv2.add(frame, noise)
+        frames.append(frame)
+    return frames
+
+
+def time_per_frame(extract, frames: List[np.ndarray]) -> List[float]:
+    durations = []
+    for frame in frames:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        start = time.perf_counter()
+        extract(gray)
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="分块场景特征基准测试")
+    parser.add_argument("--frames", type=int, default=10, help="每种画面模式的帧数")
+    parser.add_argument("--tile-size", type=int, default=320, help="小块边长")
+    parser.add_argument("--workers", type=int, default=4, help="并行线程数")
+    args = parser.parse_args(argv)
+
+    scene = cv2.imread(SCENE_PATH)
+    if scene is None:
+        print(f"{Colors.RED}无法加载画面: {SCENE_PATH}{Colors.ENDC}")
+        return 1
+
+    sift = cv2.SIFT_create()
+    print(f"{Colors.BOLD}每帧特征提取耗时（{scene.shape[1]}x{scene.shape[0]}，小块{args.tile_size}，"
+          f"{args.workers}线程）{Colors.ENDC}")
+    print(f"{'画面':<10}{'整幅(ms)':>12}{'分块首帧(ms)':>16}{'分块后续(ms)':>16}{'复用率':>10}")
+    summary: Dict[str, Dict] = {}
+    for pattern in ('static', 'local', 'full'):
+        frames = make_frames(scene, pattern, args.frames)
+        full = time_per_frame(lambda gray: sift.detectAndCompute(gray, None), frames)
+        tiled_extractor = TiledFeatureExtractor(cv2.SIFT_create, tile_size=args.tile_size, workers=args.workers)
+        tiled = time_per_frame(tiled_extractor.detect_and_compute, frames)
+        stats = tiled_extractor.stats()
+        summary[pattern] = {
+            'full_ms': statistics.median(full),
+            'tiled_first_ms': tiled[0],
+            'tiled_ms': statistics.median(tiled[1:]) if len(tiled) > 1 else tiled[0],
+            'reuse_rate': stats['reuse_rate'],
+        }
+        row = summary[pattern]
+        print(f"{pattern:<10}{row['full_ms']:>12.1f}{row['tiled_first_ms']:>16.1f}"
+              f"{row['tiled_ms']:>16.1f}{row['reuse_rate']:>10.1%}")
+
+    # 识别结果一致性
+    whole = ImageRecognition(0.8).find_target_in_scene(scene, TEMPLATE_PATH, ['feature_match_SIFT'])
+    tiled = ImageRecognition(0.8, tile_size=args.tile_size, tile_workers=args.workers) \
+        .find_target_in_scene(scene, TEMPLATE_PATH, ['feature_match_SIFT'])
+    whole_center = whole[0]['center'] if whole else None
+    tiled_center = tiled[0]['center'] if tiled else None
+    consistent = (whole_center is not None and tiled_center is not None
+                  and abs(whole_center[0] - tiled_center[0]) <= 5 and abs(whole_center[1] - tiled_center[1]) <= 5)
+    color = Colors.GREEN if consistent else Colors.RED
+    print(f"\n{color}识别位置 整幅: {whole_center}，分块: {tiled_center}{Colors.ENDC}")
+    return 0 if consistent else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+图标跟踪基准测试
+在模拟窗口中让图标沿一条路径移动（模拟动画），随后静止，最后消失；
+对比每帧完整识别（ImageFinder.find_icon_in_game）与光流跟踪（ImageFinder.track_icon + IconTracker.update）
+的单次耗时、中心点误差、重新识别次数，以及图标消失后跟踪器多少帧内报告不在
+
+用法:
+    python -m benchmarks.tracking_benchmark [--template PATH] [--moving 30] [--still 20] [--gone 5]
+"""
+
+import argparse
+import contextlib
+import io
+import statistics
+import sys
+import time
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from benchmarks.corpus import make_background
+from common.utils import Colors
+
+TEMPLATE_PATH = "./img/template/legion.png"
+
+
+def build_frames(template_path: str, moving: int, still: int, gone: int, step: float,
+                 size: Tuple[int, int] = (1280, 720), seed: int = 0):
+    """
+    生成画面序列和每帧图标中心的真值（消失后为None）
+
+    Returns:
+        (画面列表, 真值列表)
+    """
+    template = cv2.imread(template_path)
+    if template is None:
+        raise FileNotFoundError(f"无法加载模板: {template_path}")
+    background = make_background(np.random.default_rng(seed), size)
+    h, w = template.shape[:2]
+    start_x, start_y = size[0] // 3, size[1] // 3
+
+    frames, truth = [], []
+    for index in range(moving + still + gone):
+        frame = background.copy()
+        if index < moving + still:
+            offset = min(index, moving) * step
+            # 平移带小数部分，用仿射变换粘贴
+            matrix = np.float32([[1, 0, start_x + offset], [0, 1, start_y + offset * 0.5]])
+            warped = cv2.warpAffine(template, matrix, size, flags=cv2.INTER_LINEAR)
+            mask = cv2.warpAffine(np.full((h, w), 255, np.uint8), matrix, size) > 127
+            frame[mask] = warped[mask]
+            truth.append((start_x + offset + w / 2, start_y + offset * 0.5 + h / 2))
+        else:
+            truth.append(None)
+        frames.append(frame)
+    return frames, truth
+
+
+def error(center, expected) -> Optional[float]:
+    if center is None or expected is None:
+        return None
+    return float(np.hypot(center[0] - expected[0], center[1] - expected[1]))
+
+
+def summarize(name: str, durations: List[float], errors: List[float], extra: str = ""):
+    errors = [value for value in errors if value is not None]
+    print(f"{name:<10}{statistics.median(durations):>12.2f}{max(durations):>12.2f}"
+          f"{(statistics.median(errors) if errors else float('nan')):>12.2f}"
+          f"{(max(errors) if errors else float('nan')):>12.2f}  {extra}")
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="图标跟踪基准测试")
+    parser.add_argument("--template", default=TEMPLATE_PATH, help="跟踪的模板")
+    parser.add_argument("--moving", type=int, default=30, help="图标移动的帧数")
+    parser.add_argument("--still", type=int, default=20, help="移动后静止的帧数")
+    parser.add_argument("--gone", type=int, default=5, help="图标消失后的帧数")
+    parser.add_argument("--step", type=float, default=1.5, help="每帧移动的像素")
+    args = parser.parse_args(argv)
+
+    from common.backends import set_backend
+    from common.backends.fake_backend import FakeBackend
+    from common.governor import RecognitionGovernor, set_governor
+    from common.image_finder import ImageFinder
+
+    frames, truth = build_frames(args.template, args.moving, args.still, args.gone, args.step)
+    total = len(frames)
+    # 不限速，只测识别和跟踪本身
+    set_governor(RecognitionGovernor())
+    print(f"{Colors.BOLD}{total}帧：移动{args.moving}帧（每帧{args.step}像素），静止{args.still}帧，"
+          f"消失{args.gone}帧{Colors.ENDC}")
+    print(f"{'方式':<10}{'中位(ms)':>12}{'最大(ms)':>12}{'中位误差':>12}{'最大误差':>12}")
+
+    def fresh_window():
+        backend = FakeBackend()
+        # 每次调用取当前帧，由测试代码控制帧序号
+        position = {'index': 0}
+        hwnd = backend.add_window("雷电模拟器-bench", lambda _: frames[position['index']])
+        set_backend(backend)
+        return hwnd, position
+
+    # 每帧完整识别
+    hwnd, position = fresh_window()
+    with contextlib.redirect_stdout(io.StringIO()):
+        finder = ImageFinder(hwnd=hwnd)
+        finder.recorder = None
+        durations, errors, found = [], [], []
+        for index in range(total):
+            position['index'] = index
+            start = time.perf_counter()
+            center = finder.find_icon_in_game(args.template)
+            durations.append((time.perf_counter() - start) * 1000)
+            errors.append(error(center, truth[index]))
+            found.append(center is not None)
+    summarize("完整识别", durations, errors,
+              f"找到{sum(found[:args.moving + args.still])}/{args.moving + args.still}，"
+              f"消失后误报{sum(found[args.moving + args.still:])}")
+    detect_median = statistics.median(durations)
+
+    # 光流跟踪
+    hwnd, position = fresh_window()
+    gone_after: Optional[int] = None
+    with contextlib.redirect_stdout(io.StringIO()):
+        finder = ImageFinder(hwnd=hwnd)
+        finder.recorder = None
+        tracker = finder.track_icon(args.template)
+        durations, errors = [], []
+        for index in range(1, total if tracker is not None else 0):
+            position['index'] = index
+            start = time.perf_counter()
+            result = tracker.update()
+            durations.append((time.perf_counter() - start) * 1000)
+            errors.append(error(result['center'] if result else None, truth[index]))
+            if truth[index] is None and result is None and gone_after is None:
+                gone_after = index - (args.moving + args.still) + 1
+    if tracker is None:
+        print(f"{Colors.RED}第一帧未找到图标{Colors.ENDC}")
+        return 1
+    stats = tracker.stats()
+    summarize("光流跟踪", durations, errors,
+              f"重新识别{stats['redetections']}次，"
+              f"消失后{'第' + str(gone_after) + '帧报告不在' if gone_after else '未报告不在'}")
+    track_median = statistics.median(durations)
+    print(f"\n跟踪单次耗时中位数为完整识别的 {track_median / detect_median:.1%}"
+          f"（{detect_median / track_median:.0f}倍）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+窗口后端
+按配置选择真实Windows后端或模拟后端，后端模块在第一次使用时才导入；
+配置了录制目录时用录制后端包装，把截图和鼠标操作写入会话录制
+"""
+
+import atexit
+import os
+import threading
+import time
+
+from .base import BackendBase
+
+# 环境变量优先于 config/settings.py 中的 BACKEND_SETTINGS
+BACKEND_ENV = "JLTX_BACKEND"
+# 会话录制目录，每次运行在其中新建一个子目录
+RECORD_ENV = "JLTX_RECORD"
+
+_backend = None
+_lock = threading.Lock()
+
+
+def _backend_settings() -> dict:
+    try:
+        from config.settings import BACKEND_SETTINGS
+        return BACKEND_SETTINGS
+    except ImportError:
+        return {}
+
+
+def _adb_settings() -> dict:
+    try:
+        from config.settings import ADB_SETTINGS
+        return ADB_SETTINGS
+    except ImportError:
+        return {}
+
+
+def create_backend(name: str = None) -> BackendBase:
+    """
+    创建窗口后端
+
+    Args:
+        name: 后端名称 ('win32'、'fake' 或 'adb')，默认读取环境变量和配置
+
+    Returns:
+        窗口后端实例
+    """
+    settings = _backend_settings()
+    name = name or os.environ.get(BACKEND_ENV) or settings.get('backend', 'win32')
+
+    if name == 'win32':
+        from .win32_backend import Win32Backend
+        return Win32Backend()
+    if name == 'fake':
+        from .fake_backend import FakeBackend
+        backend = FakeBackend()
+        for title, frame in settings.get('fake_windows', []):
+            backend.add_window(title, [frame])
+        return backend
+    if name == 'adb':
+        from .adb_backend import AdbBackend, AdbClient
+        adb = _adb_settings()
+        inner = create_backend(adb.get('inner_backend', 'win32'))
+        client = AdbClient(adb.get('host', '127.0.0.1'), adb.get('port', 5037), adb.get('timeout', 5.0))
+        return AdbBackend(inner, client, devices=adb.get('devices'),
+                          match_client_size=adb.get('match_client_size', True),
+                          remap_interval=adb.get('remap_interval', 30.0),
+                          input_sessions=adb.get('input_sessions', 2),
+                          crop=adb.get('crop', (0, 0, 0, 0)),
+                          keep_aspect=adb.get('keep_aspect', True),
+                          verify_pairing=adb.get('verify_pairing', True),
+                          ack_timeout=adb.get('ack_timeout', 2.0))
+
+    raise ValueError(f"不支持的窗口后端: {name}")
+
+
+def wrap_recording(backend: BackendBase, record_dir: str) -> BackendBase:
+    """
+    用录制后端包装窗口后端，进程退出时自动结束录制
+
+    Args:
+        backend: 被包装的后端
+        record_dir: 会话录制根目录
+
+    Returns:
+        录制后端
+    """
+    from ..session_recording import SessionWriter
+    from .recording_backend import RecordingBackend
+
+    path = os.path.join(record_dir, time.strftime("%Y%m%d_%H%M%S"))
+    recording = RecordingBackend(backend, SessionWriter(path))
+    atexit.register(recording.close)
+    print(f"会话录制已开启: {path}")
+    return recording
+
+
+def get_backend() -> BackendBase:
+    """获取当前进程使用的窗口后端，第一次调用时创建"""
+    global _backend
+    if _backend is None:
+        with _lock:
+            if _backend is None:
+                backend = create_backend()
+                record_dir = os.environ.get(RECORD_ENV) or _backend_settings().get('record_dir')
+                _backend = wrap_recording(backend, record_dir) if record_dir else backend
+    return _backend
+
+
+def set_backend(backend: BackendBase) -> BackendBase:
+    """
+    替换当前进程使用的窗口后端
+
+    Args:
+        backend: 新的窗口后端
+
+    Returns:
+        之前的窗口后端（可能为None）
+    """
+    global _backend
+    with _lock:
+        previous, _backend = _backend, backend
+    return previous
@@ -0,0 +1,606 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+ADB截图后端
+游戏窗口都是安卓模拟器，通过adb server直接从模拟器拉取原始画面（exec-out screencap），
+不需要把窗口切到前台，多个窗口可以并行截图；input_for()提供通过 adb shell 发送点击的输入通道（adb_input）。
+窗口枚举、坐标换算和鼠标输入仍由被包装的后端完成，没有对应设备或ADB截图失败的窗口退回被包装后端的截图
+"""
+
+import re
+import socket
+import struct
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .base import BackendBase
+
+# screencap输出的像素格式（android PixelFormat）-> 每像素字节数
+PIXEL_FORMATS = {1: 4, 2: 4, 3: 3}
+
+# 自动对应窗口与设备时比较的缩略图宽度（像素）
+PAIRING_THUMB_WIDTH = 64
+# 缩略图平均灰度差（0~1）不超过该值才认为窗口显示的是该设备的画面
+PAIRING_MAX_DIFF = 0.08
+# 最佳对应必须比次佳对应的差异小这么多，画面相同的多个模拟器无法区分时不自动对应
+PAIRING_MARGIN = 0.03
+
+Rect = Tuple[int, int, int, int]
+
+
+def content_rect(size: Tuple[int, int], device_size: Tuple[int, int],
+                 crop: Tuple[int, int, int, int] = (0, 0, 0, 0), keep_aspect: bool = True) -> Rect:
+    """
+    设备画面在客户区图像中的位置
+
+    Args:
+        size: 客户区图像尺寸 (width, height)
+        device_size: 设备分辨率 (width, height)
+        crop: 客户区中不属于模拟器画面的边距 (left, top, right, bottom)，例如模拟器的工具栏
+        keep_aspect: 保持设备画面的宽高比，在去掉边距的区域中居中；关闭时拉伸填满该区域
+
+    Returns:
+        (left, top, width, height)
+    """
+    left, top = crop[0], crop[1]
+    width = max(1, size[0] - crop[0] - crop[2])
+    height = max(1, size[1] - crop[1] - crop[3])
+    if keep_aspect:
+        scale = min(width / device_size[0], height / device_size[1])
+        fit_w = max(1, int(round(device_size[0] * scale)))
+        fit_h = max(1, int(round(device_size[1] * scale)))
+        left += (width - fit_w) // 2
+        top += (height - fit_h) // 2
+        width, height = fit_w, fit_h
+    return left, top, width, height
+
+
+class AdbError(Exception):
+    """adb server返回FAIL或连接中断"""
+
+
+def decode_screencap(data, pool=None, size: Optional[Tuple[int, int]] = None,
+                     crop: Tuple[int, int, int, int] = (0, 0, 0, 0), keep_aspect: bool = True):
+    """
+    将 screencap 原始输出解码为BGR数组
+
+    Args:
+        data: screencap输出（头部为宽、高、像素格式，Android 9以后多一个色彩空间字段）
+        pool: 缓冲池，不为None时输出写入池中的缓冲区
+        size: (width, height)，不为None且与设备分辨率不同时输出该尺寸的画面，设备画面按content_rect放置，
+              其余部分为黑色
+        crop: 客户区中不属于模拟器画面的边距，见content_rect
+        keep_aspect: 保持设备画面的宽高比，见content_rect
+
+    Returns:
+        BGR数组
+    """
+    import cv2
+    import numpy as np
+
+    if len(data) < 12:
+        raise AdbError(f"screencap输出过短: {len(data)}字节")
+    width, height, pixel_format = np.frombuffer(data, dtype='<u4', count=3)
+    width, height = int(width), int(height)
+    channels = PIXEL_FORMATS.get(int(pixel_format))
+    if channels is None:
+        raise AdbError(f"不支持的screencap像素格式: {pixel_format}")
+    payload = width * height * channels
+    header = len(data) - payload
+    if header not in (12, 16):
+        raise AdbError(f"screencap输出长度不符: {len(data)}字节，画面 {width}x{height}")
+
+    pixels = np.frombuffer(data, dtype=np.uint8, count=payload, offset=header).reshape(height, width, channels)
+    code = cv2.COLOR_RGBA2BGR if channels == 4 else cv2.COLOR_RGB2BGR
+    if size is None or size == (width, height):
+        out = pool.acquire((height, width, 3)) if pool is not None else None
+        return cv2.cvtColor(pixels, code, dst=out)
+
+    # 先缩放再转换颜色，只处理一次目标尺寸的像素
+    target_w, target_h = size
+    left, top, fit_w, fit_h = content_rect(size, (width, height), crop, keep_aspect)
+    scaled = pool.acquire((fit_h, fit_w, channels)) if pool is not None else None
+    scaled = cv2.resize(pixels, (fit_w, fit_h), dst=scaled, interpolation=cv2.INTER_AREA)
+    try:
+        if (left, top, fit_w, fit_h) == (0, 0, target_w, target_h):
+            out = pool.acquire((target_h, target_w, 3)) if pool is not None else None
+            return cv2.cvtColor(scaled, code, dst=out)
+        out = pool.acquire((target_h, target_w, 3)) if pool is not None else np.empty((target_h, target_w, 3), np.uint8)
+        out.fill(0)
+        out[top:top + fit_h, left:left + fit_w] = cv2.cvtColor(scaled, code)
+        return out
+    finally:
+        if pool is not None:
+            pool.release(scaled)
+
+
+class AdbClient:
+    """
+    adb server协议客户端
+    直接通过TCP与adb server通信，不启动adb.exe子进程；每个请求使用一个新连接
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 5037, timeout: float = 5.0):
+        """
+        初始化adb客户端
+
+        Args:
+            host: adb server地址
+            port: adb server端口
+            timeout: 连接和读取超时（秒）
+        """
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        # 每个设备上次画面的字节数，用于预分配接收缓冲区
+        self._frame_bytes: Dict[str, int] = {}
+
+    def _connect(self) -> socket.socket:
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    @staticmethod
+    def _recv_exact(sock: socket.socket, size: int) -> bytes:
+        data = bytearray()
+        while len(data) < size:
+            chunk = sock.recv(size - len(data))
+            if not chunk:
+                raise AdbError("adb连接意外关闭")
+            data.extend(chunk)
+        return bytes(data)
+
+    def _request(self, sock: socket.socket, request: str):
+        """发送一个请求并检查OKAY/FAIL"""
+        payload = request.encode('utf-8')
+        sock.sendall(b"%04x" % len(payload) + payload)
+        status = self._recv_exact(sock, 4)
+        if status == b"OKAY":
+            return
+        if status == b"FAIL":
+            length = int(self._recv_exact(sock, 4), 16)
+            raise AdbError(self._recv_exact(sock, length).decode('utf-8', 'replace'))
+        raise AdbError(f"adb server返回未知状态: {status!r}")
+
+    def _read_message(self, sock: socket.socket) -> str:
+        length = int(self._recv_exact(sock, 4), 16)
+        return self._recv_exact(sock, length).decode('utf-8', 'replace')
+
+    @staticmethod
+    def _read_to_end(sock: socket.socket, size_hint: int = 0) -> bytearray:
+        """读到连接关闭为止，按size_hint预分配缓冲区减少扩容复制"""
+        buffer = bytearray(max(size_hint, 65536))
+        view = memoryview(buffer)
+        length = 0
+        while True:
+            if length == len(buffer):
+                view.release()
+                buffer.extend(bytes(len(buffer)))
+                view = memoryview(buffer)
+            received = sock.recv_into(view[length:])
+            if not received:
+                break
+            length += received
+        view.release()
+        del buffer[length:]
+        return buffer
+
+    def version(self) -> int:
+        """adb server协议版本"""
+        with self._connect() as sock:
+            self._request(sock, "host:version")
+            return int(self._read_message(sock), 16)
+
+    def devices(self) -> List[Tuple[str, str]]:
+        """
+        列出设备
+
+        Returns:
+            [(serial, state), ...]，state为'device'时可用
+        """
+        with self._connect() as sock:
+            self._request(sock, "host:devices")
+            text = self._read_message(sock)
+        return [tuple(line.split('\t', 1)) for line in text.splitlines() if '\t' in line]
+
+    def _open(self, serial: str, service: str) -> socket.socket:
+        """连接到设备上的服务，返回的连接由调用方关闭"""
+        sock = self._connect()
+        try:
+            self._request(sock, f"host:transport:{serial}")
+            self._request(sock, service)
+        except BaseException:
+            sock.close()
+            raise
+        return sock
+
+    def exec_out(self, serial: str, command: str) -> bytearray:
+        """
+        执行命令并返回原始输出（等同于 adb exec-out，不做换行转换）
+
+        Args:
+            serial: 设备序列号
+            command: 命令
+
+        Returns:
+            命令输出
+        """
+        with self._open(serial, f"exec:{command}") as sock:
+            return self._read_to_end(sock)
+
+    def shell(self, serial: str, command: str) -> str:
+        """执行shell命令并返回输出文本"""
+        with self._open(serial, f"shell:{command}") as sock:
+            return bytes(self._read_to_end(sock)).decode('utf-8', 'replace')
+
+    def screencap(self, serial: str) -> bytearray:
+        """截取设备画面，返回 screencap 原始输出"""
+        with self._open(serial, "exec:screencap") as sock:
+            data = self._read_to_end(sock, self._frame_bytes.get(serial, 0))
+        self._frame_bytes[serial] = len(data)
+        return data
+
+
+def _natural_key(text: str):
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', text)]
+
+
+class AdbBackend(BackendBase):
+    """
+    ADB截图后端
+    包装另一个后端（通常是Win32Backend），只替换截图；ADB画面保持宽高比缩放到窗口客户区中模拟器画面的位置
+    （客户区去掉crop边距后居中），因此识别结果的坐标与原后端一致
+    """
+
+    name = "adb"
+
+    def __init__(self, inner: BackendBase, client: AdbClient = None,
+                 devices: Dict[str, str] = None, match_client_size: bool = True,
+                 remap_interval: float = 30.0, input_sessions: int = 2,
+                 crop: Tuple[int, int, int, int] = (0, 0, 0, 0), keep_aspect: bool = True,
+                 verify_pairing: bool = True, ack_timeout: float = 2.0):
+        """
+        初始化ADB截图后端
+
+        Args:
+            inner: 被包装的后端
+            client: adb客户端，默认连接本机adb server
+            devices: 窗口标题关键字 -> 设备序列号；未配置的窗口通过比较窗口截图和设备画面自动对应
+            match_client_size: 将画面缩放到客户区像素尺寸，关闭时返回设备原始分辨率
+            remap_interval: 没有对应设备的窗口每隔多久（秒）重新尝试对应
+            input_sessions: 每个设备保持的 adb shell 输入会话数
+            crop: 客户区中不属于模拟器画面的边距 (left, top, right, bottom)，图像像素
+            keep_aspect: 保持设备画面的宽高比，关闭时拉伸填满客户区（去掉边距后）
+            verify_pairing: 自动对应时比较窗口截图和设备画面，只接受能明确区分的对应；
+                            关闭时在窗口数与设备数相同时按标题和序列号的自然顺序一一对应（不验证）
+            ack_timeout: 手势时长之外等待设备执行回执的时间（秒）
+        """
+        self.inner = inner
+        self.client = client or AdbClient()
+        self.devices = dict(devices or {})
+        self.match_client_size = match_client_size
+        self.crop = tuple(crop)
+        self.keep_aspect = keep_aspect
+        self.verify_pairing = verify_pairing
+        self.remap_interval = remap_interval
+        self._mapped_at = 0.0
+        self.input_sessions = input_sessions
+        self.ack_timeout = ack_timeout
+        self._input_pool = None
+        # 设备序列号 -> 设备分辨率 (width, height)
+        self._device_sizes: Dict[str, Tuple[int, int]] = {}
+        self._serials: Dict[int, Optional[str]] = {}
+        self._assigned: Dict[int, Optional[str]] = {}
+        self._lock = threading.Lock()
+        self.adb_captures = 0
+        self.adb_failures = 0
+        self.adb_seconds = 0.0
+
+    @property
+    def keep_capture_sessions(self):
+        return self.inner.keep_capture_sessions
+
+    @keep_capture_sessions.setter
+    def keep_capture_sessions(self, value):
+        self.inner.keep_capture_sessions = value
+
+    def __getattr__(self, item):
+        return getattr(self.inner, item)
+
+    # ---- 设备与窗口的对应 ----
+
+    def assign(self, hwnd: int, serial: Optional[str]):
+        """手动指定窗口对应的设备，serial为None表示该窗口不使用ADB截图"""
+        with self._lock:
+            self._assigned[hwnd] = serial
+            self._serials[hwnd] = serial
+
+    def serial_for(self, hwnd: int) -> Optional[str]:
+        """
+        获取窗口对应的设备序列号
+
+        Args:
+            hwnd: 窗口句柄
+
+        Returns:
+            设备序列号，没有对应设备时返回None
+        """
+        with self._lock:
+            if hwnd in self._serials:
+                serial = self._serials[hwnd]
+                if serial is not None or hwnd in self._assigned or \
+                        time.time() - self._mapped_at < self.remap_interval:
+                    return serial
+        self.map_devices()
+        with self._lock:
+            return self._serials.setdefault(hwnd, None)
+
+    def map_devices(self) -> Dict[int, str]:
+        """
+        重新建立窗口与设备的对应关系，手动指定的对应保留
+
+        Returns:
+            窗口句柄 -> 设备序列号（手动指定的对应见assign）
+        """
+        from ..window_registry import get_window_registry
+
+        try:
+            online = sorted((serial for serial, state in self.client.devices() if state == 'device'),
+                            key=_natural_key)
+        except (OSError, AdbError) as e:
+            print(f"无法连接adb server: {e}")
+            online = []
+
+        registry = get_window_registry()
+        windows = sorted(((hwnd, title) for hwnd, title in self.inner.enum_windows() if registry.matches(title)),
+                         key=lambda item: _natural_key(item[1]))
+        with self._lock:
+            mapping = {hwnd: serial for hwnd, serial in self._assigned.items() if serial is not None}
+            for hwnd, title in windows:
+                if hwnd in mapping or hwnd in self._assigned:
+                    continue
+                serial = next((s for keyword, s in self.devices.items() if keyword in title), None)
+                if serial in online:
+                    mapping[hwnd] = serial
+
+            free_windows = [hwnd for hwnd, _ in windows if hwnd not in mapping and hwnd not in self._assigned]
+            free_serials = [serial for serial in online if serial not in mapping.values()]
+
+        # 比较画面需要截图，不持锁
+        if free_windows and free_serials:
+            if self.verify_pairing:
+                paired = self._pair_by_frames(free_windows, free_serials)
+            elif len(free_windows) == len(free_serials):
+                paired = dict(zip(free_windows, free_serials))
+            else:
+                paired = {}
+            if len(paired) < min(len(free_windows), len(free_serials)):
+                print(f"有{len(free_windows) - len(paired)}个窗口、{len(free_serials) - len(paired)}个设备"
+                      f"无法自动对应，请在 ADB_SETTINGS['devices'] 中配置")
+        else:
+            paired = {}
+
+        with self._lock:
+            for hwnd, serial in paired.items():
+                if hwnd not in self._assigned and serial not in mapping.values():
+                    mapping[hwnd] = serial
+            self._serials = {hwnd: mapping.get(hwnd) for hwnd, _ in windows}
+            self._serials.update(mapping)
+            self._mapped_at = time.time()
+            return dict(mapping)
+
+    def _pair_by_frames(self, hwnds: List[int], serials: List[str]) -> Dict[int, str]:
+        """
+        比较窗口截图和设备画面的缩略图，对应互为最佳且差异明显小于次佳的窗口和设备
+
+        Returns:
+            窗口句柄 -> 设备序列号
+        """
+        import cv2
+        import numpy as np
+
+        devices = {}
+        for serial in serials:
+            try:
+                data = self.client.screencap(serial)
+                frame = decode_screencap(data)
+            except (OSError, AdbError) as e:
+                print(f"ADB截图失败 ({serial}): {e}")
+                continue
+            self._device_sizes[serial] = struct.unpack_from('<II', data)
+            devices[serial] = frame
+        windows = {}
+        for hwnd in hwnds:
+            frame = self.inner.capture_window_array(hwnd)
+            if frame is not None:
+                windows[hwnd] = frame
+
+        def thumbnail(image):
+            height, width = image.shape[:2]
+            size = (PAIRING_THUMB_WIDTH, max(1, round(PAIRING_THUMB_WIDTH * height / width)))
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            return cv2.resize(gray, size, interpolation=cv2.INTER_AREA).astype(np.float32) / 255.0
+
+        scores: Dict[Tuple[int, str], float] = {}
+        for serial, device_frame in devices.items():
+            device_thumb = thumbnail(device_frame)
+            device_size = device_frame.shape[1::-1]
+            for hwnd, window_frame in windows.items():
+                # 只比较窗口中模拟器画面所在的区域
+                left, top, width, height = content_rect(window_frame.shape[1::-1], device_size,
+                                                        self.crop, self.keep_aspect)
+                window_thumb = thumbnail(window_frame[top:top + height, left:left + width])
+                if window_thumb.shape != device_thumb.shape:
+                    window_thumb = cv2.resize(window_thumb, device_thumb.shape[::-1], interpolation=cv2.INTER_AREA)
+                scores[hwnd, serial] = float(np.abs(window_thumb - device_thumb).mean())
+
+        def best(candidates):
+            ranked = sorted(candidates)
+            second = ranked[1][0] if len(ranked) > 1 else float('inf')
+            return ranked[0], second
+
+        paired = {}
+        for hwnd in windows:
+            (score, serial), second = best([(scores[hwnd, s], s) for s in devices])
+            if score > PAIRING_MAX_DIFF or second - score < PAIRING_MARGIN:
+                continue
+            (_, back), back_second = best([(scores[h, serial], h) for h in windows])
+            if back == hwnd and back_second - score >= PAIRING_MARGIN:
+                paired[hwnd] = serial
+        return paired
+
+    # ---- 截图 ----
+
+    def _adb_capture(self, hwnd: int, pool=None):
+        """通过ADB截图，没有对应设备或截图失败时返回None"""
+        serial = self.serial_for(hwnd)
+        if serial is None:
+            return None
+        size = None
+        if self.match_client_size:
+            _, _, width, height = self.inner.get_client_rect(hwnd)
+            scale = self.inner.get_window_dpi_scale(hwnd)
+            size = (int(width * scale), int(height * scale))
+        start = time.perf_counter()
+        try:
+            data = self.client.screencap(serial)
+            frame = decode_screencap(data, pool, size, self.crop, self.keep_aspect)
+        except (OSError, AdbError) as e:
+            self.adb_failures += 1
+            print(f"ADB截图失败 ({serial}): {e}，改用窗口截图")
+            with self._lock:
+                # 设备断开，之后按remap_interval重新尝试对应
+                if hwnd not in self._assigned:
+                    self._serials[hwnd] = None
+            return None
+        self.adb_seconds += time.perf_counter() - start
+        self.adb_captures += 1
+        self._device_sizes[serial] = struct.unpack_from('<II', data)
+        return frame
+
+    def capture_window_array(self, hwnd, pool=None):
+        frame = self._adb_capture(hwnd, pool)
+        if frame is None:
+            return self.inner.capture_window_array(hwnd, pool)
+        return frame
+
+    def capture_window(self, hwnd):
+        frame = self._adb_capture(hwnd)
+        if frame is None:
+            return self.inner.capture_window(hwnd)
+        import cv2
+        from PIL import Image
+        return Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+
+    # ---- 输入 ----
+
+    def device_size(self, serial: str) -> Tuple[int, int]:
+        """设备分辨率，优先使用最近一次截图的尺寸，没有截图时查询 wm size"""
+        size = self._device_sizes.get(serial)
+        if size is None:
+            output = self.client.shell(serial, "wm size")
+            match = re.findall(r'(\d+)x(\d+)', output)
+            if not match:
+                raise AdbError(f"无法获取设备分辨率: {output.strip()}")
+            # 有 Override size 时以最后一行为准
+            size = tuple(int(v) for v in match[-1])
+            self._device_sizes[serial] = size
+        return size
+
+    def input_for(self, hwnd):
+        """
+        获取窗口对应设备的输入通道
+
+        Args:
+            hwnd: 窗口句柄
+
+        Returns:
+            AdbInput，坐标为截图的图像坐标；窗口没有对应设备时返回None
+        """
+        from .adb_input import AdbInput, AdbShellPool
+
+        serial = self.serial_for(hwnd)
+        if serial is None:
+            return None
+        with self._lock:
+            if self._input_pool is None:
+                self._input_pool = AdbShellPool(self.client, self.input_sessions, self.ack_timeout)
+        scale = (1.0, 1.0)
+        offset = (0, 0)
+        if self.match_client_size:
+            try:
+                device_w, device_h = self.device_size(serial)
+            except (OSError, AdbError) as e:
+                print(f"ADB输入不可用 ({serial}): {e}")
+                return None
+            _, _, width, height = self.inner.get_client_rect(hwnd)
+            dpi = self.inner.get_window_dpi_scale(hwnd)
+            # 与截图相同的画面位置，图像坐标先减去画面在客户区中的偏移
+            left, top, fit_w, fit_h = content_rect((int(width * dpi), int(height * dpi)), (device_w, device_h),
+                                                   self.crop, self.keep_aspect)
+            scale = (device_w / fit_w, device_h / fit_h)
+            offset = (left, top)
+        return AdbInput(self._input_pool, serial, scale, offset)
+
+    def close(self):
+        """关闭输入会话"""
+        if self._input_pool is not None:
+            self._input_pool.close()
+
+    def stats(self) -> Dict[str, float]:
+        """ADB截图次数、失败次数和平均耗时"""
+        return {
+            'adb_captures': self.adb_captures,
+            'adb_failures': self.adb_failures,
+            'adb_mean_ms': round(self.adb_seconds * 1000 / self.adb_captures, 2) if self.adb_captures else 0.0,
+            'devices': {hwnd: serial for hwnd, serial in self._serials.items() if serial is not None},
+            'input': self._input_pool.stats() if self._input_pool is not None else {},
+        }
+
+    # ---- 其余操作由被包装的后端完成 ----
+
+    def enum_windows(self):
+        return self.inner.enum_windows()
+
+    def is_window(self, hwnd):
+        return self.inner.is_window(hwnd)
+
+    def get_window_text(self, hwnd):
+        return self.inner.get_window_text(hwnd)
+
+    def get_window_dpi_scale(self, hwnd):
+        return self.inner.get_window_dpi_scale(hwnd)
+
+    def capture_screen(self, rect, pool=None):
+        return self.inner.capture_screen(rect, pool)
+
+    def window_at(self, screen_x, screen_y):
+        return self.inner.window_at(screen_x, screen_y)
+
+    def capture_window_alternative(self, hwnd):
+        return self.capture_window(hwnd)
+
+    def release_capture_sessions(self, hwnd=None):
+        self.inner.release_capture_sessions(hwnd)
+
+    def get_window_rect(self, hwnd):
+        return self.inner.get_window_rect(hwnd)
+
+    def get_client_rect(self, hwnd):
+        return self.inner.get_client_rect(hwnd)
+
+    def client_to_screen(self, hwnd, point):
+        return self.inner.client_to_screen(hwnd, point)
+
+    def get_cursor_pos(self):
+        return self.inner.get_cursor_pos()
+
+    def set_cursor_pos(self, pos):
+        self.inner.set_cursor_pos(pos)
+
+    def mouse_down(self, button='left'):
+        self.inner.mouse_down(button)
+
+    def mouse_up(self, button='left'):
+        self.inner.mouse_up(button)
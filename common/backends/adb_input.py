@@ -0,0 +1,350 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+ADB输入
+通过常驻的 adb shell 会话向模拟器发送点击、长按和滑动，不移动系统鼠标，多个窗口可以同时操作；
+会话按设备放在连接池中复用，排队的手势合并为一次写入，长按在设备端后台执行不阻塞调用方；
+每个手势后附带一条echo回执命令，设备执行完手势才输出回执，Gesture.wait()等待回执而不是按写入时间估算
+"""
+
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .adb_backend import AdbClient, AdbError
+
+# 回执输出 JLTXACK:<序号>；命令中写作 JLTX""ACK，终端回显的命令行不会被当成回执
+ACK_PATTERN = re.compile(rb"JLTXACK:(\d+)\s")
+# 未读完的一行最多保留的字节数，回执行很短，更长的输出只需要保留行尾
+ACK_TAIL_BYTES = 64
+
+
+def ack_command(marker: int) -> str:
+    """输出回执marker的shell命令"""
+    return f'echo JLTX""ACK:{marker}'
+
+
+class AdbShellSession:
+    """
+    常驻的交互式 adb shell 会话
+    写入的每一行作为一条shell命令执行，输出由后台线程读出，其中的回执交给on_ack，其余丢弃
+    """
+
+    def __init__(self, client: AdbClient, serial: str, on_ack: Callable[[List[int]], None] = None):
+        """
+        打开shell会话
+
+        Args:
+            client: adb客户端
+            serial: 设备序列号
+            on_ack: 收到回执时调用，参数为回执序号
+        """
+        self.serial = serial
+        self.on_ack = on_ack
+        self._sock = client._open(serial, "shell:")
+        # 阻塞写入，读取由后台线程完成
+        self._sock.settimeout(None)
+        self.closed = False
+        self._reader = threading.Thread(target=self._drain, name=f"adb-shell-{serial}", daemon=True)
+        self._reader.start()
+
+    def _drain(self):
+        pending = b""
+        try:
+            while True:
+                chunk = self._sock.recv(65536)
+                if not chunk:
+                    break
+                # 只在完整的行中查找回执，避免把被拆开的序号当成另一个回执
+                lines, _, pending = (pending + chunk).rpartition(b"\n")
+                pending = pending[-ACK_TAIL_BYTES:]
+                markers = [int(marker) for marker in ACK_PATTERN.findall(lines + b"\n")]
+                if markers and self.on_ack is not None:
+                    self.on_ack(markers)
+        except OSError:
+            pass
+        self.closed = True
+
+    def write(self, commands: List[str]):
+        """
+        在一次写入中发送多条命令
+
+        Args:
+            commands: shell命令
+        """
+        if self.closed:
+            raise AdbError(f"shell会话已断开: {self.serial}")
+        self._sock.sendall(("".join(command + "\n" for command in commands)).encode('utf-8'))
+
+    def close(self):
+        self.closed = True
+        try:
+            self._sock.close()
+        except OSError:
+            pass
+
+
+class AdbShellPool:
+    """
+    adb shell 会话池
+    每个设备最多保持max_sessions个会话，空闲会话被后续命令复用，断开的会话自动重连一次
+    """
+
+    def __init__(self, client: AdbClient, max_sessions: int = 2, ack_timeout: float = 2.0):
+        """
+        初始化会话池
+
+        Args:
+            client: adb客户端
+            max_sessions: 每个设备的最大会话数
+            ack_timeout: 手势时长之外等待回执的时间（秒），覆盖命令传输和设备执行input的延迟
+        """
+        self.client = client
+        self.max_sessions = max_sessions
+        self.ack_timeout = ack_timeout
+        # 回执序号 -> 收到回执时设置的事件
+        self._acks: Dict[int, threading.Event] = {}
+        self._next_ack = 0
+        self._ack_lock = threading.Lock()
+        self._idle: Dict[str, List[AdbShellSession]] = {}
+        self._open_count: Dict[str, int] = {}
+        self._condition = threading.Condition()
+        self.writes = 0
+        self.commands = 0
+        self.sessions_opened = 0
+        self.reconnects = 0
+
+    def _acquire(self, serial: str) -> AdbShellSession:
+        with self._condition:
+            while True:
+                idle = self._idle.setdefault(serial, [])
+                while idle:
+                    session = idle.pop()
+                    if not session.closed:
+                        return session
+                    self._open_count[serial] -= 1
+                if self._open_count.get(serial, 0) < self.max_sessions:
+                    self._open_count[serial] = self._open_count.get(serial, 0) + 1
+                    break
+                self._condition.wait()
+        try:
+            session = AdbShellSession(self.client, serial, self._acknowledge)
+        except BaseException:
+            self._discard(serial)
+            raise
+        self.sessions_opened += 1
+        return session
+
+    def _release(self, session: AdbShellSession):
+        with self._condition:
+            self._idle.setdefault(session.serial, []).append(session)
+            self._condition.notify()
+
+    def _discard(self, serial: str):
+        with self._condition:
+            self._open_count[serial] -= 1
+            self._condition.notify()
+
+    def new_ack(self) -> Tuple[int, threading.Event]:
+        """
+        分配一个回执序号
+
+        Returns:
+            (序号, 收到回执时设置的事件)
+        """
+        with self._ack_lock:
+            self._next_ack += 1
+            event = threading.Event()
+            self._acks[self._next_ack] = event
+            return self._next_ack, event
+
+    def _acknowledge(self, markers: List[int]):
+        with self._ack_lock:
+            events = [self._acks.pop(marker, None) for marker in markers]
+        for event in events:
+            if event is not None:
+                event.set()
+
+    def send(self, serial: str, commands: List[str]):
+        """
+        在设备的一个空闲会话上一次写入多条命令，会话断开时重连后重试一次
+
+        Args:
+            serial: 设备序列号
+            commands: shell命令
+        """
+        if not commands:
+            return
+        for attempt in range(2):
+            session = self._acquire(serial)
+            try:
+                session.write(commands)
+            except (OSError, AdbError):
+                session.close()
+                self._discard(serial)
+                if attempt:
+                    raise
+                self.reconnects += 1
+                continue
+            self._release(session)
+            self.writes += 1
+            self.commands += len(commands)
+            return
+
+    def close(self):
+        """关闭所有空闲会话"""
+        with self._condition:
+            for serial, sessions in self._idle.items():
+                for session in sessions:
+                    session.close()
+                self._open_count[serial] -= len(sessions)
+                sessions.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'writes': self.writes,
+            'commands': self.commands,
+            'sessions_opened': self.sessions_opened,
+            'reconnects': self.reconnects,
+        }
+
+
+class Gesture:
+    """已发送的手势，wait()等待执行完毕"""
+
+    def __init__(self, duration: float, thread: Optional[threading.Thread] = None,
+                 ack: Optional[threading.Event] = None, ack_timeout: float = 0.0):
+        """
+        Args:
+            duration: 手势持续时间（秒）
+            thread: 在本机执行手势的线程（例如用鼠标模拟的长按），wait()时等待线程结束
+            ack: 设备执行完手势时设置的回执事件，wait()时等待回执
+            ack_timeout: 手势时长之外等待回执的时间（秒）
+        """
+        self.duration = duration
+        self.done_at = time.time() + duration
+        self.thread = thread
+        self.ack = ack
+        self.ack_timeout = ack_timeout
+
+    @property
+    def done(self) -> bool:
+        if self.thread is not None:
+            return not self.thread.is_alive()
+        if self.ack is not None:
+            return self.ack.is_set()
+        return time.time() >= self.done_at
+
+    def wait(self) -> bool:
+        """
+        等待手势执行完毕
+
+        Returns:
+            是否确认执行完毕；回执超时（会话断开或设备无响应）时返回False
+        """
+        if self.thread is not None:
+            self.thread.join()
+            return True
+        remaining = self.done_at - time.time()
+        if self.ack is not None:
+            if self.ack.wait(max(remaining, 0.0) + self.ack_timeout):
+                return True
+            print(f"ADB手势（{self.duration:.1f}秒）在{self.ack_timeout:.1f}秒的额外等待内没有收到执行回执")
+            return False
+        if remaining > 0:
+            time.sleep(remaining)
+        return True
+
+
+class AdbInput:
+    """
+    绑定到一个设备的输入通道
+    坐标使用识别结果的图像坐标，按scale换算为设备坐标；batch()期间的手势合并为一次写入
+    """
+
+    def __init__(self, pool: AdbShellPool, serial: str, scale: Tuple[float, float] = (1.0, 1.0),
+                 offset: Tuple[float, float] = (0, 0)):
+        """
+        初始化输入通道
+
+        Args:
+            pool: shell会话池
+            serial: 设备序列号
+            scale: 设备分辨率与截图中设备画面尺寸之比 (x, y)
+            offset: 设备画面在截图中的左上角 (x, y)
+        """
+        self.pool = pool
+        self.serial = serial
+        self.scale = scale
+        self.offset = offset
+        self._queue: Optional[List[str]] = None
+
+    def to_device(self, x: float, y: float) -> Tuple[int, int]:
+        """图像坐标换算为设备坐标"""
+        return (int(round((x - self.offset[0]) * self.scale[0])),
+                int(round((y - self.offset[1]) * self.scale[1])))
+
+    def _send(self, command: str):
+        if self._queue is not None:
+            self._queue.append(command)
+        else:
+            self.pool.send(self.serial, [command])
+
+    @contextmanager
+    def batch(self):
+        """期间发送的手势排队，退出时一次写入；手势在退出后才发送，wait()应在退出后调用"""
+        outer = self._queue
+        self._queue = [] if outer is None else outer
+        try:
+            yield self
+        finally:
+            if outer is None:
+                queued, self._queue = self._queue, None
+                self.pool.send(self.serial, queued)
+
+    def _gesture(self, command: str, duration: float, background: bool = False) -> Gesture:
+        """发送手势命令和回执命令，后台执行时回执在手势结束后输出"""
+        marker, ack = self.pool.new_ack()
+        if background:
+            self._send(f"({command}; {ack_command(marker)}) &")
+        else:
+            self._send(f"{command}; {ack_command(marker)}")
+        return Gesture(duration, ack=ack, ack_timeout=self.pool.ack_timeout)
+
+    def tap(self, x: float, y: float) -> Gesture:
+        """
+        点击图像坐标
+
+        Returns:
+            手势，wait()等待设备执行完点击
+        """
+        device_x, device_y = self.to_device(x, y)
+        return self._gesture(f"input tap {device_x} {device_y}", 0.0)
+
+    def swipe(self, x1: float, y1: float, x2: float, y2: float, duration: float = 0.3) -> Gesture:
+        """
+        从(x1, y1)滑动到(x2, y2)，在设备端后台执行
+
+        Args:
+            x1, y1: 起点图像坐标
+            x2, y2: 终点图像坐标
+            duration: 滑动时长（秒）
+
+        Returns:
+            手势，wait()等待滑动结束
+        """
+        start_x, start_y = self.to_device(x1, y1)
+        end_x, end_y = self.to_device(x2, y2)
+        return self._gesture(f"input swipe {start_x} {start_y} {end_x} {end_y} {int(duration * 1000)}",
+                             duration, background=True)
+
+    def long_press(self, x: float, y: float, duration: float) -> Gesture:
+        """
+        在图像坐标处按住duration秒，不阻塞调用方
+
+        Returns:
+            手势，wait()等待松开
+        """
+        return self.swipe(x, y, x, y, duration)
@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+窗口后端基类
+定义窗口枚举、截图和鼠标输入的统一接口，真实Windows环境与模拟环境分别实现
+"""
+
+from typing import List, Tuple
+
+
+def pil_to_bgr(image, pool=None):
+    """
+    将PIL RGB图像转换为BGR数组
+
+    Args:
+        image: PIL Image，为None时返回None
+        pool: 缓冲池，不为None时输出写入池中的缓冲区
+
+    Returns:
+        BGR数组或None
+    """
+    if image is None:
+        return None
+    import cv2
+    import numpy as np
+
+    rgb = np.asarray(image.convert('RGB'))
+    out = pool.acquire(rgb.shape) if pool is not None else None
+    return cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR, dst=out)
+
+
+def clip_region(region: Tuple[int, int, int, int], width: int, height: int):
+    """
+    将区域裁剪到图像范围内
+
+    Args:
+        region: (left, top, right, bottom)，图像像素坐标
+        width: 图像宽度
+        height: 图像高度
+
+    Returns:
+        裁剪后的区域，与图像没有交集时返回None
+    """
+    left, top, right, bottom = (int(v) for v in region)
+    left, top = max(left, 0), max(top, 0)
+    right, bottom = min(right, width), min(bottom, height)
+    if right <= left or bottom <= top:
+        return None
+    return left, top, right, bottom
+
+
+def copy_region(frame, region: Tuple[int, int, int, int], pool=None):
+    """
+    把画面中的区域复制到独立的（池中的）缓冲区
+
+    Args:
+        frame: BGR数组
+        region: (left, top, right, bottom)
+        pool: 缓冲池
+
+    Returns:
+        区域BGR数组，区域与画面没有交集时返回None
+    """
+    import numpy as np
+
+    region = clip_region(region, frame.shape[1], frame.shape[0])
+    if region is None:
+        return None
+    left, top, right, bottom = region
+    view = frame[top:bottom, left:right]
+    out = pool.acquire(view.shape, view.dtype) if pool is not None else np.empty_like(view)
+    np.copyto(out, view)
+    return out
+
+
+class BackendBase:
+    """窗口后端基类，所有后端都应该继承这个类"""
+
+    name = "base"
+
+    # 是否在多次截图之间保持截图会话（设备上下文、位图等），常驻进程可开启
+    keep_capture_sessions = False
+
+    def enum_windows(self) -> List[Tuple[int, str]]:
+        """枚举所有带标题的顶层窗口，返回 [(hwnd, title), ...]"""
+        raise NotImplementedError("子类必须实现enum_windows方法")
+
+    def is_window(self, hwnd: int) -> bool:
+        """窗口句柄是否仍然有效，默认重新枚举窗口判断，后端应提供更轻量的实现"""
+        return any(handle == hwnd for handle, _ in self.enum_windows())
+
+    def get_window_text(self, hwnd: int) -> str:
+        """获取窗口标题，窗口不存在时返回空字符串"""
+        return next((title for handle, title in self.enum_windows() if handle == hwnd), "")
+
+    def get_window_dpi_scale(self, hwnd: int) -> float:
+        """获取窗口的DPI缩放比例"""
+        raise NotImplementedError("子类必须实现get_window_dpi_scale方法")
+
+    def capture_window(self, hwnd: int):
+        """截取窗口客户区图像，返回PIL Image，失败返回None"""
+        raise NotImplementedError("子类必须实现capture_window方法")
+
+    def capture_window_array(self, hwnd: int, pool=None):
+        """
+        截取窗口客户区图像为BGR数组
+
+        Args:
+            hwnd: 窗口句柄
+            pool: 缓冲池（common.buffer_pool.BufferPool），不为None时从池中取输出缓冲区，
+                  调用方用完后应归还
+
+        Returns:
+            BGR数组，失败返回None
+        """
+        return pil_to_bgr(self.capture_window(hwnd), pool)
+
+    def capture_region(self, hwnd: int, region: Tuple[int, int, int, int], pool=None):
+        """
+        只截取客户区中的一个矩形区域为BGR数组，用于高频轮询小范围画面
+
+        Args:
+            hwnd: 窗口句柄
+            region: (left, top, right, bottom)，与capture_window_array结果相同的图像像素坐标，
+                    超出客户区的部分会被裁掉
+            pool: 缓冲池，不为None时从池中取输出缓冲区，调用方用完后应归还
+
+        Returns:
+            区域BGR数组，失败或区域与客户区没有交集时返回None
+        """
+        # 默认实现截取整个客户区后复制区域，后端应尽量只复制区域内的像素
+        frame = self.capture_window_array(hwnd, pool)
+        if frame is None:
+            return None
+        try:
+            return copy_region(frame, region, pool)
+        finally:
+            if pool is not None:
+                pool.release(frame)
+
+    def capture_screen(self, rect: Tuple[int, int, int, int], pool=None):
+        """
+        截取屏幕上的矩形区域为BGR数组，用于一次截取多个平铺的窗口
+
+        Args:
+            rect: (left, top, right, bottom)，屏幕坐标
+            pool: 缓冲池，不为None时从池中取输出缓冲区，调用方用完后应归还
+
+        Returns:
+            BGR数组，后端不支持或截取失败时返回None，调用方应退回逐窗口截图
+        """
+        return None
+
+    def window_at(self, screen_x: int, screen_y: int):
+        """返回屏幕坐标处最上层的顶层窗口句柄，后端不支持或没有窗口时返回None"""
+        return None
+
+    def input_for(self, hwnd: int):
+        """
+        获取直接向窗口发送点击的输入通道（例如 adb_input.AdbInput），坐标为截图的图像坐标
+
+        Returns:
+            输入通道，后端不支持时返回None，调用方应使用鼠标操作
+        """
+        return None
+
+    def capture_window_alternative(self, hwnd: int):
+        """替代截图方法，默认与capture_window相同"""
+        return self.capture_window(hwnd)
+
+    def release_capture_sessions(self, hwnd: int = None):
+        """释放保持的截图会话，hwnd为None时释放全部"""
+        pass
+
+    def get_window_rect(self, hwnd: int) -> Tuple[int, int, int, int]:
+        """获取窗口完整矩形（屏幕坐标）"""
+        raise NotImplementedError("子类必须实现get_window_rect方法")
+
+    def get_client_rect(self, hwnd: int) -> Tuple[int, int, int, int]:
+        """获取客户区矩形（客户区坐标）"""
+        raise NotImplementedError("子类必须实现get_client_rect方法")
+
+    def client_to_screen(self, hwnd: int, point: Tuple[int, int]) -> Tuple[int, int]:
+        """将客户区坐标转换为屏幕坐标"""
+        raise NotImplementedError("子类必须实现client_to_screen方法")
+
+    def get_cursor_pos(self) -> Tuple[int, int]:
+        """获取鼠标当前屏幕坐标"""
+        raise NotImplementedError("子类必须实现get_cursor_pos方法")
+
+    def set_cursor_pos(self, pos: Tuple[int, int]):
+        """移动鼠标到屏幕坐标"""
+        raise NotImplementedError("子类必须实现set_cursor_pos方法")
+
+    def mouse_down(self, button: str = 'left'):
+        """按下鼠标按钮 ('left', 'right', 'middle')"""
+        raise NotImplementedError("子类必须实现mouse_down方法")
+
+    def mouse_up(self, button: str = 'left'):
+        """松开鼠标按钮 ('left', 'right', 'middle')"""
+        raise NotImplementedError("子类必须实现mouse_up方法")
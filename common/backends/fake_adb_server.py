@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+模拟adb server
+实现adb server协议中截图和执行命令用到的部分（host:version、host:devices、host:transport、
+exec:screencap、shell:命令和交互式shell），用预先准备的画面模拟设备屏幕，记录收到的所有命令，
+用于在没有模拟器的环境中运行ADB后端和基准测试
+"""
+
+import socketserver
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from .fake_backend import FakeWindow, FrameSource
+
+
+class _FakeAdbHandler(socketserver.BaseRequestHandler):
+
+    def _read_request(self) -> str:
+        header = self._recv_exact(4)
+        if not header:
+            return ""
+        return self._recv_exact(int(header, 16)).decode('utf-8')
+
+    def _recv_exact(self, size: int) -> bytes:
+        data = b""
+        while len(data) < size:
+            chunk = self.request.recv(size - len(data))
+            if not chunk:
+                return b""
+            data += chunk
+        return data
+
+    def _okay(self, message: str = None):
+        reply = b"OKAY"
+        if message is not None:
+            payload = message.encode('utf-8')
+            reply += b"%04x" % len(payload) + payload
+        self.request.sendall(reply)
+
+    def _fail(self, message: str):
+        payload = message.encode('utf-8')
+        self.request.sendall(b"FAIL" + b"%04x" % len(payload) + payload)
+
+    def handle(self):
+        server: FakeAdbServer = self.server.owner
+        request = self._read_request()
+        if request == "host:version":
+            self._okay("0029")
+        elif request == "host:devices":
+            self._okay("".join(f"{serial}\tdevice\n" for serial in server.devices))
+        elif request.startswith("host:transport:"):
+            serial = request[len("host:transport:"):]
+            if serial not in server.devices:
+                self._fail(f"device '{serial}' not found")
+                return
+            self._okay()
+            self._device_service(server, serial, self._read_request())
+        else:
+            self._fail(f"unknown host service: {request}")
+
+    def _device_service(self, server: 'FakeAdbServer', serial: str, service: str):
+        kind, _, command = service.partition(':')
+        if kind not in ('exec', 'shell'):
+            self._fail(f"unknown device service: {service}")
+            return
+        self._okay()
+        if kind == 'shell' and not command:
+            self._interactive_shell(server, serial)
+            return
+        server.log(serial, kind, command)
+        if kind == 'exec' and command.split()[:1] == ['screencap'] and '-p' not in command.split():
+            if server.screencap_delay:
+                time.sleep(server.screencap_delay)
+            self.request.sendall(server.screencap(serial))
+        elif command == 'wm size':
+            height, width = server.devices[serial].current_frame().shape[:2]
+            self.request.sendall(f"Physical size: {width}x{height}\n".encode('utf-8'))
+
+    def _interactive_shell(self, server: 'FakeAdbServer', serial: str):
+        """
+        交互式shell：像终端一样回显输入的行，逐行执行命令直到客户端关闭连接
+        支持 `a; b` 顺序执行、`(a; b) &` 后台执行和echo输出，input swipe 按时长等待
+        """
+        server.shell_sessions += 1
+        send_lock = threading.Lock()
+
+        def output(text: str):
+            with send_lock:
+                try:
+                    self.request.sendall(text.encode('utf-8'))
+                except OSError:
+                    pass
+
+        pending = b""
+        while True:
+            chunk = self.request.recv(65536)
+            if not chunk:
+                break
+            server.shell_writes += 1
+            pending += chunk
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                line = line.decode('utf-8').strip()
+                if not line:
+                    continue
+                output(line + "\r\n")
+                background = line.endswith('&')
+                if background:
+                    line = line[:-1].strip()
+                if line.startswith('(') and line.endswith(')'):
+                    line = line[1:-1]
+                steps = [step.strip() for step in line.split(';') if step.strip()]
+                if background:
+                    threading.Thread(target=self._run_steps, args=(server, serial, steps, output),
+                                     daemon=True).start()
+                else:
+                    self._run_steps(server, serial, steps, output)
+
+    @staticmethod
+    def _run_steps(server: 'FakeAdbServer', serial: str, steps: List[str], output):
+        for step in steps:
+            words = step.split()
+            if words[0] == 'echo':
+                output(" ".join(words[1:]).replace('""', '') + "\r\n")
+                continue
+            server.log(serial, 'shell', step)
+            if words[:2] == ['input', 'swipe'] and len(words) == 7:
+                time.sleep(int(words[6]) / 1000)
+
+
+class FakeAdbServer:
+    """
+    模拟adb server
+    在本机随机端口监听，每个设备按截图次数依次循环返回画面
+    """
+
+    def __init__(self, devices: Dict[str, FrameSource], host: str = '127.0.0.1', port: int = 0,
+                 header_size: int = 16, screencap_delay: float = 0.0):
+        """
+        初始化模拟adb server
+
+        Args:
+            devices: 设备序列号 -> 画面序列（BGR数组或图像路径）或按序号返回画面的函数
+            host: 监听地址
+            port: 监听端口，0表示随机端口
+            header_size: screencap输出头部长度，16为Android 9及以后，12为更早的版本
+            screencap_delay: 每次截图的模拟耗时（秒）
+        """
+        self.devices = {serial: FakeWindow(0, serial, frames) for serial, frames in devices.items()}
+        self.header_size = header_size
+        self.screencap_delay = screencap_delay
+        # 收到的设备命令: (时间, 序列号, 'exec'/'shell', 命令)
+        self.commands: List[Tuple[float, str, str, str]] = []
+        # 交互式shell的连接数和收到的写入次数，用于观察会话复用和批量写入
+        self.shell_sessions = 0
+        self.shell_writes = 0
+        self._lock = threading.Lock()
+        self._server = socketserver.ThreadingTCPServer((host, port), _FakeAdbHandler, bind_and_activate=False)
+        self._server.daemon_threads = True
+        self._server.allow_reuse_address = True
+        self._server.server_bind()
+        self._server.server_activate()
+        self._server.owner = self
+        self._thread = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._server.server_address[:2]
+
+    def start(self) -> 'FakeAdbServer':
+        """在后台线程中开始服务"""
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-adb-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def log(self, serial: str, kind: str, command: str):
+        with self._lock:
+            self.commands.append((time.time(), serial, kind, command))
+
+    def screencap(self, serial: str) -> bytes:
+        """生成 screencap 原始输出（RGBA_8888）"""
+        import cv2
+        import numpy as np
+
+        with self._lock:
+            frame = self.devices[serial].next_frame()
+        rgba = cv2.cvtColor(frame, cv2.COLOR_BGR2RGBA)
+        height, width = rgba.shape[:2]
+        header = np.array([width, height, 1, 0][:self.header_size // 4], dtype='<u4').tobytes()
+        return header + rgba.tobytes()
+
+    def commands_for(self, serial: str, kind: str = None) -> List[str]:
+        """某个设备收到的命令"""
+        with self._lock:
+            return [command for _, s, k, command in self.commands if s == serial and (kind is None or k == kind)]
@@ -0,0 +1,323 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+模拟窗口后端
+不依赖pywin32，用预先准备的画面模拟模拟器窗口，记录所有鼠标操作，
+用于在Linux上运行基准测试和回放；截图会话按Win32后端的方式计数GDI对象，用于长时间运行的泄漏检测
+"""
+
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from .base import BackendBase, copy_region
+
+# 画面来源：BGR数组、图像路径，或者按截图序号返回画面的函数
+FrameSource = Union[Sequence, Callable[[int], object]]
+
+# Win32后端每个截图会话持有的GDI对象：窗口设备上下文、兼容设备上下文、位图
+GDI_OBJECTS_PER_SESSION = 3
+
+
+class FakeWindow:
+    """
+    模拟窗口
+    按截图次数依次循环返回画面
+    """
+
+    def __init__(self, hwnd: int, title: str, frames: FrameSource,
+                 screen_pos: Tuple[int, int] = (0, 0), dpi_scale: float = 1.0,
+                 title_bar_height: int = 30, border_width: int = 8):
+        """
+        初始化模拟窗口
+
+        Args:
+            hwnd: 模拟窗口句柄
+            title: 窗口标题
+            frames: 画面序列（BGR数组或图像路径）或按序号返回画面的函数
+            screen_pos: 客户区左上角的屏幕坐标
+            dpi_scale: DPI缩放比例
+            title_bar_height: 模拟标题栏高度
+            border_width: 模拟边框宽度
+        """
+        self.hwnd = hwnd
+        self.title = title
+        self.frames = frames
+        self.screen_pos = screen_pos
+        self.dpi_scale = dpi_scale
+        self.title_bar_height = title_bar_height
+        self.border_width = border_width
+        self.capture_count = 0
+        self._frame_cache = {}
+
+    def _load(self, frame):
+        """将图像路径解析为BGR数组"""
+        if isinstance(frame, str):
+            if frame not in self._frame_cache:
+                import cv2
+                image = cv2.imread(frame)
+                if image is None:
+                    raise FileNotFoundError(f"无法加载模拟画面: {frame}")
+                self._frame_cache[frame] = image
+            return self._frame_cache[frame]
+        return frame
+
+    def current_frame(self):
+        """当前画面（BGR数组），不推进序号"""
+        if callable(self.frames):
+            return self._load(self.frames(self.capture_count))
+        return self._load(self.frames[self.capture_count % len(self.frames)])
+
+    def next_frame(self):
+        """返回当前画面并推进序号"""
+        frame = self.current_frame()
+        self.capture_count += 1
+        return frame
+
+    @property
+    def client_size(self) -> Tuple[int, int]:
+        """客户区逻辑尺寸（未缩放）"""
+        height, width = self.current_frame().shape[:2]
+        return int(width / self.dpi_scale), int(height / self.dpi_scale)
+
+
+class FakeBackend(BackendBase):
+    """模拟窗口后端"""
+
+    name = "fake"
+
+    def __init__(self):
+        self.windows: Dict[int, FakeWindow] = {}
+        self.cursor_pos = (0, 0)
+        self.pressed_buttons = set()
+        self.events: List[Tuple[float, str, int, int, str]] = []
+        # 窗口枚举次数，用于观察窗口缓存的效果
+        self.enum_calls = 0
+        # 每次截图调用的模拟固定开销（秒），用于在基准测试中模拟GDI截图的调用成本
+        self.capture_delay = 0.0
+        # 模拟的截图会话（窗口句柄 -> 位图尺寸），与Win32后端一样尺寸不变时复用、不保持会话时每次截图后释放
+        self._sessions: Dict[int, Tuple[int, int]] = {}
+        self._region_sessions: Dict[int, Tuple[int, int]] = {}
+        self.gdi_objects = 0
+        self.gdi_created = 0
+        self.gdi_released = 0
+        self._next_hwnd = 0x10000
+        self._lock = threading.Lock()
+
+    def add_window(self, title: str, frames: FrameSource, **kwargs) -> int:
+        """
+        添加模拟窗口
+
+        Args:
+            title: 窗口标题
+            frames: 画面序列或画面函数
+            **kwargs: 传给FakeWindow的其他参数
+
+        Returns:
+            模拟窗口句柄
+        """
+        with self._lock:
+            hwnd = self._next_hwnd
+            self._next_hwnd += 0x10
+            self.windows[hwnd] = FakeWindow(hwnd, title, frames, **kwargs)
+        return hwnd
+
+    def remove_window(self, hwnd: int):
+        """移除模拟窗口（与真实窗口关闭一样，截图会话需要调用方释放）"""
+        with self._lock:
+            self.windows.pop(hwnd, None)
+
+    def _open_session(self, sessions: Dict[int, Tuple[int, int]], hwnd: int, size: Tuple[int, int]):
+        """获取截图会话，尺寸变化时重新创建"""
+        with self._lock:
+            current = sessions.get(hwnd)
+            if current == size:
+                return
+            if current is not None:
+                self.gdi_objects -= GDI_OBJECTS_PER_SESSION
+                self.gdi_released += GDI_OBJECTS_PER_SESSION
+            sessions[hwnd] = size
+            self.gdi_objects += GDI_OBJECTS_PER_SESSION
+            self.gdi_created += GDI_OBJECTS_PER_SESSION
+
+    def _end_capture(self, hwnd: int):
+        if not self.keep_capture_sessions:
+            self.release_capture_sessions(hwnd)
+
+    def release_capture_sessions(self, hwnd=None):
+        with self._lock:
+            for sessions in (self._sessions, self._region_sessions):
+                for key in (list(sessions) if hwnd is None else [hwnd]):
+                    if sessions.pop(key, None) is not None:
+                        self.gdi_objects -= GDI_OBJECTS_PER_SESSION
+                        self.gdi_released += GDI_OBJECTS_PER_SESSION
+
+    def resource_counters(self) -> Dict[str, int]:
+        """
+        模拟的资源计数，长时间运行时应保持稳定
+
+        Returns:
+            截图会话数、存活/累计创建/累计释放的GDI对象数、窗口数、已加载画面数、事件记录数
+        """
+        with self._lock:
+            return {
+                'capture_sessions': len(self._sessions) + len(self._region_sessions),
+                'gdi_objects': self.gdi_objects,
+                'gdi_created': self.gdi_created,
+                'gdi_released': self.gdi_released,
+                'windows': len(self.windows),
+                'cached_frames': sum(len(window._frame_cache) for window in self.windows.values()),
+                'events': len(self.events),
+            }
+
+    def _window(self, hwnd: int) -> FakeWindow:
+        window = self.windows.get(hwnd)
+        if window is None:
+            raise ValueError(f"无效的窗口句柄: {hwnd}")
+        return window
+
+    def enum_windows(self):
+        self.enum_calls += 1
+        return [(hwnd, window.title) for hwnd, window in list(self.windows.items())]
+
+    def is_window(self, hwnd):
+        return hwnd in self.windows
+
+    def get_window_text(self, hwnd):
+        window = self.windows.get(hwnd)
+        return window.title if window else ""
+
+    def get_window_dpi_scale(self, hwnd):
+        window = self.windows.get(hwnd)
+        return window.dpi_scale if window else 1.0
+
+    def capture_window(self, hwnd):
+        window = self.windows.get(hwnd)
+        if window is None:
+            print(f"模拟窗口不存在 (hwnd: {hwnd})")
+            return None
+
+        import cv2
+        from PIL import Image
+
+        self._capture_delay()
+        frame = window.next_frame()
+        self._open_session(self._sessions, hwnd, frame.shape[1::-1])
+        image = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        self._end_capture(hwnd)
+        return image
+
+    def _capture_delay(self):
+        if self.capture_delay > 0:
+            time.sleep(self.capture_delay)
+
+    def capture_window_array(self, hwnd, pool=None):
+        window = self.windows.get(hwnd)
+        if window is None:
+            print(f"模拟窗口不存在 (hwnd: {hwnd})")
+            return None
+
+        import numpy as np
+
+        self._capture_delay()
+        frame = window.next_frame()
+        self._open_session(self._sessions, hwnd, frame.shape[1::-1])
+        out = pool.acquire(frame.shape, frame.dtype) if pool is not None else np.empty_like(frame)
+        np.copyto(out, frame)
+        self._end_capture(hwnd)
+        return out
+
+    def capture_region(self, hwnd, region, pool=None):
+        window = self.windows.get(hwnd)
+        if window is None:
+            print(f"模拟窗口不存在 (hwnd: {hwnd})")
+            return None
+        # 只复制区域内的像素，与真实后端的区域截图一样推进画面序号
+        self._capture_delay()
+        image = copy_region(window.next_frame(), region, pool)
+        if image is not None:
+            self._open_session(self._region_sessions, hwnd, image.shape[1::-1])
+        self._end_capture(hwnd)
+        return image
+
+    def capture_screen(self, rect, pool=None):
+        """把模拟窗口的画面按屏幕位置合成为屏幕截图，先添加的窗口在上层（与window_at一致）"""
+        import numpy as np
+
+        left, top, right, bottom = (int(v) for v in rect)
+        if right <= left or bottom <= top:
+            return None
+        self._capture_delay()
+        # 句柄0为屏幕截图会话，与Win32后端一致
+        self._open_session(self._region_sessions, 0, (right - left, bottom - top))
+        shape = (bottom - top, right - left, 3)
+        out = pool.acquire(shape) if pool is not None else np.empty(shape, dtype=np.uint8)
+        out.fill(0)
+        for window in reversed(list(self.windows.values())):
+            frame = window.next_frame()
+            x, y = window.screen_pos
+            # 画面与截取区域的交集
+            x0, y0 = max(x, left), max(y, top)
+            x1, y1 = min(x + frame.shape[1], right), min(y + frame.shape[0], bottom)
+            if x1 > x0 and y1 > y0:
+                out[y0 - top:y1 - top, x0 - left:x1 - left] = frame[y0 - y:y1 - y, x0 - x:x1 - x]
+        self._end_capture(0)
+        return out
+
+    def get_window_rect(self, hwnd):
+        window = self._window(hwnd)
+        width, height = window.client_size
+        left = window.screen_pos[0] - window.border_width
+        top = window.screen_pos[1] - window.title_bar_height
+        right = window.screen_pos[0] + width + window.border_width
+        bottom = window.screen_pos[1] + height + window.border_width
+        return left, top, right, bottom
+
+    def get_client_rect(self, hwnd):
+        width, height = self._window(hwnd).client_size
+        return 0, 0, width, height
+
+    def client_to_screen(self, hwnd, point):
+        window = self._window(hwnd)
+        return window.screen_pos[0] + point[0], window.screen_pos[1] + point[1]
+
+    def get_cursor_pos(self):
+        return self.cursor_pos
+
+    def set_cursor_pos(self, pos):
+        self.cursor_pos = (int(pos[0]), int(pos[1]))
+        self._record('move')
+
+    def mouse_down(self, button='left'):
+        self.pressed_buttons.add(button)
+        self._record('down', button)
+
+    def mouse_up(self, button='left'):
+        self.pressed_buttons.discard(button)
+        self._record('up', button)
+
+    def _record(self, kind: str, button: str = ''):
+        with self._lock:
+            self.events.append((time.time(), kind, self.cursor_pos[0], self.cursor_pos[1], button))
+
+    def clicks(self) -> List[Tuple[int, int, str]]:
+        """
+        从事件记录中提取完整的点击（按下后松开）
+
+        Returns:
+            [(screen_x, screen_y, button), ...]
+        """
+        result = []
+        for _, kind, x, y, button in self.events:
+            if kind == 'up':
+                result.append((x, y, button))
+        return result
+
+    def window_at(self, screen_x: int, screen_y: int) -> Optional[int]:
+        """返回包含该屏幕坐标的模拟窗口句柄"""
+        for hwnd, window in list(self.windows.items()):
+            width, height = window.client_size
+            left, top = window.screen_pos
+            if left <= screen_x < left + width and top <= screen_y < top + height:
+                return hwnd
+        return None
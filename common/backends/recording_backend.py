@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+录制后端
+包装任意窗口后端，把截图画面、鼠标操作和输入通道（ADB）的手势写入会话录制（common.session_recording）
+"""
+
+import time
+from contextlib import contextmanager
+
+from .base import BackendBase
+
+
+class RecordingInput:
+    """
+    包装输入通道（例如 adb_input.AdbInput），手势发送后按与鼠标操作相同的格式（move/down/up）写入录制，
+    坐标换算为屏幕坐标，另外记录窗口句柄、图像坐标和来源
+    """
+
+    def __init__(self, inner, backend: "RecordingBackend", hwnd: int):
+        """
+        Args:
+            inner: 被包装的输入通道
+            backend: 录制后端，用于写入事件和换算坐标
+            hwnd: 输入通道对应的窗口句柄
+        """
+        self.inner = inner
+        self.backend = backend
+        self.hwnd = hwnd
+
+    def __getattr__(self, item):
+        return getattr(self.inner, item)
+
+    def _to_screen(self, x: float, y: float):
+        scale = self.backend.inner.get_window_dpi_scale(self.hwnd) or 1.0
+        return self.backend.inner.client_to_screen(self.hwnd, (int(x / scale), int(y / scale)))
+
+    def _event(self, kind: str, x: float, y: float, timestamp: float, **fields):
+        screen_x, screen_y = self._to_screen(x, y)
+        self.backend.writer.add_event(kind, x=int(screen_x), y=int(screen_y), image_x=int(x), image_y=int(y),
+                                      t=timestamp, hwnd=self.hwnd, source='input', **fields)
+
+    def _record(self, x1: float, y1: float, x2: float, y2: float, duration: float):
+        """手势按 move -> down -> (move) -> up 写入，松开的时间为按下时间加手势时长"""
+        timestamp = time.time()
+        self._event('move', x1, y1, timestamp)
+        self._event('down', x1, y1, timestamp, button='left')
+        if (x1, y1) != (x2, y2):
+            self._event('move', x2, y2, timestamp + duration)
+        self._event('up', x2, y2, timestamp + duration, button='left')
+
+    @contextmanager
+    def batch(self):
+        """期间发送的手势排队，退出时一次写入；排队的手势同样写入录制"""
+        with self.inner.batch():
+            yield self
+
+    def tap(self, x: float, y: float):
+        gesture = self.inner.tap(x, y)
+        self._record(x, y, x, y, 0.0)
+        return gesture
+
+    def swipe(self, x1: float, y1: float, x2: float, y2: float, duration: float = 0.3):
+        gesture = self.inner.swipe(x1, y1, x2, y2, duration)
+        self._record(x1, y1, x2, y2, duration)
+        return gesture
+
+    def long_press(self, x: float, y: float, duration: float):
+        gesture = self.inner.long_press(x, y, duration)
+        self._record(x, y, x, y, duration)
+        return gesture
+
+
+class RecordingBackend(BackendBase):
+    """录制后端，除记录外行为与被包装的后端完全相同"""
+
+    name = "recording"
+
+    def __init__(self, inner: BackendBase, writer):
+        """
+        初始化录制后端
+
+        Args:
+            inner: 被包装的后端
+            writer: 会话录制写入器（SessionWriter）
+        """
+        self.inner = inner
+        self.writer = writer
+        self._known_windows = {}
+
+    @property
+    def keep_capture_sessions(self):
+        return self.inner.keep_capture_sessions
+
+    @keep_capture_sessions.setter
+    def keep_capture_sessions(self, value):
+        self.inner.keep_capture_sessions = value
+
+    def __getattr__(self, item):
+        # 被包装后端特有的方法（例如FakeBackend.add_window）直接转发
+        return getattr(self.inner, item)
+
+    def _note_window(self, hwnd, title):
+        if self._known_windows.get(hwnd) != title:
+            self._known_windows[hwnd] = title
+            self.writer.add_event('window', hwnd=hwnd, title=title)
+
+    def enum_windows(self):
+        windows = self.inner.enum_windows()
+        for hwnd, title in windows:
+            self._note_window(hwnd, title)
+        return windows
+
+    def is_window(self, hwnd):
+        return self.inner.is_window(hwnd)
+
+    def get_window_text(self, hwnd):
+        title = self.inner.get_window_text(hwnd)
+        if title:
+            self._note_window(hwnd, title)
+        return title
+
+    def get_window_dpi_scale(self, hwnd):
+        return self.inner.get_window_dpi_scale(hwnd)
+
+    def capture_window(self, hwnd):
+        timestamp = time.time()
+        image = self.inner.capture_window(hwnd)
+        if image is not None:
+            import cv2
+            import numpy as np
+            self.writer.add_frame(hwnd, cv2.cvtColor(np.asarray(image.convert('RGB')), cv2.COLOR_RGB2BGR), timestamp)
+        return image
+
+    def capture_window_array(self, hwnd, pool=None):
+        timestamp = time.time()
+        frame = self.inner.capture_window_array(hwnd, pool)
+        if frame is not None:
+            self.writer.add_frame(hwnd, frame, timestamp)
+        return frame
+
+    def capture_region(self, hwnd, region, pool=None):
+        # 区域截图只用于高频轮询，不写入录制，避免录制中出现尺寸不一的画面
+        return self.inner.capture_region(hwnd, region, pool)
+
+    def capture_screen(self, rect, pool=None):
+        # 屏幕截图不属于某个窗口，不写入录制
+        return self.inner.capture_screen(rect, pool)
+
+    def window_at(self, screen_x, screen_y):
+        return self.inner.window_at(screen_x, screen_y)
+
+    def input_for(self, hwnd):
+        # 输入通道的手势不经过鼠标，包装后与鼠标操作一样写入录制
+        channel = self.inner.input_for(hwnd)
+        return RecordingInput(channel, self, hwnd) if channel is not None else None
+
+    def capture_window_alternative(self, hwnd):
+        return self.inner.capture_window_alternative(hwnd)
+
+    def release_capture_sessions(self, hwnd=None):
+        self.inner.release_capture_sessions(hwnd)
+
+    def get_window_rect(self, hwnd):
+        return self.inner.get_window_rect(hwnd)
+
+    def get_client_rect(self, hwnd):
+        return self.inner.get_client_rect(hwnd)
+
+    def client_to_screen(self, hwnd, point):
+        return self.inner.client_to_screen(hwnd, point)
+
+    def get_cursor_pos(self):
+        return self.inner.get_cursor_pos()
+
+    def set_cursor_pos(self, pos):
+        self.inner.set_cursor_pos(pos)
+        self.writer.add_event('move', x=int(pos[0]), y=int(pos[1]))
+
+    def mouse_down(self, button='left'):
+        self.inner.mouse_down(button)
+        x, y = self.inner.get_cursor_pos()
+        self.writer.add_event('down', x=int(x), y=int(y), button=button)
+
+    def mouse_up(self, button='left'):
+        self.inner.mouse_up(button)
+        x, y = self.inner.get_cursor_pos()
+        self.writer.add_event('up', x=int(x), y=int(y), button=button)
+
+    def close(self):
+        """结束录制"""
+        self.writer.close()
@@ -0,0 +1,507 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Windows窗口后端
+通过pywin32完成窗口枚举、GDI截图和鼠标输入
+"""
+
+import time
+from ctypes import windll
+
+import cv2
+import numpy as np
+import win32api
+import win32con
+import win32gui
+import win32ui
+from PIL import Image
+
+from .base import BackendBase, clip_region, pil_to_bgr
+
+# 鼠标按钮对应的按下/松开事件
+MOUSE_EVENTS = {
+    'left': (win32con.MOUSEEVENTF_LEFTDOWN, win32con.MOUSEEVENTF_LEFTUP),
+    'right': (win32con.MOUSEEVENTF_RIGHTDOWN, win32con.MOUSEEVENTF_RIGHTUP),
+    'middle': (win32con.MOUSEEVENTF_MIDDLEDOWN, win32con.MOUSEEVENTF_MIDDLEUP),
+}
+
+
+def enum_windows_callback(hwnd, windows):
+    window_title = win32gui.GetWindowText(hwnd)
+    if window_title:
+        windows.append((hwnd, window_title))
+
+
+class CaptureSession:
+    """
+    窗口截图会话
+    持有窗口设备上下文、兼容设备上下文和位图，尺寸不变时可跨多次截图复用
+    """
+
+    def __init__(self, hwnd, width, height, client_only=False):
+        """
+        Args:
+            hwnd: 窗口句柄
+            width: 位图宽度
+            height: 位图高度
+            client_only: 为True时使用客户区设备上下文（区域截图），否则使用整个窗口的设备上下文
+        """
+        self.hwnd = hwnd
+        self.size = (width, height)
+        self.hwnd_dc = win32gui.GetDC(hwnd) if client_only else win32gui.GetWindowDC(hwnd)
+        self.mfc_dc = win32ui.CreateDCFromHandle(self.hwnd_dc)
+        self.save_dc = self.mfc_dc.CreateCompatibleDC()
+
+        # 创建位图对象 - 使用实际尺寸
+        self.bitmap = win32ui.CreateBitmap()
+        self.bitmap.CreateCompatibleBitmap(self.mfc_dc, width, height)
+        self.save_dc.SelectObject(self.bitmap)
+
+    def release(self):
+        """释放设备上下文和位图"""
+        try:
+            win32gui.DeleteObject(self.bitmap.GetHandle())
+            self.save_dc.DeleteDC()
+            self.mfc_dc.DeleteDC()
+            win32gui.ReleaseDC(self.hwnd, self.hwnd_dc)
+        except Exception as e:
+            print(f"释放截图会话失败: {e}")
+
+
+class Win32Backend(BackendBase):
+    """Windows窗口后端"""
+
+    name = "win32"
+
+    def __init__(self):
+        # 窗口句柄 -> 截图会话
+        self._sessions = {}
+        # 窗口句柄 -> 区域截图会话（位图只有区域大小），句柄0为屏幕截图会话
+        self._region_sessions = {}
+
+    def enum_windows(self):
+        windows = []
+        win32gui.EnumWindows(enum_windows_callback, windows)
+        return windows
+
+    def is_window(self, hwnd):
+        try:
+            return bool(win32gui.IsWindow(hwnd))
+        except Exception:
+            return False
+
+    def get_window_text(self, hwnd):
+        try:
+            return win32gui.GetWindowText(hwnd)
+        except Exception:
+            return ""
+
+    def get_window_dpi_scale(self, hwnd):
+        """获取窗口的DPI缩放比例"""
+        try:
+            # 尝试使用GetDpiForWindow (Windows 10 1607+)
+            dpi = windll.user32.GetDpiForWindow(hwnd)
+            if dpi > 0:
+                return dpi / 96.0  # 96 DPI是100%缩放
+        except:
+            pass
+
+        try:
+            # 备用方法：使用GetWindowDC获取设备上下文的DPI
+            hdc = win32gui.GetWindowDC(hwnd)
+            dpi = windll.gdi32.GetDeviceCaps(hdc, 88)  # LOGPIXELSX
+            win32gui.ReleaseDC(hwnd, hdc)
+            return dpi / 96.0
+        except:
+            pass
+
+        # 如果都失败，返回1.0（无缩放）
+        return 1.0
+
+    def capture_window(self, hwnd):
+        """
+        截取窗口图像，处理DPI缩放问题
+        """
+        return self._capture(hwnd)
+
+    def capture_window_array(self, hwnd, pool=None):
+        """
+        截取窗口图像为BGR数组，位图数据直接转换到（可复用的）输出缓冲区，不经过PIL
+        """
+        return self._capture(hwnd, pool=pool, as_array=True)
+
+    def capture_region(self, hwnd, region, pool=None):
+        """
+        只截取客户区中的矩形区域：从客户区设备上下文BitBlt区域像素到区域大小的位图，
+        不激活窗口、不输出日志，适合高频轮询；窗口最小化或BitBlt失败时退回整窗截图后裁剪
+        """
+        try:
+            minimized = win32gui.IsIconic(hwnd)
+        except Exception:
+            return None
+        if minimized:
+            return super().capture_region(hwnd, region, pool)
+
+        # 区域使用图像像素坐标，与整窗截图（已按DPI缩放）的坐标一致
+        dpi_scale = self.get_window_dpi_scale(hwnd)
+        _, _, client_right, client_bottom = win32gui.GetClientRect(hwnd)
+        region = clip_region(region, int(client_right * dpi_scale), int(client_bottom * dpi_scale))
+        if region is None:
+            return None
+        left, top, right, bottom = region
+        width, height = right - left, bottom - top
+
+        image = self._blit_region(hwnd, left, top, width, height, pool)
+        if image is None:
+            print("区域BitBlt失败，改为整窗截图后裁剪")
+            return super().capture_region(hwnd, region, pool)
+        return image
+
+    def capture_screen(self, rect, pool=None):
+        """截取屏幕矩形区域：从屏幕设备上下文BitBlt到区域大小的位图，不激活任何窗口"""
+        left, top, right, bottom = (int(v) for v in rect)
+        if right <= left or bottom <= top:
+            return None
+        # 句柄0对应整个屏幕的设备上下文
+        image = self._blit_region(0, left, top, right - left, bottom - top, pool)
+        if image is None:
+            print("屏幕BitBlt失败")
+        return image
+
+    def _blit_region(self, hwnd, left, top, width, height, pool=None):
+        """从窗口客户区（hwnd为0时为屏幕）设备上下文复制矩形区域为BGR数组，失败返回None"""
+        session = self._acquire_region_session(hwnd, width, height)
+        result = windll.gdi32.BitBlt(
+            session.save_dc.GetSafeHdc(),
+            0, 0, width, height,
+            session.hwnd_dc,
+            left, top,
+            0x00CC0020  # SRCCOPY
+        )
+        if result == 0:
+            self._release_region_session(hwnd)
+            return None
+
+        bmpstr = session.bitmap.GetBitmapBits(True)
+        bgrx = np.frombuffer(bmpstr, dtype=np.uint8, count=width * height * 4).reshape(height, width, 4)
+        out = pool.acquire((height, width, 3)) if pool is not None else None
+        image = cv2.cvtColor(bgrx, cv2.COLOR_BGRA2BGR, dst=out)
+
+        if not self.keep_capture_sessions:
+            self._release_region_session(hwnd)
+        return image
+
+    def window_at(self, screen_x, screen_y):
+        try:
+            hwnd = win32gui.WindowFromPoint((int(screen_x), int(screen_y)))
+            # 取所属的顶层窗口（模拟器的画面通常是子窗口）
+            return win32gui.GetAncestor(hwnd, 2) if hwnd else None  # GA_ROOT
+        except Exception:
+            return None
+
+    def _capture(self, hwnd, pool=None, as_array=False):
+        """截图实现，as_array为True时返回BGR数组，否则返回PIL Image"""
+        print(f"开始截取窗口 (hwnd: {hwnd})")
+
+        # 先将窗口切换到前台，已在前台时跳过激活和等待
+        if self._is_foreground(hwnd):
+            print("窗口已在前台")
+        else:
+            self._bring_to_foreground(hwnd)
+
+        # 获取窗口的DPI缩放比例
+        dpi_scale = self.get_window_dpi_scale(hwnd)
+
+        # 首先尝试获取客户区尺寸
+        client_rect = win32gui.GetClientRect(hwnd)
+        left, top, right, bottom = client_rect
+        client_width = right - left
+        client_height = bottom - top
+
+        print(f"客户区尺寸: {client_width}x{client_height}")
+
+        # 如果客户区尺寸为0或太小，使用窗口完整尺寸
+        if client_width <= 0 or client_height <= 0 or client_width < 50 or client_height < 50:
+            print("客户区尺寸无效，使用窗口完整尺寸")
+            window_rect = win32gui.GetWindowRect(hwnd)
+            win_left, win_top, win_right, win_bottom = window_rect
+            width = win_right - win_left
+            height = win_bottom - win_top
+            use_window_rect = True
+        else:
+            width = client_width
+            height = client_height
+            use_window_rect = False
+
+        print(f"使用尺寸: {width}x{height}")
+
+        # 根据DPI缩放调整实际尺寸
+        actual_width = int(width * dpi_scale)
+        actual_height = int(height * dpi_scale)
+
+        print(f"DPI缩放比例: {dpi_scale:.2f}")
+        print(f"实际截图尺寸: {actual_width}x{actual_height}")
+
+        # 最终检查尺寸是否有效
+        if actual_width <= 0 or actual_height <= 0:
+            print("错误：计算出的截图尺寸无效")
+            return None
+
+        # 获取设备上下文和位图（尺寸未变时复用上一次的截图会话）
+        session = self._acquire_session(hwnd, actual_width, actual_height)
+        save_dc = session.save_dc
+        bitmap = session.bitmap
+
+        # 方法1：使用PrintWindow (推荐)
+        result = windll.user32.PrintWindow(hwnd, save_dc.GetSafeHdc(), 2)  # 使用PW_RENDERFULLCONTENT标志
+
+        if result != 1:
+            print("PrintWindow失败，尝试使用BitBlt方法")
+            # 方法2：使用BitBlt作为备用
+            if use_window_rect:
+                # 使用窗口坐标
+                window_rect = win32gui.GetWindowRect(hwnd)
+                window_left, window_top, window_right, window_bottom = window_rect
+            else:
+                # 使用客户区坐标，需要转换为屏幕坐标
+                client_point = win32gui.ClientToScreen(hwnd, (0, 0))
+                window_left, window_top = client_point
+
+            # 获取屏幕设备上下文
+            screen_dc = win32gui.GetDC(0)
+            screen_mfc_dc = win32ui.CreateDCFromHandle(screen_dc)
+
+            # 使用BitBlt复制屏幕内容
+            result = windll.gdi32.BitBlt(
+                save_dc.GetSafeHdc(),
+                0, 0, actual_width, actual_height,
+                screen_mfc_dc.GetSafeHdc(),
+                window_left, window_top,
+                0x00CC0020  # SRCCOPY
+            )
+
+            print(f"BitBlt从屏幕位置 ({window_left}, {window_top}) 复制 {actual_width}x{actual_height} 像素")
+
+            # 清理屏幕设备上下文
+            screen_mfc_dc.DeleteDC()
+            win32gui.ReleaseDC(0, screen_dc)
+
+            if result == 0:
+                print("BitBlt也失败了，尝试最后一种方法")
+                # 清理资源
+                self.release_capture_sessions(hwnd)
+
+                # 最后尝试使用alternative方法
+                image = self.capture_window_alternative(hwnd)
+                return pil_to_bgr(image, pool) if as_array else image
+
+        # 转换为 PIL 图像格式
+        bmpinfo = bitmap.GetInfo()
+        bmpstr = bitmap.GetBitmapBits(True)
+
+        print(f"位图信息: {bmpinfo['bmWidth']}x{bmpinfo['bmHeight']}")
+
+        # 检查是否有足够的图像数据
+        expected_size = bmpinfo['bmWidth'] * bmpinfo['bmHeight'] * 4  # BGRX格式，每像素4字节
+        if len(bmpstr) < expected_size:
+            print(f"图像数据不足: 期望{expected_size}字节，实际{len(bmpstr)}字节")
+            # 清理资源
+            self.release_capture_sessions(hwnd)
+            return None
+
+        if as_array:
+            # BGRX位图按行直接映射为数组，只做一次到BGR缓冲区的转换
+            bgrx = np.frombuffer(bmpstr, dtype=np.uint8, count=expected_size).reshape(
+                bmpinfo['bmHeight'], bmpinfo['bmWidth'], 4)
+            out = pool.acquire((bmpinfo['bmHeight'], bmpinfo['bmWidth'], 3)) if pool is not None else None
+            image = cv2.cvtColor(bgrx, cv2.COLOR_BGRA2BGR, dst=out)
+        else:
+            image = Image.frombuffer(
+                'RGB',
+                (bmpinfo['bmWidth'], bmpinfo['bmHeight']),
+                bmpstr, 'raw', 'BGRX', 0, 1
+            )
+
+        # 不保持会话时清理资源
+        if not self.keep_capture_sessions:
+            self.release_capture_sessions(hwnd)
+
+        print("截图完成！")
+        return image
+
+    def _is_foreground(self, hwnd):
+        """窗口是否已在前台且未最小化"""
+        try:
+            return win32gui.GetForegroundWindow() == hwnd and not win32gui.IsIconic(hwnd)
+        except Exception:
+            return False
+
+    def _bring_to_foreground(self, hwnd):
+        """将窗口切换到前台"""
+        try:
+            # 检查窗口是否最小化
+            if win32gui.IsIconic(hwnd):
+                print("窗口处于最小化状态，正在还原...")
+                win32gui.ShowWindow(hwnd, 9)  # SW_RESTORE
+                time.sleep(0.5)
+
+            # 将窗口设置为可见
+            win32gui.ShowWindow(hwnd, 5)  # SW_SHOW
+            time.sleep(0.5)
+
+            # 尝试多种方法激活窗口
+            activation_success = False
+
+            # 方法1: 直接使用SetForegroundWindow
+            try:
+                result = win32gui.SetForegroundWindow(hwnd)
+                if result != 0:
+                    activation_success = True
+                    print("方法1: SetForegroundWindow成功")
+            except Exception as e:
+                print(f"方法1: SetForegroundWindow失败: {e}")
+
+            # 方法2: 如果方法1失败，尝试使用BringWindowToTop
+            if not activation_success:
+                try:
+                    win32gui.BringWindowToTop(hwnd)
+                    activation_success = True
+                    print("方法2: BringWindowToTop成功")
+                except Exception as e:
+                    print(f"方法2: BringWindowToTop失败: {e}")
+
+            # 方法3: 最后尝试SetActiveWindow
+            if not activation_success:
+                try:
+                    win32gui.SetActiveWindow(hwnd)
+                    activation_success = True
+                    print("方法3: SetActiveWindow成功")
+                except Exception as e:
+                    print(f"方法3: SetActiveWindow失败: {e}")
+
+            if activation_success:
+                print("窗口已成功激活")
+            else:
+                print("窗口激活失败，但将继续尝试截图")
+
+            # 等待一下让窗口完全切换到前台
+            time.sleep(0.5)
+
+        except Exception as e:
+            print(f"窗口激活过程中出现异常: {e}")
+            print("将继续尝试截图...")
+
+    def _acquire_session(self, hwnd, width, height):
+        """获取窗口的截图会话，尺寸变化时重新创建"""
+        session = self._sessions.get(hwnd)
+        if session is not None and session.size != (width, height):
+            self.release_capture_sessions(hwnd)
+            session = None
+        if session is None:
+            session = CaptureSession(hwnd, width, height)
+            self._sessions[hwnd] = session
+        return session
+
+    def _acquire_region_session(self, hwnd, width, height):
+        """获取窗口的区域截图会话，区域尺寸变化时重新创建"""
+        session = self._region_sessions.get(hwnd)
+        if session is not None and session.size != (width, height):
+            self._release_region_session(hwnd)
+            session = None
+        if session is None:
+            session = CaptureSession(hwnd, width, height, client_only=True)
+            self._region_sessions[hwnd] = session
+        return session
+
+    def _release_region_session(self, hwnd):
+        session = self._region_sessions.pop(hwnd, None)
+        if session is not None:
+            session.release()
+
+    def release_capture_sessions(self, hwnd=None):
+        """释放截图会话占用的设备上下文和位图，hwnd为None时释放全部"""
+        hwnds = list(self._sessions) if hwnd is None else [hwnd]
+        for key in hwnds:
+            session = self._sessions.pop(key, None)
+            if session is not None:
+                session.release()
+        for key in (list(self._region_sessions) if hwnd is None else [hwnd]):
+            self._release_region_session(key)
+
+    def capture_window_alternative(self, hwnd):
+        """
+        替代的窗口截图方法，使用GetWindowRect而不是GetClientRect
+        """
+        # 获取窗口的完整矩形区域（包括标题栏）
+        window_rect = win32gui.GetWindowRect(hwnd)
+        left, top, right, bottom = window_rect
+        width = right - left
+        height = bottom - top
+
+        print(f"窗口完整尺寸: {width}x{height}")
+
+        # 获取屏幕设备上下文
+        screen_dc = win32gui.GetDC(0)
+        mfc_dc = win32ui.CreateDCFromHandle(screen_dc)
+        save_dc = mfc_dc.CreateCompatibleDC()
+
+        # 创建位图对象
+        bitmap = win32ui.CreateBitmap()
+        bitmap.CreateCompatibleBitmap(mfc_dc, width, height)
+        save_dc.SelectObject(bitmap)
+
+        # 使用BitBlt从屏幕复制内容
+        result = windll.gdi32.BitBlt(
+            save_dc.GetSafeHdc(),
+            0, 0, width, height,
+            mfc_dc.GetSafeHdc(),
+            left, top,
+            0x00CC0020  # SRCCOPY
+        )
+
+        if result == 0:
+            print("截图失败")
+            # 清理资源
+            win32gui.DeleteObject(bitmap.GetHandle())
+            save_dc.DeleteDC()
+            mfc_dc.DeleteDC()
+            win32gui.ReleaseDC(0, screen_dc)
+            return None
+
+        # 转换为 PIL 图像格式
+        bmpinfo = bitmap.GetInfo()
+        bmpstr = bitmap.GetBitmapBits(True)
+        image = Image.frombuffer(
+            'RGB',
+            (bmpinfo['bmWidth'], bmpinfo['bmHeight']),
+            bmpstr, 'raw', 'BGRX', 0, 1
+        )
+
+        # 清理资源
+        win32gui.DeleteObject(bitmap.GetHandle())
+        save_dc.DeleteDC()
+        mfc_dc.DeleteDC()
+        win32gui.ReleaseDC(0, screen_dc)
+
+        return image
+
+    def get_window_rect(self, hwnd):
+        return win32gui.GetWindowRect(hwnd)
+
+    def get_client_rect(self, hwnd):
+        return win32gui.GetClientRect(hwnd)
+
+    def client_to_screen(self, hwnd, point):
+        return win32gui.ClientToScreen(hwnd, point)
+
+    def get_cursor_pos(self):
+        return win32gui.GetCursorPos()
+
+    def set_cursor_pos(self, pos):
+        win32api.SetCursorPos(pos)
+
+    def mouse_down(self, button='left'):
+        win32api.mouse_event(MOUSE_EVENTS[button][0], 0, 0, 0, 0)
+
+    def mouse_up(self, button='left'):
+        win32api.mouse_event(MOUSE_EVENTS[button][1], 0, 0, 0, 0)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+图像缓冲池
+按形状和数据类型复用截图画面与灰度图的numpy缓冲区，空闲缓冲区总大小受内存预算限制
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+BufferKey = Tuple[Tuple[int, ...], str]
+
+
+class BufferPool:
+    """
+    图像缓冲池
+    acquire取出（或新建）缓冲区，release归还；超出预算时优先丢弃最久未使用的空闲缓冲区
+    """
+
+    def __init__(self, budget_bytes: int = 64 * 1024 * 1024):
+        """
+        初始化缓冲池
+
+        Args:
+            budget_bytes: 空闲缓冲区的内存预算（字节）
+        """
+        self.budget_bytes = budget_bytes
+        self._free: "OrderedDict[BufferKey, List[np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.pooled_bytes = 0
+        self.in_use_bytes = 0
+        self.allocations = 0
+        self.reuses = 0
+        self.discards = 0
+
+    @staticmethod
+    def _key(shape, dtype) -> BufferKey:
+        return tuple(int(n) for n in shape), np.dtype(dtype).str
+
+    def acquire(self, shape, dtype=np.uint8) -> np.ndarray:
+        """
+        获取指定形状的缓冲区，内容未初始化
+
+        Args:
+            shape: 数组形状
+            dtype: 数据类型
+
+        Returns:
+            缓冲区数组
+        """
+        key = self._key(shape, dtype)
+        with self._lock:
+            buffers = self._free.get(key)
+            if buffers:
+                array = buffers.pop()
+                if not buffers:
+                    del self._free[key]
+                self.pooled_bytes -= array.nbytes
+                self.in_use_bytes += array.nbytes
+                self.reuses += 1
+                return array
+
+        array = np.empty(key[0], dtype=np.dtype(key[1]))
+        with self._lock:
+            self.in_use_bytes += array.nbytes
+            self.allocations += 1
+        return array
+
+    def release(self, array: np.ndarray):
+        """
+        归还缓冲区，归还后调用方不能再使用该数组
+
+        Args:
+            array: acquire得到的数组
+        """
+        if array is None:
+            return
+        # 只接收拥有自身内存的连续数组，视图归还会导致底层内存被意外复用
+        if array.base is not None or not array.flags['C_CONTIGUOUS']:
+            return
+
+        key = self._key(array.shape, array.dtype)
+        with self._lock:
+            self.in_use_bytes = max(0, self.in_use_bytes - array.nbytes)
+            if array.nbytes > self.budget_bytes:
+                self.discards += 1
+                return
+
+            # 超出预算时淘汰最久未使用的空闲缓冲区
+            while self.pooled_bytes + array.nbytes > self.budget_bytes and self._free:
+                old_key, buffers = next(iter(self._free.items()))
+                dropped = buffers.pop(0)
+                if not buffers:
+                    del self._free[old_key]
+                self.pooled_bytes -= dropped.nbytes
+                self.discards += 1
+
+            self._free.setdefault(key, []).append(array)
+            self._free.move_to_end(key)
+            self.pooled_bytes += array.nbytes
+
+    def clear(self):
+        """丢弃所有空闲缓冲区"""
+        with self._lock:
+            self._free.clear()
+            self.pooled_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """缓冲池统计"""
+        return {
+            'budget_bytes': self.budget_bytes,
+            'pooled_bytes': self.pooled_bytes,
+            'in_use_bytes': self.in_use_bytes,
+            'allocations': self.allocations,
+            'reuses': self.reuses,
+            'discards': self.discards,
+        }
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_buffer_pool() -> BufferPool:
+    """获取进程共享的缓冲池，预算取自 RECOGNITION_SETTINGS['buffer_pool_mb']"""
+    global _default_pool
+    if _default_pool is None:
+        with _default_pool_lock:
+            if _default_pool is None:
+                from config.settings import RECOGNITION_SETTINGS
+                budget_mb = RECOGNITION_SETTINGS.get('buffer_pool_mb', 64)
+                _default_pool = BufferPool(int(budget_mb * 1024 * 1024))
+    return _default_pool
@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+点击验证
+点击前截取被点击图标所在区域（以及按步骤配置的区域）的灰度快照，点击后只截取这些区域，
+用归一化的平均像素差判断画面是否变化；没有变化说明点击没有生效，由调用方立即重试，
+不需要重新识别整个画面或等待多秒的超时
+"""
+
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .backends import get_backend
+from .buffer_pool import get_buffer_pool
+
+Region = Tuple[int, int, int, int]
+
+
+def _verify_settings() -> dict:
+    try:
+        from config.settings import CLICK_VERIFY_SETTINGS
+        return CLICK_VERIFY_SETTINGS
+    except ImportError:
+        return {}
+
+
+def region_diff(before: np.ndarray, after: np.ndarray) -> float:
+    """
+    两幅灰度图的归一化平均绝对差
+
+    Returns:
+        0（完全相同）到 1 之间的值，尺寸不同时为1
+    """
+    if before.shape != after.shape:
+        return 1.0
+    return cv2.norm(before, after, cv2.NORM_L1) / (before.size * 255.0)
+
+
+class ClickVerifier:
+    """
+    点击验证器
+    snapshot()在点击前调用，changed()在点击后按interval轮询，直到任一区域的差异达到threshold或超时
+    """
+
+    def __init__(self, hwnd: int, threshold: Optional[float] = None, timeout: Optional[float] = None,
+                 interval: Optional[float] = None, margin: Optional[int] = None, retries: Optional[int] = None,
+                 pool=None, backend=None):
+        """
+        初始化点击验证器
+
+        Args:
+            hwnd: 窗口句柄
+            threshold: 判定为变化的归一化差异阈值，None时使用 CLICK_VERIFY_SETTINGS
+            timeout: 点击后等待画面变化的最长时间（秒）
+            interval: 点击后截取区域的间隔（秒）
+            margin: 图标区域四周扩展的像素
+            retries: 点击后画面未变化时立即重试点击的次数
+            pool: 缓冲池，默认使用全局缓冲池
+            backend: 窗口后端，默认使用当前后端
+        """
+        settings = _verify_settings()
+        self.hwnd = hwnd
+        self.threshold = settings.get('threshold', 0.02) if threshold is None else threshold
+        self.timeout = settings.get('timeout', 0.8) if timeout is None else timeout
+        self.interval = settings.get('interval', 0.03) if interval is None else interval
+        self.margin = settings.get('margin', 8) if margin is None else margin
+        self.retries = settings.get('retries', 1) if retries is None else retries
+        # 步骤未指定verify时是否验证
+        self.enabled = settings.get('enabled', False)
+        self.configured_regions: Dict[str, tuple] = settings.get('regions', {})
+        self.pool = pool if pool is not None else get_buffer_pool()
+        self.backend = backend if backend is not None else get_backend()
+
+        self.last_score = 0.0
+        self.checks = 0
+        self.compares = 0
+        self.compare_seconds = 0.0
+
+    def _client_size(self) -> Tuple[int, int]:
+        _, _, right, bottom = self.backend.get_client_rect(self.hwnd)
+        scale = self.backend.get_window_dpi_scale(self.hwnd)
+        return int(right * scale), int(bottom * scale)
+
+    def regions_for(self, icon_path: str, result: Optional[Dict], extra_region: Optional[Region] = None) -> List[Region]:
+        """
+        需要比较的区域：图标框（四周扩展margin）、CLICK_VERIFY_SETTINGS['regions']中按模板文件名配置的相对区域，
+        以及调用方指定的区域
+
+        Args:
+            icon_path: 模板路径
+            result: 图标的识别结果，为None时不包含图标框
+            extra_region: 步骤指定的区域 (left, top, right, bottom)，图像像素坐标
+
+        Returns:
+            区域列表
+        """
+        regions = []
+        if result is not None:
+            (left, top), (right, bottom) = result['top_left'], result['bottom_right']
+            regions.append((left - self.margin, top - self.margin, right + self.margin, bottom + self.margin))
+        fractions = self.configured_regions.get(os.path.basename(icon_path))
+        if fractions is not None:
+            width, height = self._client_size()
+            left, top, right, bottom = fractions
+            regions.append((int(left * width), int(top * height), int(right * width), int(bottom * height)))
+        if extra_region is not None:
+            regions.append(tuple(int(v) for v in extra_region))
+        return regions
+
+    def _capture_gray(self, region: Region, keep: bool) -> Optional[np.ndarray]:
+        frame = self.backend.capture_region(self.hwnd, region, self.pool)
+        if frame is None:
+            return None
+        try:
+            out = None if keep else self.pool.acquire(frame.shape[:2])
+            return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=out)
+        finally:
+            self.pool.release(frame)
+
+    def snapshot(self, regions: List[Region]) -> List[Tuple[Region, np.ndarray]]:
+        """
+        点击前截取各区域的灰度快照
+
+        Returns:
+            [(区域, 灰度图)]，截取失败的区域被跳过
+        """
+        shots = []
+        for region in regions:
+            gray = self._capture_gray(region, keep=True)
+            if gray is not None:
+                shots.append((region, gray))
+        return shots
+
+    def compare(self, snapshot: List[Tuple[Region, np.ndarray]]) -> float:
+        """截取一次各区域并与快照比较，返回最大的归一化差异"""
+        score = 0.0
+        for region, before in snapshot:
+            after = self._capture_gray(region, keep=False)
+            if after is None:
+                continue
+            try:
+                start = time.perf_counter()
+                score = max(score, region_diff(before, after))
+                self.compare_seconds += time.perf_counter() - start
+                self.compares += 1
+            finally:
+                self.pool.release(after)
+        self.last_score = score
+        return score
+
+    def changed(self, snapshot: List[Tuple[Region, np.ndarray]], timeout: Optional[float] = None) -> bool:
+        """
+        点击后画面是否变化：按interval截取区域比较，达到阈值立即返回True，超时返回False；
+        快照为空（无法截取区域）时视为已变化，不触发重试
+
+        Args:
+            snapshot: snapshot()的返回值
+            timeout: 等待时间（秒），None时使用配置
+        """
+        if not snapshot:
+            return True
+        self.checks += 1
+        deadline = time.time() + (self.timeout if timeout is None else timeout)
+        while True:
+            if self.compare(snapshot) >= self.threshold:
+                return True
+            if time.time() >= deadline:
+                return False
+            time.sleep(self.interval)
+
+    def stats(self) -> Dict[str, float]:
+        """验证次数、比较次数和平均每次比较的耗时（微秒）"""
+        return {
+            'checks': self.checks,
+            'compares': self.compares,
+            'compare_us': self.compare_seconds * 1e6 / max(self.compares, 1),
+            'last_score': self.last_score,
+        }
@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+紧凑描述子
+在模板集合的SIFT描述子上拟合PCA，把128维float32描述子投影到32~64维并量化为uint8；
+匹配时先用紧凑描述子为每个模板特征找出少量候选，再用完整精度的描述子复核并做ratio test
+"""
+
+import os
+import threading
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .template_manifest import DEFAULT_TEMPLATE_DIR
+
+CODEC_FILENAME = "descriptor_codec.npz"
+DEFAULT_CODEC_PATH = os.path.join(DEFAULT_TEMPLATE_DIR, CODEC_FILENAME)
+
+# 量化范围取投影值的分位数，两端少量离群值截断
+QUANTILE = 0.5
+
+
+class DescriptorCodec:
+    """
+    描述子编码器
+    encode()输出uint8紧凑描述子，场景一侧用CompactIndex做初筛
+    """
+
+    def __init__(self, mean: np.ndarray, components: np.ndarray, low: float, high: float):
+        """
+        Args:
+            mean: PCA均值 (1, 128)
+            components: PCA主成分 (dims, 128)
+            low: 量化下界
+            high: 量化上界
+        """
+        self.mean = mean.astype(np.float32)
+        self.components = components.astype(np.float32)
+        self.low = float(low)
+        self.high = float(high)
+        self._scale = 255.0 / (self.high - self.low) if self.high > self.low else 1.0
+
+    @property
+    def dims(self) -> int:
+        return self.components.shape[0]
+
+    @classmethod
+    def fit(cls, descriptors: np.ndarray, dims: int = 48) -> "DescriptorCodec":
+        """
+        在描述子集合上拟合编码器
+
+        Args:
+            descriptors: SIFT描述子 (N, 128)
+            dims: 投影维数
+
+        Returns:
+            描述子编码器
+        """
+        descriptors = np.ascontiguousarray(descriptors, dtype=np.float32)
+        mean, components = cv2.PCACompute(descriptors, None, maxComponents=dims)
+        projected = cv2.PCAProject(descriptors, mean, components)
+        low, high = np.percentile(projected, [QUANTILE, 100 - QUANTILE])
+        return cls(mean, components, low, high)
+
+    @classmethod
+    def fit_templates(cls, template_paths: List[str], dims: int = 48) -> "DescriptorCodec":
+        """
+        在模板图像的SIFT描述子上拟合编码器
+
+        Args:
+            template_paths: 模板图像路径列表
+            dims: 投影维数
+        """
+        sift = cv2.SIFT_create()
+        collected = []
+        for path in template_paths:
+            gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+            if gray is None:
+                continue
+            _, descriptors = sift.detectAndCompute(gray, None)
+            if descriptors is not None:
+                collected.append(descriptors)
+        if not collected:
+            raise ValueError("模板中没有可用的SIFT描述子")
+        return cls.fit(np.vstack(collected), dims)
+
+    def encode(self, descriptors: np.ndarray) -> np.ndarray:
+        """将完整描述子编码为uint8紧凑描述子"""
+        projected = cv2.PCAProject(np.ascontiguousarray(descriptors, dtype=np.float32), self.mean, self.components)
+        return np.clip((projected - self.low) * self._scale, 0, 255).astype(np.uint8)
+
+    def save(self, path: str):
+        np.savez(path, mean=self.mean, components=self.components, low=self.low, high=self.high)
+
+    @classmethod
+    def load(cls, path: str) -> "DescriptorCodec":
+        data = np.load(path)
+        return cls(data['mean'], data['components'], float(data['low']), float(data['high']))
+
+
+class CompactIndex:
+    """
+    场景紧凑描述子，计算距离所需的float32形式和平方范数只准备一次，多个模板共用
+    """
+
+    def __init__(self, codes: np.ndarray):
+        self.codes = codes
+        self._vectors = codes.astype(np.float32)
+        self._sq_norms = np.einsum('ij,ij->i', self._vectors, self._vectors)
+
+    def candidates(self, query_codes: np.ndarray, k: int) -> np.ndarray:
+        """
+        为每个查询描述子找出紧凑空间中最近的k个场景特征
+
+        Args:
+            query_codes: 模板紧凑描述子 (N, dims) uint8
+            k: 候选数量
+
+        Returns:
+            候选序号 (N, k)，未按距离排序
+        """
+        k = min(k, len(self.codes))
+        query = query_codes.astype(np.float32)
+        # |a-b|^2 = |a|^2 + |b|^2 - 2ab，|a|^2对同一行的排序没有影响可以省略
+        distances = self._sq_norms[None, :] - 2.0 * (query @ self._vectors.T)
+        if k >= distances.shape[1]:
+            return np.tile(np.arange(distances.shape[1]), (len(query), 1))
+        return np.argpartition(distances, k - 1, axis=1)[:, :k]
+
+
+def compact_ratio_test_matches(des1: np.ndarray, des2: np.ndarray, codes1: np.ndarray,
+                               index: CompactIndex, ratio: float = 0.7,
+                               candidates: int = 8) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    紧凑描述子初筛 + 完整描述子复核的ratio test
+
+    Args:
+        des1: 模板完整描述子
+        des2: 场景完整描述子
+        codes1: 模板紧凑描述子
+        index: 场景紧凑描述子索引
+        ratio: 最近邻与次近邻距离之比的上限
+        candidates: 每个模板特征保留的候选数量
+
+    Returns:
+        (模板特征序号数组, 场景特征序号数组)
+    """
+    empty = np.empty(0, dtype=np.int32)
+    if len(des2) < 2:
+        return empty, empty
+    candidate_idx = index.candidates(codes1, max(2, candidates))
+    # 只对候选计算完整精度的距离
+    diff = des2[candidate_idx] - des1[:, None, :]
+    exact = np.einsum('ijk,ijk->ij', diff, diff)
+    order = np.argsort(exact, axis=1)[:, :2]
+    best = np.take_along_axis(exact, order, axis=1)
+    nearest = np.take_along_axis(candidate_idx, order[:, :1], axis=1).ravel()
+    good = best[:, 0] < (ratio * ratio) * best[:, 1]
+    return np.nonzero(good)[0].astype(np.int32), nearest[good].astype(np.int32)
+
+
+_default_codec = None
+_default_codec_loaded = False
+_default_codec_lock = threading.Lock()
+
+
+def get_default_codec() -> Optional[DescriptorCodec]:
+    """加载模板目录下的描述子编码器（由 tools.template_compiler 生成），不存在时返回None"""
+    global _default_codec, _default_codec_loaded
+    if not _default_codec_loaded:
+        with _default_codec_lock:
+            if not _default_codec_loaded:
+                if os.path.exists(DEFAULT_CODEC_PATH):
+                    _default_codec = DescriptorCodec.load(DEFAULT_CODEC_PATH)
+                    print(f"已加载描述子编码器: {_default_codec.dims}维")
+                _default_codec_loaded = True
+    return _default_codec
+
@@ -5,11 +5,14 @@
 用于将相对于窗口截图的坐标转换为屏幕绝对坐标
 """
 
-import win32gui
-import win32api
-import win32con
+import threading
+import time
 from typing import Tuple, Optional
+from .backends import get_backend
+from .backends.adb_input import Gesture
+from .click_verifier import ClickVerifier
 from .gui_util import get_window_dpi_scale
+from .profiler import get_profiler
 
 class CoordinateConverter:
     """
@@ -25,22 +28,75 @@ class CoordinateConverter:
             hwnd: 窗口句柄
         """
         self.hwnd = hwnd
+        self.backend = get_backend()
         self.dpi_scale = get_window_dpi_scale(hwnd)
+        # 按置信度阈值缓存的图像查找器，跨多次任务复用
+        self._image_finders = {}
+        # 步骤统计：find_and_click_icon 的调用次数与失败步骤
+        self.step_count = 0
+        self.failed_steps = []
+        # 点击后画面未变化而立即重试的次数
+        self.click_retries = 0
+        self._verifier = None
         self._update_window_info()
     
+    def get_image_finder(self, confidence_threshold: float = 0.8):
+        """
+        获取绑定到当前窗口的图像查找器，同一阈值只创建一次
+        
+        Args:
+            confidence_threshold: 图像识别置信度阈值
+            
+        Returns:
+            ImageFinder实例
+        """
+        finder = self._image_finders.get(confidence_threshold)
+        if finder is None:
+            from .image_finder import ImageFinder
+            finder = ImageFinder(confidence_threshold=confidence_threshold, hwnd=self.hwnd)
+            self._image_finders[confidence_threshold] = finder
+        return finder
+    
+    def memo_stats(self) -> dict:
+        """汇总各图像查找器的识别结果记忆统计"""
+        totals = {'hits': 0, 'negative_hits': 0, 'misses': 0, 'evictions': 0}
+        for finder in self._image_finders.values():
+            memo = finder.recognizer.memo
+            if memo is None:
+                continue
+            stats = memo.stats()
+            for name in totals:
+                totals[name] += stats[name]
+        lookups = totals['hits'] + totals['misses']
+        totals['hit_rate'] = round(totals['hits'] / lookups, 4) if lookups else 0.0
+        return totals
+    
+    def reset_stats(self):
+        """清空步骤统计"""
+        self.step_count = 0
+        self.failed_steps = []
+        self.click_retries = 0
+    
+    @property
+    def verifier(self) -> ClickVerifier:
+        """点击验证器，第一次使用时创建"""
+        if self._verifier is None:
+            self._verifier = ClickVerifier(self.hwnd, backend=self.backend)
+        return self._verifier
+    
     def _update_window_info(self):
         """更新窗口信息"""
         try:
             # 获取窗口完整矩形区域（包括标题栏）
-            self.window_rect = win32gui.GetWindowRect(self.hwnd)
+            self.window_rect = self.backend.get_window_rect(self.hwnd)
             self.window_left, self.window_top, self.window_right, self.window_bottom = self.window_rect
             
             # 获取客户区矩形区域
-            self.client_rect = win32gui.GetClientRect(self.hwnd)
+            self.client_rect = self.backend.get_client_rect(self.hwnd)
             client_left, client_top, client_right, client_bottom = self.client_rect
             
             # 计算客户区在屏幕上的位置
-            self.client_screen_pos = win32gui.ClientToScreen(self.hwnd, (0, 0))
+            self.client_screen_pos = self.backend.client_to_screen(self.hwnd, (0, 0))
             
             # 计算客户区尺寸
             self.client_width = client_right - client_left
@@ -178,9 +234,22 @@ class CoordinateConverter:
             print(f"获取窗口中心失败: {e}")
             return 0, 0
     
+    def input_channel(self):
+        """
+        获取后端提供的输入通道（例如ADB输入），不需要移动系统鼠标，坐标直接使用图像坐标
+        
+        Returns:
+            输入通道，后端不支持时返回None
+        """
+        try:
+            return self.backend.input_for(self.hwnd)
+        except Exception as e:
+            print(f"获取输入通道失败: {e}")
+            return None
+    
     def click_at_image_coords(self, image_x: int, image_y: int, button: str = 'left') -> bool:
         """
-        在图像坐标位置执行鼠标点击
+        在图像坐标位置执行鼠标点击，后端提供输入通道时直接向窗口发送点击
         
         Args:
             image_x: 图像中的x坐标
@@ -191,6 +260,13 @@ class CoordinateConverter:
             点击是否成功
         """
         try:
+            channel = self.input_channel() if button == 'left' else None
+            if channel is not None:
+                # 与鼠标点击一样在点击执行后返回，之后的点击验证从设备执行完点击开始计时
+                acknowledged = channel.tap(image_x, image_y).wait()
+                print(f"通过输入通道在图像坐标({image_x}, {image_y})点击")
+                return acknowledged
+            
             # 转换为屏幕坐标
             screen_x, screen_y = self.image_to_screen_coords(image_x, image_y)
             
@@ -219,29 +295,23 @@ class CoordinateConverter:
         """
         try:
             # 保存当前鼠标位置
-            current_pos = win32gui.GetCursorPos()
+            current_pos = self.backend.get_cursor_pos()
+            
+            if button not in ('left', 'right', 'middle'):
+                print(f"不支持的鼠标按钮: {button}")
+                return False
             
             # 移动鼠标到目标位置
-            win32api.SetCursorPos((screen_x, screen_y))
+            self.backend.set_cursor_pos((screen_x, screen_y))
             
             # 根据按钮类型执行点击
-            if button == 'left':
-                win32api.mouse_event(win32con.MOUSEEVENTF_LEFTDOWN, 0, 0, 0, 0)
-                win32api.mouse_event(win32con.MOUSEEVENTF_LEFTUP, 0, 0, 0, 0)
-            elif button == 'right':
-                win32api.mouse_event(win32con.MOUSEEVENTF_RIGHTDOWN, 0, 0, 0, 0)
-                win32api.mouse_event(win32con.MOUSEEVENTF_RIGHTUP, 0, 0, 0, 0)
-            elif button == 'middle':
-                win32api.mouse_event(win32con.MOUSEEVENTF_MIDDLEDOWN, 0, 0, 0, 0)
-                win32api.mouse_event(win32con.MOUSEEVENTF_MIDDLEUP, 0, 0, 0, 0)
-            else:
-                print(f"不支持的鼠标按钮: {button}")
-                return False
+            self.backend.mouse_down(button)
+            self.backend.mouse_up(button)
             
             print(f"在屏幕坐标({screen_x}, {screen_y})执行{button}点击")
             
             # 可选：恢复鼠标原位置
-            # win32api.SetCursorPos(current_pos)
+            # self.backend.set_cursor_pos(current_pos)
             
             return True
             
@@ -249,11 +319,66 @@ class CoordinateConverter:
             print(f"点击失败: {e}")
             return False
 
+    def mouse_down(self, screen_x: Optional[int] = None, screen_y: Optional[int] = None,
+                   button: str = 'left'):
+        """
+        按下鼠标按钮，可先移动到指定屏幕坐标
+        
+        Args:
+            screen_x: 屏幕x坐标，为None时在当前位置按下
+            screen_y: 屏幕y坐标
+            button: 鼠标按钮 ('left', 'right', 'middle')
+        """
+        if screen_x is not None and screen_y is not None:
+            self.backend.set_cursor_pos((screen_x, screen_y))
+        self.backend.mouse_down(button)
+    
+    def mouse_up(self, button: str = 'left'):
+        """
+        松开鼠标按钮
+        
+        Args:
+            button: 鼠标按钮 ('left', 'right', 'middle')
+        """
+        self.backend.mouse_up(button)
+
+    def long_press_at_image_coords(self, image_x: int, image_y: int, duration: float):
+        """
+        在图像坐标位置长按，不阻塞调用方
+        后端提供输入通道时由设备端执行；否则用鼠标按下，duration秒后在后台线程中松开
+        
+        Args:
+            image_x: 图像中的x坐标
+            image_y: 图像中的y坐标
+            duration: 按住的时间（秒）
+            
+        Returns:
+            手势（adb_input.Gesture），wait()等待松开
+        """
+        channel = self.input_channel()
+        if channel is not None:
+            print(f"通过输入通道在图像坐标({image_x}, {image_y})长按{duration}秒")
+            return channel.long_press(image_x, image_y, duration)
+        
+        screen_x, screen_y = self.image_to_screen_coords(image_x, image_y)
+        self.mouse_down(screen_x, screen_y)
+        print(f"鼠标左键已在({screen_x}, {screen_y})按下，将保持{duration}秒...")
+        
+        def release():
+            time.sleep(duration)
+            self.mouse_up()
+            print("鼠标左键已松开")
+        
+        thread = threading.Thread(target=release, name="long-press", daemon=True)
+        thread.start()
+        return Gesture(duration, thread)
+
     def find_and_click_icon(self, icon_path: str, description: str = "图标", 
                            confidence_threshold: float = 0.8, delay: float = 0.5, 
-                           button: str = 'left') -> bool:
+                           button: str = 'left', verify: Optional[bool] = None,
+                           verify_region: Optional[Tuple[int, int, int, int]] = None) -> bool:
         """
-        完整的查找图标并点击流程：查找图标 -> 转换坐标 -> 执行点击
+        完整的查找图标并点击流程：查找图标 -> 转换坐标 -> 执行点击 -> 验证点击
         
         Args:
             icon_path: 图标文件路径
@@ -261,15 +386,46 @@ class CoordinateConverter:
             confidence_threshold: 图像识别置信度阈值
             delay: 点击前的延迟时间（秒）
             button: 鼠标按钮 ('left', 'right', 'middle')
+            verify: 点击后比较图标区域确认画面发生变化，未变化时立即重试点击；None时使用 CLICK_VERIFY_SETTINGS（默认关闭）。
+                    只应在多点一次无副作用的步骤上开启
+            verify_region: 另外比较的区域 (left, top, right, bottom)，图像像素坐标，例如点击后会弹出窗口的位置
             
         Returns:
-            是否成功找到并点击图标
+            是否成功找到并点击图标（启用验证时还要求点击后画面发生变化）
         """
+        self.step_count += 1
+        if verify is None:
+            verify = self.verifier.enabled
+        with get_profiler().step(description, self.hwnd):
+            success = self._find_and_click_icon(icon_path, description, confidence_threshold, delay, button,
+                                                verify, verify_region)
+        if not success:
+            self.failed_steps.append(description)
+            self.get_image_finder(confidence_threshold).dump_recording(f"step_failed_{description}")
+        return success
+    
+    def _verify_click(self, snapshot, target_center: Tuple[int, int], button: str, description: str) -> bool:
+        """点击后画面未变化时立即重试点击，重试后仍未变化返回False"""
+        retries = self.verifier.retries
+        for attempt in range(retries + 1):
+            if self.verifier.changed(snapshot):
+                return True
+            if attempt == retries:
+                break
+            self.click_retries += 1
+            print(f"点击{description}后画面未变化（差异{self.verifier.last_score:.4f}），立即重试点击")
+            if not self.click_at_image_coords(target_center[0], target_center[1], button):
+                return False
+        print(f"点击{description}后画面仍未变化（差异{self.verifier.last_score:.4f}）")
+        return False
+    
+    def _find_and_click_icon(self, icon_path: str, description: str, confidence_threshold: float,
+                             delay: float, button: str, verify: bool = False,
+                             verify_region: Optional[Tuple[int, int, int, int]] = None) -> bool:
+        """find_and_click_icon的实现，不含步骤统计"""
         try:
-            from .image_finder import ImageFinder
-            
-            # 创建图像查找器
-            image_finder = ImageFinder(confidence_threshold=confidence_threshold)
+            # 获取图像查找器
+            image_finder = self.get_image_finder(confidence_threshold)
             
             # 查找图标
             print(f"正在查找{description}...")
@@ -288,11 +444,18 @@ class CoordinateConverter:
                     
                     # 延迟
                     if delay > 0:
-                        import time
                         time.sleep(delay)
                     
+                    # 点击前截取图标区域（和步骤指定的区域）作为对比快照
+                    snapshot = None
+                    if verify:
+                        snapshot = self.verifier.snapshot(
+                            self.verifier.regions_for(icon_path, image_finder.last_result, verify_region))
+                    
                     # 执行点击
                     success = self.click_at_image_coords(target_center[0], target_center[1], button)
+                    if success and snapshot is not None:
+                        success = self._verify_click(snapshot, target_center, button, description)
                     if success:
                         print(f"成功点击{description}")
                         return True
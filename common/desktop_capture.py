@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+多窗口屏幕截图
+多个模拟器平铺在同一屏幕上时，每个周期只截取一次覆盖所有窗口的屏幕区域，
+再把各窗口客户区作为该截图的切片（不复制）交给调用方；
+被遮挡、互相重叠或不在屏幕截图中的窗口退回逐窗口截图
+"""
+
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .backends import get_backend
+from .buffer_pool import get_buffer_pool
+from .window_registry import get_window_registry
+
+Rect = Tuple[int, int, int, int]
+
+
+def _overlaps(a: Rect, b: Rect) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+class DesktopCapture:
+    """
+    多窗口屏幕截图
+    grab()返回的画面在下一次grab()或close()之前有效，调用方需要保留时应自行复制
+    """
+
+    def __init__(self, backend=None, pool=None, layout_ttl: float = 0.5):
+        """
+        初始化多窗口截图
+
+        Args:
+            backend: 窗口后端，默认使用当前后端
+            pool: 缓冲池，默认使用全局缓冲池
+            layout_ttl: 窗口位置和遮挡检查结果的缓存时间（秒），0表示每个周期都重新检查
+        """
+        self._backend = backend
+        self.layout_ttl = layout_ttl
+        self._layout = None
+        self.pool = pool if pool is not None else get_buffer_pool()
+        self._held: List[np.ndarray] = []
+        self._lock = threading.Lock()
+        self.ticks = 0
+        self.sliced = 0
+        self.fallbacks = 0
+        self.screen_failures = 0
+
+    @property
+    def backend(self):
+        return self._backend if self._backend is not None else get_backend()
+
+    def client_screen_rect(self, hwnd: int) -> Rect:
+        """窗口客户区在屏幕上的矩形，尺寸按DPI缩放，与逐窗口截图的画面尺寸一致"""
+        backend = self.backend
+        _, _, width, height = backend.get_client_rect(hwnd)
+        scale = backend.get_window_dpi_scale(hwnd)
+        left, top = backend.client_to_screen(hwnd, (0, 0))
+        return left, top, left + int(width * scale), top + int(height * scale)
+
+    def _visible(self, hwnd: int, rect: Rect) -> bool:
+        """客户区四角和中心都属于该窗口时视为未被遮挡"""
+        left, top, right, bottom = rect
+        points = [(left + 1, top + 1), (right - 2, top + 1), (left + 1, bottom - 2),
+                  (right - 2, bottom - 2), ((left + right) // 2, (top + bottom) // 2)]
+        backend = self.backend
+        return all(backend.window_at(x, y) == hwnd for x, y in points)
+
+    def plan(self, hwnds: Iterable[int]) -> Tuple[Dict[int, Rect], List[int]]:
+        """
+        决定每个窗口的截图方式
+
+        Args:
+            hwnds: 窗口句柄
+
+        Returns:
+            (可从屏幕截图切片的窗口 -> 客户区屏幕矩形, 需要逐窗口截图的窗口列表)
+        """
+        rects = {}
+        fallback = []
+        for hwnd in hwnds:
+            try:
+                rect = self.client_screen_rect(hwnd)
+            except Exception:
+                fallback.append(hwnd)
+                continue
+            if rect[2] <= rect[0] or rect[3] <= rect[1]:
+                fallback.append(hwnd)
+            else:
+                rects[hwnd] = rect
+
+        # 互相重叠的窗口至少有一个被挡住，全部退回逐窗口截图
+        overlapping = {a for a in rects for b in rects if a != b and _overlaps(rects[a], rects[b])}
+        sliceable = {}
+        for hwnd, rect in rects.items():
+            if hwnd in overlapping or not self._visible(hwnd, rect):
+                fallback.append(hwnd)
+            else:
+                sliceable[hwnd] = rect
+        return sliceable, fallback
+
+    def grab(self, hwnds: Optional[Iterable[int]] = None) -> Dict[int, Optional[np.ndarray]]:
+        """
+        截取一个周期的所有窗口画面
+
+        Args:
+            hwnds: 窗口句柄，默认为窗口注册表中的全部游戏窗口
+
+        Returns:
+            窗口句柄 -> BGR画面（可能是屏幕截图的切片），截图失败的窗口为None
+        """
+        with self._lock:
+            self._release_held()
+            self.ticks += 1
+            if hwnds is None:
+                hwnds = [hwnd for hwnd, _ in get_window_registry().windows()]
+            sliceable, fallback = self._cached_plan(tuple(hwnds))
+            fallback = list(fallback)
+            frames: Dict[int, Optional[np.ndarray]] = {}
+
+            if sliceable:
+                bounds = (min(r[0] for r in sliceable.values()), min(r[1] for r in sliceable.values()),
+                          max(r[2] for r in sliceable.values()), max(r[3] for r in sliceable.values()))
+                screen = self.backend.capture_screen(bounds, self.pool)
+                if screen is None:
+                    # 后端不支持屏幕截图或截图失败
+                    self.screen_failures += 1
+                    fallback.extend(sliceable)
+                    self._layout = None
+                else:
+                    self._held.append(screen)
+                    left, top = bounds[0], bounds[1]
+                    for hwnd, (x0, y0, x1, y1) in sliceable.items():
+                        frames[hwnd] = screen[y0 - top:y1 - top, x0 - left:x1 - left]
+                    self.sliced += len(sliceable)
+
+            for hwnd in fallback:
+                frame = self.backend.capture_window_array(hwnd, self.pool)
+                if frame is not None:
+                    self._held.append(frame)
+                frames[hwnd] = frame
+            self.fallbacks += len(fallback)
+            return frames
+
+    def _cached_plan(self, hwnds: Tuple[int, ...]) -> Tuple[Dict[int, Rect], List[int]]:
+        """窗口列表不变且未超过layout_ttl时复用上次的截图方式"""
+        now = time.time()
+        if self._layout is not None:
+            planned_hwnds, planned_at, plan = self._layout
+            if planned_hwnds == hwnds and now - planned_at < self.layout_ttl:
+                return plan
+        plan = self.plan(hwnds)
+        self._layout = (hwnds, now, plan)
+        return plan
+
+    def invalidate(self):
+        """窗口移动或层叠关系变化后调用，下个周期重新检查"""
+        with self._lock:
+            self._layout = None
+
+    def _release_held(self):
+        for array in self._held:
+            self.pool.release(array)
+        self._held.clear()
+
+    def close(self):
+        """归还最近一次grab()占用的缓冲区"""
+        with self._lock:
+            self._release_held()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'ticks': self.ticks,
+            'sliced': self.sliced,
+            'fallbacks': self.fallbacks,
+            'screen_failures': self.screen_failures,
+        }
@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+识别飞行记录器
+在预分配的环形缓冲区中保留每个窗口最近N帧（缩小后的）截图和识别信息，平时不写盘；
+识别失败或出错时才由后台线程把这些画面标注后写出，写出受频率限制和磁盘配额约束
+"""
+
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from .utils import Colors
+
+
+class _Ring:
+    """一个窗口的环形缓冲区，格子尺寸由该窗口的第一帧决定"""
+
+    def __init__(self, capacity: int, shape: tuple):
+        self.frames = np.zeros((capacity,) + shape, dtype=np.uint8)
+        self.meta: List[Optional[Dict[str, Any]]] = [None] * capacity
+        self.next = 0
+
+
+class FlightRecorder:
+    """
+    飞行记录器
+    record()在识别路径上调用，只做一次缩小写入所属窗口的环形缓冲区；dump()复制快照后交给后台线程写出。
+    每个窗口一个环形缓冲区，多个尺寸不同的窗口互不覆盖；窗口尺寸变化后的画面缩放到原有格子中，
+    原始尺寸记录在识别信息中
+    """
+
+    def __init__(self, capacity: int = 16, scale: float = 0.5,
+                 output_dir: str = "logs/flight_recorder",
+                 min_dump_interval: float = 30.0, disk_quota_mb: float = 200):
+        """
+        初始化飞行记录器
+
+        Args:
+            capacity: 每个窗口的环形缓冲区保存的帧数
+            scale: 画面缩小比例（1.0为原尺寸）
+            output_dir: 写出目录，每次写出一个子目录
+            min_dump_interval: 同一窗口两次写出之间的最小间隔（秒），间隔内的写出请求被丢弃
+            disk_quota_mb: 写出目录的磁盘配额（MB），超出时删除最早的记录
+        """
+        self.capacity = capacity
+        self.scale = scale
+        self.output_dir = output_dir
+        self.min_dump_interval = min_dump_interval
+        self.disk_quota_bytes = int(disk_quota_mb * 1024 * 1024)
+
+        # 窗口句柄（识别信息中的hwnd，没有时为None）-> 环形缓冲区
+        self._rings: Dict[Any, _Ring] = {}
+        self._lock = threading.Lock()
+        # 按窗口限制写出频率（hwnd为None的写出请求单独计时），一个窗口频繁失败不会挡住其他窗口的写出
+        self._last_dump: Dict[Any, float] = {}
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=4)
+        self._writer: Optional[threading.Thread] = None
+
+        self.recorded = 0
+        self.dumps = 0
+        self.suppressed = 0
+
+    def _slot_shape(self, frame: np.ndarray) -> tuple:
+        height, width = frame.shape[:2]
+        return max(1, int(height * self.scale)), max(1, int(width * self.scale)), 3
+
+    def record(self, frame: np.ndarray, **meta):
+        """
+        记录一帧画面和识别信息
+
+        Args:
+            frame: BGR画面（不会被保留引用，调用方可以立即复用该缓冲区）
+            **meta: 识别信息，例如 hwnd、template、results
+        """
+        if frame is None or frame.ndim != 3:
+            return
+        window = meta.get('hwnd')
+        with self._lock:
+            ring = self._rings.get(window)
+            if ring is None:
+                ring = self._rings[window] = _Ring(self.capacity, self._slot_shape(frame))
+            slot = ring.next
+            ring.next = (ring.next + 1) % self.capacity
+            # 尺寸变化后的画面也缩放到已有的格子中，不丢弃该窗口之前的画面
+            height, width = ring.frames.shape[1:3]
+            cv2.resize(frame, (width, height), dst=ring.frames[slot], interpolation=cv2.INTER_AREA)
+            ring.meta[slot] = dict(meta, time=time.time(), size=(frame.shape[1], frame.shape[0]))
+            self.recorded += 1
+
+    def forget(self, hwnd: int):
+        """窗口关闭后释放它的环形缓冲区"""
+        with self._lock:
+            self._rings.pop(hwnd, None)
+            self._last_dump.pop(hwnd, None)
+
+    def dump(self, reason: str, hwnd: Optional[int] = None) -> bool:
+        """
+        请求写出环形缓冲区中的画面
+
+        Args:
+            reason: 写出原因，用于目录名和记录
+            hwnd: 只写出该窗口的画面，为None时写出全部
+
+        Returns:
+            是否已提交写出（被频率限制或队列已满时返回False）
+        """
+        now = time.time()
+        with self._lock:
+            if not self._rings or now - self._last_dump.get(hwnd, 0.0) < self.min_dump_interval:
+                self.suppressed += 1
+                return False
+
+            # 按时间顺序复制快照，后台写出期间环形缓冲区可以继续使用
+            if hwnd is None:
+                rings = list(self._rings.values())
+            else:
+                rings = [self._rings[hwnd]] if hwnd in self._rings else []
+            snapshot = []
+            for ring in rings:
+                for slot in range(self.capacity):
+                    meta = ring.meta[slot]
+                    if meta is not None:
+                        snapshot.append((ring.frames[slot].copy(), meta))
+            snapshot.sort(key=lambda item: item[1]['time'])
+            if not snapshot:
+                self.suppressed += 1
+                return False
+            self._last_dump[hwnd] = now
+
+        try:
+            self._queue.put_nowait((reason, now, snapshot))
+        except queue.Full:
+            self.suppressed += 1
+            return False
+
+        self.dumps += 1
+        self._ensure_writer()
+        return True
+
+    def _ensure_writer(self):
+        if self._writer is None or not self._writer.is_alive():
+            self._writer = threading.Thread(target=self._write_loop, name="flight-recorder", daemon=True)
+            self._writer.start()
+
+    def _write_loop(self):
+        while True:
+            reason, timestamp, snapshot = self._queue.get()
+            try:
+                self._write(reason, timestamp, snapshot)
+                self._enforce_quota()
+            except Exception as e:
+                print(f"{Colors.RED}飞行记录写出失败: {e}{Colors.ENDC}")
+            finally:
+                # 等待下一次写出期间不持有上一次的快照
+                del snapshot
+                self._queue.task_done()
+
+    def _write(self, reason: str, timestamp: float, snapshot: List[tuple]):
+        """标注并写出一次快照"""
+        safe_reason = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in reason)[:60]
+        stamp = datetime.fromtimestamp(timestamp).strftime("%Y%m%d_%H%M%S_%f")[:-3]
+        directory = os.path.join(self.output_dir, f"{stamp}_{safe_reason}")
+        os.makedirs(directory, exist_ok=True)
+
+        index = []
+        for i, (frame, meta) in enumerate(snapshot):
+            self._annotate(frame, meta)
+            filename = f"{i:03d}.png"
+            cv2.imwrite(os.path.join(directory, filename), frame)
+            index.append(dict(_json_safe(meta), file=filename))
+
+        with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({'reason': reason, 'time': timestamp, 'scale': self.scale, 'frames': index},
+                      f, ensure_ascii=False, indent=2)
+        print(f"{Colors.YELLOW}飞行记录已写出: {directory}（{len(snapshot)}帧）{Colors.ENDC}")
+
+    def _annotate(self, frame: np.ndarray, meta: Dict[str, Any]):
+        """在缩小后的画面上绘制识别框和说明文字"""
+        # 窗口尺寸变化后格子的宽高比可能与原画面不同，横纵分别换算
+        scale_x = frame.shape[1] / meta['size'][0]
+        scale_y = frame.shape[0] / meta['size'][1]
+        for result in meta.get('results') or []:
+            top_left = (int(result['top_left'][0] * scale_x), int(result['top_left'][1] * scale_y))
+            bottom_right = (int(result['bottom_right'][0] * scale_x), int(result['bottom_right'][1] * scale_y))
+            cv2.rectangle(frame, top_left, bottom_right, (0, 255, 0), 1)
+        label = f"{os.path.basename(str(meta.get('template', '')))} " \
+                f"{'hit' if meta.get('results') else 'miss'}"
+        cv2.putText(frame, label, (4, 14), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 0, 255), 1)
+
+    def _enforce_quota(self):
+        """超出磁盘配额时删除最早的记录目录"""
+        if not os.path.isdir(self.output_dir):
+            return
+        entries = []
+        total = 0
+        for name in os.listdir(self.output_dir):
+            path = os.path.join(self.output_dir, name)
+            if not os.path.isdir(path):
+                continue
+            size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+            entries.append((os.path.getmtime(path), path, size))
+            total += size
+
+        entries.sort()
+        # 至少保留最新的一条记录
+        while total > self.disk_quota_bytes and len(entries) > 1:
+            _, path, size = entries.pop(0)
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def flush(self, timeout: float = 5.0):
+        """等待已提交的写出完成"""
+        deadline = time.time() + timeout
+        while self._queue.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.05)
+
+    def stats(self) -> Dict[str, int]:
+        """记录统计"""
+        return {'recorded': self.recorded, 'dumps': self.dumps, 'suppressed': self.suppressed}
+
+
+def _json_safe(meta: Dict[str, Any]) -> Dict[str, Any]:
+    """将识别信息中的numpy类型转换为可写入JSON的值"""
+    def convert(value):
+        if isinstance(value, dict):
+            return {key: convert(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [convert(item) for item in value]
+        if isinstance(value, np.ndarray):
+            return value.tolist()
+        if isinstance(value, np.generic):
+            return value.item()
+        return value
+    return convert(meta)
+
+
+_default_recorder = None
+_default_recorder_lock = threading.Lock()
+
+
+def get_flight_recorder() -> Optional[FlightRecorder]:
+    """获取进程共享的飞行记录器，配置取自 FLIGHT_RECORDER_SETTINGS，未启用时返回None"""
+    global _default_recorder
+    if _default_recorder is None:
+        with _default_recorder_lock:
+            if _default_recorder is None:
+                from config.settings import FLIGHT_RECORDER_SETTINGS
+                if not FLIGHT_RECORDER_SETTINGS.get('enabled', True):
+                    return None
+                _default_recorder = FlightRecorder(
+                    capacity=FLIGHT_RECORDER_SETTINGS.get('capacity', 16),
+                    scale=FLIGHT_RECORDER_SETTINGS.get('scale', 0.5),
+                    output_dir=FLIGHT_RECORDER_SETTINGS.get('output_dir', 'logs/flight_recorder'),
+                    min_dump_interval=FLIGHT_RECORDER_SETTINGS.get('min_dump_interval', 30),
+                    disk_quota_mb=FLIGHT_RECORDER_SETTINGS.get('disk_quota_mb', 200),
+                )
+    return _default_recorder
@@ -0,0 +1,247 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+识别CPU调节器
+进程内所有截图和识别在执行前向调节器申请令牌：截图和识别各有一个令牌桶限制每秒次数，
+令牌不足时按优先级（交互步骤优先于后台轮询）和各窗口的份额公平排队，避免占满CPU拖慢同机的模拟器；
+统计每个窗口、每个优先级的等待时间和实际速率
+"""
+
+import threading
+import time
+from typing import Dict, Optional
+
+# 优先级：数值越小越优先
+INTERACTIVE = 0  # 查找并点击等交互步骤
+NORMAL = 1
+BACKGROUND = 2  # wait_for_icon、区域监视器等轮询
+
+PRIORITY_NAMES = {INTERACTIVE: 'interactive', NORMAL: 'normal', BACKGROUND: 'background'}
+
+KINDS = ('capture', 'recognition')
+
+
+def _governor_settings() -> dict:
+    try:
+        from config.settings import GOVERNOR_SETTINGS
+        return GOVERNOR_SETTINGS
+    except ImportError:
+        return {}
+
+
+class _Bucket:
+    """令牌桶，rate为None时不限制"""
+
+    def __init__(self, rate: Optional[float], burst: float):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        if self.rate:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class _Waiter:
+    __slots__ = ('window', 'priority', 'cost', 'order')
+
+    def __init__(self, window, priority: int, cost: float, order: int):
+        self.window = window
+        self.priority = priority
+        self.cost = cost
+        self.order = order
+
+
+class _KindStats:
+    """一种令牌的统计"""
+
+    def __init__(self):
+        self.granted = 0.0
+        self.throttled_seconds = 0.0
+        self.throttled_count = 0
+        self.by_priority: Dict[int, list] = {}
+        self.by_window: Dict[object, list] = {}
+
+    def add(self, window, priority: int, cost: float, waited: float):
+        self.granted += cost
+        self.throttled_seconds += waited
+        if waited > 0.001:
+            self.throttled_count += 1
+        for table, key in ((self.by_priority, priority), (self.by_window, window)):
+            entry = table.setdefault(key, [0.0, 0.0])
+            entry[0] += cost
+            entry[1] += waited
+
+
+class RecognitionGovernor:
+    """
+    识别CPU调节器
+    acquire()在令牌充足且没有更优先的等待者时立即返回，否则阻塞到轮到自己；
+    等待者按 (优先级, 窗口虚拟时间) 排序，窗口虚拟时间按已获得令牌数除以份额增长（起始时间公平排队）
+    """
+
+    def __init__(self, recognitions_per_second: Optional[float] = None,
+                 captures_per_second: Optional[float] = None, burst: float = 2.0,
+                 window_shares: Optional[Dict[str, float]] = None):
+        """
+        初始化调节器
+
+        Args:
+            recognitions_per_second: 每秒识别次数上限，None或0表示不限制
+            captures_per_second: 每秒截图次数上限，None或0表示不限制
+            burst: 令牌桶容量，允许短时间内连续执行的次数
+            window_shares: 窗口标题关键字 -> 份额（默认1.0），份额大的窗口在竞争时获得更多令牌
+        """
+        self._buckets = {
+            'recognition': _Bucket(recognitions_per_second or None, burst),
+            'capture': _Bucket(captures_per_second or None, burst),
+        }
+        self.window_shares = dict(window_shares or {})
+        self._shares: Dict[object, float] = {}
+        self._vtime: Dict[str, Dict[object, float]] = {kind: {} for kind in KINDS}
+        self._clock: Dict[str, float] = {kind: 0.0 for kind in KINDS}
+        self._waiters: Dict[str, list] = {kind: [] for kind in KINDS}
+        self._stats = {kind: _KindStats() for kind in KINDS}
+        self._order = 0
+        self._condition = threading.Condition()
+        self.started = time.monotonic()
+
+    def set_share(self, window, share: float):
+        """设置窗口的份额"""
+        with self._condition:
+            self._shares[window] = max(share, 0.01)
+
+    def forget(self, window):
+        """窗口关闭后丢弃它的份额、虚拟时间和按窗口的统计"""
+        with self._condition:
+            self._shares.pop(window, None)
+            for kind in KINDS:
+                self._vtime[kind].pop(window, None)
+                self._stats[kind].by_window.pop(window, None)
+
+    def _share(self, window) -> float:
+        share = self._shares.get(window)
+        if share is None:
+            share = 1.0
+            if self.window_shares and isinstance(window, int):
+                from .backends import get_backend
+                title = get_backend().get_window_text(window)
+                share = next((value for keyword, value in self.window_shares.items() if keyword in title), 1.0)
+            self._shares[window] = share = max(share, 0.01)
+        return share
+
+    def _head(self, kind: str) -> _Waiter:
+        vtime = self._vtime[kind]
+        return min(self._waiters[kind], key=lambda w: (w.priority, vtime.get(w.window, 0.0), w.order))
+
+    def acquire(self, kind: str, window=None, priority: int = NORMAL, cost: float = 1.0) -> float:
+        """
+        申请令牌，必要时阻塞等待
+
+        Args:
+            kind: 'capture' 或 'recognition'
+            window: 窗口句柄（或其他窗口标识），用于按窗口公平分配
+            priority: INTERACTIVE、NORMAL 或 BACKGROUND
+            cost: 消耗的令牌数，例如一次截图上识别多个模板时为模板数
+
+        Returns:
+            等待的时间（秒）
+        """
+        bucket = self._buckets[kind]
+        if not bucket.rate:
+            with self._condition:
+                self._stats[kind].add(window, priority, cost, 0.0)
+            return 0.0
+
+        start = time.monotonic()
+        with self._condition:
+            vtime = self._vtime[kind]
+            # 窗口的虚拟时间不低于虚拟时钟（最近一次放行时的虚拟时间），不能用之前空闲的时间换取突发
+            clock = self._clock[kind]
+            vtime[window] = max(vtime.get(window, clock), clock)
+            self._order += 1
+            waiter = _Waiter(window, priority, cost, self._order)
+            self._waiters[kind].append(waiter)
+            try:
+                while True:
+                    now = time.monotonic()
+                    bucket.refill(now)
+                    needed = min(cost, bucket.burst)
+                    if self._head(kind) is waiter and bucket.tokens >= needed:
+                        bucket.tokens -= cost
+                        self._clock[kind] = max(self._clock[kind], vtime[window])
+                        vtime[window] += cost / self._share(window)
+                        break
+                    if self._head(kind) is waiter:
+                        self._condition.wait((needed - bucket.tokens) / bucket.rate)
+                    else:
+                        self._condition.wait(1.0 / bucket.rate)
+            finally:
+                self._waiters[kind].remove(waiter)
+                self._condition.notify_all()
+            waited = time.monotonic() - start
+            self._stats[kind].add(window, priority, cost, waited)
+        return waited
+
+    def throttled_seconds(self, window=None) -> float:
+        """累计等待时间（秒），window不为None时只统计该窗口"""
+        with self._condition:
+            if window is None:
+                return sum(stats.throttled_seconds for stats in self._stats.values())
+            return sum(stats.by_window.get(window, [0.0, 0.0])[1] for stats in self._stats.values())
+
+    def stats(self) -> Dict[str, Dict]:
+        """每种令牌的限制速率、实际速率、等待时间，以及按优先级和窗口的明细"""
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        report = {}
+        with self._condition:
+            for kind in KINDS:
+                stats = self._stats[kind]
+                report[kind] = {
+                    'limit_per_second': self._buckets[kind].rate,
+                    'granted': stats.granted,
+                    'rate': round(stats.granted / elapsed, 2),
+                    'throttled_seconds': round(stats.throttled_seconds, 3),
+                    'throttled_count': stats.throttled_count,
+                    'by_priority': {PRIORITY_NAMES.get(p, p): {'granted': v[0], 'throttled_seconds': round(v[1], 3)}
+                                    for p, v in stats.by_priority.items()},
+                    'by_window': {w: {'granted': v[0], 'throttled_seconds': round(v[1], 3)}
+                                  for w, v in stats.by_window.items()},
+                }
+        return report
+
+
+_governor = None
+_governor_lock = threading.Lock()
+
+
+def get_governor() -> RecognitionGovernor:
+    """获取进程共享的调节器，限制速率读取 GOVERNOR_SETTINGS"""
+    global _governor
+    if _governor is None:
+        with _governor_lock:
+            if _governor is None:
+                settings = _governor_settings()
+                enabled = settings.get('enabled', False)
+                _governor = RecognitionGovernor(
+                    recognitions_per_second=settings.get('recognitions_per_second') if enabled else None,
+                    captures_per_second=settings.get('captures_per_second') if enabled else None,
+                    burst=settings.get('burst', 2),
+                    window_shares=settings.get('window_shares'),
+                )
+    return _governor
+
+
+def set_governor(governor: RecognitionGovernor) -> Optional[RecognitionGovernor]:
+    """
+    替换进程共享的调节器
+
+    Returns:
+        之前的调节器（可能为None）
+    """
+    global _governor
+    with _governor_lock:
+        previous, _governor = _governor, governor
+    return previous
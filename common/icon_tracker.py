@@ -0,0 +1,271 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+图标跟踪
+图标定位后，后续检查（等待它变化、动画结束后确认它还在）不再重新做完整的特征识别：
+以上次匹配的内点为跟踪点，只截取图标附近的小区域，用金字塔Lucas-Kanade光流跟踪这些点并更新位置；
+跟踪质量下降时才重新完整识别一次
+"""
+
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .backends import get_backend
+from .backends.base import clip_region
+from .governor import BACKGROUND
+
+Region = Tuple[int, int, int, int]
+
+
+def _box_corners(result: Dict[str, Any]) -> np.ndarray:
+    """识别结果的四个角点，模板匹配的结果没有corners时由识别框得到"""
+    if result.get('corners') is not None:
+        return np.asarray(result['corners'], dtype=np.float32).reshape(-1, 2)
+    (left, top), (right, bottom) = result['top_left'], result['bottom_right']
+    return np.float32([(left, top), (right, top), (right, bottom), (left, bottom)])
+
+
+def _tracker_settings() -> dict:
+    try:
+        from config.settings import TRACKER_SETTINGS
+        return TRACKER_SETTINGS
+    except ImportError:
+        return {}
+
+
+class IconTracker:
+    """
+    图标跟踪器
+    update()截取图标四周margin像素的区域做一次光流跟踪，返回与识别结果格式相同的字典；
+    保留的跟踪点比例低于min_quality或少于min_points时用完整识别重新定位并重新播种
+    """
+
+    def __init__(self, finder, template_path: str, result: Dict[str, Any], scene_image: Optional[np.ndarray] = None,
+                 margin: Optional[int] = None, min_points: Optional[int] = None,
+                 min_quality: Optional[float] = None, max_fb_error: Optional[float] = None):
+        """
+        初始化跟踪器
+
+        Args:
+            finder: 图像查找器（ImageFinder），提供窗口句柄、识别器、缓冲池和调节器，用于重新识别
+            template_path: 模板图像路径
+            result: 识别结果，特征匹配的结果带有内点坐标（inlier_points）
+            scene_image: 识别时的BGR画面，为None时重新截取图标附近的区域作为起始画面
+            margin: 跟踪区域在图标框四周扩展的像素，None时使用 TRACKER_SETTINGS
+            min_points: 最少跟踪点数
+            min_quality: 最低跟踪质量（保留的跟踪点占播种时的比例）
+            max_fb_error: 前向-后向光流误差上限（像素），超过的点视为跟踪失败
+        """
+        settings = _tracker_settings()
+        self.finder = finder
+        self.hwnd = finder.game_hwnd
+        self.template_path = template_path
+        self.backend = get_backend()
+        self.pool = finder.buffer_pool
+        self.margin = settings.get('margin', 32) if margin is None else margin
+        self.min_points = settings.get('min_points', 6) if min_points is None else min_points
+        self.min_quality = settings.get('min_quality', 0.5) if min_quality is None else min_quality
+        self.max_fb_error = settings.get('max_fb_error', 1.0) if max_fb_error is None else max_fb_error
+        self.lk_params = dict(
+            winSize=tuple(settings.get('win_size', (15, 15))),
+            maxLevel=settings.get('pyramid_levels', 2),
+            criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03),
+        )
+
+        self.result = result
+        self._region: Optional[Region] = None
+        self._prev_gray: Optional[np.ndarray] = None
+        self._points: Optional[np.ndarray] = None
+        self._seeded = 0
+
+        self.updates = 0
+        self.redetections = 0
+        self.track_seconds = 0.0
+        self.detect_seconds = 0.0
+        self._seed(result, scene_image)
+
+    # ---------- 播种 ----------
+
+    def _client_size(self) -> Tuple[int, int]:
+        _, _, right, bottom = self.backend.get_client_rect(self.hwnd)
+        scale = self.backend.get_window_dpi_scale(self.hwnd)
+        return int(right * scale), int(bottom * scale)
+
+    def _track_region(self, result: Dict[str, Any]) -> Optional[Region]:
+        (left, top), (right, bottom) = result['top_left'], result['bottom_right']
+        width, height = self._client_size()
+        return clip_region((left - self.margin, top - self.margin, right + self.margin, bottom + self.margin),
+                           width, height)
+
+    def _capture_gray(self, region: Region) -> Optional[np.ndarray]:
+        """截取区域并转换为灰度图（独立数组，跨多次update保留）"""
+        frame = self.backend.capture_region(self.hwnd, region, self.pool)
+        if frame is None:
+            return None
+        try:
+            return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        finally:
+            self.pool.release(frame)
+
+    def _seed(self, result: Dict[str, Any], scene_image: Optional[np.ndarray] = None) -> bool:
+        """以识别结果的内点播种，内点不足时在图标框内补充角点"""
+        self.result = result
+        region = self._track_region(result)
+        if region is None:
+            self._points = None
+            return False
+        left, top, right, bottom = region
+        if scene_image is not None:
+            gray = cv2.cvtColor(scene_image[top:bottom, left:right], cv2.COLOR_BGR2GRAY)
+        else:
+            gray = self._capture_gray(region)
+            if gray is None or gray.shape != (bottom - top, right - left):
+                self._points = None
+                return False
+
+        points = np.asarray(result.get('inlier_points', np.empty((0, 2))), dtype=np.float32).reshape(-1, 2)
+        points = points - np.float32((left, top))
+        inside = (points[:, 0] >= 0) & (points[:, 1] >= 0) & (points[:, 0] < right - left) & (points[:, 1] < bottom - top)
+        points = points[inside]
+        if len(points) < self.min_points * 2:
+            # 模板匹配等没有内点的结果：在图标框内找角点
+            mask = np.zeros_like(gray)
+            (box_left, box_top), (box_right, box_bottom) = result['top_left'], result['bottom_right']
+            mask[max(box_top - top, 0):box_bottom - top, max(box_left - left, 0):box_right - left] = 255
+            corners = cv2.goodFeaturesToTrack(gray, maxCorners=48, qualityLevel=0.01, minDistance=4, mask=mask)
+            if corners is not None:
+                points = np.vstack([points, corners.reshape(-1, 2)])
+
+        self._region = region
+        self._prev_gray = gray
+        self._points = points.reshape(-1, 1, 2).astype(np.float32)
+        self._seeded = len(points)
+        return self._seeded >= self.min_points
+
+    # ---------- 跟踪 ----------
+
+    def _track(self) -> Optional[Dict[str, Any]]:
+        """在跟踪区域内做一次前向-后向光流，质量不足时返回None"""
+        if self._points is None or self._seeded < self.min_points:
+            return None
+        gray = self._capture_gray(self._region)
+        if gray is None or gray.shape != self._prev_gray.shape:
+            return None
+
+        next_points, status, _ = cv2.calcOpticalFlowPyrLK(self._prev_gray, gray, self._points, None, **self.lk_params)
+        back_points, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, self._prev_gray, next_points, None,
+                                                               **self.lk_params)
+        fb_error = np.linalg.norm((self._points - back_points).reshape(-1, 2), axis=1)
+        good = (status.ravel() == 1) & (back_status.ravel() == 1) & (fb_error < self.max_fb_error)
+        if np.count_nonzero(good) < self.min_points:
+            return None
+
+        old, new = self._points[good], next_points[good]
+        # 平移+缩放（+小角度旋转）模型，RANSAC剔除跟错的点
+        matrix, inliers = cv2.estimateAffinePartial2D(old, new, method=cv2.RANSAC, ransacReprojThreshold=2.0)
+        if matrix is None:
+            return None
+        inliers = inliers.ravel() != 0
+        quality = np.count_nonzero(inliers) / self._seeded
+        if quality < self.min_quality or np.count_nonzero(inliers) < self.min_points:
+            return None
+
+        left, top = self._region[:2]
+        origin = np.float32((left, top))
+        corners = (_box_corners(self.result) - origin).reshape(-1, 1, 2)
+        quad = cv2.transform(corners, matrix).reshape(-1, 2) + origin
+        min_x, min_y = quad.min(axis=0)
+        max_x, max_y = quad.max(axis=0)
+        center_x, center_y = quad.mean(axis=0)
+        tracked = new[inliers].reshape(-1, 2)
+        result = {
+            'confidence': float(quality),
+            'center': (int(center_x), int(center_y)),
+            'top_left': (int(min_x), int(min_y)),
+            'bottom_right': (int(max_x), int(max_y)),
+            'width': int(max_x - min_x),
+            'height': int(max_y - min_y),
+            'corners': quad.astype(int),
+            'inliers_count': int(len(tracked)),
+            'inlier_points': tracked + origin,
+            'method': 'optical_flow_LK',
+        }
+
+        self._prev_gray = gray
+        self._points = tracked.reshape(-1, 1, 2)
+        self.result = dict(result, corners=quad)
+        # 图标接近跟踪区域边缘时以当前位置重新取区域
+        if not self._contains(self._region, result):
+            self._seed(dict(self.result, inlier_points=tracked + origin))
+        return result
+
+    def _contains(self, region: Region, result: Dict[str, Any]) -> bool:
+        left, top, right, bottom = region
+        inset = self.margin // 2
+        (box_left, box_top), (box_right, box_bottom) = result['top_left'], result['bottom_right']
+        return box_left - left >= inset and box_top - top >= inset and \
+            right - box_right >= inset and bottom - box_bottom >= inset
+
+    def redetect(self, priority: int = BACKGROUND) -> Optional[Dict[str, Any]]:
+        """
+        完整截图识别一次，找到时重新播种
+
+        Args:
+            priority: 向调节器申请令牌的优先级
+
+        Returns:
+            识别结果，未找到返回None
+        """
+        from .gui_util import capture_window_array
+
+        start = time.perf_counter()
+        self.redetections += 1
+        finder = self.finder
+        scene_image = None
+        try:
+            finder.governor.acquire('capture', self.hwnd, priority)
+            scene_image = capture_window_array(self.hwnd, self.pool)
+            if scene_image is None:
+                return None
+            finder.governor.acquire('recognition', self.hwnd, priority)
+            results = finder.recognizer.find_target_in_scene(scene_image, self.template_path)
+            finder.record_lookup(scene_image, self.template_path, results)
+            if not results:
+                self._points = None
+                return None
+            self._seed(results[0], scene_image)
+            return results[0]
+        finally:
+            self.pool.release(scene_image)
+            self.detect_seconds += time.perf_counter() - start
+
+    def update(self, priority: int = BACKGROUND) -> Optional[Dict[str, Any]]:
+        """
+        更新图标位置：先光流跟踪，质量不足时重新识别
+
+        Args:
+            priority: 截图和重新识别时向调节器申请令牌的优先级
+
+        Returns:
+            识别结果（method为 'optical_flow_LK' 或重新识别的方法），图标已不在时返回None
+        """
+        self.updates += 1
+        start = time.perf_counter()
+        self.finder.governor.acquire('capture', self.hwnd, priority)
+        result = self._track()
+        self.track_seconds += time.perf_counter() - start
+        if result is not None:
+            return result
+        return self.redetect(priority)
+
+    def stats(self) -> Dict[str, float]:
+        """更新次数、重新识别次数，以及平均每次跟踪和重新识别的耗时（毫秒）"""
+        return {
+            'updates': self.updates,
+            'redetections': self.redetections,
+            'track_ms': self.track_seconds * 1000 / max(self.updates, 1),
+            'detect_ms': self.detect_seconds * 1000 / max(self.redetections, 1),
+        }
@@ -7,8 +7,41 @@
 
 import os
 from typing import Tuple, Optional, List
+from config.settings import RECOGNITION_SERVER_SETTINGS, RECOGNITION_SETTINGS
+from .buffer_pool import get_buffer_pool
+from .compact_descriptors import get_default_codec
+from .flight_recorder import get_flight_recorder
+from .governor import BACKGROUND, INTERACTIVE, get_governor
+from .icon_tracker import IconTracker
 from .image_recognition import ImageRecognition
-from .gui_util import capture_window, get_game_windows
+from .recognition_memo import RecognitionMemo
+from .recognition_server import SERVER_ENV, RemoteRecognition, connect_remote_recognition
+from .gui_util import capture_window_array, get_game_windows
+
+
+def create_recognizer(confidence_threshold: float = 0.8, buffer_pool=None) -> ImageRecognition:
+    """
+    按 RECOGNITION_SETTINGS 创建图像识别器
+
+    Args:
+        confidence_threshold: 置信度阈值
+        buffer_pool: 缓冲池
+
+    Returns:
+        图像识别器
+    """
+    memo = None
+    if RECOGNITION_SETTINGS.get('memo_enabled', True):
+        memo = RecognitionMemo(max_entries=RECOGNITION_SETTINGS.get('memo_max_entries', 256))
+    return ImageRecognition(
+        confidence_threshold, memo=memo, buffer_pool=buffer_pool,
+        tile_size=RECOGNITION_SETTINGS.get('feature_tile_size', 0),
+        tile_workers=RECOGNITION_SETTINGS.get('feature_tile_workers', 4),
+        geometric_model=RECOGNITION_SETTINGS.get('geometric_model', 'homography'),
+        descriptor_codec=get_default_codec() if RECOGNITION_SETTINGS.get('compact_descriptors') else None,
+        race=RECOGNITION_SETTINGS.get('race_methods', False),
+        coarse_scale=RECOGNITION_SETTINGS.get('coarse_scale', 1.0),
+    )
 
 
 class ImageFinder:
@@ -17,16 +50,32 @@ class ImageFinder:
     提供简化的接口来查找游戏界面中的图标或按钮
     """
     
-    def __init__(self, confidence_threshold: float = 0.8):
+    def __init__(self, confidence_threshold: float = 0.8, hwnd: Optional[int] = None):
         """
         初始化图像查找器
         
         Args:
             confidence_threshold: 置信度阈值，默认0.8
+            hwnd: 游戏窗口句柄，默认使用找到的第一个游戏窗口
         """
-        self.recognizer = ImageRecognition(confidence_threshold)
-        self.game_hwnd = None
-        self._setup_game_window()
+        # 截图和场景灰度图在进程共享的缓冲池中复用
+        self.buffer_pool = get_buffer_pool()
+        self.game_hwnd = hwnd
+        if self.game_hwnd is None:
+            self._setup_game_window()
+        # 配置了识别服务时通过本地识别服务识别，服务不可用时使用本进程的识别器
+        self.recognizer = None
+        if RECOGNITION_SERVER_SETTINGS.get('enabled') or os.environ.get(SERVER_ENV):
+            self.recognizer = connect_remote_recognition(
+                confidence_threshold, session=f"{os.getpid()}:{self.game_hwnd}")
+        if self.recognizer is None:
+            self.recognizer = create_recognizer(confidence_threshold, self.buffer_pool)
+        # 最近的识别画面保存在飞行记录器中，失败时才写出
+        self.recorder = get_flight_recorder()
+        # 截图和识别前向进程共享的调节器申请令牌
+        self.governor = get_governor()
+        # find_icon_in_game 最近一次找到的完整识别结果（未找到时为None），用于点击验证等
+        self.last_result = None
     
     def _setup_game_window(self):
         """设置游戏窗口"""
@@ -40,13 +89,15 @@ class ImageFinder:
         except Exception as e:
             print(f"设置游戏窗口时出错: {e}")
     
-    def find_icon_in_game(self, icon_path: str, use_multi_scale: bool = True) -> Optional[Tuple[int, int]]:
+    def find_icon_in_game(self, icon_path: str, use_multi_scale: bool = True,
+                          priority: int = INTERACTIVE) -> Optional[Tuple[int, int]]:
         """
         在游戏界面中查找指定图标
         
         Args:
             icon_path: 图标文件路径
             use_multi_scale: 已弃用，保留参数向后兼容
+            priority: 向识别调节器申请截图和识别时的优先级（common.governor）
             
         Returns:
             图标的中心位置坐标 (x, y)，如果未找到则返回None
@@ -59,18 +110,21 @@ class ImageFinder:
             print(f"图标文件不存在: {icon_path}")
             return None
         
+        scene_image = None
+        self.last_result = None
         try:
             # 截取游戏窗口
-            scene_image = capture_window(self.game_hwnd)
+            self.governor.acquire('capture', self.game_hwnd, priority)
+            scene_image = capture_window_array(self.game_hwnd, self.buffer_pool)
             if scene_image is None:
                 print("截图失败")
                 return None
             
-            # 使用SIFT特征匹配
-            methods = ['feature_match_SIFT']
-            
-            # 执行图像识别
-            results = self.recognizer.find_target_in_scene(scene_image, icon_path, methods)
+            # 执行图像识别（匹配方法由模板清单决定，默认SIFT特征匹配）
+            self.governor.acquire('recognition', self.game_hwnd, priority)
+            results = self.recognizer.find_target_in_scene(scene_image, icon_path)
+            self.record_lookup(scene_image, icon_path, results)
+            self.last_result = results[0] if results else None
             
             if results:
                 best_match = results[0]  # 取置信度最高的结果
@@ -89,7 +143,65 @@ class ImageFinder:
                 
         except Exception as e:
             print(f"查找图标时出错: {e}")
+            self.dump_recording(f"error_{os.path.basename(icon_path)}")
             return None
+        finally:
+            self.buffer_pool.release(scene_image)
+    
+    def track_icon(self, icon_path: str, priority: int = INTERACTIVE) -> Optional[IconTracker]:
+        """
+        识别图标并返回跟踪器，之后用 tracker.update() 以光流跟踪代替重新识别
+        
+        Args:
+            icon_path: 图标文件路径
+            priority: 向识别调节器申请截图和识别时的优先级
+            
+        Returns:
+            跟踪器（tracker.result为本次识别结果），未找到图标时返回None
+        """
+        if not self.game_hwnd:
+            print("游戏窗口未连接")
+            return None
+        
+        scene_image = None
+        try:
+            self.governor.acquire('capture', self.game_hwnd, priority)
+            scene_image = capture_window_array(self.game_hwnd, self.buffer_pool)
+            if scene_image is None:
+                print("截图失败")
+                return None
+            
+            self.governor.acquire('recognition', self.game_hwnd, priority)
+            results = self.recognizer.find_target_in_scene(scene_image, icon_path)
+            self.record_lookup(scene_image, icon_path, results)
+            if not results:
+                print(f"未找到图标: {os.path.basename(icon_path)}")
+                return None
+            return IconTracker(self, icon_path, results[0], scene_image)
+        except Exception as e:
+            print(f"跟踪图标时出错: {e}")
+            return None
+        finally:
+            self.buffer_pool.release(scene_image)
+    
+    def record_lookup(self, scene_image, icon_path: str, results: List[dict]):
+        """将本次识别的画面和结果写入飞行记录器"""
+        if self.recorder is not None:
+            self.recorder.record(scene_image, hwnd=self.game_hwnd, template=icon_path, results=results)
+    
+    def dump_recording(self, reason: str) -> bool:
+        """
+        写出本窗口最近的识别画面（后台线程写出，受频率限制）
+        
+        Args:
+            reason: 写出原因
+            
+        Returns:
+            是否已提交写出
+        """
+        if self.recorder is None:
+            return False
+        return self.recorder.dump(reason, hwnd=self.game_hwnd)
     
     def find_icon_in_image(self, scene_image_path: str, icon_path: str, 
                           use_multi_scale: bool = True) -> Optional[Tuple[int, int]]:
@@ -113,11 +225,8 @@ class ImageFinder:
             return None
         
         try:
-            # 使用SIFT特征匹配
-            methods = ['feature_match_SIFT']
-            
-            # 执行图像识别
-            results = self.recognizer.find_target_in_scene(scene_image_path, icon_path, methods)
+            # 执行图像识别（匹配方法由模板清单决定，默认SIFT特征匹配）
+            results = self.recognizer.find_target_in_scene(scene_image_path, icon_path)
             
             if results:
                 best_match = results[0]  # 取置信度最高的结果
@@ -155,13 +264,24 @@ class ImageFinder:
             print("游戏窗口未连接")
             return results
         
+        scene_image = None
         try:
             # 截取游戏窗口
-            scene_image = capture_window(self.game_hwnd)
+            self.governor.acquire('capture', self.game_hwnd, INTERACTIVE)
+            scene_image = capture_window_array(self.game_hwnd, self.buffer_pool)
             if scene_image is None:
                 print("截图失败")
                 return results
             
+            # 每个模板一次识别
+            self.governor.acquire('recognition', self.game_hwnd, INTERACTIVE, cost=len(icon_paths))
+            
+            # 通过识别服务识别时画面只传送一次
+            batch = None
+            if isinstance(self.recognizer, RemoteRecognition):
+                batch = self.recognizer.find_multiple(
+                    scene_image, [path for path in icon_paths if os.path.exists(path)])
+            
             # 为每个图标查找位置
             for icon_path in icon_paths:
                 icon_name = os.path.basename(icon_path)
@@ -171,11 +291,12 @@ class ImageFinder:
                     results[icon_name] = None
                     continue
                 
-                # 使用SIFT特征匹配
-                methods = ['feature_match_SIFT']
-                
-                # 执行图像识别
-                matches = self.recognizer.find_target_in_scene(scene_image, icon_path, methods)
+                # 执行图像识别（匹配方法由模板清单决定，默认SIFT特征匹配）
+                if batch is not None:
+                    matches = batch[icon_path]
+                else:
+                    matches = self.recognizer.find_target_in_scene(scene_image, icon_path)
+                self.record_lookup(scene_image, icon_path, matches)
                 
                 if matches:
                     best_match = matches[0]
@@ -189,7 +310,10 @@ class ImageFinder:
             
         except Exception as e:
             print(f"查找多个图标时出错: {e}")
+            self.dump_recording("error_multiple_icons")
             return results
+        finally:
+            self.buffer_pool.release(scene_image)
     
     def is_icon_visible(self, icon_path: str, use_multi_scale: bool = True) -> bool:
         """
@@ -224,7 +348,8 @@ class ImageFinder:
         start_time = time.time()
         
         while time.time() - start_time < timeout:
-            position = self.find_icon_in_game(icon_path)
+            # 轮询以后台优先级申请识别，不与其他窗口的交互步骤争抢
+            position = self.find_icon_in_game(icon_path, priority=BACKGROUND)
             if position:
                 return position
             
@@ -1,9 +1,142 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from typing import List, Optional, Dict, Any
 
 import cv2
 import numpy as np
 from PIL import Image
 
+from .buffer_pool import BufferPool
+from .compact_descriptors import CompactIndex, DescriptorCodec, compact_ratio_test_matches
+from .recognition_memo import RecognitionMemo
+from .tiled_features import TiledFeatureExtractor
+from .template_manifest import TemplateManifest, get_default_manifest
+
+# 特征匹配的几何模型
+MODEL_SIMILARITY = 'similarity'
+MODEL_MEDIAN = 'median'
+MODEL_HOMOGRAPHY = 'homography'
+
+# 内点判定的重投影误差（像素）
+REPROJ_THRESHOLD = 5.0
+# 匹配框允许的缩放范围和长宽比偏差，超出时视为错误的拟合
+MIN_BOX_SCALE = 0.25
+MAX_BOX_SCALE = 4.0
+MAX_ASPECT_DEVIATION = 0.25
+# 平移+缩放模型允许的最大旋转角度（度），界面图标不会旋转
+MAX_ROTATION_DEGREES = 10.0
+# 任何几何模型至少需要的内点数：置信度是内点占匹配点的比例，匹配点很少时4个里4个内点也是1.0
+MIN_INLIERS = 8
+
+# Lowe's ratio test 阈值
+RATIO_TEST = 0.7
+# FLANN KD树参数
+FLANN_INDEX_KDTREE = 1
+FLANN_INDEX_PARAMS = dict(algorithm=FLANN_INDEX_KDTREE, trees=5)
+FLANN_SEARCH_PARAMS = dict(checks=50)
+# 每个识别器缓存特征的模板数量上限
+TEMPLATE_FEATURE_CACHE_SIZE = 128
+# 由粗到细识别：缩小后模板较短边小于该值时特征太少，直接在原分辨率上识别
+COARSE_MIN_TEMPLATE_SIDE = 24
+# 原分辨率细化窗口在粗定位框四周扩展的比例（相对模板较长边）和固定像素
+COARSE_REFINE_MARGIN = 0.25
+COARSE_REFINE_PADDING = 8
+# 结果中保留的内点场景坐标数量上限（供光流跟踪播种，见 common.icon_tracker）
+MAX_INLIER_POINTS = 64
+
+# 竞速模式：参加竞速的方法，以及某个方法在同一模板上稳定胜出后只运行该方法的条件
+RACE_METHODS = ['template_match_NCC', 'feature_match_SIFT']
+RACE_MIN_SAMPLES = 8
+RACE_DOMINANCE = 0.9
+RACE_WORKERS = 4
+# 竞速落败的方法等待方法锁时检查竞速是否已结束的间隔（秒）
+RACE_CANCEL_POLL = 0.005
+
+_race_executor = None
+_race_executor_lock = threading.Lock()
+
+
+def get_race_executor() -> ThreadPoolExecutor:
+    """竞速模式共用的线程池，OpenCV计算期间释放GIL，各方法可以真正并行"""
+    global _race_executor
+    if _race_executor is None:
+        with _race_executor_lock:
+            if _race_executor is None:
+                _race_executor = ThreadPoolExecutor(max_workers=RACE_WORKERS, thread_name_prefix="recognition-race")
+    return _race_executor
+
+
+class _RaceCancelled(Exception):
+    """竞速已结束，落败的方法在阶段之间放弃执行"""
+
+
+def _check_cancelled(cancelled: Optional[threading.Event]):
+    if cancelled is not None and cancelled.is_set():
+        raise _RaceCancelled()
+
+
+def ratio_test_matches(des1: np.ndarray, des2: np.ndarray, ratio: float = RATIO_TEST, index=None):
+    """
+    FLANN最近邻搜索加Lowe's ratio test，全部以数组完成
+    
+    Args:
+        des1: 模板描述子（float32）
+        des2: 场景描述子（float32）
+        ratio: 最近邻与次近邻距离之比的上限
+        index: 已在des2上建立的cv2.flann_Index，为None时临时建立
+        
+    Returns:
+        (模板特征序号数组, 场景特征序号数组)
+    """
+    empty = np.empty(0, dtype=np.int32)
+    if len(des2) < 2:
+        return empty, empty
+    if index is None:
+        index = cv2.flann_Index(des2, FLANN_INDEX_PARAMS)
+    neighbors, distances = index.knnSearch(des1, 2, params=FLANN_SEARCH_PARAMS)
+    # FLANN返回的是L2距离的平方，比较时阈值也取平方
+    good = distances[:, 0] < (ratio * ratio) * distances[:, 1]
+    return np.nonzero(good)[0].astype(np.int32), neighbors[good, 0].astype(np.int32)
+
+
+def cross_check_matches(des1: np.ndarray, des2: np.ndarray):
+    """
+    汉明距离暴力匹配加交叉检查（与BFMatcher(crossCheck=True)相同），结果为数组
+    
+    Args:
+        des1: 模板描述子（uint8）
+        des2: 场景描述子（uint8）
+        
+    Returns:
+        (模板特征序号数组, 场景特征序号数组)
+    """
+    _, nearest = cv2.batchDistance(des1, des2, -1, normType=cv2.NORM_HAMMING, K=1, crosscheck=True)
+    nearest = nearest.ravel()
+    good = nearest >= 0
+    return np.nonzero(good)[0].astype(np.int32), nearest[good].astype(np.int32)
+
+
+def _map_result(result: Dict[str, Any], scale: float, dx: int, dy: int) -> Dict[str, Any]:
+    """把识别结果的坐标按 p * scale + (dx, dy) 换算，返回新的结果"""
+    offset = np.float32((dx, dy))
+    
+    def point(p):
+        return int(round(p[0] * scale + dx)), int(round(p[1] * scale + dy))
+    
+    mapped = dict(result)
+    mapped['center'] = point(result['center'])
+    mapped['top_left'] = point(result['top_left'])
+    mapped['bottom_right'] = point(result['bottom_right'])
+    mapped['width'] = mapped['bottom_right'][0] - mapped['top_left'][0]
+    mapped['height'] = mapped['bottom_right'][1] - mapped['top_left'][1]
+    if result.get('corners') is not None:
+        mapped['corners'] = np.rint(np.asarray(result['corners'], np.float32) * scale + offset).astype(int)
+    if result.get('inlier_points') is not None:
+        mapped['inlier_points'] = (result['inlier_points'] * scale + offset).astype(np.float32)
+    return mapped
+
 
 class ImageRecognition:
     """
@@ -11,17 +144,98 @@ class ImageRecognition:
     支持在场景图中找到目标图的位置，能处理目标大小和长宽比的变化
     """
     
-    def __init__(self, confidence_threshold: float = 0.8):
+    # 进程内共享的模板缓存：路径 -> (修改时间, 图像)
+    _template_cache: Dict[str, tuple] = {}
+    # 模板灰度图缓存：路径 -> (修改时间, 灰度图)
+    _template_gray_cache: Dict[str, tuple] = {}
+    # 竞速胜出统计：模板路径 -> {方法: 胜出次数}，所有识别器共用
+    _race_wins: Dict[str, Dict[str, int]] = {}
+    _race_lock = threading.Lock()
+    
+    def __init__(self, confidence_threshold: float = 0.8,
+                 manifest: Optional[TemplateManifest] = None,
+                 memo: Optional[RecognitionMemo] = None,
+                 buffer_pool: Optional[BufferPool] = None,
+                 tile_size: int = 0, tile_workers: int = 4,
+                 geometric_model: str = MODEL_HOMOGRAPHY,
+                 descriptor_codec: Optional[DescriptorCodec] = None,
+                 race: bool = False, coarse_scale: float = 1.0):
         """
         初始化图像识别器
         
         Args:
             confidence_threshold: 置信度阈值，默认0.8
+            manifest: 模板清单，默认加载img/template/manifest.json
+            memo: 识别结果记忆，为None时不缓存识别结果
+            buffer_pool: 缓冲池，场景灰度图从池中分配，为None时每次新建
+            tile_size: 场景特征分块缓存的小块边长，0表示每次在整幅画面上提取特征
+            tile_workers: 分块提取特征的线程数
+            geometric_model: 特征匹配的几何模型：'homography'（单应矩阵）、
+                             'similarity'（平移+缩放，RANSAC）或 'median'（平移+缩放，中位数闭式解）
+            descriptor_codec: 紧凑描述子编码器，设置后SIFT匹配先用紧凑描述子初筛再用完整描述子复核
+            race: 竞速模式，多个匹配方法在线程池中并行执行，取第一个有结果的方法
+            coarse_scale: 由粗到细识别的缩小比例，小于1时特征匹配先在缩小的画面上定位，
+                          再只在粗定位附近的原分辨率窗口中细化；1表示关闭
         """
         self.confidence_threshold = confidence_threshold
-        self.sift = cv2.SIFT_create()
-        self.orb = cv2.ORB_create()
+        self.memo = memo
+        self.buffer_pool = buffer_pool
+        self.tile_size = tile_size
+        self.tile_workers = tile_workers
+        self.geometric_model = geometric_model
+        self.descriptor_codec = descriptor_codec
+        self.race = race
+        self.coarse_scale = coarse_scale
+        # 缩小的模板灰度图：原灰度图id -> (原灰度图, 缩小的灰度图或None)
+        self._coarse_templates: "OrderedDict[int, tuple]" = OrderedDict()
+        # 竞速模式下落败的方法可能还在后台运行，同一特征提取方法的匹配串行执行，
+        # 落败的方法在阶段之间检查取消标志并尽快释放锁；模板特征缓存（OrderedDict）的读写另外加锁
+        self._method_locks = {'SIFT': threading.Lock(), 'ORB': threading.Lock()}
+        self._feature_cache_lock = threading.Lock()
+        self._feature_cache_stats = {'hits': 0, 'misses': 0}
+        # 特征提取方法 -> 分块特征提取器，同一识别器连续处理同一窗口的画面
+        self._scene_features: Dict[str, TiledFeatureExtractor] = {}
+        # 模板特征缓存：(灰度图id, 方法) -> (灰度图, 坐标数组, 描述子)
+        self._template_feature_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+        # 最近一次场景特征的数组形式：方法 -> [特征点列表, 坐标数组, 匹配索引]
+        self._scene_cache: Dict[str, list] = {}
+        # 特征检测器在第一次使用时才创建
+        self._sift = None
+        self._orb = None
+        self.manifest = manifest if manifest is not None else get_default_manifest()
+    
+    @property
+    def sift(self):
+        """SIFT检测器，第一次访问时创建"""
+        if self._sift is None:
+            self._sift = cv2.SIFT_create()
+        return self._sift
+    
+    @property
+    def orb(self):
+        """ORB检测器，第一次访问时创建"""
+        if self._orb is None:
+            self._orb = cv2.ORB_create()
+        return self._orb
         
+    def scene_features(self, method: str, stage: str = '') -> Optional[TiledFeatureExtractor]:
+        """
+        获取场景的分块特征提取器，未启用分块时返回None
+        
+        Args:
+            method: 特征提取方法 ('SIFT' 或 'ORB')
+            stage: '' 为原分辨率画面，'coarse' 为由粗到细识别中缩小的画面（小块边长按比例缩小）
+        """
+        if self.tile_size <= 0:
+            return None
+        key = method + stage
+        if key not in self._scene_features:
+            factory = cv2.SIFT_create if method == 'SIFT' else cv2.ORB_create
+            tile_size = self.tile_size if not stage else max(64, int(self.tile_size * self.coarse_scale))
+            self._scene_features[key] = TiledFeatureExtractor(
+                factory, tile_size=tile_size, workers=self.tile_workers)
+        return self._scene_features[key]
+    
     def load_image(self, image_path: str) -> Optional[np.ndarray]:
         """
         加载图像
@@ -51,119 +265,637 @@ class ImageRecognition:
             print(f"加载图像时出错: {e}")
             return None
     
+    def to_gray(self, image: np.ndarray, pooled: bool = False) -> np.ndarray:
+        """
+        转换为灰度图，已是灰度图时原样返回
+        
+        Args:
+            image: BGR或灰度图像
+            pooled: 为True且设置了缓冲池时，灰度图写入池中的缓冲区，调用方用完后应归还
+            
+        Returns:
+            灰度图像
+        """
+        if image.ndim == 2:
+            return image
+        out = None
+        if pooled and self.buffer_pool is not None:
+            out = self.buffer_pool.acquire(image.shape[:2])
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=out)
     
     def feature_match(self, scene_image: np.ndarray, template_image: np.ndarray, 
-                     method: str = 'SIFT') -> List[Dict[str, Any]]:
+                     method: str = 'SIFT', cancelled: Optional[threading.Event] = None) -> List[Dict[str, Any]]:
         """
         特征匹配
         
         Args:
-            scene_image: 场景图像
-            template_image: 模板图像
+            scene_image: 场景图像（BGR或灰度）
+            template_image: 模板图像（BGR或灰度）
             method: 特征提取方法 ('SIFT' 或 'ORB')
+            cancelled: 竞速结束标志，设置后在等待方法锁时和各阶段之间放弃匹配并返回空列表
             
         Returns:
             匹配结果列表
         """
         try:
             # 转换为灰度图
-            scene_gray = cv2.cvtColor(scene_image, cv2.COLOR_BGR2GRAY)
-            template_gray = cv2.cvtColor(template_image, cv2.COLOR_BGR2GRAY)
+            scene_gray = self.to_gray(scene_image)
+            template_gray = self.to_gray(template_image)
             
             # 选择特征提取器
-            if method == 'SIFT':
-                detector = self.sift
-            elif method == 'ORB':
-                detector = self.orb
-            else:
+            if method not in self._method_locks:
                 print(f"不支持的特征提取方法: {method}")
                 return []
+            lock = self._method_locks[method]
+            if cancelled is None:
+                lock.acquire()
+            else:
+                while not lock.acquire(timeout=RACE_CANCEL_POLL):
+                    _check_cancelled(cancelled)
+            try:
+                _check_cancelled(cancelled)
+                detector = self.sift if method == 'SIFT' else self.orb
+                if self.coarse_scale < 1.0:
+                    results = self._coarse_to_fine(scene_gray, template_gray, method, detector, cancelled)
+                    if results is not None:
+                        return results
+                return self._feature_match(scene_gray, template_gray, method, detector, cancelled=cancelled)
+            finally:
+                lock.release()
             
-            # 提取特征点和描述子
-            kp1, des1 = detector.detectAndCompute(template_gray, None)
+        except _RaceCancelled:
+            return []
+        except Exception as e:
+            print(f"特征匹配时出错: {e}")
+            return []
+    
+    def _feature_match(self, scene_gray: np.ndarray, template_gray: np.ndarray,
+                       method: str, detector, stage: str = '',
+                       cancelled: Optional[threading.Event] = None) -> List[Dict[str, Any]]:
+        """
+        特征匹配的实现，调用方持有该方法的锁；设置了cancelled时在提取特征、匹配和拟合之间抛出_RaceCancelled
+        
+        stage为 'coarse'（缩小的画面）或 'refine'（原分辨率的局部窗口）时场景特征分开缓存，
+        不与整幅原分辨率画面的缓存互相覆盖；局部窗口不使用分块缓存
+        """
+        # 提取特征点和描述子，模板特征按灰度图缓存
+        template_points, des1 = self._template_features(template_gray, method, detector)
+        _check_cancelled(cancelled)
+        # 启用分块缓存时只对画面中变化的小块重新提取特征
+        tiled = self.scene_features(method, stage) if stage != 'refine' else None
+        if tiled is not None:
+            # 竞速结束后不再提取新的小块，已提取的小块留给之后的识别复用
+            features = tiled.detect_and_compute(scene_gray, cancelled)
+            _check_cancelled(cancelled)
+            kp2, des2 = features
+        else:
             kp2, des2 = detector.detectAndCompute(scene_gray, None)
+        
+        if des1 is None or des2 is None:
+            print("未找到足够的特征点")
+            return []
+        
+        # 场景特征点坐标和FLANN索引随场景特征缓存，画面未变化时多个模板共用
+        _check_cancelled(cancelled)
+        scene = self._scene_arrays(method + stage, kp2, des2)
+        
+        # 特征匹配，得到匹配点在模板和场景特征中的序号数组
+        if method == 'SIFT' and self.descriptor_codec is not None:
+            if scene[2] is None:
+                scene[2] = CompactIndex(self.descriptor_codec.encode(des2))
+            query_idx, train_idx = compact_ratio_test_matches(
+                des1, des2, self._template_codes(template_gray, des1), scene[2], RATIO_TEST)
+        elif method == 'SIFT':
+            if scene[2] is None and len(des2) >= 2:
+                scene[2] = cv2.flann_Index(des2, FLANN_INDEX_PARAMS)
+            query_idx, train_idx = ratio_test_matches(des1, des2, index=scene[2])
+        else:
+            query_idx, train_idx = cross_check_matches(des1, des2)
+        
+        # 匹配点不足MIN_INLIERS时不可能得到足够的内点
+        if len(query_idx) < MIN_INLIERS:
+            print("匹配点不足，无法计算位置")
+            return []
+        
+        # 提取匹配点的坐标
+        _check_cancelled(cancelled)
+        src_pts = template_points[query_idx].reshape(-1, 1, 2)
+        dst_pts = scene[1][train_idx].reshape(-1, 1, 2)
+        
+        # 估计模板到场景的几何变换（配置的模型失败或结果不合理时退回单应矩阵）
+        h, w = template_gray.shape
+        estimate = self.estimate_box(src_pts, dst_pts, w, h)
+        if estimate is None:
+            print("无法计算模板在场景中的位置")
+            return []
+        dst, mask, model = estimate
+        
+        # 计算中心点和边界框
+        quad = dst.reshape(-1, 2)
+        center_x, center_y = quad.mean(axis=0)
+        min_x, min_y = quad.min(axis=0)
+        max_x, max_y = quad.max(axis=0)
+        
+        # 计算置信度（基于内点比例）
+        inliers_count = int(np.count_nonzero(mask)) if mask is not None else 0
+        confidence = inliers_count / len(mask) if mask is not None else 0
+        
+        results = []
+        if confidence >= 0.3:  # 特征匹配的置信度阈值可以设置得更低
+            inlier_points = dst_pts.reshape(-1, 2)[np.asarray(mask).ravel() != 0][:MAX_INLIER_POINTS]
+            results.append({
+                'confidence': confidence,
+                'center': (int(center_x), int(center_y)),
+                'top_left': (int(min_x), int(min_y)),
+                'bottom_right': (int(max_x), int(max_y)),
+                'width': int(max_x - min_x),
+                'height': int(max_y - min_y),
+                'corners': quad.astype(int),
+                'matches_count': len(query_idx),
+                'inliers_count': inliers_count,
+                'inlier_points': inlier_points.astype(np.float32),
+                'method': f'feature_match_{method}',
+                'model': model
+            })
+        
+        return results
+    
+    def _coarse_template(self, template_gray: np.ndarray) -> Optional[np.ndarray]:
+        """按coarse_scale缩小的模板灰度图，缩小后太小时返回None；同一个灰度图对象只缩小一次"""
+        key = id(template_gray)
+        with self._feature_cache_lock:
+            cached = self._coarse_templates.get(key)
+        if cached is not None and cached[0] is template_gray:
+            return cached[1]
+        small = None
+        if min(template_gray.shape[:2]) * self.coarse_scale >= COARSE_MIN_TEMPLATE_SIDE:
+            small = cv2.resize(template_gray, None, fx=self.coarse_scale, fy=self.coarse_scale,
+                               interpolation=cv2.INTER_AREA)
+        with self._feature_cache_lock:
+            self._coarse_templates[key] = (template_gray, small)
+            while len(self._coarse_templates) > TEMPLATE_FEATURE_CACHE_SIZE:
+                self._coarse_templates.popitem(last=False)
+        return small
+    
+    def _coarse_to_fine(self, scene_gray: np.ndarray, template_gray: np.ndarray, method: str, detector,
+                        cancelled: Optional[threading.Event] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        由粗到细的特征匹配：在缩小的画面上用缩小的模板定位，再在粗定位附近的原分辨率窗口中细化，
+        结果坐标为原分辨率坐标；细化失败时返回换算后的粗定位结果
+        
+        Returns:
+            匹配结果列表，模板缩小后太小时返回None（由调用方在原分辨率上识别）
+        """
+        small_template = self._coarse_template(template_gray)
+        if small_template is None:
+            return None
+        scale = self.coarse_scale
+        height, width = scene_gray.shape[:2]
+        small_size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        small_scene = None
+        if self.buffer_pool is not None:
+            small_scene = self.buffer_pool.acquire((small_size[1], small_size[0]))
+        try:
+            small_scene = cv2.resize(scene_gray, small_size, dst=small_scene, interpolation=cv2.INTER_AREA)
+            coarse = self._feature_match(small_scene, small_template, method, detector, stage='coarse',
+                                         cancelled=cancelled)
+        finally:
+            if self.buffer_pool is not None:
+                self.buffer_pool.release(small_scene)
+        if not coarse:
+            return []
+        
+        # 粗定位框换算到原分辨率，四周扩展后作为细化窗口
+        hit = _map_result(coarse[0], 1.0 / scale, 0, 0)
+        h, w = template_gray.shape[:2]
+        pad = int(max(w, h) * COARSE_REFINE_MARGIN + COARSE_REFINE_PADDING / scale)
+        (left, top), (right, bottom) = hit['top_left'], hit['bottom_right']
+        left, top = max(left - pad, 0), max(top - pad, 0)
+        right, bottom = min(right + pad, width), min(bottom + pad, height)
+        refined = []
+        if right - left >= w // 2 and bottom - top >= h // 2:
+            refined = self._feature_match(scene_gray[top:bottom, left:right], template_gray, method, detector,
+                                          stage='refine', cancelled=cancelled)
+        result = _map_result(refined[0], 1.0, left, top) if refined else hit
+        result['coarse_scale'] = scale
+        return [result]
+    
+    def _template_features(self, template_gray: np.ndarray, method: str, detector):
+        """
+        提取模板特征，返回 (特征点坐标数组, 描述子)，同一个灰度图对象只提取一次
+        
+        Args:
+            template_gray: 模板灰度图（以路径加载的模板每次都是同一个缓存对象）
+            method: 特征提取方法
+            detector: 特征检测器
+        """
+        key = (id(template_gray), method)
+        with self._feature_cache_lock:
+            cached = self._template_feature_cache.get(key)
+            hit = cached is not None and cached[0] is template_gray
+            self._feature_cache_stats['hits' if hit else 'misses'] += 1
+        if hit:
+            return cached[1], cached[2]
+        
+        keypoints, descriptors = detector.detectAndCompute(template_gray, None)
+        points = cv2.KeyPoint_convert(keypoints) if keypoints else np.empty((0, 2), np.float32)
+        with self._feature_cache_lock:
+            self._template_feature_cache[key] = (template_gray, points, descriptors)
+            while len(self._template_feature_cache) > TEMPLATE_FEATURE_CACHE_SIZE:
+                self._template_feature_cache.popitem(last=False)
+        return points, descriptors
+    
+    def share_template_features(self, other: "ImageRecognition"):
+        """
+        与另一个识别器共用模板特征缓存（包括锁和命中统计），用于同一进程内服务多个窗口的识别器
+        
+        Args:
+            other: 提供缓存的识别器
+        """
+        self._template_feature_cache = other._template_feature_cache
+        self._feature_cache_lock = other._feature_cache_lock
+        self._feature_cache_stats = other._feature_cache_stats
+    
+    def template_feature_stats(self) -> Dict[str, Any]:
+        """模板特征缓存的条目数和命中统计"""
+        with self._feature_cache_lock:
+            hits, misses = self._feature_cache_stats['hits'], self._feature_cache_stats['misses']
+            entries = len(self._template_feature_cache)
+        total = hits + misses
+        return {
+            'entries': entries,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 4) if total else 0.0,
+        }
+    
+    def _template_codes(self, template_gray: np.ndarray, des1: np.ndarray) -> np.ndarray:
+        """模板的紧凑描述子，随模板特征一起缓存"""
+        key = (id(template_gray), 'SIFT')
+        with self._feature_cache_lock:
+            cached = self._template_feature_cache.get(key)
+        if cached is None or cached[0] is not template_gray:
+            return self.descriptor_codec.encode(des1)
+        if len(cached) < 4:
+            cached = cached + (self.descriptor_codec.encode(des1),)
+            with self._feature_cache_lock:
+                self._template_feature_cache[key] = cached
+        return cached[3]
+    
+    def _scene_arrays(self, method: str, keypoints, descriptors) -> list:
+        """
+        场景特征的数组形式：[特征点列表, 坐标数组, 匹配索引(FLANN或紧凑描述子，按需创建)]
+        分块缓存返回同一组特征时直接复用
+        """
+        cached = self._scene_cache.get(method)
+        if cached is not None and cached[0] is keypoints:
+            return cached
+        points = cv2.KeyPoint_convert(keypoints) if keypoints else np.empty((0, 2), np.float32)
+        cached = [keypoints, points, None]
+        self._scene_cache[method] = cached
+        return cached
+    
+    def estimate_box(self, src_pts: np.ndarray, dst_pts: np.ndarray, w: int, h: int):
+        """
+        估计模板四个角在场景中的位置，依次尝试配置的模型和单应矩阵，
+        取第一个内点数不少于MIN_INLIERS且通过框一致性检查的结果
+        
+        Args:
+            src_pts: 模板上的匹配点 (N, 1, 2)
+            dst_pts: 场景上的匹配点 (N, 1, 2)
+            w: 模板宽度
+            h: 模板高度
             
-            if des1 is None or des2 is None:
-                print("未找到足够的特征点")
-                return []
-            
-            # 特征匹配
-            if method == 'SIFT':
-                # 使用FLANN匹配器
-                FLANN_INDEX_KDTREE = 1
-                index_params = dict(algorithm=FLANN_INDEX_KDTREE, trees=5)
-                search_params = dict(checks=50)
-                flann = cv2.FlannBasedMatcher(index_params, search_params)
-                matches = flann.knnMatch(des1, des2, k=2)
-                
-                # 使用Lowe's ratio test筛选好的匹配
-                good_matches = []
-                for match_pair in matches:
-                    if len(match_pair) == 2:
-                        m, n = match_pair
-                        if m.distance < 0.7 * n.distance:
-                            good_matches.append(m)
+        Returns:
+            (四个角 (4, 1, 2), 内点掩码, 模型名称)，全部失败时返回None
+        """
+        corners = np.float32([[0, 0], [w, 0], [w, h], [0, h]]).reshape(-1, 1, 2)
+        models = [self.geometric_model]
+        if self.geometric_model != MODEL_HOMOGRAPHY:
+            models.append(MODEL_HOMOGRAPHY)
+        
+        for model in models:
+            if model == MODEL_MEDIAN:
+                estimate = self._estimate_median(src_pts, dst_pts)
+            elif model == MODEL_SIMILARITY:
+                matrix, mask = cv2.estimateAffinePartial2D(
+                    src_pts, dst_pts, method=cv2.RANSAC, ransacReprojThreshold=REPROJ_THRESHOLD)
+                estimate = (matrix, mask) if matrix is not None and self._rotation_ok(matrix) else None
             else:
-                # 使用BF匹配器
-                bf = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True)
-                matches = bf.match(des1, des2)
-                good_matches = sorted(matches, key=lambda x: x.distance)
-            
-            # 需要至少4个匹配点来计算单应矩阵
-            if len(good_matches) < 4:
-                print("匹配点不足，无法计算位置")
-                return []
-            
-            # 提取匹配点的坐标
-            src_pts = np.float32([kp1[m.queryIdx].pt for m in good_matches]).reshape(-1, 1, 2)
-            dst_pts = np.float32([kp2[m.trainIdx].pt for m in good_matches]).reshape(-1, 1, 2)
+                matrix, mask = cv2.findHomography(src_pts, dst_pts, cv2.RANSAC, REPROJ_THRESHOLD)
+                estimate = (matrix, mask) if matrix is not None else None
+            if estimate is None:
+                continue
             
-            # 计算单应矩阵
-            M, mask = cv2.findHomography(src_pts, dst_pts, cv2.RANSAC, 5.0)
+            matrix, mask = estimate
+            if mask is None or int(np.count_nonzero(mask)) < MIN_INLIERS:
+                continue
+            if matrix.shape == (3, 3):
+                dst = cv2.perspectiveTransform(corners, matrix)
+            else:
+                dst = cv2.transform(corners, matrix)
+            if self._box_consistent(dst, w, h):
+                return dst, mask, model
+        return None
+    
+    @staticmethod
+    def _estimate_median(src_pts: np.ndarray, dst_pts: np.ndarray):
+        """
+        平移+缩放的中位数闭式解：缩放取匹配点对间距之比的中位数，平移取残差的中位数
+        
+        Returns:
+            (2x3变换矩阵, 内点掩码)，匹配点不足时返回None
+        """
+        src = src_pts.reshape(-1, 2)
+        dst = dst_pts.reshape(-1, 2)
+        count = len(src)
+        # 每个点与相隔一半的点配对，避免O(N^2)的全部点对
+        partner = (np.arange(count) + count // 2) % count
+        src_dist = np.linalg.norm(src - src[partner], axis=1)
+        dst_dist = np.linalg.norm(dst - dst[partner], axis=1)
+        valid = src_dist > 2.0
+        if np.count_nonzero(valid) < 2:
+            return None
+        
+        scale = float(np.median(dst_dist[valid] / src_dist[valid]))
+        offset = np.median(dst - scale * src, axis=0)
+        residual = np.linalg.norm(dst - (scale * src + offset), axis=1)
+        mask = (residual < REPROJ_THRESHOLD).astype(np.uint8).reshape(-1, 1)
+        if int(mask.sum()) < 4:
+            return None
+        
+        matrix = np.float32([[scale, 0, offset[0]], [0, scale, offset[1]]])
+        return matrix, mask
+    
+    @staticmethod
+    def _rotation_ok(matrix: np.ndarray) -> bool:
+        """平移+缩放模型的旋转角度是否在允许范围内"""
+        angle = np.degrees(np.arctan2(matrix[1, 0], matrix[0, 0]))
+        return abs(angle) <= MAX_ROTATION_DEGREES
+    
+    @staticmethod
+    def _box_consistent(dst: np.ndarray, w: int, h: int) -> bool:
+        """
+        匹配框一致性检查：四边形必须是凸的，缩放比例和长宽比都要与模板相符
+        
+        Args:
+            dst: 模板四个角在场景中的位置
+            w: 模板宽度
+            h: 模板高度
+        """
+        quad = dst.reshape(-1, 2)
+        if not np.all(np.isfinite(quad)) or not cv2.isContourConvex(quad.astype(np.float32)):
+            return False
+        box_w = np.ptp(quad[:, 0])
+        box_h = np.ptp(quad[:, 1])
+        if box_w <= 0 or box_h <= 0:
+            return False
+        
+        scale_x, scale_y = box_w / w, box_h / h
+        if not (MIN_BOX_SCALE <= scale_x <= MAX_BOX_SCALE and MIN_BOX_SCALE <= scale_y <= MAX_BOX_SCALE):
+            return False
+        return abs(scale_x / scale_y - 1.0) <= MAX_ASPECT_DEVIATION
+    
+    def load_template(self, template_path) -> Optional[np.ndarray]:
+        """
+        加载模板图像，按路径缓存，文件修改后自动重新加载
+        
+        Args:
+            template_path: 模板图像路径，非路径参数直接交给load_image
             
-            if M is None:
-                print("无法计算单应矩阵")
-                return []
+        Returns:
+            图像数组或None
+        """
+        if not isinstance(template_path, str):
+            return self.load_image(template_path)
+        
+        try:
+            mtime = os.path.getmtime(template_path)
+        except OSError:
+            return self.load_image(template_path)
+        
+        key = os.path.abspath(template_path)
+        cached = self._template_cache.get(key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        
+        image = self.load_image(template_path)
+        if image is not None:
+            self._template_cache[key] = (mtime, image)
+        return image
+    
+    def load_template_gray(self, template_path) -> Optional[np.ndarray]:
+        """
+        加载模板灰度图，以路径给出的模板按路径缓存
+        
+        Args:
+            template_path: 模板图像路径或图像
             
-            # 计算模板图像的四个角在场景图像中的对应位置
-            h, w = template_gray.shape
-            pts = np.float32([[0, 0], [w, 0], [w, h], [0, h]]).reshape(-1, 1, 2)
-            dst = cv2.perspectiveTransform(pts, M)
+        Returns:
+            灰度图像或None
+        """
+        image = self.load_template(template_path)
+        if image is None or not isinstance(template_path, str):
+            return None if image is None else self.to_gray(image)
+        
+        key = os.path.abspath(template_path)
+        mtime = self._template_cache.get(key, (None,))[0]
+        cached = self._template_gray_cache.get(key)
+        if cached is not None and mtime is not None and cached[0] == mtime:
+            return cached[1]
+        
+        gray = self.to_gray(image)
+        if mtime is not None:
+            self._template_gray_cache[key] = (mtime, gray)
+        return gray
+    
+    def template_match(self, scene_image: np.ndarray, template_image: np.ndarray,
+                       scales: tuple = (1.0,)) -> List[Dict[str, Any]]:
+        """
+        归一化互相关（NCC）模板匹配，适用于特征点很少但尺寸固定的图标
+        
+        Args:
+            scene_image: 场景图像（BGR或灰度）
+            template_image: 模板图像（BGR或灰度）
+            scales: 尝试的模板缩放比例
             
-            # 计算中心点
-            center_x = np.mean(dst[:, 0, 0])
-            center_y = np.mean(dst[:, 0, 1])
+        Returns:
+            匹配结果列表
+        """
+        try:
+            scene_gray = self.to_gray(scene_image)
+            template_gray = self.to_gray(template_image)
             
-            # 计算边界框
-            x_coords = dst[:, 0, 0]
-            y_coords = dst[:, 0, 1]
-            min_x, max_x = np.min(x_coords), np.max(x_coords)
-            min_y, max_y = np.min(y_coords), np.max(y_coords)
+            best = None
+            for scale in scales:
+                if scale == 1.0:
+                    scaled = template_gray
+                else:
+                    scaled = cv2.resize(template_gray, None, fx=scale, fy=scale,
+                                        interpolation=cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR)
+                
+                h, w = scaled.shape
+                if h > scene_gray.shape[0] or w > scene_gray.shape[1] or h < 4 or w < 4:
+                    continue
+                
+                response = cv2.matchTemplate(scene_gray, scaled, cv2.TM_CCOEFF_NORMED)
+                _, max_val, _, max_loc = cv2.minMaxLoc(response)
+                if best is None or max_val > best[0]:
+                    best = (max_val, max_loc, w, h)
             
-            # 计算置信度（基于内点比例）
-            confidence = np.sum(mask) / len(mask) if mask is not None else 0
+            if best is None:
+                print("模板尺寸超出场景范围")
+                return []
             
+            confidence, (min_x, min_y), w, h = best
             results = []
-            if confidence >= 0.3:  # 特征匹配的置信度阈值可以设置得更低
+            if confidence >= self.confidence_threshold:
+                max_x, max_y = min_x + w, min_y + h
                 results.append({
-                    'confidence': confidence,
-                    'center': (int(center_x), int(center_y)),
+                    'confidence': float(confidence),
+                    'center': (int(min_x + w // 2), int(min_y + h // 2)),
                     'top_left': (int(min_x), int(min_y)),
                     'bottom_right': (int(max_x), int(max_y)),
-                    'width': int(max_x - min_x),
-                    'height': int(max_y - min_y),
-                    'corners': dst.reshape(-1, 2).astype(int),
-                    'matches_count': len(good_matches),
-                    'inliers_count': int(np.sum(mask)) if mask is not None else 0,
-                    'method': f'feature_match_{method}'
+                    'width': int(w),
+                    'height': int(h),
+                    'method': 'template_match_NCC'
                 })
             
             return results
             
         except Exception as e:
-            print(f"特征匹配时出错: {e}")
+            print(f"模板匹配时出错: {e}")
             return []
     
+    def select_methods(self, template_image_path) -> List[str]:
+        """
+        根据模板清单选择匹配方法，未收录的模板使用SIFT特征匹配
+        
+        Args:
+            template_image_path: 模板图像路径
+            
+        Returns:
+            匹配方法列表
+        """
+        methods = self.manifest.get_methods(template_image_path) if self.manifest else None
+        methods = methods or ['feature_match_SIFT']
+        if not self.race:
+            return methods
+        
+        # 竞速模式：清单推荐的方法加上NCC和SIFT一起竞速；某个方法已在该模板上稳定胜出时先只运行它
+        candidates = methods + [method for method in RACE_METHODS if method not in methods]
+        dominant = self.dominant_method(template_image_path)
+        if dominant is not None:
+            return [dominant] + [method for method in candidates if method != dominant]
+        return candidates
+    
+    def dominant_method(self, template_image_path) -> Optional[str]:
+        """
+        竞速中稳定胜出的方法：至少RACE_MIN_SAMPLES次竞速且胜出比例不低于RACE_DOMINANCE
+        
+        Args:
+            template_image_path: 模板图像路径
+            
+        Returns:
+            方法名，没有时返回None
+        """
+        if not isinstance(template_image_path, str):
+            return None
+        with self._race_lock:
+            wins = dict(self._race_wins.get(os.path.abspath(template_image_path), {}))
+        total = sum(wins.values())
+        if total < RACE_MIN_SAMPLES:
+            return None
+        method, count = max(wins.items(), key=lambda item: item[1])
+        return method if count >= RACE_DOMINANCE * total else None
+    
+    @classmethod
+    def race_stats(cls) -> Dict[str, Dict[str, int]]:
+        """竞速胜出统计：模板路径 -> {方法: 胜出次数}"""
+        with cls._race_lock:
+            return {path: dict(wins) for path, wins in cls._race_wins.items()}
+    
+    def _record_race_win(self, template_image_path, method: str):
+        if not isinstance(template_image_path, str):
+            return
+        with self._race_lock:
+            wins = self._race_wins.setdefault(os.path.abspath(template_image_path), {})
+            wins[method] = wins.get(method, 0) + 1
+    
+    def run_method(self, method: str, scene_gray: np.ndarray, template_gray: np.ndarray,
+                   cancelled: Optional[threading.Event] = None) -> List[Dict[str, Any]]:
+        """
+        执行一个匹配方法，出错时返回空列表
+        
+        Args:
+            method: 匹配方法
+            scene_gray: 场景灰度图
+            template_gray: 模板灰度图
+            cancelled: 竞速结束标志，特征匹配在设置后尽快放弃
+            
+        Returns:
+            匹配结果列表
+        """
+        try:
+            if method == 'feature_match_SIFT':
+                return self.feature_match(scene_gray, template_gray, 'SIFT', cancelled)
+            if method == 'feature_match_ORB':
+                return self.feature_match(scene_gray, template_gray, 'ORB', cancelled)
+            if method == 'template_match_NCC':
+                return self.template_match(scene_gray, template_gray)
+            print(f"不支持的匹配方法: {method}")
+        except Exception as e:
+            print(f"执行匹配方法 {method} 时出错: {e}")
+        return []
+    
+    def race_methods(self, methods: List[str], scene_gray: np.ndarray, template_gray: np.ndarray,
+                     on_finished=None) -> tuple:
+        """
+        在线程池中并行执行匹配方法，返回第一个有结果的方法，其余方法未开始的取消，
+        已开始的特征匹配在当前阶段结束后放弃，不再占用方法锁阻塞之后的识别
+        
+        Args:
+            methods: 匹配方法列表
+            scene_gray: 场景灰度图，所有方法结束（包括被忽略的方法）之前不能修改
+            template_gray: 模板灰度图
+            on_finished: 所有方法都结束后调用（可能在线程池线程中），用于归还场景灰度图
+            
+        Returns:
+            (胜出的方法, 匹配结果列表)，都没有结果时为 (None, [])
+        """
+        executor = get_race_executor()
+        cancelled = threading.Event()
+        futures = {executor.submit(self.run_method, method, scene_gray, template_gray, cancelled): method
+                   for method in methods}
+        pending = set(futures)
+        winner, results = None, []
+        while pending and winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                found = future.result()
+                if found and (winner is None or found[0]['confidence'] > results[0]['confidence']):
+                    winner, results = futures[future], found
+        
+        cancelled.set()
+        running = [future for future in pending if not future.cancel()]
+        if on_finished is not None:
+            if not running:
+                on_finished()
+            else:
+                remaining = [len(running)]
+                lock = threading.Lock()
+                
+                def finished(_):
+                    with lock:
+                        remaining[0] -= 1
+                        last = remaining[0] == 0
+                    if last:
+                        on_finished()
+                
+                for future in running:
+                    future.add_done_callback(finished)
+        return winner, results
+    
     def find_target_in_scene(self, scene_image_path: str, template_image_path: str, 
                             methods: List[str] = None) -> List[Dict[str, Any]]:
         """
@@ -172,46 +904,101 @@ class ImageRecognition:
         Args:
             scene_image_path: 场景图像路径或PIL Image对象
             template_image_path: 模板图像路径或PIL Image对象
-            methods: 使用的匹配方法列表，默认只使用SIFT特征匹配
+            methods: 使用的匹配方法列表，依次执行并合并结果；默认使用模板清单按优先级排列的方法
+                     （未收录时为SIFT特征匹配），依次执行到第一个有结果的方法为止
             
         Returns:
-            所有匹配结果的列表
+            所有匹配结果的列表（竞速模式下为胜出方法的结果）
         """
+        # 清单给出的方法中靠后的是后备方法，前面的方法有结果时不再执行
+        fallback = methods is None
         if methods is None:
-            methods = ['feature_match_SIFT']
+            methods = self.select_methods(template_image_path)
         
         # 加载图像
         scene_image = self.load_image(scene_image_path)
-        template_image = self.load_image(template_image_path)
+        template_image = self.load_template(template_image_path)
         
         if scene_image is None or template_image is None:
             print("无法加载图像")
             return []
         
+        # 画面相关区域未变化时直接复用上次结果
+        memo_key = self._memo_key(template_image_path, methods, scene_image)
+        if memo_key is not None:
+            cached = self.memo.lookup(scene_image, memo_key)
+            if cached is not None:
+                return cached
+        
         all_results = []
         
-        # 执行SIFT特征匹配
-        for method in methods:
-            try:
-                if method == 'feature_match_SIFT':
-                    results = self.feature_match(scene_image, template_image, 'SIFT')
-                else:
-                    print(f"不支持的匹配方法: {method}")
-                    continue
-                
-                all_results.extend(results)
-                
-            except Exception as e:
-                print(f"执行匹配方法 {method} 时出错: {e}")
-                continue
+        # 灰度图只转换一次，各匹配方法共用；场景灰度图使用缓冲池中的缓冲区
+        scene_gray = self.to_gray(scene_image, pooled=True)
+        template_gray = self.load_template_gray(template_image_path)
+        if template_gray is None:
+            template_gray = self.to_gray(template_image)
+        
+        release_gray = self.buffer_pool is not None and scene_gray is not scene_image
+        try:
+            if self.race and len(methods) > 1:
+                if scene_gray is scene_image:
+                    # 落败的方法在返回后仍可能读取场景灰度图，调用方的画面不能借给它们
+                    scene_gray = scene_gray.copy()
+                all_results = self._find_racing(template_image_path, methods, scene_gray, template_gray,
+                                                release_gray)
+                # 场景灰度图由竞速中最后结束的方法归还
+                release_gray = False
+            else:
+                # 依次执行各匹配方法
+                for method in methods:
+                    all_results.extend(self.run_method(method, scene_gray, template_gray))
+                    if fallback and all_results:
+                        break
+        finally:
+            if release_gray:
+                self.buffer_pool.release(scene_gray)
         
         # 根据置信度排序
         all_results.sort(key=lambda x: x['confidence'], reverse=True)
         
+        if memo_key is not None:
+            self.memo.store(scene_image, memo_key, all_results)
+        
         return all_results
     
+    def _find_racing(self, template_image_path, methods: List[str], scene_gray: np.ndarray,
+                     template_gray: np.ndarray, release_gray: bool) -> List[Dict[str, Any]]:
+        """竞速模式的识别：稳定胜出的方法先单独运行，没有结果时其余方法再竞速"""
+        on_finished = (lambda: self.buffer_pool.release(scene_gray)) if release_gray else None
+        
+        dominant = self.dominant_method(template_image_path)
+        if dominant is not None and dominant == methods[0]:
+            results = self.run_method(dominant, scene_gray, template_gray)
+            if results:
+                self._record_race_win(template_image_path, dominant)
+                if on_finished is not None:
+                    on_finished()
+                return results
+            methods = methods[1:]
+        
+        winner, results = self.race_methods(methods, scene_gray, template_gray, on_finished)
+        if winner is not None:
+            self._record_race_win(template_image_path, winner)
+        return results
+    
+    def _memo_key(self, template_image_path, methods: List[str], scene_image: np.ndarray):
+        """识别结果记忆的键，只对以路径给出的模板启用；键包含模板文件的修改时间，模板替换后旧结果不再命中"""
+        if self.memo is None or not isinstance(template_image_path, str):
+            return None
+        try:
+            mtime = os.path.getmtime(template_image_path)
+        except OSError:
+            mtime = None
+        return (os.path.abspath(template_image_path), mtime, tuple(methods),
+                self.confidence_threshold, scene_image.shape)
+    
     def draw_matches(self, scene_image: np.ndarray, matches: List[Dict[str, Any]], 
-                    output_path: str = None) -> np.ndarray:
+                    output_path: str = None, in_place: bool = False) -> np.ndarray:
         """
         在场景图上绘制匹配结果
         
@@ -219,12 +1006,13 @@ class ImageRecognition:
             scene_image: 场景图像
             matches: 匹配结果列表
             output_path: 输出图像路径，如果为None则不保存
+            in_place: 为True时直接在场景图上绘制，不复制整幅图像
             
         Returns:
             绘制了匹配结果的图像
         """
         try:
-            result_image = scene_image.copy()
+            result_image = scene_image if in_place else scene_image.copy()
             
             for i, match in enumerate(matches):
                 # 选择不同的颜色
@@ -0,0 +1,300 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+按需性能分析
+可以按任务或按步骤开启：cProfile确定性分析，或者低开销的采样分析线程；
+输出 .prof（cProfile）和折叠栈文件 .collapsed（可直接导入 flamegraph.pl、speedscope 等火焰图工具），
+文件按任务、窗口和时间命名；关闭时每个任务/步骤只多一次属性检查
+"""
+
+import cProfile
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from .utils import Colors
+
+# 环境变量优先于 config/settings.py 中的 PROFILER_SETTINGS，值为 'cprofile' 或 'sampling'；
+# 1/true/yes/on 使用 PROFILER_SETTINGS 中的模式，0/false/no/off 关闭
+PROFILE_ENV = "JLTX_PROFILE"
+MODES = ('cprofile', 'sampling')
+_ENV_ON = ('1', 'true', 'yes', 'on')
+_ENV_OFF = ('', '0', 'false', 'no', 'off')
+
+_NULL_CONTEXT = nullcontext()
+
+
+def _profiler_settings() -> dict:
+    try:
+        from config.settings import PROFILER_SETTINGS
+        return PROFILER_SETTINGS
+    except ImportError:
+        return {}
+
+
+def env_mode(value: Optional[str], settings: dict) -> Optional[str]:
+    """
+    解析环境变量JLTX_PROFILE和PROFILER_SETTINGS得到初始分析模式
+
+    Args:
+        value: 环境变量的值，None表示未设置
+        settings: PROFILER_SETTINGS
+
+    Returns:
+        'cprofile'、'sampling' 或 None（关闭）；环境变量的值无法识别时提示并关闭
+    """
+    configured = settings.get('mode', 'sampling')
+    if configured not in MODES:
+        configured = 'sampling'
+    if value is None:
+        return configured if settings.get('enabled') else None
+    value = value.strip().lower()
+    if value in MODES:
+        return value
+    if value in _ENV_ON:
+        return configured
+    if value not in _ENV_OFF:
+        print(f"{Colors.YELLOW}无法识别的{PROFILE_ENV}={value}，性能分析保持关闭"
+              f"（可用值: {', '.join(MODES)}、1 或 0）{Colors.ENDC}")
+    return None
+
+
+def _safe_name(text: str) -> str:
+    return re.sub(r'[\\/:*?"<>|\s]+', '_', str(text)).strip('_') or 'unknown'
+
+
+def _frame_name(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _pstats_name(func) -> str:
+    filename, line, name = func
+    if filename == '~':
+        # 内置函数，例如 <built-in method cv2.matchTemplate>
+        return name
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def collapse_pstats(stats: pstats.Stats, min_seconds: float = 1e-5, max_depth: int = 48) -> Dict[str, int]:
+    """
+    把cProfile统计转换为折叠栈（近似）
+    cProfile只记录调用边，每个函数的自身耗时按各调用方占该函数累计耗时的比例逐层向上分摊
+
+    Args:
+        stats: pstats.Stats
+        min_seconds: 分摊到一条栈上的耗时小于该值时不再展开
+        max_depth: 最大栈深度
+
+    Returns:
+        折叠栈 -> 耗时（微秒）
+    """
+    table = stats.stats
+    collapsed: Counter = Counter()
+
+    def walk(func, weight, path):
+        callers = table[func][4] if func in table else {}
+        callers = {caller: edge for caller, edge in callers.items() if caller not in path}
+        total = sum(edge[3] for edge in callers.values())
+        if not callers or total <= 0 or len(path) >= max_depth:
+            collapsed[";".join(_pstats_name(f) for f in reversed(path))] += weight
+            return
+        for caller, edge in callers.items():
+            share = weight * edge[3] / total
+            if share >= min_seconds:
+                walk(caller, share, path + (caller,))
+
+    for func, (_, _, self_time, _, _) in table.items():
+        if self_time >= min_seconds:
+            walk(func, self_time, (func,))
+    return {stack: int(seconds * 1e6) for stack, seconds in collapsed.items() if seconds * 1e6 >= 1}
+
+
+def write_collapsed(path: str, stacks: Dict[str, int]):
+    """写出折叠栈文件，每行为 '栈;帧 数值'"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for stack, value in sorted(stacks.items(), key=lambda item: -item[1]):
+            f.write(f"{stack} {value}\n")
+
+
+class SamplingProfiler:
+    """
+    采样分析器
+    后台线程每隔interval秒读取目标线程的调用栈并计数，不在目标线程中插入任何钩子
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        """
+        Args:
+            thread_id: 被采样线程的ident
+            interval: 采样间隔（秒）
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
+            self.sample_count += 1
+            del frame
+
+
+class _Session:
+    """一次分析：按模式启动分析器，结束时写出文件"""
+
+    def __init__(self, control: 'ProfilerControl', mode: str, label: str):
+        self.control = control
+        self.mode = mode
+        self.label = label
+        self._profile = None
+        self._sampler = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        self.control._local.active = True
+        if self.mode == 'cprofile':
+            self._profile = cProfile.Profile()
+            try:
+                self._profile.enable()
+            except ValueError as e:
+                # 其他分析工具（或另一个线程的cProfile，Python 3.12+）正在运行
+                print(f"{Colors.YELLOW}无法启动cProfile: {e}{Colors.ENDC}")
+                self._profile = None
+        else:
+            self._sampler = SamplingProfiler(threading.get_ident(), self.control.sample_interval)
+            self._sampler.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.control._local.active = False
+        elapsed = time.perf_counter() - self.started
+        base = os.path.join(self.control.output_dir, self.label)
+        os.makedirs(self.control.output_dir, exist_ok=True)
+        files = []
+        try:
+            if self._profile is not None:
+                self._profile.disable()
+                self._profile.dump_stats(base + ".prof")
+                write_collapsed(base + ".collapsed", collapse_pstats(pstats.Stats(self._profile)))
+                files = [base + ".prof", base + ".collapsed"]
+            elif self._sampler is not None:
+                self._sampler.stop()
+                write_collapsed(base + ".collapsed", self._sampler.samples)
+                files = [base + ".collapsed"]
+        except OSError as e:
+            print(f"{Colors.RED}写出性能分析结果失败: {e}{Colors.ENDC}")
+            return False
+        if files:
+            self.control.written.extend(files)
+            print(f"{Colors.BLUE}性能分析（{self.mode}，{elapsed:.1f}秒）已写入: {', '.join(files)}{Colors.ENDC}")
+        return False
+
+
+class ProfilerControl:
+    """
+    性能分析开关
+    task()/step()在关闭或不匹配时返回共享的空上下文；同一线程中已经在分析时不再嵌套开启
+    """
+
+    def __init__(self, mode: Optional[str] = None, tasks="*", steps: Iterable[str] = (),
+                 output_dir: str = "logs/profiles", sample_interval: float = 0.005):
+        """
+        初始化性能分析开关
+
+        Args:
+            mode: None（关闭）、'cprofile' 或 'sampling'
+            tasks: 需要分析的任务名列表，'*'表示全部任务，空列表表示只分析步骤
+            steps: 需要单独分析的步骤描述（find_and_click_icon的description）
+            output_dir: 输出目录
+            sample_interval: 采样间隔（秒）
+        """
+        self.output_dir = output_dir
+        self.sample_interval = sample_interval
+        self.written: List[str] = []
+        self._local = threading.local()
+        self.configure(mode, tasks, steps)
+
+    def configure(self, mode: Optional[str], tasks="*", steps: Iterable[str] = ()):
+        """切换分析模式和范围（参数同构造函数），下一个任务或步骤开始时生效"""
+        if mode not in (None, '', 'off') + MODES:
+            raise ValueError(f"不支持的性能分析模式: {mode}")
+        self.mode = mode if mode in MODES else None
+        self.tasks = None if tasks == "*" else set(tasks or ())
+        self.steps = set(steps or ())
+
+    def _label(self, *parts: str) -> str:
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
+        return "_".join(_safe_name(part) for part in parts + (stamp,))
+
+    def task(self, task_name: str, window: str = ""):
+        """
+        分析一次任务执行的上下文
+
+        Args:
+            task_name: 任务名（agent.tasks.TASK_REGISTRY中的名字）
+            window: 窗口标题
+        """
+        if self.mode is None or (self.tasks is not None and task_name not in self.tasks) \
+                or getattr(self._local, 'active', False):
+            return _NULL_CONTEXT
+        return _Session(self, self.mode, self._label(task_name, window))
+
+    def step(self, description: str, window=""):
+        """
+        分析单个步骤的上下文，只有配置了该步骤时才开启
+
+        Args:
+            description: 步骤描述
+            window: 窗口标题或窗口句柄（开启分析时才查询标题）
+        """
+        if self.mode is None or description not in self.steps or getattr(self._local, 'active', False):
+            return _NULL_CONTEXT
+        if isinstance(window, int):
+            from .backends import get_backend
+            window = get_backend().get_window_text(window) or f"{window:x}"
+        return _Session(self, self.mode, self._label("step", description, window))
+
+
+_control = None
+_control_lock = threading.Lock()
+
+
+def get_profiler() -> ProfilerControl:
+    """获取进程共享的性能分析开关，初始状态读取环境变量和 PROFILER_SETTINGS"""
+    global _control
+    if _control is None:
+        with _control_lock:
+            if _control is None:
+                settings = _profiler_settings()
+                _control = ProfilerControl(
+                    mode=env_mode(os.environ.get(PROFILE_ENV) or None, settings),
+                    tasks=settings.get('tasks', '*'),
+                    steps=settings.get('steps', []),
+                    output_dir=settings.get('output_dir', 'logs/profiles'),
+                    sample_interval=settings.get('sample_interval', 0.005),
+                )
+    return _control
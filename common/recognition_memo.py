@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+识别结果记忆
+以模板和画面区域哈希为键缓存识别结果：命中区域未变化时直接返回上次结果，
+未命中的结果在整幅画面（或ROI）未变化时同样复用
+"""
+
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+Region = Tuple[int, int, int, int]
+
+
+def region_hash(image: np.ndarray, region: Region) -> int:
+    """
+    计算图像区域的64位哈希
+
+    Args:
+        image: 图像数组
+        region: (left, top, right, bottom)
+
+    Returns:
+        区域哈希值
+    """
+    left, top, right, bottom = region
+    data = np.ascontiguousarray(image[top:bottom, left:right])
+    return zlib.crc32(data) | (zlib.adler32(data) << 32)
+
+
+class RecognitionMemo:
+    """
+    识别结果记忆
+    LRU淘汰，按条目数限制大小，并统计命中率
+    """
+
+    def __init__(self, max_entries: int = 256, padding: int = 8):
+        """
+        初始化识别结果记忆
+
+        Args:
+            max_entries: 最多保存的条目数，超出时淘汰最久未使用的条目
+            padding: 命中区域向外扩展的像素数，覆盖匹配框边缘的抖动
+        """
+        self.max_entries = max_entries
+        self.padding = padding
+        self._entries: "OrderedDict[Hashable, Tuple[Region, int, List[Dict[str, Any]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _result_region(self, image: np.ndarray, results: List[Dict[str, Any]],
+                       roi: Optional[Region]) -> Region:
+        """确定需要哈希的区域：命中时为所有匹配框的外接矩形，未命中时为ROI或整幅画面"""
+        height, width = image.shape[:2]
+        if not results:
+            return roi if roi is not None else (0, 0, width, height)
+
+        left = min(result['top_left'][0] for result in results) - self.padding
+        top = min(result['top_left'][1] for result in results) - self.padding
+        right = max(result['bottom_right'][0] for result in results) + self.padding
+        bottom = max(result['bottom_right'][1] for result in results) + self.padding
+        return max(0, left), max(0, top), min(width, right), min(height, bottom)
+
+    def lookup(self, image: np.ndarray, key: Hashable) -> Optional[List[Dict[str, Any]]]:
+        """
+        查找缓存的识别结果
+
+        Args:
+            image: 当前画面
+            key: 缓存键（模板、匹配方法、阈值、ROI等）
+
+        Returns:
+            区域未变化时返回缓存结果的副本，否则返回None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+        # 哈希计算不持锁，避免多个线程互相等待
+        region, expected_hash, results = entry
+        unchanged = (region[3] <= image.shape[0] and region[2] <= image.shape[1]
+                     and region_hash(image, region) == expected_hash)
+
+        with self._lock:
+            if not unchanged:
+                self.misses += 1
+                return None
+
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self.hits += 1
+            if not results:
+                self.negative_hits += 1
+            return [dict(result) for result in results]
+
+    def store(self, image: np.ndarray, key: Hashable, results: List[Dict[str, Any]],
+              roi: Optional[Region] = None):
+        """
+        保存识别结果
+
+        Args:
+            image: 识别时的画面
+            key: 缓存键
+            results: 识别结果列表（可以为空，表示未找到）
+            roi: 识别时限定的区域，未找到时用它作为哈希区域
+        """
+        region = self._result_region(image, results, roi)
+        entry = (region, region_hash(image, region), [dict(result) for result in results])
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """清空缓存，保留统计"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """命中统计"""
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'negative_hits': self.negative_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+        }
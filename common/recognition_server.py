@@ -0,0 +1,587 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+本地识别服务
+一个服务进程持有识别器、模板缓存和识别线程，多个Agent进程通过本地套接字（Windows上为命名管道）
+发送识别请求；画面经共享内存传递，连接上只传送请求和识别结果。
+连接用密钥认证（连接上的请求会被反序列化），默认使用本机首次运行时生成的随机密钥；
+监听TCP地址时必须显式设置密钥。模板按模板目录中的相对路径请求，服务不读取模板目录以外的文件
+
+用法:
+    python -m tools.recognition_server [--address 127.0.0.1:47651] [--workers 2]
+"""
+
+import os
+import secrets
+import sys
+import threading
+import time
+from collections import OrderedDict
+from multiprocessing import shared_memory
+from multiprocessing.connection import Client, Listener
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .template_manifest import DEFAULT_TEMPLATE_DIR
+from .utils import Colors
+
+# 环境变量：识别服务地址，设置后ImageFinder通过识别服务识别（值为 1 时使用默认地址）
+SERVER_ENV = "JLTX_RECOGNITION_SERVER"
+DEFAULT_PIPE = r"\\.\pipe\jltx-recognition"
+DEFAULT_TCP = ('127.0.0.1', 47651)
+# 环境变量：连接认证密钥，优先于配置
+AUTHKEY_ENV = "JLTX_RECOGNITION_AUTHKEY"
+# 未设置密钥时，本机随机密钥的保存位置（只有当前用户可读）
+DEFAULT_KEY_FILE = os.path.join(os.path.expanduser('~'), '.jltx', 'recognition.key')
+
+
+def _server_settings() -> dict:
+    try:
+        from config.settings import RECOGNITION_SERVER_SETTINGS
+        return RECOGNITION_SERVER_SETTINGS
+    except (ImportError, AttributeError):
+        return {}
+
+
+def parse_address(address: Optional[str] = None):
+    """
+    解析服务地址
+
+    Args:
+        address: 'host:port'、命名管道路径或Unix套接字路径，为空时读取环境变量和配置，都未设置时使用默认地址
+
+    Returns:
+        multiprocessing.connection 可用的地址
+    """
+    if not address:
+        env = os.environ.get(SERVER_ENV, '')
+        address = (env if env not in ('', '1') else '') or _server_settings().get('address', '')
+    if not address:
+        return DEFAULT_PIPE if sys.platform == 'win32' else DEFAULT_TCP
+    if isinstance(address, tuple) or address.startswith('\\\\') or '/' in address:
+        return address
+    host, _, port = address.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def template_name(template_path: str, template_dir: str = DEFAULT_TEMPLATE_DIR) -> Optional[str]:
+    """
+    模板在模板目录中的相对路径（识别请求中的模板名）
+
+    Args:
+        template_path: 模板路径
+        template_dir: 模板目录
+
+    Returns:
+        相对路径（使用 / 分隔），模板不在模板目录中时返回None
+    """
+    root = os.path.realpath(template_dir)
+    path = os.path.realpath(template_path)
+    if os.path.commonpath([root, path]) != root or path == root:
+        return None
+    return os.path.relpath(path, root).replace(os.sep, '/')
+
+
+def configured_authkey() -> Optional[bytes]:
+    """环境变量或配置中显式设置的密钥，都未设置时返回None"""
+    key = os.environ.get(AUTHKEY_ENV) or _server_settings().get('authkey')
+    return str(key).encode('utf-8') if key else None
+
+
+def default_authkey() -> bytes:
+    """
+    连接认证密钥：显式设置的密钥，未设置时使用本机的随机密钥（第一次使用时生成，服务和Agent进程读取同一个文件）
+
+    Returns:
+        密钥
+    """
+    key = configured_authkey()
+    if key is not None:
+        return key
+    path = _server_settings().get('authkey_file') or DEFAULT_KEY_FILE
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        # 先写临时文件再硬链接到目标位置，多个进程同时生成时只有一个密钥生效
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(secrets.token_hex(32).encode('ascii'))
+        try:
+            os.link(temp_path, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(temp_path)
+    with open(path, 'rb') as f:
+        return f.read().strip()
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """打开客户端创建的共享内存，共享内存由客户端负责删除"""
+    segment = shared_memory.SharedMemory(name=name)
+    if os.name == 'posix':
+        # 打开已有共享内存也会登记到本进程的resource_tracker，退出时会被误删
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(segment._name, 'shared_memory')
+    return segment
+
+
+class RecognitionServer:
+    """
+    识别服务
+    每个连接一个线程收发请求，识别在最多workers个请求间并发执行；
+    每个(会话, 阈值)一个识别器（保留各窗口的识别结果记忆和分块特征），模板特征缓存所有识别器共用；
+    连接断开时释放它使用过的识别器，识别器总数超过max_recognizers时释放最久未使用的
+    """
+
+    def __init__(self, address=None, authkey: Optional[bytes] = None, workers: Optional[int] = None,
+                 template_dir: str = DEFAULT_TEMPLATE_DIR, max_recognizers: Optional[int] = None):
+        """
+        初始化识别服务
+
+        Args:
+            address: 服务地址，默认读取配置
+            authkey: 连接认证密钥，默认为 default_authkey()；监听TCP地址时必须传入或在配置/环境变量中设置
+            workers: 同时执行的识别请求数，默认读取配置
+            template_dir: 模板目录，请求中的模板名相对于该目录解析
+            max_recognizers: 保留的识别器数量上限，默认读取配置
+
+        Raises:
+            RuntimeError: 监听TCP地址但没有显式设置密钥
+        """
+        self.address = parse_address(address)
+        if isinstance(self.address, tuple) and authkey is None and configured_authkey() is None:
+            # TCP端口本机任何进程都能连接，不使用保存在本机文件中的默认密钥
+            raise RuntimeError(f"识别服务监听TCP地址时必须设置 RECOGNITION_SERVER_SETTINGS['authkey'] "
+                               f"或环境变量 {AUTHKEY_ENV}")
+        self.authkey = authkey if authkey is not None else default_authkey()
+        self.workers = workers or _server_settings().get('workers', 2)
+        self.template_dir = os.path.realpath(template_dir)
+        self.max_recognizers = max_recognizers or _server_settings().get('max_recognizers', 16)
+        self._slots = threading.BoundedSemaphore(self.workers)
+        self._lock = threading.Lock()
+        # (会话, 阈值) -> 识别器，按最近使用排序
+        self._recognizers: "OrderedDict[tuple, Any]" = OrderedDict()
+        # (会话, 阈值) -> 使用它的连接数
+        self._users: Dict[tuple, int] = {}
+        # 持有共用模板特征缓存的识别器（不用于识别），识别器被释放后模板特征仍然保留
+        self._template_features = None
+        # 已释放的识别器的识别结果记忆统计
+        self._retired_memo = {'hits': 0, 'misses': 0}
+        self._listener = None
+        self._stopping = threading.Event()
+        self.started_at = time.time()
+        self.connections = 0
+        self.requests = 0
+
+    def recognizer(self, session: str, threshold: float, keys: Optional[set] = None):
+        """
+        获取会话的识别器，第一次使用时创建并接入共用的模板特征缓存
+
+        Args:
+            session: 会话名
+            threshold: 置信度阈值
+            keys: 当前连接使用过的识别器键，连接断开时据此释放识别器
+        """
+        key = (session, threshold)
+        with self._lock:
+            recognizer = self._recognizers.get(key)
+            if recognizer is None:
+                from .buffer_pool import get_buffer_pool
+                from .image_finder import create_recognizer
+                recognizer = create_recognizer(threshold, get_buffer_pool())
+                if self._template_features is None:
+                    self._template_features = recognizer
+                    recognizer = create_recognizer(threshold, get_buffer_pool())
+                recognizer.share_template_features(self._template_features)
+                self._recognizers[key] = recognizer
+                # 被淘汰的识别器的连接计数保留，连接断开时照常减少
+                while len(self._recognizers) > self.max_recognizers:
+                    self._retire(self._recognizers.popitem(last=False)[1])
+            self._recognizers.move_to_end(key)
+            if keys is not None and key not in keys:
+                keys.add(key)
+                self._users[key] = self._users.get(key, 0) + 1
+            return recognizer
+
+    def _release(self, keys: set):
+        """连接断开后释放只有它使用的识别器"""
+        with self._lock:
+            for key in keys:
+                users = self._users.get(key, 0) - 1
+                if users > 0:
+                    self._users[key] = users
+                    continue
+                self._users.pop(key, None)
+                recognizer = self._recognizers.pop(key, None)
+                if recognizer is not None:
+                    self._retire(recognizer)
+
+    def _retire(self, recognizer):
+        """累计被释放的识别器的识别结果记忆统计，调用方持有锁"""
+        if recognizer.memo is not None:
+            stats = recognizer.memo.stats()
+            self._retired_memo['hits'] += stats['hits']
+            self._retired_memo['misses'] += stats['misses']
+
+    def template_path(self, name):
+        """
+        把请求中的模板名解析为模板目录中的路径
+
+        Args:
+            name: 模板在模板目录中的相对路径；非字符串（模板图像数组）原样返回
+
+        Raises:
+            ValueError: 模板名解析到模板目录以外
+        """
+        if not isinstance(name, str):
+            return name
+        path = os.path.realpath(os.path.join(self.template_dir, name))
+        if os.path.commonpath([self.template_dir, path]) != self.template_dir or path == self.template_dir:
+            raise ValueError(f"模板不在模板目录中: {name}")
+        return path
+
+    def start(self) -> threading.Thread:
+        """在后台线程中开始监听，返回监听线程"""
+        self._listener = Listener(self.address, authkey=self.authkey)
+        self.address = self._listener.address
+        thread = threading.Thread(target=self._accept_loop, name="recognition-server", daemon=True)
+        thread.start()
+        return thread
+
+    def serve_forever(self):
+        """监听并处理请求，直到close()或收到shutdown请求"""
+        thread = self.start()
+        while thread.is_alive():
+            thread.join(0.5)
+
+    def _accept_loop(self):
+        print(f"{Colors.GREEN}识别服务已启动: {self.address}{Colors.ENDC}")
+        while not self._stopping.is_set():
+            try:
+                conn = self._listener.accept()
+            except (OSError, EOFError):
+                if self._stopping.is_set():
+                    break
+                continue
+            except Exception as e:
+                # 认证失败等错误只影响这一个连接
+                print(f"接受识别服务连接失败: {e}")
+                continue
+            self.connections += 1
+            threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+
+    def _serve_connection(self, conn):
+        segments: Dict[str, shared_memory.SharedMemory] = {}
+        keys: set = set()
+        try:
+            while not self._stopping.is_set():
+                try:
+                    request = conn.recv()
+                except (EOFError, OSError):
+                    break
+                try:
+                    reply = {'ok': True, 'result': self.handle(request, segments, keys)}
+                except Exception as e:
+                    reply = {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+                conn.send(reply)
+                if request.get('op') == 'shutdown':
+                    self.close()
+        finally:
+            self._release(keys)
+            for segment in segments.values():
+                segment.close()
+            conn.close()
+
+    def _frame(self, spec, segments: Dict[str, shared_memory.SharedMemory]) -> np.ndarray:
+        """由共享内存描述 (名称, 形状, 数据类型) 得到画面数组（不复制）"""
+        name, shape, dtype = spec
+        segment = segments.get(name)
+        if segment is None:
+            # 客户端画面变大时会换用新的共享内存，旧的不再使用
+            for old in segments.values():
+                old.close()
+            segments.clear()
+            segment = segments[name] = _attach(name)
+        return np.ndarray(shape, dtype=np.dtype(dtype), buffer=segment.buf)
+
+    def handle(self, request: Dict[str, Any], segments: Dict[str, shared_memory.SharedMemory],
+               keys: Optional[set] = None):
+        """
+        处理一个请求
+
+        Args:
+            request: 请求，op为 'find'、'find_multiple'、'stats'、'ping' 或 'shutdown'
+            segments: 本连接已打开的共享内存
+            keys: 本连接使用过的识别器键
+
+        Returns:
+            请求结果
+        """
+        op = request.get('op')
+        if op == 'ping':
+            return 'pong'
+        if op == 'stats':
+            return self.stats()
+        if op == 'shutdown':
+            return None
+        if op not in ('find', 'find_multiple'):
+            raise ValueError(f"不支持的请求: {op}")
+
+        if 'frame' not in request:
+            # 不按客户端给出的路径读取文件，画面只经共享内存传递
+            raise ValueError("请求中没有共享内存画面")
+        # 模板同样只按模板目录中的名称读取
+        templates = [request['template']] if op == 'find' else list(request['templates'])
+        paths = [self.template_path(name) for name in templates]
+        self.requests += 1
+        scene = self._frame(request['frame'], segments)
+        recognizer = self.recognizer(request.get('session', ''), request.get('threshold', 0.8), keys)
+        methods = request.get('methods')
+        with self._slots:
+            if op == 'find':
+                return recognizer.find_target_in_scene(scene, paths[0], methods)
+            return {name: recognizer.find_target_in_scene(scene, path, methods)
+                    for name, path in zip(templates, paths)}
+
+    def stats(self) -> Dict[str, Any]:
+        """服务统计：请求数、识别器数、模板特征缓存和识别结果记忆的命中情况（包括已释放的识别器）"""
+        with self._lock:
+            recognizers = list(self._recognizers.values())
+            template_features = self._template_features
+            memo = dict(self._retired_memo)
+        for recognizer in recognizers:
+            if recognizer.memo is not None:
+                stats = recognizer.memo.stats()
+                memo['hits'] += stats['hits']
+                memo['misses'] += stats['misses']
+        lookups = memo['hits'] + memo['misses']
+        memo['hit_rate'] = round(memo['hits'] / lookups, 4) if lookups else 0.0
+        stats = {
+            'uptime': round(time.time() - self.started_at, 1),
+            'connections': self.connections,
+            'requests': self.requests,
+            'recognizers': len(recognizers),
+            'template_features': template_features.template_feature_stats() if template_features else None,
+            'memo': memo,
+        }
+        try:
+            import resource
+            # Linux上ru_maxrss的单位是KB
+            stats['max_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        except ImportError:
+            pass
+        return stats
+
+    def close(self):
+        """停止监听"""
+        if self._stopping.is_set():
+            return
+        self._stopping.set()
+        if self._listener is not None:
+            # 连接一次唤醒阻塞在accept()中的监听线程
+            try:
+                Client(self.address, authkey=self.authkey).close()
+            except (OSError, EOFError):
+                pass
+            try:
+                self._listener.close()
+            except OSError:
+                pass
+
+
+class RecognitionClient:
+    """
+    识别服务客户端
+    一个连接、一块按需增大的共享内存，请求按顺序发送（多线程调用时加锁）
+    """
+
+    def __init__(self, address=None, authkey: Optional[bytes] = None):
+        """
+        连接识别服务
+
+        Args:
+            address: 服务地址，默认读取环境变量和配置
+            authkey: 连接认证密钥，默认为 default_authkey()
+        """
+        self.address = parse_address(address)
+        self.conn = Client(self.address, authkey=authkey if authkey is not None else default_authkey())
+        self._segment: Optional[shared_memory.SharedMemory] = None
+        self._lock = threading.Lock()
+
+    def _frame_spec(self, frame: np.ndarray) -> tuple:
+        """把画面复制到共享内存，返回 (名称, 形状, 数据类型)"""
+        if self._segment is None or self._segment.size < frame.nbytes:
+            self._release_segment()
+            self._segment = shared_memory.SharedMemory(create=True, size=frame.nbytes)
+        view = np.ndarray(frame.shape, dtype=frame.dtype, buffer=self._segment.buf)
+        np.copyto(view, frame)
+        return self._segment.name, frame.shape, frame.dtype.str
+
+    def call(self, request: Dict[str, Any], frame: Optional[np.ndarray] = None):
+        """
+        发送请求并等待结果
+
+        Args:
+            request: 请求
+            frame: 画面，经共享内存传递
+
+        Returns:
+            请求结果，服务端出错时抛出RuntimeError，连接断开时抛出OSError或EOFError
+        """
+        with self._lock:
+            if frame is not None:
+                request = dict(request, frame=self._frame_spec(frame))
+            self.conn.send(request)
+            reply = self.conn.recv()
+        if not reply['ok']:
+            raise RuntimeError(reply['error'])
+        return reply['result']
+
+    def stats(self) -> Dict[str, Any]:
+        return self.call({'op': 'stats'})
+
+    def shutdown(self):
+        """请求服务停止"""
+        self.call({'op': 'shutdown'})
+
+    def _release_segment(self):
+        if self._segment is not None:
+            self._segment.close()
+            self._segment.unlink()
+            self._segment = None
+
+    def close(self):
+        with self._lock:
+            self._release_segment()
+            self.conn.close()
+
+
+class RemoteRecognition:
+    """
+    通过识别服务识别的识别器，find_target_in_scene与ImageRecognition的接口相同；
+    识别服务断开时改用本进程的识别器
+    """
+
+    # 识别结果记忆在服务端
+    memo = None
+
+    def __init__(self, client: RecognitionClient, confidence_threshold: float = 0.8, session: str = ''):
+        """
+        Args:
+            client: 识别服务客户端
+            confidence_threshold: 置信度阈值
+            session: 会话名（通常为进程号和窗口句柄），服务端为每个会话保留识别结果记忆和分块特征
+        """
+        self.client = client
+        self.confidence_threshold = confidence_threshold
+        self.session = session
+        # 服务断开后改用的本进程识别器；模板目录以外的模板也在本进程识别
+        self._local = None
+        self._local_fallback = None
+
+    def _request(self, op: str, scene, **fields) -> tuple:
+        """构造请求，画面统一在本进程加载后经共享内存传递；场景图无法加载时画面为None"""
+        request = dict(fields, op=op, session=self.session, threshold=self.confidence_threshold)
+        if isinstance(scene, np.ndarray):
+            return request, scene
+        if isinstance(scene, str):
+            import cv2
+            return request, cv2.imread(scene)
+        from .backends.base import pil_to_bgr
+        return request, pil_to_bgr(scene)
+
+    def _local_recognizer(self):
+        """本进程的识别器，第一次使用时创建"""
+        if self._local_fallback is None:
+            from .buffer_pool import get_buffer_pool
+            from .image_finder import create_recognizer
+            self._local_fallback = create_recognizer(self.confidence_threshold, get_buffer_pool())
+        return self._local_fallback
+
+    def _fallback(self, error):
+        print(f"{Colors.YELLOW}识别服务不可用（{error}），改用本进程识别{Colors.ENDC}")
+        self._local = self._local_recognizer()
+        return self._local
+
+    @staticmethod
+    def _template(template):
+        """请求中的模板名：模板目录中的相对路径，模板目录以外的模板返回None（在本进程识别）"""
+        return template_name(template) if isinstance(template, str) else template
+
+    def find_target_in_scene(self, scene_image_path, template_image_path,
+                             methods: List[str] = None) -> List[Dict[str, Any]]:
+        """在场景图中找到目标图的位置，参数和返回值与ImageRecognition.find_target_in_scene相同"""
+        if self._local is not None:
+            return self._local.find_target_in_scene(scene_image_path, template_image_path, methods)
+        name = self._template(template_image_path)
+        if name is None:
+            return self._local_recognizer().find_target_in_scene(scene_image_path, template_image_path, methods)
+        request, frame = self._request('find', scene_image_path, template=name, methods=methods)
+        if frame is None:
+            print(f"无法加载图像: {scene_image_path}")
+            return []
+        try:
+            return self.client.call(request, frame)
+        except (OSError, EOFError) as e:
+            return self._fallback(e).find_target_in_scene(scene_image_path, template_image_path, methods)
+
+    def find_multiple(self, scene_image_path, template_paths: List[str],
+                      methods: List[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        在同一画面中查找多个模板，画面只传送一次
+
+        Returns:
+            模板路径 -> 匹配结果列表
+        """
+        names = {path: self._template(path) for path in template_paths}
+        remote = [path for path in template_paths if names[path] is not None]
+        if self._local is None and remote:
+            request, frame = self._request('find_multiple', scene_image_path,
+                                           templates=[names[path] for path in remote], methods=methods)
+            if frame is None:
+                print(f"无法加载图像: {scene_image_path}")
+                return {path: [] for path in template_paths}
+            try:
+                found = self.client.call(request, frame)
+                results = {path: found[names[path]] for path in remote}
+                # 模板目录以外的模板在本进程识别
+                for path in template_paths:
+                    if path not in results:
+                        results[path] = self._local_recognizer().find_target_in_scene(scene_image_path, path, methods)
+                return results
+            except (OSError, EOFError) as e:
+                self._fallback(e)
+        local = self._local if self._local is not None else self._local_recognizer()
+        return {path: local.find_target_in_scene(scene_image_path, path, methods)
+                for path in template_paths}
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def connect_remote_recognition(confidence_threshold: float = 0.8, session: str = '') -> Optional[RemoteRecognition]:
+    """
+    连接识别服务（进程内共用一个连接）
+
+    Args:
+        confidence_threshold: 置信度阈值
+        session: 会话名
+
+    Returns:
+        远程识别器，服务不可用时返回None
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            try:
+                _client = RecognitionClient()
+            except (OSError, EOFError) as e:
+                print(f"{Colors.YELLOW}无法连接识别服务: {e}{Colors.ENDC}")
+                return None
+            import atexit
+            atexit.register(_client.close)
+            print(f"已连接识别服务: {_client.address}")
+    return RemoteRecognition(_client, confidence_threshold, session)
@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+区域监视器
+只截取窗口中的一小块区域，用灰度NCC模板匹配高频轮询按钮是否出现，
+比每次截取并识别整个窗口的CPU开销小得多
+"""
+
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .backends import get_backend
+from .buffer_pool import get_buffer_pool
+from .governor import BACKGROUND, get_governor
+
+Region = Tuple[int, int, int, int]
+
+# (窗口句柄, 模板文件名) -> 上次出现的位置，同一窗口中同一按钮下次出现时先只监视这附近
+_last_seen: Dict[Tuple[int, str], Region] = {}
+
+
+def _watcher_settings() -> dict:
+    try:
+        from config.settings import WATCHER_SETTINGS
+        return WATCHER_SETTINGS
+    except (ImportError, AttributeError):
+        return {}
+
+
+class RegionWatcher:
+    """
+    区域监视器
+    poll()截取一次区域并匹配，wait()按固定间隔轮询直到模板出现或超时
+    """
+
+    def __init__(self, hwnd: int, template_path: str, region: Optional[Region] = None,
+                 threshold: float = 0.8, interval: Optional[float] = None, pool=None, backend=None):
+        """
+        初始化区域监视器
+
+        Args:
+            hwnd: 窗口句柄
+            template_path: 模板图像路径
+            region: 监视区域 (left, top, right, bottom)，图像像素坐标；为None时使用
+                    WATCHER_SETTINGS['regions']中按模板文件名配置的相对区域，未配置时监视整个客户区，
+                    模板以前出现过时大部分轮询只监视上次位置附近
+            threshold: NCC匹配阈值
+            interval: 轮询间隔（秒），为None时使用配置
+            pool: 缓冲池，默认使用全局缓冲池
+            backend: 窗口后端，默认使用当前后端
+        """
+        settings = _watcher_settings()
+        self.hwnd = hwnd
+        self.template_path = template_path
+        self.threshold = threshold
+        self.interval = settings.get('interval', 0.05) if interval is None else interval
+        self.pool = pool if pool is not None else get_buffer_pool()
+        self.backend = backend if backend is not None else get_backend()
+        self.governor = get_governor()
+
+        self.template = cv2.imread(template_path, cv2.IMREAD_GRAYSCALE)
+        if self.template is None:
+            raise FileNotFoundError(f"无法加载模板: {template_path}")
+        # NCC只能匹配单一尺度，模板按窗口的缩放比例缩放后再匹配
+        self.scale = self._template_scale(settings)
+        if abs(self.scale - 1.0) > 0.01:
+            interpolation = cv2.INTER_AREA if self.scale < 1.0 else cv2.INTER_LINEAR
+            self.template = cv2.resize(self.template, None, fx=self.scale, fy=self.scale, interpolation=interpolation)
+
+        self.name = os.path.basename(template_path)
+        self.key = (hwnd, self.name)
+        self.region = region if region is not None else self._configured_region(settings)
+        # 只有未指定区域时才使用上次出现的位置，每隔refresh_every次轮询仍检查一次完整区域
+        self.learn = region is None
+        self.margin = settings.get('margin', 24)
+        self.refresh_every = max(1, settings.get('refresh_every', 10))
+        self.polls = 0
+        self.capture_seconds = 0.0
+        self.match_seconds = 0.0
+        self.throttled_seconds = 0.0
+
+    @classmethod
+    def from_result(cls, hwnd: int, template_path: str, result: Dict, margin: int = 24, **kwargs) -> "RegionWatcher":
+        """
+        以一次识别结果的位置为中心创建监视器，用于监视已知位置的按钮
+
+        Args:
+            hwnd: 窗口句柄
+            template_path: 模板图像路径
+            result: 识别结果（包含top_left和bottom_right）
+            margin: 区域在识别框四周扩展的像素
+            **kwargs: 传给构造函数的其他参数
+        """
+        (left, top), (right, bottom) = result['top_left'], result['bottom_right']
+        region = (left - margin, top - margin, right + margin, bottom + margin)
+        return cls(hwnd, template_path, region=region, **kwargs)
+
+    def _client_size(self) -> Tuple[int, int]:
+        """客户区图像尺寸（已按DPI缩放，与截图尺寸一致）"""
+        _, _, right, bottom = self.backend.get_client_rect(self.hwnd)
+        scale = self.backend.get_window_dpi_scale(self.hwnd)
+        return int(right * scale), int(bottom * scale)
+
+    def _template_scale(self, settings: dict) -> float:
+        """
+        模板到当前窗口画面的缩放比例：配置了 reference_size（截取模板时的客户区图像宽高）时按客户区宽度之比，
+        否则按窗口DPI缩放与截取模板时的DPI缩放（template_dpi_scale）之比
+        """
+        reference = settings.get('reference_size')
+        if reference:
+            width, _ = self._client_size()
+            return width / float(reference[0])
+        return self.backend.get_window_dpi_scale(self.hwnd) / settings.get('template_dpi_scale', 1.0)
+
+    def _configured_region(self, settings: dict) -> Region:
+        width, height = self._client_size()
+        fractions = settings.get('regions', {}).get(self.name)
+        if fractions is None:
+            return 0, 0, width, height
+        left, top, right, bottom = fractions
+        return int(left * width), int(top * height), int(right * width), int(bottom * height)
+
+    def poll(self) -> Optional[Dict]:
+        """
+        截取一次监视区域并匹配模板
+
+        Returns:
+            识别结果（坐标为整个客户区图像中的坐标，格式与ImageRecognition的结果相同），未出现时返回None
+        """
+        region = self.region
+        if self.learn and self.key in _last_seen and self.polls % self.refresh_every:
+            left, top, right, bottom = _last_seen[self.key]
+            region = (left - self.margin, top - self.margin, right + self.margin, bottom + self.margin)
+
+        # 后台轮询，交互步骤需要截图时让出令牌；区域NCC开销很小，不申请识别令牌
+        self.throttled_seconds += self.governor.acquire('capture', self.hwnd, BACKGROUND)
+        start = time.perf_counter()
+        frame = self.backend.capture_region(self.hwnd, region, self.pool)
+        captured = time.perf_counter()
+        self.polls += 1
+        self.capture_seconds += captured - start
+        if frame is None:
+            return None
+
+        gray = self.pool.acquire(frame.shape[:2])
+        try:
+            cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=gray)
+            h, w = self.template.shape
+            if gray.shape[0] < h or gray.shape[1] < w:
+                return None
+            scores = cv2.matchTemplate(gray, self.template, cv2.TM_CCOEFF_NORMED)
+            _, confidence, _, (x, y) = cv2.minMaxLoc(scores)
+        finally:
+            self.pool.release(gray)
+            self.pool.release(frame)
+            self.match_seconds += time.perf_counter() - captured
+
+        if not np.isfinite(confidence) or confidence < self.threshold:
+            return None
+        # 区域截图可能被裁剪到客户区范围内，左上角按裁剪后的区域换算
+        left, top = max(int(region[0]), 0), max(int(region[1]), 0)
+        min_x, min_y = left + x, top + y
+        if self.learn:
+            _last_seen[self.key] = (min_x, min_y, min_x + w, min_y + h)
+        return {
+            'confidence': float(confidence),
+            'center': (int(min_x + w // 2), int(min_y + h // 2)),
+            'top_left': (int(min_x), int(min_y)),
+            'bottom_right': (int(min_x + w), int(min_y + h)),
+            'method': 'region_watch_NCC',
+        }
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[Dict]:
+        """
+        轮询直到模板出现
+
+        Args:
+            timeout: 超时时间（秒），为None时一直等待
+
+        Returns:
+            识别结果，超时返回None
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            started = time.time()
+            result = self.poll()
+            if result:
+                return result
+            if deadline is not None and started >= deadline:
+                return None
+            remaining = self.interval - (time.time() - started)
+            if remaining > 0:
+                time.sleep(remaining)
+
+    def wait_or_find(self, finder, timeout: Optional[float] = None,
+                     full_every: Optional[float] = None) -> Optional[Tuple[int, int]]:
+        """
+        轮询直到模板出现，每隔一段时间仍未匹配到时用图像查找器完整识别一次；
+        窗口缩放与模板不一致等NCC匹配不到的情况下仍能找到按钮
+
+        Args:
+            finder: 图像查找器（ImageFinder）
+            timeout: 总超时时间（秒），为None时一直等待直到找到
+            full_every: 区域轮询多久未匹配到后完整识别一次（秒），为None时使用 WATCHER_SETTINGS['full_lookup_every']
+
+        Returns:
+            按钮中心的图像坐标，超时返回None
+        """
+        if full_every is None:
+            full_every = _watcher_settings().get('full_lookup_every', 15.0)
+        deadline = None if timeout is None else time.time() + timeout
+        lookups = 0
+        while True:
+            wait = full_every if deadline is None else min(full_every, max(deadline - time.time(), 0.0))
+            result = self.wait(wait)
+            if result:
+                return result['center']
+            lookups += 1
+            if lookups == 1:
+                print(f"区域监视 {full_every:.0f} 秒内未匹配到 {self.name}，改用完整识别")
+            center = finder.find_icon_in_game(self.template_path)
+            if center:
+                return center
+            if deadline is not None and time.time() >= deadline:
+                print(f"{self.name} 在 {timeout:.0f} 秒内未出现（完整识别{lookups}次）")
+                return None
+
+    def stats(self) -> Dict[str, float]:
+        """轮询次数、平均每次的截图和匹配耗时（毫秒），以及被调节器限流等待的总时间（秒）"""
+        polls = max(self.polls, 1)
+        return {
+            'polls': self.polls,
+            'capture_ms': self.capture_seconds * 1000 / polls,
+            'match_ms': self.match_seconds * 1000 / polls,
+            'throttled_seconds': self.throttled_seconds,
+        }
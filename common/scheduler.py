@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+定时调度工具
+解析类cron表达式（分 时 日 月 周），计算下一次执行时间
+"""
+
+from datetime import datetime, timedelta
+from typing import Set
+
+# 各字段的取值范围
+FIELD_RANGES = [
+    (0, 59),  # 分
+    (0, 23),  # 时
+    (1, 31),  # 日
+    (1, 12),  # 月
+    (0, 6),   # 周（0为周日）
+]
+
+
+def parse_field(field: str, low: int, high: int) -> Set[int]:
+    """
+    解析cron的单个字段
+
+    支持 *、*/n、a、a-b、a-b/n 以及用逗号分隔的组合
+
+    Args:
+        field: 字段文本
+        low: 最小值
+        high: 最大值
+
+    Returns:
+        该字段允许的取值集合
+    """
+    values = set()
+    for part in field.split(','):
+        step = 1
+        if '/' in part:
+            part, step_text = part.split('/', 1)
+            step = int(step_text)
+            if step <= 0:
+                raise ValueError(f"无效的步长: {step_text}")
+
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start_text, end_text = part.split('-', 1)
+            start, end = int(start_text), int(end_text)
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+
+        if start < low or end > high or start > end:
+            raise ValueError(f"取值超出范围[{low}, {high}]: {part}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """
+    类cron调度表达式
+    例如 "0 6 * * *" 表示每天6:00，"*/30 8-22 * * 1-5" 表示工作日8点到22点每30分钟
+    """
+
+    def __init__(self, expression: str):
+        """
+        初始化调度表达式
+
+        Args:
+            expression: 五段式cron表达式（分 时 日 月 周）
+        """
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"cron表达式需要5个字段: {expression}")
+
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, self.weekdays = [
+            parse_field(field, low, high) for field, (low, high) in zip(fields, FIELD_RANGES)
+        ]
+        # 与cron一致：日和周都被限制时，满足任意一个即可
+        self._day_restricted = fields[2] != '*'
+        self._weekday_restricted = fields[4] != '*'
+
+    def _day_matches(self, dt: datetime) -> bool:
+        weekday = (dt.weekday() + 1) % 7  # Python周一为0，cron周日为0
+        day_ok = dt.day in self.days
+        weekday_ok = weekday in self.weekdays
+        if self._day_restricted and self._weekday_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def matches(self, dt: datetime) -> bool:
+        """判断某一分钟是否满足调度表达式"""
+        return (dt.minute in self.minutes and dt.hour in self.hours
+                and dt.month in self.months and self._day_matches(dt))
+
+    def next_after(self, dt: datetime) -> datetime:
+        """
+        计算严格晚于dt的下一次执行时间
+
+        Args:
+            dt: 起始时间
+
+        Returns:
+            下一次执行时间（秒和微秒为0）
+        """
+        candidate = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # 最多向后查找约4年，足以覆盖2月29日之类的表达式
+        limit = candidate + timedelta(days=366 * 4)
+        while candidate <= limit:
+            if candidate.month not in self.months or not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+                continue
+            if candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+                continue
+            return candidate
+        raise ValueError(f"cron表达式没有可执行的时间: {self.expression}")
+
+    def __repr__(self):
+        return f"CronSchedule({self.expression!r})"
@@ -0,0 +1,397 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+会话录制格式
+把一次运行中截取的每一帧画面和发出的每一次鼠标操作按时间顺序记录到一个目录中，
+录制结果与平台无关，可以在Linux上按帧号随机读取并离线重跑识别
+
+目录结构:
+    session.json    会话信息（格式版本、创建时间、统计）
+    frames.bin      只追加的画面数据，每个不重复的画面压缩为一个数据块
+    index.bin       定长帧索引，每帧一条记录，重复画面指向同一个数据块
+    events.jsonl    鼠标操作和窗口信息，每行一条JSON记录
+"""
+
+import json
+import mmap
+import os
+import queue
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import cv2
+import numpy as np
+
+FORMAT_NAME = "jltx-session"
+FORMAT_VERSION = 1
+
+SESSION_FILE = "session.json"
+FRAMES_FILE = "frames.bin"
+INDEX_FILE = "index.bin"
+EVENTS_FILE = "events.jsonl"
+
+# 帧索引记录，定长40字节，可直接用np.memmap读取
+INDEX_DTYPE = np.dtype([
+    ('time', '<f8'),
+    ('hwnd', '<u8'),
+    ('offset', '<u8'),
+    ('length', '<u4'),
+    ('height', '<u2'),
+    ('width', '<u2'),
+    ('channels', 'u1'),
+    ('duplicate', 'u1'),
+    ('reserved', 'V6'),
+])
+
+# 判断近似重复时缩略图每个格子对应的原图像素，格子足够小才能发现按钮等局部变化
+THUMB_CELL = 8
+
+
+class SessionWriter:
+    """
+    会话录制写入器
+    add_frame()只复制画面并排队，去重、压缩和写盘在后台线程中进行
+    """
+
+    def __init__(self, path: str, compress_level: int = 1,
+                 near_duplicate_threshold: float = 0, queue_size: int = 8):
+        """
+        创建会话录制
+
+        Args:
+            path: 会话目录（不存在时创建，已有录制时报错）
+            compress_level: zlib压缩级别，录制时优先速度
+            near_duplicate_threshold: 与同窗口上一帧缩略图（每THUMB_CELL像素一格）逐格比较，最大的绝对差不超过该值时
+                                      视为重复；默认0，只去除完全相同的画面，保证离线重跑识别时看到的画面与录制时一致
+            queue_size: 等待写盘的最大帧数，写盘跟不上时add_frame会阻塞
+        """
+        if os.path.exists(os.path.join(path, INDEX_FILE)):
+            raise FileExistsError(f"会话目录已有录制: {path}")
+        os.makedirs(path, exist_ok=True)
+
+        self.path = path
+        self.compress_level = compress_level
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self.created = time.time()
+
+        self._frames_file = open(os.path.join(path, FRAMES_FILE), 'ab')
+        self._index_file = open(os.path.join(path, INDEX_FILE), 'ab')
+        self._events_file = open(os.path.join(path, EVENTS_FILE), 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+        self._frame_count = 0
+        self._unique_count = 0
+        self._raw_bytes = 0
+        self._stored_bytes = 0
+        # 每个窗口上一个数据块：hwnd -> (完整哈希, 缩略图, offset, length, shape)
+        self._last_blocks: Dict[int, tuple] = {}
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._writer = threading.Thread(target=self._write_loop, name="session-writer", daemon=True)
+        self._writer.start()
+        self._closed = False
+        self._write_header()
+
+    def _write_header(self, stats: Optional[Dict[str, Any]] = None):
+        header = {
+            'format': FORMAT_NAME,
+            'version': FORMAT_VERSION,
+            'created': self.created,
+            'index_record_size': INDEX_DTYPE.itemsize,
+            'thumb_cell': THUMB_CELL,
+            'near_duplicate_threshold': self.near_duplicate_threshold,
+        }
+        if stats:
+            header['stats'] = stats
+        with open(os.path.join(self.path, SESSION_FILE), 'w', encoding='utf-8') as f:
+            json.dump(header, f, ensure_ascii=False, indent=2)
+
+    @property
+    def frame_count(self) -> int:
+        """已分配的帧号数量（包括尚未写盘的帧）"""
+        return self._frame_count
+
+    def add_frame(self, hwnd: int, frame: np.ndarray, timestamp: Optional[float] = None) -> int:
+        """
+        记录一帧画面
+
+        Args:
+            hwnd: 窗口句柄
+            frame: BGR画面（会被复制，调用方可以立即复用）
+            timestamp: 截图时间，默认当前时间
+
+        Returns:
+            帧号
+        """
+        if self._closed:
+            raise ValueError("会话录制已关闭")
+        with self._lock:
+            index = self._frame_count
+            self._frame_count += 1
+        self._queue.put((index, hwnd, np.ascontiguousarray(frame).copy(),
+                         timestamp if timestamp is not None else time.time()))
+        return index
+
+    def add_event(self, kind: str, **fields):
+        """
+        记录一次操作（鼠标移动/按下/松开、窗口信息等）
+
+        Args:
+            kind: 操作类型
+            **fields: 操作参数
+        """
+        if self._closed:
+            return
+        record = dict(fields, t=fields.get('t', time.time()), kind=kind)
+        with self._lock:
+            # 关联到已分配的最后一帧，回放时可以知道操作发生在哪一帧之后
+            record.setdefault('frame', self._frame_count - 1)
+            self._events_file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self._events_file.flush()
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._write_frame(*item)
+            except Exception as e:
+                print(f"写入会话录制帧失败: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _is_duplicate(self, hwnd: int, frame: np.ndarray, digest: int, thumb: np.ndarray) -> Optional[tuple]:
+        """与同一窗口上一个数据块比较，重复时返回该数据块"""
+        last = self._last_blocks.get(hwnd)
+        if last is None or last[4] != frame.shape:
+            return None
+        if last[0] == digest:
+            return last
+        if thumb is not None and last[1] is not None:
+            # 取逐格差异的最大值而不是全图平均，局部变化（按钮变亮、弹出小窗口）不会被整幅画面平均掉
+            diff = cv2.absdiff(last[1], thumb)
+            if float(diff.max()) <= self.near_duplicate_threshold:
+                return last
+        return None
+
+    def _write_frame(self, index: int, hwnd: int, frame: np.ndarray, timestamp: float):
+        digest = zlib.crc32(frame) | (zlib.adler32(frame) << 32)
+        thumb = None
+        if self.near_duplicate_threshold > 0:
+            height, width = frame.shape[:2]
+            thumb = cv2.resize(frame, (max(width // THUMB_CELL, 1), max(height // THUMB_CELL, 1)),
+                               interpolation=cv2.INTER_AREA)
+        duplicate = self._is_duplicate(hwnd, frame, digest, thumb)
+
+        if duplicate is not None:
+            offset, length = duplicate[2], duplicate[3]
+        else:
+            data = zlib.compress(frame, self.compress_level)
+            offset = self._frames_file.tell()
+            length = len(data)
+            self._frames_file.write(data)
+            self._frames_file.flush()
+            self._last_blocks[hwnd] = (digest, thumb, offset, length, frame.shape)
+            self._unique_count += 1
+            self._stored_bytes += length
+        self._raw_bytes += frame.nbytes
+
+        height, width = frame.shape[:2]
+        record = np.zeros(1, dtype=INDEX_DTYPE)
+        record['time'] = timestamp
+        record['hwnd'] = hwnd
+        record['offset'] = offset
+        record['length'] = length
+        record['height'] = height
+        record['width'] = width
+        record['channels'] = frame.shape[2] if frame.ndim == 3 else 1
+        record['duplicate'] = 1 if duplicate is not None else 0
+        # 索引按帧号顺序追加，读取方可以在录制过程中随时打开
+        self._index_file.write(record.tobytes())
+        self._index_file.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        """录制统计"""
+        return {
+            'frames': self._frame_count,
+            'unique_frames': self._unique_count,
+            'raw_bytes': self._raw_bytes,
+            'stored_bytes': self._stored_bytes,
+        }
+
+    def close(self):
+        """写完排队的画面并关闭文件"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()
+        with self._lock:
+            self._frames_file.close()
+            self._index_file.close()
+            self._events_file.close()
+        self._write_header(self.stats())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SessionReader:
+    """
+    会话录制读取器
+    帧索引和画面数据都通过内存映射访问，按帧号读取时只解压对应的数据块
+    """
+
+    def __init__(self, path: str):
+        """
+        打开会话录制
+
+        Args:
+            path: 会话目录
+        """
+        self.path = path
+        with open(os.path.join(path, SESSION_FILE), encoding='utf-8') as f:
+            self.header = json.load(f)
+        if self.header.get('format') != FORMAT_NAME:
+            raise ValueError(f"不是会话录制目录: {path}")
+        if self.header.get('version', 0) > FORMAT_VERSION:
+            raise ValueError(f"不支持的会话录制版本: {self.header.get('version')}")
+
+        index_path = os.path.join(path, INDEX_FILE)
+        count = os.path.getsize(index_path) // INDEX_DTYPE.itemsize
+        self.index = (np.memmap(index_path, dtype=INDEX_DTYPE, mode='r', shape=(count,))
+                      if count else np.zeros(0, dtype=INDEX_DTYPE))
+
+        self._data_file = open(os.path.join(path, FRAMES_FILE), 'rb')
+        size = os.fstat(self._data_file.fileno()).st_size
+        self._data = mmap.mmap(self._data_file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def meta(self, index: int) -> Dict[str, Any]:
+        """帧信息（时间、窗口、尺寸、是否重复）"""
+        record = self.index[index]
+        return {
+            'index': index,
+            'time': float(record['time']),
+            'hwnd': int(record['hwnd']),
+            'size': (int(record['width']), int(record['height'])),
+            'duplicate': bool(record['duplicate']),
+        }
+
+    def frame(self, index: int) -> np.ndarray:
+        """
+        读取指定帧
+
+        Args:
+            index: 帧号
+
+        Returns:
+            BGR画面
+        """
+        record = self.index[index]
+        offset, length = int(record['offset']), int(record['length'])
+        raw = zlib.decompress(self._data[offset:offset + length])
+        shape = (int(record['height']), int(record['width']))
+        if record['channels'] > 1:
+            shape += (int(record['channels']),)
+        return np.frombuffer(raw, dtype=np.uint8).reshape(shape)
+
+    def frame_indices(self, hwnd: Optional[int] = None, unique: bool = False) -> List[int]:
+        """
+        筛选帧号
+
+        Args:
+            hwnd: 只返回该窗口的帧
+            unique: 只返回不重复的帧
+
+        Returns:
+            帧号列表
+        """
+        mask = np.ones(len(self.index), dtype=bool)
+        if hwnd is not None:
+            mask &= self.index['hwnd'] == hwnd
+        if unique:
+            mask &= self.index['duplicate'] == 0
+        return np.nonzero(mask)[0].tolist()
+
+    def iter_frames(self, hwnd: Optional[int] = None, unique: bool = False) -> Iterator[tuple]:
+        """按顺序遍历 (帧号, 画面)"""
+        for index in self.frame_indices(hwnd, unique):
+            yield index, self.frame(index)
+
+    def events(self, kinds: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """读取操作记录，可按类型筛选"""
+        events_path = os.path.join(self.path, EVENTS_FILE)
+        if not os.path.exists(events_path):
+            return []
+        result = []
+        with open(events_path, encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                event = json.loads(line)
+                if kinds is None or event['kind'] in kinds:
+                    result.append(event)
+        return result
+
+    def windows(self) -> Dict[int, str]:
+        """录制期间出现过的窗口：hwnd -> 标题"""
+        windows = {}
+        for event in self.events(['window']):
+            windows[event['hwnd']] = event['title']
+        for hwnd in np.unique(self.index['hwnd']).tolist():
+            windows.setdefault(int(hwnd), f"window-{int(hwnd):x}")
+        return windows
+
+    def frame_source(self, hwnd: int) -> Callable[[int], np.ndarray]:
+        """
+        按截图序号循环返回某个窗口的录制画面，可直接作为FakeBackend.add_window的frames参数
+
+        Args:
+            hwnd: 录制时的窗口句柄
+
+        Returns:
+            画面函数
+        """
+        indices = self.frame_indices(hwnd)
+        if not indices:
+            raise ValueError(f"会话录制中没有该窗口的画面: {hwnd}")
+        return lambda count: self.frame(indices[count % len(indices)])
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._data_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def create_replay_backend(reader: SessionReader):
+    """
+    用会话录制创建模拟后端，每个录制过的窗口对应一个模拟窗口
+
+    Args:
+        reader: 会话录制读取器
+
+    Returns:
+        (FakeBackend, {录制时hwnd: 模拟hwnd})
+    """
+    from .backends.fake_backend import FakeBackend
+
+    backend = FakeBackend()
+    mapping = {}
+    for hwnd, title in reader.windows().items():
+        if reader.frame_indices(hwnd):
+            mapping[hwnd] = backend.add_window(title, reader.frame_source(hwnd))
+    return backend, mapping
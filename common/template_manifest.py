@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+模板清单
+读取由 tools/template_compiler.py 生成的模板清单，为每个模板提供按优先级排列的匹配方法
+"""
+
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+# 默认模板目录与清单路径（相对于项目根目录）
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_TEMPLATE_DIR = os.path.join(PROJECT_ROOT, "img", "template")
+MANIFEST_FILENAME = "manifest.json"
+DEFAULT_MANIFEST_PATH = os.path.join(DEFAULT_TEMPLATE_DIR, MANIFEST_FILENAME)
+
+MANIFEST_VERSION = 1
+
+# 支持的匹配方法
+METHOD_SIFT = "feature_match_SIFT"
+METHOD_ORB = "feature_match_ORB"
+METHOD_NCC = "template_match_NCC"
+SUPPORTED_METHODS = (METHOD_SIFT, METHOD_ORB, METHOD_NCC)
+
+
+def file_sha1(path: str) -> str:
+    """计算文件的SHA1摘要"""
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+class TemplateManifest:
+    """
+    模板清单
+    以模板文件名为键保存分析结果和推荐的匹配方法
+    """
+
+    def __init__(self, templates: Optional[Dict[str, Dict[str, Any]]] = None,
+                 path: Optional[str] = None):
+        """
+        初始化模板清单
+
+        Args:
+            templates: 模板条目字典，键为模板文件名
+            path: 清单文件路径
+        """
+        self.templates = templates or {}
+        self.path = path
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_MANIFEST_PATH) -> "TemplateManifest":
+        """
+        从文件加载模板清单，文件不存在或格式错误时返回空清单
+
+        Args:
+            path: 清单文件路径
+
+        Returns:
+            模板清单对象
+        """
+        if not os.path.exists(path):
+            return cls(path=path)
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"加载模板清单失败: {e}")
+            return cls(path=path)
+
+        if data.get("version") != MANIFEST_VERSION:
+            print(f"模板清单版本不匹配: {data.get('version')}，已忽略")
+            return cls(path=path)
+
+        return cls(cls._drop_stale(data.get("templates", {}), os.path.dirname(path)), path=path)
+
+    @staticmethod
+    def _drop_stale(templates: Dict[str, Dict[str, Any]], template_dir: str) -> Dict[str, Dict[str, Any]]:
+        """去掉模板文件在生成清单后被修改的条目（SHA1不一致），这些模板改用默认方法"""
+        stale = []
+        for name, entry in templates.items():
+            path = os.path.join(template_dir, name)
+            if entry.get("sha1") and os.path.exists(path) and file_sha1(path) != entry["sha1"]:
+                stale.append(name)
+        if stale:
+            print(f"模板清单中{len(stale)}个模板已被修改，忽略其条目: {', '.join(stale)}")
+        return {name: entry for name, entry in templates.items() if name not in stale}
+
+    def save(self, path: Optional[str] = None, extra: Optional[Dict[str, Any]] = None):
+        """
+        保存模板清单
+
+        Args:
+            path: 清单文件路径，默认使用加载时的路径
+            extra: 写入清单顶层的附加字段
+        """
+        path = path or self.path or DEFAULT_MANIFEST_PATH
+        data = {"version": MANIFEST_VERSION}
+        if extra:
+            data.update(extra)
+        data["templates"] = self.templates
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2, sort_keys=False)
+        self.path = path
+
+    def get_entry(self, template_path: str) -> Optional[Dict[str, Any]]:
+        """
+        获取模板条目
+
+        Args:
+            template_path: 模板文件路径或文件名
+
+        Returns:
+            模板条目，未收录时返回None
+        """
+        if not isinstance(template_path, str):
+            return None
+        return self.templates.get(os.path.basename(template_path))
+
+    def get_methods(self, template_path: str) -> Optional[List[str]]:
+        """
+        获取模板按优先级排列的匹配方法：推荐方法在前，其余候选方法作为后备，总是包含SIFT
+        （NCC只在原尺寸上匹配，窗口缩放与模板不同时由SIFT找到）
+
+        Args:
+            template_path: 模板文件路径或文件名
+
+        Returns:
+            匹配方法列表，未收录时返回None
+        """
+        entry = self.get_entry(template_path)
+        if not entry:
+            return None
+
+        method = entry.get("method")
+        if method not in SUPPORTED_METHODS:
+            return None
+        methods = [method]
+        for candidate in entry.get("methods", []) + [METHOD_SIFT]:
+            if candidate in SUPPORTED_METHODS and candidate not in methods:
+                methods.append(candidate)
+        return methods
+
+
+_default_manifest = None
+
+
+def get_default_manifest() -> TemplateManifest:
+    """获取默认模板清单，进程内只加载一次"""
+    global _default_manifest
+    if _default_manifest is None:
+        _default_manifest = TemplateManifest.load(DEFAULT_MANIFEST_PATH)
+        if _default_manifest.templates:
+            print(f"已加载模板清单: {len(_default_manifest.templates)}个模板")
+    return _default_manifest
+
+
+def reload_default_manifest() -> TemplateManifest:
+    """重新加载默认模板清单"""
+    global _default_manifest
+    _default_manifest = None
+    return get_default_manifest()
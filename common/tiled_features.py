@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+分块场景特征缓存
+把画面切成带重叠的小块，每块单独计算哈希；只对内容变化的小块重新提取特征点和描述子，
+未变化的小块复用上次结果，最后合并为整幅画面的特征集合
+"""
+
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+Tile = Tuple[int, int, int, int, int, int, int, int]
+
+# 进程共用的小块提取线程池：识别器按阈值、按识别服务会话创建，各自建线程池会让线程随运行时间累积
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+
+
+def _shared_executor(workers: int) -> ThreadPoolExecutor:
+    """获取共用线程池，线程数取各提取器要求的最大值，要求更多线程时换用新的线程池"""
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is None or workers > _executor_workers:
+            old = _executor
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tile")
+            _executor_workers = workers
+            if old is not None:
+                # 已提交的任务执行完后旧线程退出
+                old.shutdown(wait=False)
+        return _executor
+
+
+class TiledFeatureExtractor:
+    """
+    分块特征提取器
+    每个小块由核心区域和四周的重叠边组成：特征在整个小块上提取，只保留落在核心区域内的特征点，
+    使相邻小块之间既不重复也不会因为边界截断丢失特征
+    """
+
+    def __init__(self, detector_factory: Callable[[], object], tile_size: int = 320,
+                 overlap: int = 32, workers: int = 4):
+        """
+        初始化分块特征提取器
+
+        Args:
+            detector_factory: 创建特征检测器的函数（例如cv2.SIFT_create），每个线程各自创建一个
+            tile_size: 小块核心区域的边长
+            overlap: 核心区域四周扩展的像素数
+            workers: 并行提取的线程数，1表示在调用线程中顺序提取；线程来自进程共用的线程池
+        """
+        self.detector_factory = detector_factory
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.workers = workers
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+        self._shape = None
+        self._tiles: List[Tile] = []
+        # 小块序号 -> (哈希, 特征点, 描述子)
+        self._cache: Dict[int, tuple] = {}
+        self._combined = None
+
+        self.frames = 0
+        self.tiles_computed = 0
+        self.tiles_reused = 0
+
+    def _detector(self):
+        detector = getattr(self._local, 'detector', None)
+        if detector is None:
+            detector = self._local.detector = self.detector_factory()
+        return detector
+
+    def _layout(self, shape) -> List[Tile]:
+        """计算小块布局：(核心左, 核心上, 核心右, 核心下, 小块左, 小块上, 小块右, 小块下)"""
+        height, width = shape[:2]
+        tiles = []
+        for top in range(0, height, self.tile_size):
+            for left in range(0, width, self.tile_size):
+                right = min(left + self.tile_size, width)
+                bottom = min(top + self.tile_size, height)
+                tiles.append((
+                    left, top, right, bottom,
+                    max(0, left - self.overlap), max(0, top - self.overlap),
+                    min(width, right + self.overlap), min(height, bottom + self.overlap),
+                ))
+        return tiles
+
+    def _compute_tile(self, gray: np.ndarray, tile: Tile) -> tuple:
+        """在一个小块上提取特征，返回核心区域内的特征点（整幅画面坐标）和描述子"""
+        core_left, core_top, core_right, core_bottom, left, top, right, bottom = tile
+        keypoints, descriptors = self._detector().detectAndCompute(gray[top:bottom, left:right], None)
+        if descriptors is None or not keypoints:
+            return [], None
+
+        kept = []
+        rows = []
+        for i, kp in enumerate(keypoints):
+            x, y = kp.pt[0] + left, kp.pt[1] + top
+            if core_left <= x < core_right and core_top <= y < core_bottom:
+                kept.append(cv2.KeyPoint(x, y, kp.size, kp.angle, kp.response, kp.octave, kp.class_id))
+                rows.append(i)
+        if not kept:
+            return [], None
+        return kept, descriptors[rows]
+
+    def detect_and_compute(self, gray: np.ndarray,
+                           cancelled: Optional[threading.Event] = None) -> Optional[Tuple[List, Optional[np.ndarray]]]:
+        """
+        提取整幅画面的特征，接口与检测器的detectAndCompute一致
+
+        Args:
+            gray: 灰度画面
+            cancelled: 取消标志，设置后不再开始提取新的小块，已提取的小块仍然缓存
+
+        Returns:
+            (特征点列表, 描述子数组或None)，提取完成前被取消时返回None
+        """
+        with self._lock:
+            if gray.shape != self._shape:
+                self._shape = gray.shape
+                self._tiles = self._layout(gray.shape)
+                self._cache = {}
+                self._combined = None
+            self.frames += 1
+
+            # 哈希整个小块（含重叠边），重叠边变化也会影响核心区域的特征
+            hashes = []
+            changed = []
+            for index, tile in enumerate(self._tiles):
+                left, top, right, bottom = tile[4:]
+                data = np.ascontiguousarray(gray[top:bottom, left:right])
+                digest = zlib.crc32(data) | (zlib.adler32(data) << 32)
+                hashes.append(digest)
+                cached = self._cache.get(index)
+                if cached is None or cached[0] != digest:
+                    changed.append(index)
+
+            self.tiles_reused += len(self._tiles) - len(changed)
+            self.tiles_computed += len(changed)
+            if not changed and self._combined is not None:
+                return self._combined
+
+            def compute(index):
+                if cancelled is not None and cancelled.is_set():
+                    return None
+                return self._compute_tile(gray, self._tiles[index])
+
+            if self.workers > 1 and len(changed) > 1:
+                executor = _shared_executor(self.workers)
+                computed = list(executor.map(compute, changed))
+            else:
+                computed = [compute(index) for index in changed]
+            complete = True
+            for index, tile_features in zip(changed, computed):
+                if tile_features is None:
+                    complete = False
+                    continue
+                self._cache[index] = (hashes[index],) + tile_features
+            if not complete:
+                return None
+
+            keypoints = []
+            descriptors = []
+            for index in range(len(self._tiles)):
+                _, tile_keypoints, tile_descriptors = self._cache[index]
+                if tile_descriptors is not None:
+                    keypoints.extend(tile_keypoints)
+                    descriptors.append(tile_descriptors)
+            self._combined = (keypoints, np.vstack(descriptors) if descriptors else None)
+            return self._combined
+
+    def reset(self):
+        """清空缓存"""
+        with self._lock:
+            self._cache = {}
+            self._combined = None
+
+    def stats(self) -> Dict[str, float]:
+        """小块复用统计"""
+        total = self.tiles_computed + self.tiles_reused
+        return {
+            'frames': self.frames,
+            'tiles': len(self._tiles),
+            'tiles_computed': self.tiles_computed,
+            'tiles_reused': self.tiles_reused,
+            'reuse_rate': round(self.tiles_reused / total, 4) if total else 0.0,
+        }
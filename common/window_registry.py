@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+游戏窗口注册表
+枚举一次顶层窗口并按标题关键字筛选出模拟器窗口后缓存，之后只用IsWindow检查缓存的句柄，
+句柄失效、查询未命中或缓存过期时才重新枚举；每个窗口分配一个不随标题变化的稳定编号
+"""
+
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .backends import get_backend
+
+
+def _game_settings() -> dict:
+    try:
+        from config.settings import GAME_SETTINGS
+        return GAME_SETTINGS
+    except ImportError:
+        return {}
+
+
+class GameWindow:
+    """注册表中的一个游戏窗口"""
+
+    def __init__(self, window_id: int, hwnd: int, title: str):
+        """
+        Args:
+            window_id: 稳定编号，窗口存在期间不变
+            hwnd: 窗口句柄
+            title: 最近一次看到的窗口标题
+        """
+        self.window_id = window_id
+        self.hwnd = hwnd
+        self.title = title
+        self.first_seen = time.time()
+
+    def __repr__(self):
+        return f"GameWindow(id={self.window_id}, hwnd={self.hwnd}, title={self.title!r})"
+
+
+class WindowRegistry:
+    """
+    游戏窗口注册表
+    windows()返回缓存的窗口列表，get()/by_id()为字典查询
+    """
+
+    def __init__(self, title_keywords: Sequence[str] = ("模拟器",), ttl: float = 30.0, backend=None):
+        """
+        初始化窗口注册表
+
+        Args:
+            title_keywords: 标题包含任一关键字的窗口视为游戏窗口
+            ttl: 缓存有效期（秒），过期后下次查询重新枚举，0表示每次都枚举
+            backend: 窗口后端，默认使用当前后端（后端被替换时缓存自动失效）
+        """
+        self.title_keywords = tuple(title_keywords)
+        self.ttl = ttl
+        self._backend = backend
+        self._lock = threading.RLock()
+        self._by_hwnd: Dict[int, GameWindow] = {}
+        self._by_id: Dict[int, GameWindow] = {}
+        self._next_id = 1
+        self._refreshed_at = 0.0
+        self._seen_backend = None
+        self.enumerations = 0
+
+    @property
+    def backend(self):
+        return self._backend if self._backend is not None else get_backend()
+
+    def matches(self, title: str) -> bool:
+        """标题是否属于游戏窗口"""
+        return any(keyword in title for keyword in self.title_keywords)
+
+    def refresh(self) -> List[GameWindow]:
+        """
+        重新枚举窗口，已知句柄保留原编号并更新标题，消失的窗口从注册表中移除
+
+        Returns:
+            按编号排序的游戏窗口列表
+        """
+        backend = self.backend
+        with self._lock:
+            if backend is not self._seen_backend:
+                self._by_hwnd.clear()
+                self._by_id.clear()
+                self._seen_backend = backend
+
+            found = [(hwnd, title) for hwnd, title in backend.enum_windows() if self.matches(title)]
+            self.enumerations += 1
+            alive = set()
+            for hwnd, title in found:
+                alive.add(hwnd)
+                window = self._by_hwnd.get(hwnd)
+                if window is None:
+                    window = GameWindow(self._next_id, hwnd, title)
+                    self._next_id += 1
+                    self._by_hwnd[hwnd] = window
+                    self._by_id[window.window_id] = window
+                else:
+                    window.title = title
+            for hwnd in [hwnd for hwnd in self._by_hwnd if hwnd not in alive]:
+                self._by_id.pop(self._by_hwnd.pop(hwnd).window_id, None)
+            self._refreshed_at = time.time()
+            return self._sorted()
+
+    def _sorted(self) -> List[GameWindow]:
+        return sorted(self._by_hwnd.values(), key=lambda window: window.window_id)
+
+    def _stale(self) -> bool:
+        return (self.backend is not self._seen_backend
+                or time.time() - self._refreshed_at >= self.ttl)
+
+    def game_windows(self) -> List[GameWindow]:
+        """
+        获取游戏窗口，缓存未过期且缓存的句柄都仍有效时不重新枚举
+
+        Returns:
+            按编号排序的游戏窗口列表
+        """
+        with self._lock:
+            if self._stale():
+                return self.refresh()
+            backend = self.backend
+            if not all(backend.is_window(hwnd) for hwnd in self._by_hwnd):
+                return self.refresh()
+            return self._sorted()
+
+    def windows(self) -> List[Tuple[int, str]]:
+        """获取游戏窗口，格式与 gui_util.get_game_windows 相同：[(hwnd, title), ...]"""
+        return [(window.hwnd, window.title) for window in self.game_windows()]
+
+    def get(self, hwnd: int) -> Optional[GameWindow]:
+        """
+        按句柄查询游戏窗口，未命中或句柄已失效时重新枚举一次
+
+        Args:
+            hwnd: 窗口句柄
+
+        Returns:
+            游戏窗口，不存在时返回None
+        """
+        with self._lock:
+            window = None if self._stale() else self._by_hwnd.get(hwnd)
+            if window is not None and self.backend.is_window(hwnd):
+                return window
+            self.refresh()
+            return self._by_hwnd.get(hwnd)
+
+    def by_id(self, window_id: int) -> Optional[GameWindow]:
+        """
+        按稳定编号查询游戏窗口
+
+        Args:
+            window_id: 窗口编号
+
+        Returns:
+            游戏窗口，窗口已关闭时返回None
+        """
+        with self._lock:
+            window = None if self._stale() else self._by_id.get(window_id)
+            if window is not None and self.backend.is_window(window.hwnd):
+                return window
+            self.refresh()
+            return self._by_id.get(window_id)
+
+    def invalidate(self):
+        """使缓存失效，下次查询时重新枚举"""
+        with self._lock:
+            self._refreshed_at = 0.0
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_window_registry() -> WindowRegistry:
+    """获取进程共享的窗口注册表，标题关键字和缓存有效期读取 GAME_SETTINGS"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                settings = _game_settings()
+                _registry = WindowRegistry(
+                    title_keywords=settings.get('window_title_keywords', ["模拟器"]),
+                    ttl=settings.get('window_cache_ttl', 30.0),
+                )
+    return _registry
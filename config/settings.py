@@ -5,6 +5,8 @@ GAME_SETTINGS = {
     'game_path': '',  # 游戏安装路径
     'screenshot_dir': 'screenshots',  # 截图保存目录
     'log_dir': 'logs',  # 日志保存目录
+    'window_title_keywords': ['模拟器'],  # 标题包含任一关键字的窗口视为游戏窗口
+    'window_cache_ttl': 30,  # 游戏窗口列表缓存有效期（秒），缓存的句柄失效时会提前重新枚举
 }
 
 # Agent配置
@@ -12,4 +14,130 @@ AGENT_SETTINGS = {
     'debug_mode': False,  # 调试模式
     'auto_retry': True,  # 失败自动重试
     'max_retries': 3,  # 最大重试次数
-}
\ No newline at end of file
+}
+
+# 窗口后端配置
+BACKEND_SETTINGS = {
+    'backend': 'win32',  # 窗口后端：'win32' 真实窗口，'fake' 模拟窗口，'adb' 通过ADB截图（可用环境变量 JLTX_BACKEND 覆盖）
+    'fake_windows': [  # 模拟后端默认创建的窗口：(标题, 画面路径)
+        ('雷电模拟器-1', './img/screen/test_result.png'),
+    ],
+    'record_dir': '',  # 会话录制目录，非空时记录所有截图和鼠标操作（可用环境变量 JLTX_RECORD 覆盖）
+}
+
+# ADB截图配置（BACKEND_SETTINGS['backend'] 为 'adb' 时使用）：从模拟器直接拉取画面，不需要窗口在前台
+ADB_SETTINGS = {
+    'inner_backend': 'win32',  # 窗口枚举、坐标换算和鼠标输入使用的后端
+    'host': '127.0.0.1',  # adb server地址
+    'port': 5037,  # adb server端口
+    'timeout': 5.0,  # 连接和读取超时（秒）
+    'devices': {},  # 窗口标题关键字 -> 设备序列号，例如 {'雷电模拟器-1': 'emulator-5554'}；未配置时比较窗口截图和设备画面自动对应
+    'verify_pairing': True,  # 自动对应时比较画面，画面无法区分的窗口不自动对应；关闭时窗口数与设备数相同时按顺序对应（不验证）
+    'match_client_size': True,  # 画面缩放到窗口客户区尺寸，使识别坐标与窗口截图一致
+    'keep_aspect': True,  # 缩放时保持设备画面的宽高比，在客户区（去掉crop边距后）居中
+    'crop': (0, 0, 0, 0),  # 客户区中不属于模拟器画面的边距 (left, top, right, bottom)，图像像素，例如模拟器工具栏
+    'remap_interval': 30,  # 没有对应设备的窗口每隔多久（秒）重新尝试对应
+    'input_sessions': 2,  # 每个设备保持的 adb shell 输入会话数，点击和长按通过ADB发送，不移动系统鼠标
+    'ack_timeout': 2.0,  # 等待手势结束时，在手势时长之外等待设备执行回执的时间（秒）
+}
+
+# 守护进程配置（daemon.py）
+DAEMON_SETTINGS = {
+    'jobs': [  # 定时任务：任务名见 agent.tasks.TASK_REGISTRY，windows 为 '*' 或窗口标题关键字列表
+        {'task': 'daily', 'cron': '0 6 * * *', 'windows': '*'},
+    ],
+    'poll_interval': 20,  # 检查定时任务的间隔（秒）
+    'crash_retries': 1,  # 任务抛出异常（崩溃）时从头重跑的次数，已完成的步骤会再执行；步骤失败（结果为partial）不重试
+    'retry_delay': 10,  # 崩溃后重跑前的等待时间（秒）
+    'summary_file': 'logs/daemon_runs.jsonl',  # 运行摘要文件，每行一条JSON记录
+}
+
+# 图像识别配置
+RECOGNITION_SETTINGS = {
+    'memo_enabled': True,  # 画面区域未变化时复用上次识别结果
+    'memo_max_entries': 256,  # 每个查找器最多缓存的识别结果数
+    'buffer_pool_mb': 64,  # 截图和灰度图缓冲池的空闲内存预算（MB）
+    'feature_tile_size': 320,  # 场景特征分块缓存的小块边长，只重新提取变化小块的特征，0表示关闭
+    'feature_tile_workers': 4,  # 并行提取小块特征的线程数
+    'geometric_model': 'homography',  # 特征匹配几何模型：'homography'、'similarity' 或 'median'，后两者失败时退回单应矩阵；任何模型都至少需要8个内点
+    'compact_descriptors': False,  # SIFT匹配先用PCA+uint8紧凑描述子初筛（需要模板目录下的descriptor_codec.npz）
+    'race_methods': False,  # NCC与特征匹配并行竞速，取第一个有结果的方法；稳定胜出的方法之后优先单独运行
+    'coarse_scale': 1.0,  # 由粗到细识别：特征匹配先在按该比例缩小的画面上定位，再在原分辨率局部窗口细化，1表示关闭
+}
+
+# 本地识别服务配置（common.recognition_server）：多个Agent进程共用一个进程中的识别器和模板缓存
+RECOGNITION_SERVER_SETTINGS = {
+    'enabled': False,  # ImageFinder通过识别服务识别（也可设置环境变量 JLTX_RECOGNITION_SERVER 为服务地址）
+    'address': '',  # 服务地址，留空时Windows使用命名管道 \\.\pipe\jltx-recognition，其他系统使用 127.0.0.1:47651
+    'authkey': '',  # 连接认证密钥，留空时使用本机随机生成的密钥（保存在 authkey_file）；监听TCP地址时必须设置
+    'authkey_file': '',  # 本机随机密钥的保存位置，留空时为 ~/.jltx/recognition.key
+    'workers': 2,  # 同时执行的识别请求数
+    'max_recognizers': 16,  # 保留的识别器（每个会话和阈值一个）数量上限，连接断开时也会释放它的识别器
+}
+
+# 飞行记录器配置：保留最近的识别画面，识别失败或出错时才写出
+FLIGHT_RECORDER_SETTINGS = {
+    'enabled': True,
+    'capacity': 16,  # 每个窗口的环形缓冲区保存的帧数
+    'scale': 0.5,  # 画面缩小比例
+    'output_dir': 'logs/flight_recorder',  # 写出目录
+    'min_dump_interval': 30,  # 同一窗口两次写出之间的最小间隔（秒）
+    'disk_quota_mb': 200,  # 写出目录的磁盘配额（MB）
+}
+
+# 区域监视器配置（common.region_watcher）：只截取小块区域高频轮询按钮
+WATCHER_SETTINGS = {
+    'interval': 0.05,  # 轮询间隔（秒）
+    'regions': {  # 模板文件名 -> 监视区域，按客户区宽高的比例 (left, top, right, bottom)
+        'qunxiong-xiayichang.png': (0.0, 0.5, 1.0, 1.0),
+        'next_opponent.png': (0.5, 0.5, 1.0, 1.0),
+    },
+    'margin': 24,  # 按上次出现位置监视时四周扩展的像素
+    'refresh_every': 10,  # 按上次位置监视时，每隔多少次轮询检查一次完整区域
+    'template_dpi_scale': 1.0,  # 截取模板时窗口的DPI缩放，模板按 窗口DPI缩放/该值 缩放后匹配
+    'reference_size': None,  # 截取模板时的客户区图像宽高 (width, height)，设置后按客户区宽度之比缩放模板
+    'full_lookup_every': 15.0,  # wait_or_find 区域轮询每隔多少秒仍未匹配到时完整识别一次（秒），找到之前一直等待
+}
+
+# 点击验证配置（common.click_verifier）：find_and_click_icon 点击前后比较图标区域，画面未变化时立即重试点击。
+# 响应慢的按钮（购买、确认、领奖、等待网络的界面）会被点击两次，所以默认关闭，
+# 只在多点一次无副作用的步骤（如切换标签页）传 verify=True
+CLICK_VERIFY_SETTINGS = {
+    'enabled': False,
+    'threshold': 0.02,  # 归一化平均像素差达到该值视为画面已变化（0~1）
+    'timeout': 0.8,  # 点击后等待画面变化的最长时间（秒）
+    'interval': 0.03,  # 点击后截取区域的间隔（秒）
+    'margin': 8,  # 图标区域四周扩展的像素
+    'retries': 1,  # 画面未变化时立即重试点击的次数
+    'regions': {},  # 模板文件名 -> 另外比较的区域，按客户区宽高的比例 (left, top, right, bottom)
+}
+
+# 图标跟踪配置（common.icon_tracker）：已定位的图标用光流跟踪，跟踪质量下降时才重新识别
+TRACKER_SETTINGS = {
+    'margin': 32,  # 跟踪区域在图标框四周扩展的像素
+    'min_points': 6,  # 最少跟踪点数
+    'min_quality': 0.5,  # 保留的跟踪点占播种时的比例低于该值时重新识别
+    'max_fb_error': 1.0,  # 前向-后向光流误差上限（像素）
+    'win_size': (15, 15),  # Lucas-Kanade窗口大小
+    'pyramid_levels': 2,  # 金字塔层数
+}
+
+# 识别CPU调节器配置（common.governor）：限制进程内所有窗口每秒的截图和识别次数，
+# 令牌不足时交互步骤优先于 wait_for_icon、区域监视器等后台轮询
+GOVERNOR_SETTINGS = {
+    'enabled': True,
+    'recognitions_per_second': 12,  # 每秒识别次数上限（一次SIFT识别约几十毫秒CPU），0表示不限制
+    'captures_per_second': 40,  # 每秒截图次数上限，0表示不限制
+    'burst': 3,  # 允许短时间内连续执行的次数
+    'window_shares': {},  # 窗口标题关键字 -> 份额，例如 {'雷电模拟器-1': 2.0}，竞争时份额大的窗口获得更多令牌
+}
+
+# 性能分析配置（common.profiler）：也可用环境变量 JLTX_PROFILE、daemon.py --profile 或主菜单开启
+PROFILER_SETTINGS = {
+    'enabled': False,
+    'mode': 'sampling',  # 'cprofile' 确定性分析（输出.prof和.collapsed），'sampling' 采样分析（输出.collapsed）
+    'tasks': '*',  # 需要分析的任务名列表（见 agent.tasks.TASK_REGISTRY），'*' 表示全部任务，[] 表示只分析步骤
+    'steps': [],  # 需要单独分析的步骤描述，例如 ['下一场']
+    'output_dir': 'logs/profiles',  # 输出目录，文件按任务、窗口和时间命名
+    'sample_interval': 0.005,  # 采样间隔（秒）
+}
@@ -0,0 +1,257 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+游戏Agent守护进程
+按 DAEMON_SETTINGS 中的类cron计划在各游戏窗口上无人值守地执行任务，
+识别器、模板缓存和截图会话在多次运行之间保持常驻，运行摘要写入本地文件
+
+用法:
+    python daemon.py                 按计划常驻运行
+    python daemon.py --run-now       启动后立即执行一遍所有任务，然后按计划运行
+    python daemon.py --once daily    对所有窗口执行一次指定任务后退出
+    python daemon.py --profile sampling --profile-task daily
+                                     对指定任务开启性能分析（--profile-step 只分析指定步骤）
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import traceback
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from agent.tasks import create_task
+from common.backends import get_backend
+from common.coordinate_converter import CoordinateConverter
+from common.flight_recorder import get_flight_recorder
+from common.governor import get_governor
+from common.gui_util import get_game_windows
+from common.profiler import MODES, get_profiler
+from common.scheduler import CronSchedule
+from common.utils import Colors, print_box
+from config.settings import DAEMON_SETTINGS
+
+
+class ScheduledJob:
+    """一条定时任务配置"""
+
+    def __init__(self, task_name: str, cron: str, windows="*"):
+        self.task_name = task_name
+        self.schedule = CronSchedule(cron)
+        self.windows = windows
+
+    def matches_window(self, title: str) -> bool:
+        """窗口是否属于该任务"""
+        if self.windows == "*":
+            return True
+        return any(keyword in title for keyword in self.windows)
+
+
+class AgentDaemon:
+    """
+    守护进程
+    每个(任务, 窗口)组合独立计算下一次执行时间，同一时刻只在一个窗口上执行任务
+    """
+
+    def __init__(self, jobs: List[ScheduledJob], summary_file: str,
+                 poll_interval: float = 20, retry_delay: float = 10, crash_retries: int = 1):
+        self.jobs = jobs
+        self.summary_file = summary_file
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+        # 只在任务抛出异常时从头重跑；步骤失败（find_and_click_icon 返回 False）不会重试
+        self.crash_retries = crash_retries
+
+        # 常驻对象：任务实例、每个窗口的坐标转换器（内含图像查找器和识别器）
+        self.tasks = {}
+        self.converters: Dict[int, CoordinateConverter] = {}
+        self.next_runs: Dict[tuple, datetime] = {}
+
+        # 截图会话在多次运行之间保持
+        get_backend().keep_capture_sessions = True
+
+    def get_task(self, task_name: str):
+        """获取常驻的任务实例"""
+        if task_name not in self.tasks:
+            self.tasks[task_name] = create_task(task_name)
+        return self.tasks[task_name]
+
+    def get_converter(self, hwnd: int) -> CoordinateConverter:
+        """获取窗口常驻的坐标转换器"""
+        if hwnd not in self.converters:
+            self.converters[hwnd] = CoordinateConverter(hwnd)
+        return self.converters[hwnd]
+
+    def refresh_windows(self) -> List[tuple]:
+        """刷新游戏窗口，清理已关闭窗口的常驻对象"""
+        windows = get_game_windows()
+        alive = {hwnd for hwnd, _ in windows}
+        for hwnd in list(self.converters):
+            if hwnd not in alive:
+                del self.converters[hwnd]
+                get_backend().release_capture_sessions(hwnd)
+                get_governor().forget(hwnd)
+                recorder = get_flight_recorder()
+                if recorder is not None:
+                    recorder.forget(hwnd)
+        # 下次执行时间与常驻对象一起清理，窗口重新打开（句柄通常不同）时重新计算
+        for key in [key for key in self.next_runs if key[1] not in alive]:
+            del self.next_runs[key]
+        return windows
+
+    def run_job(self, job: ScheduledJob, hwnd: int, title: str) -> Dict:
+        """
+        在一个窗口上执行任务
+        任务抛出异常（崩溃）时按 DAEMON_SETTINGS['crash_retries'] 从头重跑，已完成的步骤会再执行一遍；
+        步骤失败时任务会继续执行后续步骤，结果记为 partial，不重试
+
+        Returns:
+            运行摘要
+        """
+        task = self.get_task(job.task_name)
+        converter = self.get_converter(hwnd)
+        started = time.time()
+        throttled = get_governor().throttled_seconds(hwnd)
+        summary = {
+            'task': job.task_name,
+            'window': title,
+            'hwnd': hwnd,
+            'started_at': datetime.fromtimestamp(started).strftime("%Y-%m-%d %H:%M:%S"),
+            'attempts': 0,
+            'steps': 0,
+            'failed_steps': [],
+            'click_retries': 0,
+            'errors': [],
+        }
+
+        for attempt in range(self.crash_retries + 1):
+            summary['attempts'] = attempt + 1
+            converter.reset_stats()
+            try:
+                task.run_profiled(hwnd, title, converter)
+                summary['steps'] += converter.step_count
+                summary['failed_steps'].extend(converter.failed_steps)
+                summary['click_retries'] += converter.click_retries
+                summary['status'] = 'partial' if converter.failed_steps else 'ok'
+                break
+            except Exception as e:
+                summary['steps'] += converter.step_count
+                summary['failed_steps'].extend(converter.failed_steps)
+                summary['click_retries'] += converter.click_retries
+                summary['errors'].append(f"{type(e).__name__}: {e}")
+                summary['status'] = 'error'
+                print(f"{Colors.RED}任务{job.task_name}在窗口{title}上出错（第{attempt + 1}次）: {e}{Colors.ENDC}")
+                traceback.print_exc()
+                if attempt < self.crash_retries:
+                    time.sleep(self.retry_delay)
+
+        summary['duration'] = round(time.time() - started, 3)
+        # 截图和识别被调节器限流等待的时间
+        summary['throttled_seconds'] = round(get_governor().throttled_seconds(hwnd) - throttled, 3)
+        summary['memo'] = converter.memo_stats()
+        summary['failures'] = len(summary['failed_steps']) + len(summary['errors'])
+        self.write_summary(summary)
+        return summary
+
+    def write_summary(self, summary: Dict):
+        """追加一条运行摘要"""
+        directory = os.path.dirname(self.summary_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.summary_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(summary, ensure_ascii=False) + '\n')
+
+        color = Colors.GREEN if summary['status'] == 'ok' else Colors.YELLOW
+        print(f"{color}[{summary['task']}] {summary['window']}: {summary['status']}，"
+              f"用时{summary['duration']:.1f}秒，步骤{summary['steps']}，失败{summary['failures']}{Colors.ENDC}")
+
+    def run_all_now(self, task_name: Optional[str] = None):
+        """立即在所有匹配窗口上执行任务"""
+        jobs = self.jobs if task_name is None else [ScheduledJob(task_name, '* * * * *')]
+        for hwnd, title in self.refresh_windows():
+            for job in jobs:
+                if job.matches_window(title):
+                    self.run_job(job, hwnd, title)
+
+    def tick(self, now: datetime):
+        """检查并执行到期的任务"""
+        for hwnd, title in self.refresh_windows():
+            for index, job in enumerate(self.jobs):
+                if not job.matches_window(title):
+                    continue
+                key = (index, hwnd)
+                if key not in self.next_runs:
+                    self.next_runs[key] = job.schedule.next_after(now)
+                    print(f"[{job.task_name}] {title} 下次执行: {self.next_runs[key]}")
+                    continue
+                if now >= self.next_runs[key]:
+                    self.run_job(job, hwnd, title)
+                    self.next_runs[key] = job.schedule.next_after(datetime.now())
+                    print(f"[{job.task_name}] {title} 下次执行: {self.next_runs[key]}")
+
+    def serve_forever(self):
+        """常驻运行"""
+        while True:
+            try:
+                self.tick(datetime.now())
+            except Exception as e:
+                print(f"{Colors.RED}调度出错: {e}{Colors.ENDC}")
+                traceback.print_exc()
+            time.sleep(self.poll_interval)
+
+
+def build_daemon(settings: Dict = DAEMON_SETTINGS) -> AgentDaemon:
+    """根据配置创建守护进程"""
+    jobs = [ScheduledJob(job['task'], job['cron'], job.get('windows', '*')) for job in settings.get('jobs', [])]
+    return AgentDaemon(
+        jobs,
+        summary_file=settings.get('summary_file', 'logs/daemon_runs.jsonl'),
+        poll_interval=settings.get('poll_interval', 20),
+        retry_delay=settings.get('retry_delay', 10),
+        crash_retries=settings.get('crash_retries', 1),
+    )
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="游戏Agent守护进程")
+    parser.add_argument("--once", metavar="TASK", help="对所有窗口执行一次指定任务后退出")
+    parser.add_argument("--run-now", action="store_true", help="启动后立即执行一遍所有定时任务")
+    parser.add_argument("--profile", choices=MODES, help="开启性能分析，结果写入 PROFILER_SETTINGS['output_dir']")
+    parser.add_argument("--profile-task", action="append", metavar="TASK",
+                        help="只分析指定任务（可重复），默认分析全部任务")
+    parser.add_argument("--profile-step", action="append", metavar="DESC",
+                        help="单独分析指定描述的步骤（可重复），只给出步骤时不分析整个任务")
+    args = parser.parse_args(argv)
+
+    if args.profile:
+        tasks = args.profile_task or ([] if args.profile_step else "*")
+        get_profiler().configure(args.profile, tasks=tasks, steps=args.profile_step or [])
+
+    daemon = build_daemon()
+    print_box([
+        "",
+        f"{Colors.BOLD}{Colors.GREEN}守护进程已启动{Colors.ENDC}",
+        *[f"{job.task_name}: {job.schedule.expression}" for job in daemon.jobs],
+        "",
+    ], title="JXTX AGENT DAEMON", width=60)
+
+    if args.once:
+        daemon.run_all_now(args.once)
+        return 0
+
+    if args.run_now:
+        daemon.run_all_now()
+
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        print("守护进程已停止")
+    finally:
+        get_backend().release_capture_sessions()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+"""测试共用的夹具"""
+
+import pytest
+
+from common.governor import RecognitionGovernor, set_governor
+
+
+@pytest.fixture(autouse=True)
+def unlimited_governor():
+    """测试中不受 GOVERNOR_SETTINGS 的速率限制，结束后恢复之前的调节器"""
+    governor = RecognitionGovernor()
+    previous = set_governor(governor)
+    yield governor
+    set_governor(previous)
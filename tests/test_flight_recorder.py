@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""飞行记录器的环形缓冲区和写出频率限制测试"""
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+from common.flight_recorder import FlightRecorder
+
+
+@pytest.fixture
+def recorder(tmp_path):
+    recorder = FlightRecorder(capacity=4, scale=0.5, output_dir=str(tmp_path), min_dump_interval=30)
+    yield recorder
+    recorder.flush()
+
+
+def frame(value: int, size=(64, 48)) -> np.ndarray:
+    return np.full((size[1], size[0], 3), value, dtype=np.uint8)
+
+
+def dump_dirs(path) -> list:
+    return sorted(name for name in os.listdir(path) if os.path.isdir(os.path.join(path, name)))
+
+
+def test_dump_is_rate_limited_per_window(recorder, tmp_path):
+    recorder.record(frame(10), hwnd=1, template='a.png')
+    recorder.record(frame(20), hwnd=2, template='b.png')
+
+    assert recorder.dump("first", hwnd=1)
+    assert not recorder.dump("again", hwnd=1)
+    # 另一个窗口不受窗口1的写出间隔影响
+    assert recorder.dump("other", hwnd=2)
+    recorder.flush()
+
+    assert recorder.stats() == {'recorded': 2, 'dumps': 2, 'suppressed': 1}
+    assert len(dump_dirs(tmp_path)) == 2
+
+
+def test_forget_resets_window_rate_limit(recorder):
+    recorder.record(frame(10), hwnd=1)
+    assert recorder.dump("first", hwnd=1)
+
+    recorder.forget(1)
+    assert not recorder.dump("closed", hwnd=1)
+    recorder.record(frame(30), hwnd=1)
+    assert recorder.dump("reopened", hwnd=1)
+
+
+def test_dump_without_frames_is_suppressed(recorder):
+    assert not recorder.dump("empty")
+    recorder.record(frame(10), hwnd=1)
+    assert not recorder.dump("unknown window", hwnd=2)
+    assert recorder.stats()['suppressed'] == 2
+
+
+def test_ring_keeps_last_frames_per_window(recorder, tmp_path):
+    for value in range(6):
+        recorder.record(frame(value * 10), hwnd=1, template=f"{value}.png")
+    # 尺寸不同的窗口使用自己的环形缓冲区，不覆盖窗口1的画面
+    recorder.record(frame(200, size=(80, 40)), hwnd=2, template="other.png")
+
+    assert recorder.dump("window1", hwnd=1)
+    recorder.flush()
+
+    directory = os.path.join(tmp_path, dump_dirs(tmp_path)[0])
+    with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    assert [entry['template'] for entry in meta['frames']] == ["2.png", "3.png", "4.png", "5.png"]
+    assert all(entry['size'] == [64, 48] for entry in meta['frames'])
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""识别调节器的优先级和窗口公平排队测试"""
+
+import threading
+import time
+
+from common.governor import BACKGROUND, INTERACTIVE, NORMAL, RecognitionGovernor
+
+# 令牌每200ms补充一个，等待者在补充前都已排队
+RATE = 5.0
+
+
+def queue(governor: RecognitionGovernor, granted: list, name: str, **kwargs) -> threading.Thread:
+    """在线程中申请令牌，返回前确认已经进入等待队列"""
+    waiting = len(governor._waiters['recognition'])
+
+    def run():
+        governor.acquire('recognition', **kwargs)
+        granted.append(name)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 1.0
+    while len(governor._waiters['recognition']) <= waiting and time.monotonic() < deadline:
+        time.sleep(0.001)
+    return thread
+
+
+def test_interactive_waiter_goes_before_earlier_background_waiter():
+    governor = RecognitionGovernor(recognitions_per_second=RATE, burst=1)
+    governor.acquire('recognition', window=1)
+    granted = []
+    threads = [queue(governor, granted, 'background', window=1, priority=BACKGROUND),
+               queue(governor, granted, 'interactive', window=2, priority=INTERACTIVE)]
+    for thread in threads:
+        thread.join(timeout=3)
+
+    assert granted == ['interactive', 'background']
+    stats = governor.stats()['recognition']['by_priority']
+    assert stats['interactive']['throttled_seconds'] < stats['background']['throttled_seconds']
+
+
+def test_window_with_lower_virtual_time_goes_first():
+    governor = RecognitionGovernor(recognitions_per_second=RATE, burst=3)
+    # 窗口1用完突发容量，虚拟时间领先于窗口2
+    for _ in range(3):
+        governor.acquire('recognition', window=1)
+    granted = []
+    threads = [queue(governor, granted, 'window1', window=1, priority=NORMAL),
+               queue(governor, granted, 'window2', window=2, priority=NORMAL)]
+    for thread in threads:
+        thread.join(timeout=3)
+
+    assert granted == ['window2', 'window1']
+
+
+def test_unlimited_governor_never_waits():
+    governor = RecognitionGovernor()
+    start = time.monotonic()
+    waited = [governor.acquire(kind, window=1) for kind in ('capture', 'recognition') for _ in range(200)]
+
+    assert max(waited) == 0.0
+    assert time.monotonic() - start < 1.0
+    assert governor.stats()['recognition']['granted'] == 200
+
+
+def test_forget_drops_window_state():
+    governor = RecognitionGovernor(recognitions_per_second=100, burst=2)
+    governor.set_share(7, 2.0)
+    governor.acquire('recognition', window=7)
+    assert 7 in governor.stats()['recognition']['by_window']
+
+    governor.forget(7)
+
+    assert 7 not in governor.stats()['recognition']['by_window']
+    assert 7 not in governor._vtime['recognition']
+    assert 7 not in governor._shares
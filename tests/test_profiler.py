@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""环境变量JLTX_PROFILE的解析测试"""
+
+import pytest
+
+from common import profiler
+from common.profiler import env_mode
+
+
+@pytest.mark.parametrize("value", ["1", "true", "YES", " on "])
+def test_truthy_value_uses_configured_mode(value):
+    assert env_mode(value, {'mode': 'cprofile'}) == 'cprofile'
+    assert env_mode(value, {}) == 'sampling'
+
+
+@pytest.mark.parametrize("value", ["sampling", "cprofile", "CProfile"])
+def test_mode_name_overrides_settings(value):
+    assert env_mode(value, {'enabled': False, 'mode': 'sampling'}) == value.lower()
+
+
+@pytest.mark.parametrize("value", ["0", "false", "off"])
+def test_falsy_value_disables_even_when_enabled(value):
+    assert env_mode(value, {'enabled': True, 'mode': 'sampling'}) is None
+
+
+def test_unset_follows_settings():
+    assert env_mode(None, {'enabled': True, 'mode': 'cprofile'}) == 'cprofile'
+    assert env_mode(None, {'enabled': False, 'mode': 'cprofile'}) is None
+
+
+def test_unknown_value_warns_and_disables(capsys):
+    assert env_mode("yappi", {'enabled': True}) is None
+    assert "JLTX_PROFILE" in capsys.readouterr().out
+
+
+def test_get_profiler_accepts_truthy_env(monkeypatch):
+    monkeypatch.setenv(profiler.PROFILE_ENV, "1")
+    monkeypatch.setattr(profiler, "_control", None)
+    assert profiler.get_profiler().mode in profiler.MODES
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""识别结果记忆的失效测试"""
+
+import numpy as np
+
+from common.recognition_memo import RecognitionMemo
+
+HIT = {'confidence': 0.9, 'center': (50, 50), 'top_left': (40, 40), 'bottom_right': (60, 60)}
+
+
+def make_frame(seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).integers(0, 256, (200, 300, 3), dtype=np.uint8)
+
+
+def test_hit_survives_changes_outside_result_region():
+    memo = RecognitionMemo(padding=4)
+    frame = make_frame()
+    memo.store(frame, 'legion', [HIT])
+
+    frame[150:, 200:] = 0
+    assert memo.lookup(frame, 'legion') == [HIT]
+    assert memo.stats()['hits'] == 1
+
+
+def test_hit_invalidated_when_result_region_changes():
+    memo = RecognitionMemo(padding=4)
+    frame = make_frame()
+    memo.store(frame, 'legion', [HIT])
+
+    # 匹配框向外扩展padding的范围内变化同样失效
+    frame[37, 37] ^= 0xFF
+    assert memo.lookup(frame, 'legion') is None
+    assert memo.stats()['misses'] == 1
+
+
+def test_negative_result_uses_roi():
+    memo = RecognitionMemo()
+    frame = make_frame()
+    memo.store(frame, 'legion', [], roi=(0, 0, 100, 100))
+
+    frame[150, 250] ^= 0xFF
+    assert memo.lookup(frame, 'legion') == []
+    assert memo.stats()['negative_hits'] == 1
+
+    frame[10, 10] ^= 0xFF
+    assert memo.lookup(frame, 'legion') is None
+
+
+def test_negative_result_without_roi_covers_whole_frame():
+    memo = RecognitionMemo()
+    frame = make_frame()
+    memo.store(frame, 'legion', [])
+
+    frame[199, 299] ^= 0xFF
+    assert memo.lookup(frame, 'legion') is None
+
+
+def test_smaller_frame_does_not_match():
+    memo = RecognitionMemo()
+    frame = make_frame()
+    memo.store(frame, 'legion', [])
+    assert memo.lookup(frame[:100, :150], 'legion') is None
+
+
+def test_lookup_returns_copies():
+    memo = RecognitionMemo()
+    frame = make_frame()
+    memo.store(frame, 'legion', [HIT])
+
+    memo.lookup(frame, 'legion')[0]['confidence'] = 0.0
+    assert memo.lookup(frame, 'legion')[0]['confidence'] == 0.9
+
+
+def test_lru_eviction():
+    memo = RecognitionMemo(max_entries=2)
+    frame = make_frame()
+    memo.store(frame, 'a', [])
+    memo.store(frame, 'b', [])
+    memo.lookup(frame, 'a')
+    memo.store(frame, 'c', [])
+
+    assert memo.lookup(frame, 'b') is None
+    assert memo.lookup(frame, 'a') == []
+    assert memo.stats()['evictions'] == 1
+
+
+def test_clear_keeps_stats():
+    memo = RecognitionMemo()
+    frame = make_frame()
+    memo.store(frame, 'a', [])
+    memo.lookup(frame, 'a')
+    memo.clear()
+
+    assert memo.lookup(frame, 'a') is None
+    assert memo.stats()['hits'] == 1
+    assert memo.stats()['entries'] == 0
+
+
+def make_scene(tmp_path):
+    """随机背景上贴一块模板，返回 (画面, 模板路径, 模板左上角)"""
+    import cv2
+
+    rng = np.random.default_rng(1)
+    scene = rng.integers(0, 256, (240, 320, 3), dtype=np.uint8)
+    template = rng.integers(0, 256, (32, 48, 3), dtype=np.uint8)
+    scene[100:132, 150:198] = template
+    path = str(tmp_path / "icon.png")
+    cv2.imwrite(path, template)
+    return scene, path, (150, 100)
+
+
+def test_recognizer_reuses_result_until_region_changes(tmp_path):
+    from common.image_recognition import ImageRecognition
+
+    scene, path, (left, top) = make_scene(tmp_path)
+    recognizer = ImageRecognition(memo=RecognitionMemo())
+    methods = ['template_match_NCC']
+
+    first = recognizer.find_target_in_scene(scene, path, methods)
+    assert first and first[0]['top_left'] == (left, top)
+    assert recognizer.find_target_in_scene(scene, path, methods) == first
+    assert recognizer.memo.stats()['hits'] == 1
+
+    scene[top + 5, left + 5] ^= 0xFF
+    recognizer.find_target_in_scene(scene, path, methods)
+    assert recognizer.memo.stats()['hits'] == 1
+
+
+def test_recognizer_memo_invalidated_when_template_replaced(tmp_path):
+    import os
+
+    import cv2
+
+    from common.image_recognition import ImageRecognition
+
+    scene, path, _ = make_scene(tmp_path)
+    recognizer = ImageRecognition(memo=RecognitionMemo())
+    methods = ['template_match_NCC']
+    assert recognizer.find_target_in_scene(scene, path, methods)
+
+    # 换成画面中不存在的模板，修改时间向后调整，避免文件系统时间精度不足
+    cv2.imwrite(path, np.random.default_rng(2).integers(0, 256, (32, 48, 3), dtype=np.uint8))
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+    assert recognizer.find_target_in_scene(scene, path, methods) == []
+    assert recognizer.memo.stats()['hits'] == 0
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""区域截图和区域监视器测试，使用模拟窗口后端"""
+
+import cv2
+import numpy as np
+import pytest
+
+from common import region_watcher
+from common.backends import set_backend
+from common.backends.fake_backend import FakeBackend
+from common.region_watcher import RegionWatcher
+
+ICON_POS = (150, 100)
+
+
+class SpyBackend(FakeBackend):
+    """记录每次区域截图的区域"""
+
+    def __init__(self):
+        super().__init__()
+        self.regions = []
+
+    def capture_region(self, hwnd, region, pool=None):
+        self.regions.append(tuple(region))
+        return super().capture_region(hwnd, region, pool)
+
+
+class FinderStub:
+    """按顺序返回预设结果的图像查找器"""
+
+    def __init__(self, results):
+        self.results = list(results)
+        self.calls = 0
+
+    def find_icon_in_game(self, template_path):
+        self.calls += 1
+        return self.results.pop(0) if self.results else None
+
+
+@pytest.fixture
+def backend():
+    backend = SpyBackend()
+    previous = set_backend(backend)
+    region_watcher._last_seen.clear()
+    yield backend
+    set_backend(previous)
+    region_watcher._last_seen.clear()
+
+
+@pytest.fixture
+def icon(tmp_path):
+    template = np.random.default_rng(1).integers(0, 256, (32, 48, 3), dtype=np.uint8)
+    path = str(tmp_path / "icon.png")
+    cv2.imwrite(path, template)
+    return path, template
+
+
+def make_scene(template=None, pos=ICON_POS, size=(320, 240), seed=0) -> np.ndarray:
+    scene = np.random.default_rng(seed).integers(0, 256, (size[1], size[0], 3), dtype=np.uint8)
+    if template is not None:
+        h, w = template.shape[:2]
+        scene[pos[1]:pos[1] + h, pos[0]:pos[0] + w] = template
+    return scene
+
+
+def test_capture_region_copies_clipped_pixels(backend):
+    scene = make_scene()
+    hwnd = backend.add_window("雷电模拟器-1", [scene])
+
+    assert np.array_equal(backend.capture_region(hwnd, (10, 20, 50, 60)), scene[20:60, 10:50])
+    # 超出客户区的部分被裁剪
+    assert np.array_equal(backend.capture_region(hwnd, (300, 200, 400, 300)), scene[200:, 300:])
+    assert backend.capture_region(hwnd, (400, 300, 500, 400)) is None
+
+
+def test_poll_reports_client_coordinates(backend, icon):
+    path, template = icon
+    hwnd = backend.add_window("雷电模拟器-1", [make_scene(template)])
+    watcher = RegionWatcher(hwnd, path, region=(100, 50, 300, 200))
+
+    result = watcher.poll()
+    assert result['top_left'] == ICON_POS
+    assert result['center'] == (ICON_POS[0] + 24, ICON_POS[1] + 16)
+    assert backend.regions == [(100, 50, 300, 200)]
+
+
+def test_poll_misses_outside_region(backend, icon):
+    path, template = icon
+    hwnd = backend.add_window("雷电模拟器-1", [make_scene(template)])
+    assert RegionWatcher(hwnd, path, region=(0, 0, 140, 240)).poll() is None
+
+
+def test_watcher_narrows_to_last_position(backend, icon):
+    path, template = icon
+    hwnd = backend.add_window("雷电模拟器-1", [make_scene(template)])
+    watcher = RegionWatcher(hwnd, path)
+
+    assert watcher.poll()
+    assert watcher.poll()
+    margin = watcher.margin
+    assert backend.regions[0] == (0, 0, 320, 240)
+    assert backend.regions[1] == (ICON_POS[0] - margin, ICON_POS[1] - margin,
+                                  ICON_POS[0] + 48 + margin, ICON_POS[1] + 32 + margin)
+
+    # 同一窗口新建的监视器直接从上次位置开始，但第一次轮询仍检查完整区域
+    other = RegionWatcher(hwnd, path)
+    other.poll()
+    assert backend.regions[2] == (0, 0, 320, 240)
+
+
+def test_template_scaled_to_window_dpi(backend, icon):
+    path, template = icon
+    scaled = cv2.resize(template, None, fx=1.5, fy=1.5, interpolation=cv2.INTER_LINEAR)
+    hwnd = backend.add_window("雷电模拟器-1", [make_scene(scaled, size=(480, 360))], dpi_scale=1.5)
+    watcher = RegionWatcher(hwnd, path)
+
+    assert watcher.scale == pytest.approx(1.5)
+    result = watcher.poll()
+    assert result is not None
+    assert abs(result['top_left'][0] - ICON_POS[0]) <= 2 and abs(result['top_left'][1] - ICON_POS[1]) <= 2
+
+
+def test_wait_times_out(backend, icon):
+    path, _ = icon
+    hwnd = backend.add_window("雷电模拟器-1", [make_scene()])
+    watcher = RegionWatcher(hwnd, path, interval=0.005)
+
+    assert watcher.wait(0.05) is None
+    assert watcher.polls >= 2
+
+
+def test_wait_or_find_prefers_region_match(backend, icon):
+    path, template = icon
+    hwnd = backend.add_window("雷电模拟器-1", [make_scene(template)])
+    finder = FinderStub([])
+
+    center = RegionWatcher(hwnd, path, interval=0.005).wait_or_find(finder, full_every=1.0)
+    assert center == (ICON_POS[0] + 24, ICON_POS[1] + 16)
+    assert finder.calls == 0
+
+
+def test_wait_or_find_keeps_looking_until_found(backend, icon):
+    path, _ = icon
+    hwnd = backend.add_window("雷电模拟器-1", [make_scene()])
+    finder = FinderStub([None, None, (10, 20)])
+
+    # 没有总超时时，完整识别未找到也不放弃
+    center = RegionWatcher(hwnd, path, interval=0.002).wait_or_find(finder, full_every=0.01)
+    assert center == (10, 20)
+    assert finder.calls == 3
+
+
+def test_wait_or_find_times_out(backend, icon):
+    path, _ = icon
+    hwnd = backend.add_window("雷电模拟器-1", [make_scene()])
+    finder = FinderStub([])
+
+    assert RegionWatcher(hwnd, path, interval=0.002).wait_or_find(finder, timeout=0.05, full_every=0.02) is None
+    assert finder.calls >= 2
+
+
+def test_wait_or_find_switches_to_region_after_appearing(backend, icon):
+    path, template = icon
+    empty, shown = make_scene(), make_scene(template)
+    # 前20次截图按钮还没出现
+    hwnd = backend.add_window("雷电模拟器-1", lambda index: shown if index >= 20 else empty)
+    finder = FinderStub([])
+
+    center = RegionWatcher(hwnd, path, interval=0.001).wait_or_find(finder, full_every=0.01)
+    assert center == (ICON_POS[0] + 24, ICON_POS[1] + 16)
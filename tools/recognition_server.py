@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+本地识别服务
+启动后，设置了 RECOGNITION_SERVER_SETTINGS['enabled'] 或环境变量 JLTX_RECOGNITION_SERVER 的
+Agent进程都通过该服务识别，共用识别器和模板缓存
+
+用法:
+    python -m tools.recognition_server [--address 127.0.0.1:47651] [--workers 2]
+    （监听TCP地址时需在配置或环境变量 JLTX_RECOGNITION_AUTHKEY 中设置连接密钥）
+    python -m tools.recognition_server --stats [--address ...]
+    python -m tools.recognition_server --stop [--address ...]
+"""
+
+import argparse
+import json
+import sys
+from typing import List
+
+from common.recognition_server import RecognitionClient, RecognitionServer
+from common.utils import Colors
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="本地识别服务")
+    parser.add_argument("--address", default=None, help="服务地址（host:port、命名管道或Unix套接字路径）")
+    parser.add_argument("--workers", type=int, default=None, help="同时执行的识别请求数")
+    parser.add_argument("--stats", action="store_true", help="查看运行中服务的统计")
+    parser.add_argument("--stop", action="store_true", help="停止运行中的服务")
+    args = parser.parse_args(argv)
+
+    if args.stats or args.stop:
+        try:
+            client = RecognitionClient(args.address)
+        except (OSError, EOFError) as e:
+            print(f"{Colors.RED}无法连接识别服务: {e}{Colors.ENDC}")
+            return 1
+        if args.stats:
+            print(json.dumps(client.stats(), ensure_ascii=False, indent=2))
+        if args.stop:
+            client.shutdown()
+            print("识别服务已停止")
+        client.close()
+        return 0
+
+    try:
+        server = RecognitionServer(args.address, workers=args.workers)
+    except RuntimeError as e:
+        print(f"{Colors.RED}{e}{Colors.ENDC}")
+        return 1
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
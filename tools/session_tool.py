@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+会话录制工具
+查看会话录制信息、导出指定帧，以及在录制画面上批量重跑图像识别
+
+用法:
+    python -m tools.session_tool info SESSION
+    python -m tools.session_tool export SESSION INDEX [--output PATH]
+    python -m tools.session_tool recognize SESSION TEMPLATE [TEMPLATE ...] [--threshold 0.8] [--all-frames]
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import List
+
+import cv2
+
+from common.image_recognition import ImageRecognition
+from common.session_recording import SessionReader
+from common.utils import Colors
+
+
+def cmd_info(reader: SessionReader, args) -> int:
+    stats = reader.header.get('stats', {})
+    print(f"{Colors.BOLD}会话录制: {reader.path}{Colors.ENDC}")
+    print(f"  格式版本: {reader.header['version']}")
+    print(f"  创建时间: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(reader.header['created']))}")
+    print(f"  帧数: {len(reader)}（不重复 {len(reader.frame_indices(unique=True))}）")
+    if len(reader):
+        duration = float(reader.index['time'][-1] - reader.index['time'][0])
+        print(f"  时长: {duration:.1f}秒")
+    if stats.get('raw_bytes'):
+        print(f"  原始大小: {stats['raw_bytes'] / 1024 / 1024:.1f}MB，"
+              f"存储大小: {stats['stored_bytes'] / 1024 / 1024:.1f}MB")
+    for hwnd, title in reader.windows().items():
+        print(f"  窗口 {hwnd:#x} {title}: {len(reader.frame_indices(hwnd))}帧")
+    clicks = reader.events(['up'])
+    print(f"  点击次数: {len(clicks)}")
+    return 0
+
+
+def cmd_export(reader: SessionReader, args) -> int:
+    if not 0 <= args.index < len(reader):
+        print(f"{Colors.RED}帧号超出范围: {args.index}（共{len(reader)}帧）{Colors.ENDC}")
+        return 1
+    output = args.output or f"frame_{args.index:06d}.png"
+    cv2.imwrite(output, reader.frame(args.index))
+    print(f"已导出第{args.index}帧到: {output}")
+    return 0
+
+
+def cmd_recognize(reader: SessionReader, args) -> int:
+    recognizer = ImageRecognition(args.threshold)
+    indices = reader.frame_indices(unique=not args.all_frames)
+    print(f"{Colors.BOLD}在{len(indices)}帧上识别{len(args.templates)}个模板{Colors.ENDC}")
+
+    start = time.time()
+    found = {template: 0 for template in args.templates}
+    for index in indices:
+        frame = reader.frame(index)
+        for template in args.templates:
+            results = recognizer.find_target_in_scene(frame, template)
+            if results:
+                found[template] += 1
+                best = results[0]
+                print(f"  帧{index} {os.path.basename(template)}: {best['center']} "
+                      f"置信度{best['confidence']:.3f}")
+    elapsed = time.time() - start
+
+    print(f"\n{Colors.BOLD}识别汇总{Colors.ENDC}")
+    for template, count in found.items():
+        print(f"  {os.path.basename(template)}: {count}/{len(indices)}帧")
+    lookups = len(indices) * len(args.templates)
+    if lookups:
+        print(f"共{lookups}次识别，用时{elapsed:.2f}秒，平均{elapsed / lookups * 1000:.1f}毫秒")
+    return 0
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="会话录制工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    info = subparsers.add_parser("info", help="查看会话录制信息")
+    info.add_argument("session", help="会话目录")
+    info.set_defaults(handler=cmd_info)
+
+    export = subparsers.add_parser("export", help="导出指定帧")
+    export.add_argument("session", help="会话目录")
+    export.add_argument("index", type=int, help="帧号")
+    export.add_argument("--output", default=None, help="输出图像路径")
+    export.set_defaults(handler=cmd_export)
+
+    recognize = subparsers.add_parser("recognize", help="在录制画面上重跑图像识别")
+    recognize.add_argument("session", help="会话目录")
+    recognize.add_argument("templates", nargs="+", help="模板图像路径")
+    recognize.add_argument("--threshold", type=float, default=0.8, help="置信度阈值")
+    recognize.add_argument("--all-frames", action="store_true", help="包括重复帧")
+    recognize.set_defaults(handler=cmd_recognize)
+
+    args = parser.parse_args(argv)
+    with SessionReader(args.session) as reader:
+        return args.handler(reader, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
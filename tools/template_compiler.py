@@ -0,0 +1,356 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+模板资源编译与质量分析工具
+扫描模板目录，统计特征点数量、描述子区分度和模板间混淆度，
+为每个模板推荐匹配方法（NCC、ORB 或 SIFT），并生成 ImageRecognition 启动时加载的清单
+以及在模板SIFT描述子上拟合的紧凑描述子编码器
+
+用法:
+    python -m tools.template_compiler [--template-dir DIR] [--output PATH] [--background PNG]
+                                      [--no-validate] [--dry-run] [--descriptor-dims 48]
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+from common.compact_descriptors import CODEC_FILENAME, DescriptorCodec
+from common.image_recognition import ImageRecognition
+from common.template_manifest import (
+    DEFAULT_TEMPLATE_DIR, MANIFEST_FILENAME, METHOD_NCC, METHOD_ORB, METHOD_SIFT,
+    PROJECT_ROOT, TemplateManifest, file_sha1,
+)
+from common.utils import Colors
+
+# Lowe's ratio test 阈值，与 ImageRecognition.feature_match 保持一致
+RATIO_TEST = 0.7
+# SIFT 特征点少于该值时单应矩阵不稳定，改用 NCC
+MIN_SIFT_KEYPOINTS = 40
+# ORB 特征点不少于该值时优先使用更快的 ORB
+MIN_ORB_KEYPOINTS = 150
+# 特征混淆度达到该值即视为近似重复模板
+CONFUSION_THRESHOLD = 0.5
+# 像素包含度（NCC）达到该值即视为一个模板是另一个模板的局部
+PIXEL_CONFUSION_THRESHOLD = 0.8
+# ORB 只推荐给区分度足够高的模板，避免交叉检查匹配引入过多外点
+MIN_ORB_DISTINCTIVENESS = 0.9
+# 清单中为每个模板保留的最易混淆模板数量
+TOP_CONFUSIONS = 3
+# 验证推荐方法时使用的背景截图与定位容差（像素）
+DEFAULT_BACKGROUND = os.path.join(PROJECT_ROOT, "img", "screen", "test_result.png")
+VALIDATION_TOLERANCE = 10
+# 验证时模板贴入背景的缩放比例，模拟DPI缩放和模拟器分辨率与截取模板时不同的窗口
+VALIDATION_SCALES = (1.0, 0.8, 1.25)
+
+
+def extract_features(gray: np.ndarray) -> Dict[str, Any]:
+    """
+    提取模板的SIFT和ORB特征
+
+    Args:
+        gray: 灰度模板图像
+
+    Returns:
+        包含特征点数量和SIFT描述子的字典
+    """
+    sift = cv2.SIFT_create()
+    orb = cv2.ORB_create()
+    sift_kp, sift_des = sift.detectAndCompute(gray, None)
+    orb_kp, _ = orb.detectAndCompute(gray, None)
+    return {
+        "sift_keypoints": len(sift_kp),
+        "orb_keypoints": len(orb_kp),
+        "sift_descriptors": sift_des,
+    }
+
+
+def count_ratio_matches(query: np.ndarray, train: np.ndarray) -> int:
+    """
+    统计通过 Lowe's ratio test 的匹配数量
+
+    Args:
+        query: 查询描述子
+        train: 训练描述子
+
+    Returns:
+        通过比率测试的匹配数量
+    """
+    if query is None or train is None or len(query) == 0 or len(train) < 2:
+        return 0
+    matcher = cv2.BFMatcher(cv2.NORM_L2)
+    matches = matcher.knnMatch(query, train, k=2)
+    return sum(1 for pair in matches
+               if len(pair) == 2 and pair[0].distance < RATIO_TEST * pair[1].distance)
+
+
+def ncc_containment(small: np.ndarray, large: np.ndarray) -> float:
+    """
+    计算较小模板出现在较大模板中的最大归一化互相关，用于发现一个模板是另一个模板局部的情况
+
+    Args:
+        small: 较小的灰度模板
+        large: 较大的灰度模板
+
+    Returns:
+        最大NCC值，尺寸不满足包含关系时返回0
+    """
+    if small.shape[0] > large.shape[0] or small.shape[1] > large.shape[1]:
+        return 0.0
+    response = cv2.matchTemplate(large, small, cv2.TM_CCOEFF_NORMED)
+    return float(max(0.0, response.max()))
+
+
+def load_background(path: str) -> np.ndarray:
+    """
+    加载验证用的背景截图，不存在时生成随机纹理背景
+
+    Args:
+        path: 背景截图路径
+
+    Returns:
+        BGR背景图像
+    """
+    background = cv2.imread(path) if path and os.path.exists(path) else None
+    if background is None:
+        rng = np.random.default_rng(0)
+        background = rng.integers(0, 256, (720, 1280, 3), dtype=np.uint8)
+        background = cv2.GaussianBlur(background, (7, 7), 0)
+    return background
+
+
+def validate_method(recognizer: ImageRecognition, method: str, template: np.ndarray,
+                    background: np.ndarray, scale: float = 1.0) -> bool:
+    """
+    将模板（按scale缩放后）贴到背景截图中，检查指定方法能否在容差内定位到它
+
+    Args:
+        recognizer: 不加载模板清单的识别器
+        method: 匹配方法
+        template: BGR模板图像
+        background: BGR背景图像
+        scale: 模板贴入背景前的缩放比例
+
+    Returns:
+        是否定位成功
+    """
+    pasted = template
+    if scale != 1.0:
+        interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+        pasted = cv2.resize(template, None, fx=scale, fy=scale, interpolation=interpolation)
+    h, w = pasted.shape[:2]
+    bh, bw = background.shape[:2]
+    if h >= bh or w >= bw:
+        return False
+
+    # 放在背景中部偏左上，避开边缘
+    x, y = (bw - w) // 3, (bh - h) // 3
+    scene = background.copy()
+    scene[y:y + h, x:x + w] = pasted
+
+    results = recognizer.find_target_in_scene(scene, template, [method])
+    if not results:
+        return False
+    cx, cy = results[0]['center']
+    return abs(cx - (x + w // 2)) <= VALIDATION_TOLERANCE and abs(cy - (y + h // 2)) <= VALIDATION_TOLERANCE
+
+
+def analyze_templates(template_dir: str, background_path: str = DEFAULT_BACKGROUND,
+                      validate: bool = True) -> Dict[str, Dict[str, Any]]:
+    """
+    分析模板目录中的所有PNG模板
+
+    Args:
+        template_dir: 模板目录
+        background_path: 验证推荐方法时使用的背景截图
+        validate: 是否在背景截图上验证推荐方法
+
+    Returns:
+        以模板文件名为键的分析结果
+    """
+    paths = sorted(glob.glob(os.path.join(template_dir, "*.png")))
+    images = {}
+    grays = {}
+    features = {}
+    entries = {}
+
+    for path in paths:
+        name = os.path.basename(path)
+        image = cv2.imread(path)
+        if image is None:
+            print(f"{Colors.RED}无法读取模板: {path}{Colors.ENDC}")
+            continue
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        images[name] = image
+        grays[name] = gray
+        features[name] = extract_features(gray)
+        entries[name] = {
+            "size": [int(gray.shape[1]), int(gray.shape[0])],
+            "sha1": file_sha1(path),
+            "sift_keypoints": features[name]["sift_keypoints"],
+            "orb_keypoints": features[name]["orb_keypoints"],
+        }
+
+    names = list(entries.keys())
+
+    # 区分度：模板描述子在其余所有模板描述子中找不到可靠匹配的比例
+    for name in names:
+        own = features[name]["sift_descriptors"]
+        others = [features[other]["sift_descriptors"] for other in names
+                  if other != name and features[other]["sift_descriptors"] is not None]
+        if own is None or not others:
+            entries[name]["distinctiveness"] = 0.0 if own is None else 1.0
+            continue
+        matched = count_ratio_matches(own, np.vstack(others))
+        entries[name]["distinctiveness"] = round(1.0 - matched / len(own), 3)
+
+    # 混淆度：特征混淆（A的描述子能匹配到B的比例）与像素包含（A作为B局部的NCC）取较大值
+    for name in names:
+        own = features[name]["sift_descriptors"]
+        scores = {}
+        for other in names:
+            if other == name:
+                continue
+            feature_score = 0.0
+            if own is not None and len(own) > 0:
+                feature_score = count_ratio_matches(own, features[other]["sift_descriptors"]) / len(own)
+            pixel_score = ncc_containment(grays[name], grays[other])
+            scores[other] = {
+                "feature": round(feature_score, 3),
+                "pixel": round(pixel_score, 3),
+                "score": round(max(feature_score, pixel_score), 3),
+            }
+
+        ranked = sorted(scores.items(), key=lambda item: item[1]["score"], reverse=True)
+        entries[name]["confusion"] = dict(ranked[:TOP_CONFUSIONS])
+        entries[name]["max_confusion"] = ranked[0][1]["score"] if ranked else 0.0
+        entries[name]["confused_with"] = [other for other, score in ranked
+                                          if score["feature"] >= CONFUSION_THRESHOLD
+                                          or score["pixel"] >= PIXEL_CONFUSION_THRESHOLD]
+
+    background = load_background(background_path) if validate else None
+    recognizer = ImageRecognition(0.8, manifest=TemplateManifest())
+    for name in names:
+        candidates = candidate_methods(entries[name])
+        method, reason = candidates[0]
+        if validate:
+            # 每个候选方法在各缩放比例下验证；优先选所有比例都通过的方法，
+            # 只在原尺寸通过的方法（NCC）仍可推荐，其他比例由后备方法识别
+            validated = entries[name]["validated"] = {}
+            for candidate, _ in candidates:
+                validated[candidate] = {f"{scale:g}": validate_method(recognizer, candidate, images[name],
+                                                                      background, scale)
+                                        for scale in VALIDATION_SCALES}
+            full = [(c, r) for c, r in candidates if all(validated[c].values())]
+            original = [(c, r) for c, r in candidates if validated[c]["1"]]
+            if full:
+                method, reason = full[0]
+            elif original:
+                method, reason = original[0][0], f"{original[0][1]}（仅原尺寸验证通过）"
+            else:
+                method, reason = METHOD_SIFT, "所有候选方法验证失败"
+        entries[name]["method"] = method
+        entries[name]["reason"] = reason
+        # 运行时推荐方法没有结果时依次尝试的后备方法
+        entries[name]["methods"] = [method] + [c for c, _ in candidates if c != method]
+        if METHOD_SIFT not in entries[name]["methods"]:
+            entries[name]["methods"].append(METHOD_SIFT)
+
+    return entries
+
+
+def candidate_methods(entry: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """
+    根据分析结果给出按优先级排列的候选匹配方法
+
+    Args:
+        entry: 模板分析结果
+
+    Returns:
+        [(匹配方法, 推荐原因), ...]
+    """
+    if entry["sift_keypoints"] < MIN_SIFT_KEYPOINTS:
+        return [(METHOD_NCC, "SIFT特征点过少"), (METHOD_SIFT, "NCC验证失败")]
+
+    # 特征层面相似但像素层面不同的模板，用NCC按像素区分更可靠
+    for other, score in entry["confusion"].items():
+        if score["feature"] >= CONFUSION_THRESHOLD and score["pixel"] < PIXEL_CONFUSION_THRESHOLD:
+            return [(METHOD_NCC, f"特征与{other}近似"), (METHOD_SIFT, "NCC验证失败")]
+
+    if (entry["orb_keypoints"] >= MIN_ORB_KEYPOINTS
+            and entry["distinctiveness"] >= MIN_ORB_DISTINCTIVENESS
+            and not entry["confused_with"]):
+        return [(METHOD_ORB, "ORB特征点充足"), (METHOD_SIFT, "ORB验证失败")]
+
+    return [(METHOD_SIFT, "默认"), (METHOD_NCC, "SIFT验证失败")]
+
+
+def print_report(entries: Dict[str, Dict[str, Any]]):
+    """打印分析报告"""
+    header = f"{'模板':<26}{'SIFT':>6}{'ORB':>6}{'区分度':>8}{'混淆度':>8}  {'推荐方法':<22}原因"
+    print(f"{Colors.BOLD}{header}{Colors.ENDC}")
+    for name, entry in entries.items():
+        color = Colors.YELLOW if entry["confused_with"] or entry["method"] == METHOD_NCC else ""
+        end = Colors.ENDC if color else ""
+        line = (f"{name:<28}{entry['sift_keypoints']:>6}{entry['orb_keypoints']:>6}"
+                f"{entry['distinctiveness']:>10.3f}{entry['max_confusion']:>10.3f}  "
+                f"{entry['method']:<22}{entry['reason']}")
+        print(f"{color}{line}{end}")
+        if entry["confused_with"]:
+            print(f"    易混淆: {', '.join(entry['confused_with'])}")
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="模板资源编译与质量分析工具")
+    parser.add_argument("--template-dir", default=DEFAULT_TEMPLATE_DIR, help="模板目录")
+    parser.add_argument("--output", default=None, help="清单输出路径，默认写入模板目录下的manifest.json")
+    parser.add_argument("--background", default=DEFAULT_BACKGROUND, help="验证推荐方法时使用的背景截图")
+    parser.add_argument("--no-validate", action="store_true", help="跳过在背景截图上验证推荐方法")
+    parser.add_argument("--dry-run", action="store_true", help="只打印报告，不写入清单")
+    parser.add_argument("--descriptor-dims", type=int, default=48,
+                        help="紧凑描述子（PCA+uint8）的维数，0表示不生成描述子编码器")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.template_dir):
+        print(f"{Colors.RED}模板目录不存在: {args.template_dir}{Colors.ENDC}")
+        return 1
+
+    start = time.time()
+    entries = analyze_templates(args.template_dir, args.background, validate=not args.no_validate)
+    print_report(entries)
+    print(f"\n共分析{len(entries)}个模板，用时{time.time() - start:.2f}秒")
+
+    if not args.dry_run:
+        output = args.output or os.path.join(args.template_dir, MANIFEST_FILENAME)
+        manifest = TemplateManifest(entries)
+        manifest.save(output, extra={
+            "generated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "thresholds": {
+                "ratio_test": RATIO_TEST,
+                "min_sift_keypoints": MIN_SIFT_KEYPOINTS,
+                "min_orb_keypoints": MIN_ORB_KEYPOINTS,
+                "confusion": CONFUSION_THRESHOLD,
+                "pixel_confusion": PIXEL_CONFUSION_THRESHOLD,
+                "min_orb_distinctiveness": MIN_ORB_DISTINCTIVENESS,
+            },
+        })
+        print(f"{Colors.GREEN}清单已写入: {output}{Colors.ENDC}")
+
+        if args.descriptor_dims > 0:
+            codec_path = os.path.join(os.path.dirname(output), CODEC_FILENAME)
+            codec = DescriptorCodec.fit_templates(sorted(glob.glob(os.path.join(args.template_dir, "*.png"))),
+                                                  args.descriptor_dims)
+            codec.save(codec_path)
+            print(f"{Colors.GREEN}描述子编码器已写入: {codec_path}（{codec.dims}维）{Colors.ENDC}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())